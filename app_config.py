@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# Shared config/cache locations for KZI Generator
+
+import os
+import json
+
+APP_NAME = "kzi-cartridge-generator"
+
+def get_config_dir():
+    return os.path.join(os.path.expanduser("~"), ".config", APP_NAME)
+
+def get_cache_dir(*parts):
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, APP_NAME, *parts)
+
+def get_runtime_dir(*parts):
+    """Per-boot state (mounts, pids); falls back to the cache dir without XDG_RUNTIME_DIR."""
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if not base:
+        return get_cache_dir("run", *parts)
+    return os.path.join(base, APP_NAME, *parts)
+
+def load_config():
+    config_file = os.path.join(get_config_dir(), "config.json")
+    if os.path.exists(config_file):
+        with open(config_file, 'r') as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                pass
+    return {}
+
+def save_config(config):
+    config_dir = get_config_dir()
+    os.makedirs(config_dir, exist_ok=True)
+    with open(os.path.join(config_dir, "config.json"), 'w') as f:
+        json.dump(config, f, indent=4)
+
+def write_json_atomic(path, data):
+    """Writes JSON next to `path` and renames it over, so readers never see half a file."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+# Benchmarks for KZI Generator
+# Times the packaging, ISO, theme export and download workers headlessly and compares runs
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from synthetic import make_tree, make_theme_assets, make_download_payload, tree_bytes
+
+RESULTS_VERSION = 1
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.10 # wall/CPU time may grow this much before it counts as a regression
+DEFAULT_RSS_THRESHOLD = 0.20
+NOISE_SECONDS = 0.05 # smaller differences are never regressions, however large in percent
+NOISE_MS = 1.0 # the same for preview render times
+FRAME_MS = 1000 / 60 # a preview render should fit in one frame
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+THEME_DATA = {
+    'theme_name': "Benchmark Theme",
+    'author': "kzi-bench",
+    'description': "Generated by benchmarks/synthetic.py",
+    'menu_position': "Center",
+    'font_color': "White",
+    'cursor_color': "White",
+    'background_scroll_speed': "Normal",
+    'color_shift_speed': "Normal",
+    'cursor_blink_speed': "Normal",
+    'cursor_transition_speed': "Normal",
+    'cursor_style': "Default",
+}
+
+# Each case runs one worker's run() on one synthetic input; 'tools' must be on PATH
+CASES = {
+    'create-small-files': {'worker': 'CreateWorker', 'input': 'small-files', 'tools': ['mkfs.erofs']},
+    'create-huge-files': {'worker': 'CreateWorker', 'input': 'huge-files', 'tools': ['mkfs.erofs']},
+    'create-media-mix': {'worker': 'CreateWorker', 'input': 'media-mix', 'tools': ['mkfs.erofs'],
+                         'auto_hints': True},
+    'iso-small-files': {'worker': 'CreateIsoWorker', 'input': 'small-files', 'tools': ['genisoimage']},
+    'iso-media-mix': {'worker': 'CreateIsoWorker', 'input': 'media-mix', 'tools': ['genisoimage']},
+    'theme-export': {'worker': 'ExportWorker', 'input': 'theme', 'tools': ['ffmpeg']},
+    'download': {'worker': 'DownloadWorker', 'input': 'download', 'tools': []},
+    # Types into the main window; its debounced preview times every render itself
+    'preview-typing': {'worker': 'PreviewTyping', 'input': 'preview', 'tools': [], 'gui': True},
+}
+
+PREVIEW_TEXT = "The Legend of a Very Long Game Name Deluxe Remastered Edition"
+KEY_INTERVAL_MS = 30 # a fast typist; shorter than the debounce, so only word pauses render
+
+METRICS = ['wall_seconds', 'cpu_seconds', 'peak_rss_bytes', 'bytes_per_second']
+PREVIEW_METRICS = ['render_ms_p95', 'render_ms_max', 'latency_ms_p95']
+
+
+# --- Local HTTP Server ---
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static files with single Range requests, ETag and Accept-Ranges, as segmented downloads expect."""
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            return super().send_head()
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        st = os.fstat(f.fileno())
+        start, end = 0, st.st_size - 1
+        ranged = self.headers.get('Range', '')
+        if ranged.startswith('bytes='):
+            first, _, last = ranged[6:].split(',')[0].strip().partition('-')
+            if first:
+                start, end = int(first), min(int(last), end) if last else end
+            else:
+                start = max(0, st.st_size - int(last))
+            if start > end:
+                f.close()
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{st.st_size}")
+                self.end_headers()
+                return None
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{st.st_size}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', "application/octet-stream")
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', "bytes")
+        self.send_header('ETag', f'"{st.st_size:x}-{st.st_mtime_ns:x}"')
+        self.send_header('Last-Modified', self.date_time_string(int(st.st_mtime)))
+        self.end_headers()
+        f.seek(start)
+        self.remaining = end - start + 1
+        return f
+
+    def copyfile(self, source, outputfile):
+        while self.remaining > 0:
+            chunk = source.read(min(1024 * 1024, self.remaining))
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            self.remaining -= len(chunk)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(folder):
+    """Serves `folder` on a free localhost port from a daemon thread. Returns (server, base URL)."""
+    handler = lambda *args, **kwargs: RangeRequestHandler(*args, directory=folder, **kwargs)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Running One Case (child process) ---
+def _rss_bytes(kilobytes_or_bytes):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return kilobytes_or_bytes if sys.platform == 'darwin' else kilobytes_or_bytes * 1024
+
+def _make_worker(spec):
+    worker = spec['worker']
+    if worker == 'CreateWorker':
+        from erofs_manager import CreateWorker
+        return CreateWorker(spec['input'], spec['output'], spec.get('algo', 'lz4'),
+                            auto_hints=spec.get('auto_hints', False), pkg_type='kzp')
+    if worker == 'CreateIsoWorker':
+        from iso_burner import CreateIsoWorker
+        return CreateIsoWorker(spec['input'], spec['output'])
+    if worker == 'ExportWorker':
+        from theme_creator import ExportWorker
+        return ExportWorker(dict(THEME_DATA), spec['input'], spec['output'])
+    if worker == 'DownloadWorker':
+        from main import DownloadWorker
+        return DownloadWorker(spec['url'], spec['output'])
+    if worker == 'PreviewTyping':
+        return _make_preview_typing(spec['input'])
+    raise ValueError(f"Unknown worker {worker}")
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+def _make_preview_typing(text):
+    """
+    A worker-like object that types `text` into the main window's name field,
+    one key every KEY_INTERVAL_MS and a pause after each word, and reports the
+    window's own preview_latencies: render time and time since the first key
+    of the burst (which includes the debounce by design).
+    """
+    from PyQt6.QtCore import QObject, pyqtSignal
+    from PyQt6.QtTest import QTest
+    from main import KziGeneratorApp, PREVIEW_DEBOUNCE_MS
+
+    class PreviewTyping(QObject):
+        error = pyqtSignal(str)
+
+        def __init__(self):
+            super().__init__()
+            self.window = KziGeneratorApp()
+            self.window.show()
+            QTest.qWaitForWindowExposed(self.window)
+
+        def run(self):
+            self.window.preview_latencies.clear()
+            for char in text:
+                QTest.keyClicks(self.window.game_name_entry, char)
+                QTest.qWait(PREVIEW_DEBOUNCE_MS * 2 if char == ' ' else KEY_INTERVAL_MS)
+            QTest.qWait(PREVIEW_DEBOUNCE_MS * 2)
+            if not self.window.preview_latencies:
+                self.error.emit("The preview never rendered.")
+
+        def metrics(self):
+            renders = [render for render, _ in self.window.preview_latencies]
+            latencies = [latency for _, latency in self.window.preview_latencies]
+            return {
+                'renders': len(renders),
+                'render_ms_p95': _percentile(renders, 0.95),
+                'render_ms_max': max(renders, default=None),
+                'latency_ms_p95': _percentile(latencies, 0.95),
+            }
+
+    return PreviewTyping()
+
+def run_case_in_process(spec):
+    """
+    Runs one worker synchronously (run(), not start(), so no event loop is
+    needed) and measures it. CPU time and peak RSS include the tools the
+    worker runs (mkfs.erofs, genisoimage, ffmpeg), via RUSAGE_CHILDREN.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt6.QtCore import QCoreApplication
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        return {'status': 'skipped', 'reason': "PyQt6 is not installed"}
+    # Workers only need an event loop; the preview case needs real widgets
+    app_class = QApplication if spec.get('gui') else QCoreApplication
+    app = QCoreApplication.instance() or app_class([])
+
+    try:
+        worker = _make_worker(spec)
+    except ImportError as e:
+        return {'status': 'skipped', 'reason': f"Cannot import the worker: {e}"}
+    errors = []
+    worker.error.connect(errors.append)
+
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    worker.run()
+    wall = time.perf_counter() - start
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    app.processEvents()
+
+    if errors:
+        return {'status': 'failed', 'reason': errors[0]}
+    cpu = sum(getattr(after, field) - getattr(before, field)
+              for before, after in ((self_before, self_after), (children_before, children_after))
+              for field in ('ru_utime', 'ru_stime'))
+    result = {
+        'status': 'ok',
+        'wall_seconds': wall,
+        'cpu_seconds': cpu,
+        'peak_rss_bytes': _rss_bytes(self_after.ru_maxrss),
+        'rss_before_bytes': _rss_bytes(self_before.ru_maxrss),
+        'peak_child_rss_bytes': _rss_bytes(children_after.ru_maxrss),
+        'bytes': spec['bytes'],
+        'bytes_per_second': spec['bytes'] / wall if wall else None,
+    }
+    if hasattr(worker, 'metrics'):
+        result.update(worker.metrics())
+    return result
+
+
+# --- Running the Suite ---
+def _tool_version(tool):
+    path = shutil.which(tool)
+    if not path:
+        return None
+    for flag in ('--version', '-V', '-version'):
+        try:
+            process = subprocess.run([path, flag], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            continue
+        output = (process.stdout or process.stderr).strip()
+        if output:
+            return output.splitlines()[0]
+    return path
+
+def _git_commit():
+    try:
+        process = subprocess.run(['git', '-C', REPO_DIR, 'rev-parse', '--short', 'HEAD'],
+                                 capture_output=True, text=True, timeout=10)
+        return process.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+def machine_info():
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'tools': {tool: _tool_version(tool) for tool in ('mkfs.erofs', 'genisoimage', 'ffmpeg')},
+        'commit': _git_commit(),
+    }
+
+def prepare_input(case, data_dir, scale, seed):
+    """Generates (or reuses) the synthetic input of a case. Returns (input, bytes)."""
+    kind = CASES[case]['input']
+    if kind == 'theme':
+        paths = make_theme_assets(data_dir, scale, seed)
+        return paths, sum(os.path.getsize(p) if os.path.isfile(p) else tree_bytes(p) for p in paths.values())
+    if kind == 'download':
+        path = make_download_payload(data_dir, scale, seed)
+        return path, os.path.getsize(path)
+    if kind == 'preview':
+        # Bytes are characters typed, so bytes/s is keystrokes per second
+        return PREVIEW_TEXT, len(PREVIEW_TEXT)
+    folder = make_tree(data_dir, kind, scale, seed)
+    return folder, tree_bytes(folder)
+
+def _output_path(case, out_dir):
+    worker = CASES[case]['worker']
+    if worker == 'CreateWorker':
+        return os.path.join(out_dir, f"{case}.kzp")
+    if worker == 'CreateIsoWorker':
+        return os.path.join(out_dir, f"{case}.iso")
+    if worker == 'DownloadWorker':
+        return os.path.join(out_dir, "runtime.kzr")
+    return out_dir
+
+def _run_child(spec):
+    with tempfile.TemporaryDirectory(prefix="kzi-bench-cache-") as cache_dir:
+        # An empty cache per run: no build manifests, hints or runtime store carried over
+        env = dict(os.environ, XDG_CACHE_HOME=cache_dir, QT_QPA_PLATFORM='offscreen')
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), '_case', json.dumps(spec)],
+                                 capture_output=True, text=True, env=env)
+    lines = process.stdout.strip().splitlines()
+    try:
+        return json.loads(lines[-1])
+    except (IndexError, json.JSONDecodeError):
+        return {'status': 'failed', 'reason': (process.stderr.strip().splitlines() or ["no output"])[-1]}
+
+def summarize(runs):
+    """Median of each metric over the successful runs, plus the spread of the wall time."""
+    ok = [run for run in runs if run['status'] == 'ok']
+    if not ok:
+        return None
+    summary = {metric: statistics.median(run[metric] for run in ok if run[metric] is not None) for metric in METRICS}
+    summary['peak_rss_bytes'] = max(run['peak_rss_bytes'] for run in ok)
+    summary['wall_stdev'] = statistics.stdev(run['wall_seconds'] for run in ok) if len(ok) > 1 else 0.0
+    for metric in PREVIEW_METRICS:
+        values = [run[metric] for run in ok if run.get(metric) is not None]
+        if values:
+            summary[metric] = max(values) # the worst run, as for peak RSS
+    return summary
+
+def run_suite(cases, data_dir, scale=1.0, seed=0, repeat=DEFAULT_REPEAT, log=print):
+    results = {}
+    server = url = None
+    try:
+        for case in cases:
+            missing = [tool for tool in CASES[case]['tools'] if not shutil.which(tool)]
+            if missing:
+                results[case] = {'status': 'skipped', 'reason': f"{', '.join(missing)} not found", 'runs': []}
+                log(f"{case}: skipped ({results[case]['reason']})")
+                continue
+            log(f"{case}: preparing input...")
+            try:
+                source, size = prepare_input(case, data_dir, scale, seed)
+            except ImportError as e:
+                results[case] = {'status': 'skipped', 'reason': str(e), 'runs': []}
+                log(f"{case}: skipped ({e})")
+                continue
+            if CASES[case]['worker'] == 'DownloadWorker' and server is None:
+                server, url = start_server(os.path.dirname(source))
+
+            out_dir = os.path.join(data_dir, "out", case)
+            runs = []
+            for i in range(repeat):
+                shutil.rmtree(out_dir, ignore_errors=True)
+                os.makedirs(out_dir)
+                spec = dict(CASES[case], case=case, input=source, bytes=size, output=_output_path(case, out_dir))
+                if url:
+                    spec['url'] = f"{url}/{os.path.basename(source)}"
+                run = _run_child(spec)
+                runs.append(run)
+                if run['status'] != 'ok':
+                    log(f"{case}: run {i + 1} {run['status']}: {run.get('reason')}")
+                    break
+                if 'render_ms_p95' in run:
+                    log(f"{case}: run {i + 1}/{repeat} {run['renders']} renders, {run['render_ms_p95']:.2f} ms p95, "
+                        f"{run['render_ms_max']:.2f} ms max (frame: {FRAME_MS:.1f} ms)")
+                    continue
+                log(f"{case}: run {i + 1}/{repeat} {run['wall_seconds']:.2f}s, {run['cpu_seconds']:.2f}s CPU, "
+                    f"{run['bytes_per_second'] / 1024 / 1024:.1f} MB/s")
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+            status = runs[-1]['status'] if runs else 'failed'
+            results[case] = {'status': status, 'reason': runs[-1].get('reason') if runs else None,
+                             'input_bytes': size, 'runs': runs, 'summary': summarize(runs)}
+    finally:
+        if server:
+            server.shutdown()
+    return results
+
+
+# --- Comparing Runs ---
+def compare_results(base, new, threshold=DEFAULT_THRESHOLD, rss_threshold=DEFAULT_RSS_THRESHOLD):
+    """
+    Compares the medians of two result files. A time metric regresses when it
+    grew by more than `threshold` and NOISE_SECONDS; peak RSS when it grew by
+    more than `rss_threshold`; the preview's p95 render time when it grew by
+    more than `threshold` and NOISE_MS, or no longer fits in a frame.
+    Returns {'rows', 'regressions', 'warnings'}.
+    """
+    warnings = []
+    for key in ('cpu_count', 'platform'):
+        if base['machine'].get(key) != new['machine'].get(key):
+            warnings.append(f"{key} differs: {base['machine'].get(key)} vs {new['machine'].get(key)}")
+    if base.get('scale') != new.get('scale'):
+        warnings.append(f"scale differs: {base.get('scale')} vs {new.get('scale')}")
+
+    rows = []
+    regressions = 0
+    for case in sorted(set(base['results']) | set(new['results'])):
+        before = (base['results'].get(case) or {}).get('summary')
+        after = (new['results'].get(case) or {}).get('summary')
+        if not before or not after:
+            rows.append({'case': case, 'metric': None, 'change': None, 'flag': 'not compared',
+                         'base': (base['results'].get(case) or {}).get('status', 'absent'),
+                         'new': (new['results'].get(case) or {}).get('status', 'absent')})
+            continue
+        metrics = ['wall_seconds', 'cpu_seconds', 'peak_rss_bytes']
+        if 'render_ms_p95' in before and 'render_ms_p95' in after:
+            metrics.append('render_ms_p95')
+        for metric in metrics:
+            old, cur = before[metric], after[metric]
+            change = (cur - old) / old if old else 0.0
+            limit = rss_threshold if metric == 'peak_rss_bytes' else threshold
+            if metric == 'peak_rss_bytes':
+                significant = True
+            else:
+                significant = abs(cur - old) > (NOISE_MS if metric == 'render_ms_p95' else NOISE_SECONDS)
+            flag = ''
+            if metric == 'render_ms_p95' and cur > FRAME_MS >= old:
+                flag = 'REGRESSION (over a frame)'
+                regressions += 1
+            elif significant and change > limit:
+                flag = 'REGRESSION'
+                regressions += 1
+            elif significant and change < -limit:
+                flag = 'faster' if metric != 'peak_rss_bytes' else 'smaller'
+            rows.append({'case': case, 'metric': metric, 'base': old, 'new': cur, 'change': change, 'flag': flag})
+    return {'rows': rows, 'regressions': regressions, 'warnings': warnings}
+
+def _format_value(metric, value):
+    if metric == 'peak_rss_bytes':
+        return f"{value / 1024 / 1024:.0f} MB"
+    if metric == 'render_ms_p95':
+        return f"{value:.2f} ms"
+    return f"{value:.2f}s"
+
+def format_comparison(comparison):
+    lines = [f"warning: {warning}" for warning in comparison['warnings']]
+    lines.append(f"{'Case':<22} {'Metric':<15} {'Base':>10} {'New':>10} {'Change':>8}")
+    for row in comparison['rows']:
+        if row['metric'] is None:
+            lines.append(f"{row['case']:<22} {'-':<15} {row['base']:>10} {row['new']:>10}  {row['flag']}")
+            continue
+        lines.append(f"{row['case']:<22} {row['metric']:<15} {_format_value(row['metric'], row['base']):>10} "
+                     f"{_format_value(row['metric'], row['new']):>10} {row['change'] * 100:>+7.1f}%  {row['flag']}")
+    lines.append(f"{comparison['regressions']} regressions")
+    return "\n".join(lines)
+
+def load_results(path):
+    with open(path, 'r') as f:
+        results = json.load(f)
+    if results.get('version') != RESULTS_VERSION:
+        raise ValueError(f"{path} is not a version {RESULTS_VERSION} results file")
+    return results
+
+
+# --- Command Line ---
+def cmd_run(args):
+    cases = args.cases or list(CASES)
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        print(f"error: Unknown case(s): {', '.join(unknown)}. Known: {', '.join(CASES)}", file=sys.stderr)
+        return 1
+    data_dir = os.path.abspath(args.data or os.path.join(tempfile.gettempdir(), "kzi-bench"))
+    os.makedirs(data_dir, exist_ok=True)
+
+    results = run_suite(cases, data_dir, args.scale, args.seed, args.repeat)
+    report = {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'scale': args.scale,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'machine': machine_info(),
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+    return 1 if any(result['status'] == 'failed' for result in results.values()) else 0
+
+def cmd_compare(args):
+    try:
+        base, new = load_results(args.base), load_results(args.new)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    comparison = compare_results(base, new, args.threshold, args.rss_threshold)
+    if args.json:
+        print(json.dumps(comparison, indent=2))
+    else:
+        print(format_comparison(comparison))
+    return 1 if comparison['regressions'] else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="bench", description="KZI Generator benchmarks")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('run', help="Run benchmark cases and write a JSON results file")
+    p.add_argument('cases', nargs='*', help=f"Cases to run (default: all of {', '.join(CASES)})")
+    p.add_argument('--scale', type=float, default=1.0, help="Multiplies input sizes (default: 1.0)")
+    p.add_argument('--seed', type=int, default=0, help="Seed for the synthetic inputs (default: 0)")
+    p.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help=f"Runs per case (default: {DEFAULT_REPEAT})")
+    p.add_argument('--data', help="Where inputs are generated and kept between runs (default: $TMPDIR/kzi-bench)")
+    p.add_argument('-o', '--output', help="Results file (default: benchmarks/results/<timestamp>.json)")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser('compare', help="Compare two results files and flag regressions")
+    p.add_argument('base', help="Results of the baseline")
+    p.add_argument('new', help="Results to check")
+    p.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                   help=f"Allowed growth of wall/CPU time (default: {DEFAULT_THRESHOLD})")
+    p.add_argument('--rss-threshold', type=float, default=DEFAULT_RSS_THRESHOLD,
+                   help=f"Allowed growth of peak RSS (default: {DEFAULT_RSS_THRESHOLD})")
+    p.add_argument('--json', action='store_true', help="Print JSON")
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser('list', help="List the cases")
+    p.set_defaults(func=lambda args: print("\n".join(f"{name}: {case['worker']} on {case['input']}"
+                                                     for name, case in CASES.items())) or 0)
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == '_case':
+        # Internal: one measured run in a fresh process, result as the last line of stdout
+        print(json.dumps(run_case_in_process(json.loads(argv[1]))))
+        return 0
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
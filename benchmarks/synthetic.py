@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# Synthetic Inputs for the KZI Generator Benchmarks
+# Deterministic game trees, theme assets and download payloads; same seed and scale, same bytes
+
+import os
+import json
+import math
+import wave
+import struct
+import random
+import shutil
+
+GENERATOR_VERSION = 1 # bump when the output of any generator changes, so old trees are rebuilt
+STAMP_SUFFIX = ".synthetic.json" # beside each generated folder, so it never ends up in an image
+
+WORDS = (
+    "local function return end if then else player enemy damage health level sprite texture shader "
+    "vertex index buffer frame update render audio music volume input button axis config value true "
+    "false nil table string number path asset load save state scene camera light shadow"
+).split()
+
+# Tree shapes. Sizes are at scale 1.0; every count and size is multiplied by the scale.
+TREES = {
+    # Many small scripts/configs: stresses per-file work in mkfs.erofs and genisoimage
+    'small-files': {'dirs': 100, 'files_per_dir': 200, 'min_size': 256, 'max_size': 8 * 1024,
+                    'extensions': ['.lua', '.json', '.txt', '.cfg'], 'incompressible': 0.0},
+    # A few huge archives, half compressible: stresses raw throughput
+    'huge-files': {'dirs': 1, 'files_per_dir': 3, 'min_size': 96 * 1024 * 1024, 'max_size': 128 * 1024 * 1024,
+                   'extensions': ['.pak'], 'incompressible': 0.5},
+    # Video/audio next to compressible assets: the case compress hints exist for
+    'media-mix': {'dirs': 10, 'files_per_dir': 40, 'min_size': 64 * 1024, 'max_size': 8 * 1024 * 1024,
+                  'extensions': ['.mp4', '.ogg', '.png', '.dat', '.lua', '.bin'], 'incompressible': None},
+}
+
+# Extensions filled with random bytes in 'media-mix' (incompressible=None)
+MEDIA_EXTENSIONS = {'.mp4', '.ogg', '.png'}
+
+KZI_TEMPLATE = """[Desktop Entry]
+Name=Benchmark {name}
+Id=benchmark-{name}
+Exec=game.sh
+Runtime=linux
+"""
+
+
+# --- Content ---
+def _text_bytes(rng, size):
+    """Script-like text: compresses roughly like real game scripts (3-5x with lz4)."""
+    out = bytearray()
+    while len(out) < size:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 10)))
+        out += f"{line} = {rng.randint(0, 99999)}\n".encode()
+    return bytes(out[:size])
+
+def _file_bytes(rng, size, incompressible):
+    """`incompressible` of the file is random bytes, the rest text, interleaved in 64 KB runs."""
+    if incompressible <= 0:
+        return _text_bytes(rng, size)
+    if incompressible >= 1:
+        return rng.randbytes(size)
+    out = bytearray()
+    run = 64 * 1024
+    while len(out) < size:
+        n = min(run, size - len(out))
+        out += rng.randbytes(n) if rng.random() < incompressible else _text_bytes(rng, n)
+    return bytes(out)
+
+def _write_file(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+# --- Stamps ---
+def _stamp(kind, name, scale, seed):
+    return {'generator': GENERATOR_VERSION, 'kind': kind, 'name': name, 'scale': scale, 'seed': seed}
+
+def _is_current(folder, stamp):
+    try:
+        with open(folder + STAMP_SUFFIX, 'r') as f:
+            return json.load(f) == stamp
+    except (OSError, json.JSONDecodeError):
+        return False
+
+def _finish(folder, stamp):
+    # Written last, so an interrupted generation is redone next time
+    with open(folder + STAMP_SUFFIX, 'w') as f:
+        json.dump(stamp, f)
+
+def _fresh_dir(folder):
+    if os.path.exists(folder + STAMP_SUFFIX):
+        os.remove(folder + STAMP_SUFFIX)
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+    os.makedirs(folder)
+
+def tree_bytes(folder):
+    total = 0
+    for root, _dirs, names in os.walk(folder):
+        for name in names:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+# --- Generators ---
+def make_tree(dest, name, scale=1.0, seed=0):
+    """
+    Builds (or reuses) the game tree `name` from TREES under `dest` and
+    returns its path. The tree is a valid .kzp source: it has a .kzi at
+    the top.
+    """
+    shape = TREES[name]
+    folder = os.path.join(dest, name)
+    stamp = _stamp('tree', name, scale, seed)
+    if _is_current(folder, stamp):
+        return folder
+
+    _fresh_dir(folder)
+    rng = random.Random(f"{name}:{seed}")
+    # Scale the number of folders, or the number of files when there is only one folder
+    dirs, files_per_dir = shape['dirs'], shape['files_per_dir']
+    if dirs > 1:
+        dirs = max(1, round(dirs * scale))
+    else:
+        files_per_dir = max(1, round(files_per_dir * scale))
+    for d in range(dirs):
+        subdir = os.path.join(folder, f"data{d:03d}")
+        os.makedirs(subdir)
+        for i in range(files_per_dir):
+            ext = rng.choice(shape['extensions'])
+            # Log-uniform sizes: many small files, a few large ones
+            size = int(math.exp(rng.uniform(math.log(shape['min_size']), math.log(shape['max_size']))))
+            incompressible = shape['incompressible']
+            if incompressible is None:
+                incompressible = 1.0 if ext in MEDIA_EXTENSIONS else 0.1
+            _write_file(os.path.join(subdir, f"file{i:05d}{ext}"), _file_bytes(rng, size, incompressible))
+
+    with open(os.path.join(folder, f"{name}.kzi"), 'w') as f:
+        f.write(KZI_TEMPLATE.format(name=name))
+    _write_file(os.path.join(folder, "game.sh"), b"#!/bin/sh\nexit 0\n")
+    _finish(folder, stamp)
+    return folder
+
+def _write_wav(path, seconds, rng, rate=44100):
+    """A chord with a little seeded noise, 16-bit stereo."""
+    frequencies = [rng.choice([220.0, 261.6, 329.6, 392.0, 440.0]) for _ in range(3)]
+    frames = bytearray()
+    for n in range(int(seconds * rate)):
+        t = n / rate
+        sample = sum(math.sin(2 * math.pi * f * t) for f in frequencies) / len(frequencies)
+        value = int(max(-1.0, min(1.0, sample * 0.6 + rng.uniform(-0.02, 0.02))) * 32767)
+        frames += struct.pack('<hh', value, value)
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(bytes(frames))
+
+def _write_image(path, width, height, rng):
+    """A seeded gradient with noise, saved as JPEG so the theme export has to convert it."""
+    from PIL import Image
+
+    pixels = bytearray()
+    for y in range(height):
+        for x in range(width):
+            pixels += bytes(((x * 255 // width + rng.randint(0, 15)) & 255,
+                             (y * 255 // height + rng.randint(0, 15)) & 255, 128))
+    Image.frombytes('RGB', (width, height), bytes(pixels)).save(path, 'JPEG', quality=90)
+
+def make_theme_assets(dest, scale=1.0, seed=0):
+    """
+    Theme inputs for ExportWorker: a WAV background track (converted to OGG),
+    JPEG logo and background (converted to PNG), a font and a folder of WAV
+    sound effects. Returns the paths dict ExportWorker takes.
+    """
+    folder = os.path.join(dest, 'theme-assets')
+    stamp = _stamp('theme', 'theme-assets', scale, seed)
+    paths = {
+        'bgm_path': os.path.join(folder, "bgm.wav"),
+        'logo_path': os.path.join(folder, "logo.jpg"),
+        'background_path': os.path.join(folder, "background.jpg"),
+        'font_path': os.path.join(folder, "font.ttf"),
+        'sfx_path': os.path.join(folder, "sfx"),
+    }
+    if _is_current(folder, stamp):
+        return paths
+
+    _fresh_dir(folder)
+    rng = random.Random(f"theme:{seed}")
+    _write_wav(paths['bgm_path'], 20 * scale, rng)
+    _write_image(paths['logo_path'], 512, 256, rng)
+    _write_image(paths['background_path'], int(1280 * min(scale, 2)), int(800 * min(scale, 2)), rng)
+    _write_file(paths['font_path'], rng.randbytes(200 * 1024))
+    os.makedirs(paths['sfx_path'])
+    for i in range(max(1, round(12 * scale))):
+        _write_wav(os.path.join(paths['sfx_path'], f"sfx{i:02d}.wav"), 0.5, rng)
+    _finish(folder, stamp)
+    return paths
+
+def make_download_payload(dest, scale=1.0, seed=0):
+    """A runtime-sized file for the download benchmark, served by the local HTTP server."""
+    folder = os.path.join(dest, 'download')
+    stamp = _stamp('download', 'payload', scale, seed)
+    path = os.path.join(folder, "runtime.kzr")
+    if _is_current(folder, stamp):
+        return path
+
+    _fresh_dir(folder)
+    rng = random.Random(f"download:{seed}")
+    size = int(128 * 1024 * 1024 * scale)
+    with open(path, 'wb') as f:
+        for start in range(0, size, 8 * 1024 * 1024):
+            f.write(rng.randbytes(min(8 * 1024 * 1024, size - start)))
+    _finish(folder, stamp)
+    return path
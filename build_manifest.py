@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# Build Manifests for KZI Generator
+# Remembers what each image was built from, so unchanged sources are not packed again
+
+import os
+import json
+import hashlib
+
+from app_config import get_cache_dir, write_json_atomic
+
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+
+# Fields of a file record: [size, mtime_ns, inode, mode(, sha256)]
+SIZE, MTIME, INODE, MODE, SHA256 = range(5)
+
+
+def get_build_manifest_path(output):
+    key = hashlib.sha256(os.path.abspath(output).encode()).hexdigest()[:16]
+    return get_cache_dir("builds", f"{key}.json")
+
+def load_build_manifest(output):
+    try:
+        with open(get_build_manifest_path(output), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+def build_options(algo, pkg_type=None, auto_hints=False, dedupe="never"):
+    """The settings that change an image's contents; any difference forces a rebuild."""
+    return {'algo': algo, 'pkg_type': pkg_type, 'auto_hints': bool(auto_hints), 'dedupe': dedupe}
+
+
+# --- Tree Snapshot ---
+def snapshot_tree(source, cancel_check=None):
+    """
+    {relative path: [size, mtime_ns, inode, mode]} for everything under
+    `source`, from one scandir walk. Directories are listed too (with size 0)
+    so new empty folders and permission changes count. Symlinks are recorded,
+    not followed. `cancel_check()` is called before each folder; raise from it
+    to stop.
+    """
+    files = {}
+    stack = [("", source)]
+    while stack:
+        if cancel_check:
+            cancel_check()
+        prefix, folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    rel_path = prefix + entry.name
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        files[rel_path + "/"] = [0, st.st_mtime_ns, st.st_ino, st.st_mode]
+                        stack.append((rel_path + "/", entry.path))
+                    else:
+                        files[rel_path] = [st.st_size, st.st_mtime_ns, st.st_ino, st.st_mode]
+        except OSError:
+            continue
+    return files
+
+def hash_file(path, cancel_check=None):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            if cancel_check:
+                cancel_check()
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --- Comparison ---
+def compare_snapshots(previous, current, source=None, cancel_check=None):
+    """
+    Returns {'added', 'removed', 'modified'} lists of relative paths. With
+    `source`, a file whose stat changed but whose size didn't is hashed and
+    compared against the recorded hash, so a touched or copied-back file with
+    the same content doesn't count (and its new record keeps the hash).
+    """
+    changes = {'added': [], 'removed': [], 'modified': []}
+    if previous == current:
+        return changes
+
+    for rel_path, record in current.items():
+        old = previous.get(rel_path)
+        if old is None:
+            changes['added'].append(rel_path)
+            continue
+        if old[:MODE + 1] == record[:MODE + 1]:
+            if len(old) > SHA256:
+                record[SHA256:] = old[SHA256:]
+            continue
+        if rel_path.endswith("/"):
+            # A directory's mtime and inode follow its entries, which are compared themselves
+            if old[MODE] != record[MODE]:
+                changes['modified'].append(rel_path)
+            continue
+        if (source and len(old) > SHA256 and old[SIZE] == record[SIZE] and old[MODE] == record[MODE]
+                and not os.path.islink(os.path.join(source, rel_path))):
+            try:
+                digest = hash_file(os.path.join(source, rel_path), cancel_check)
+            except OSError:
+                digest = None
+            if digest == old[SHA256]:
+                record[SHA256:] = [digest]
+                continue
+        changes['modified'].append(rel_path)
+
+    changes['removed'] = [rel_path for rel_path in previous if rel_path not in current]
+    for key in changes:
+        changes[key].sort()
+    return changes
+
+def count_changes(changes):
+    return sum(len(paths) for paths in changes.values())
+
+def format_changes(changes, limit=20):
+    """One line per changed path ('+' added, '-' removed, '~' modified), at most `limit`."""
+    lines = []
+    for key, mark in (('added', '+'), ('removed', '-'), ('modified', '~')):
+        for rel_path in changes[key]:
+            lines.append(f"  {mark} {rel_path}")
+    if len(lines) > limit:
+        lines = lines[:limit] + [f"  ... and {len(lines) - limit} more"]
+    return "\n".join(lines)
+
+
+# --- Build Check ---
+def _image_state(output):
+    try:
+        st = os.stat(output)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def check_build(source, output, options, hash_files=False, cancel_check=None):
+    """
+    Compares `source` with what `output` was last built from. Returns
+    {'up_to_date', 'reason', 'changes', 'snapshot'}; pass the snapshot to
+    record_build once the new image is in place. `cancel_check` is called
+    between folders and while hashing (see snapshot_tree).
+    """
+    current = snapshot_tree(source, cancel_check)
+    result = {'up_to_date': False, 'reason': None, 'changes': None, 'snapshot': current}
+    manifest = load_build_manifest(output)
+
+    if manifest is None:
+        result['reason'] = "no record of a previous build"
+    elif os.path.abspath(source) != manifest['source']:
+        result['reason'] = f"last built from {manifest['source']}"
+    elif manifest['options'] != options:
+        result['reason'] = "build options changed"
+    elif _image_state(output) != manifest['image']:
+        result['reason'] = "image is missing or was modified"
+    else:
+        changes = compare_snapshots(manifest['files'], current, source if hash_files else None, cancel_check)
+        result['changes'] = changes
+        if count_changes(changes):
+            result['reason'] = f"{count_changes(changes)} changed files"
+        else:
+            result['up_to_date'] = True
+            result['reason'] = "source unchanged since the last build"
+            if manifest['files'] != current:
+                # Only touched, same content: remember the new stats so they aren't hashed again
+                manifest['files'] = current
+                write_json_atomic(get_build_manifest_path(output), manifest)
+
+    if hash_files:
+        for rel_path, record in current.items():
+            if len(record) <= SHA256 and not rel_path.endswith("/"):
+                path = os.path.join(source, rel_path)
+                if not os.path.islink(path):
+                    try:
+                        record.append(hash_file(path, cancel_check))
+                    except OSError:
+                        pass
+    return result
+
+def record_build(source, output, options, snapshot):
+    """Saves the manifest for a successfully built image."""
+    write_json_atomic(get_build_manifest_path(output), {
+        'version': MANIFEST_VERSION,
+        'source': os.path.abspath(source),
+        'output': os.path.abspath(output),
+        'options': options,
+        'image': _image_state(output),
+        'files': snapshot,
+    })
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# Runtime Download Queue for KZI Generator
+# Non-modal panel for fetching many runtimes at once
+
+import os
+import time
+
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QGroupBox, QLabel, QLineEdit,
+    QPushButton, QSpinBox, QDoubleSpinBox, QProgressBar, QTableWidget,
+    QTableWidgetItem, QHeaderView, QFileDialog, QMessageBox, QAbstractItemView
+)
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+
+from runtime_cache import RuntimeCache
+from runtime_downloader import DownloadQueue, check_for_updates
+from runtime_manifest import load_runtime_manifest
+
+# --- Background Worker for the Queue ---
+class QueueWorker(QThread):
+    item_changed = pyqtSignal(int, int, str)
+    finished = pyqtSignal(int, int)
+
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+
+    def run(self):
+        rows = {id(item): row for row, item in enumerate(self.queue.items)}
+        self.queue.run(lambda item: self._report(rows[id(item)], item))
+        failed = sum(1 for item in self.queue.items if item['status'] != 'done')
+        self.finished.emit(len(self.queue.items) - failed, failed)
+
+    def _report(self, row, item):
+        percent = int(item['downloaded'] * 100 / item['total']) if item['total'] else 0
+        if item['status'] == 'downloading':
+            status = f"{item['downloaded']/1024/1024:.1f} MB at {item['speed']/1024/1024:.2f} MB/s"
+        elif item['status'] == 'done':
+            percent = 100
+            status = "Done (from cache)" if item['source'] == 'cache' else "Done"
+        elif item['status'] == 'failed':
+            status = f"Failed: {item['error']}"
+        else:
+            status = item['status'].capitalize()
+        self.item_changed.emit(row, percent, status)
+
+
+# --- Background Worker for Update Checks ---
+class CheckWorker(QThread):
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, urls):
+        super().__init__()
+        self.urls = urls
+
+    def run(self):
+        try:
+            self.finished.emit(check_for_updates(self.urls))
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class DownloadQueueWindow(QDialog):
+    COL_NAME, COL_SIZE, COL_CHECKED, COL_PROGRESS, COL_STATUS = range(5)
+
+    def __init__(self, parent=None, default_dir=None):
+        super().__init__(parent)
+        self.setWindowTitle("Runtime Download Queue")
+        self.resize(700, 480)
+        # Deliberately non-modal so the main window stays usable while runtimes download
+        self.setWindowModality(Qt.WindowModality.NonModal)
+
+        self.manifest = load_runtime_manifest()
+        self.default_dir = default_dir or os.path.expanduser("~")
+        self.queue = None
+        self.queue_worker = None
+        self.check_worker = None
+
+        self.setup_ui()
+        self.show_check_results(RuntimeCache().get_checks())
+
+    def setup_ui(self):
+        main_layout = QVBoxLayout(self)
+
+        # Runtime selection
+        self.table = QTableWidget(len(self.manifest), 5)
+        self.table.setHorizontalHeaderLabels(["Runtime", "Size", "Last Checked", "Progress", "Status"])
+        for col in (self.COL_NAME, self.COL_SIZE, self.COL_CHECKED):
+            self.table.horizontalHeader().setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(self.COL_STATUS, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+
+        self.row_progress = []
+        for row, entry in enumerate(self.manifest):
+            name_item = QTableWidgetItem(entry['name'])
+            name_item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+            name_item.setCheckState(Qt.CheckState.Unchecked)
+            self.table.setItem(row, self.COL_NAME, name_item)
+
+            bar = QProgressBar()
+            bar.setRange(0, 100)
+            bar.setValue(0)
+            self.table.setCellWidget(row, self.COL_PROGRESS, bar)
+            self.row_progress.append(bar)
+
+            self.table.setItem(row, self.COL_SIZE, QTableWidgetItem("-"))
+            self.table.setItem(row, self.COL_CHECKED, QTableWidgetItem("Never"))
+            self.table.setItem(row, self.COL_STATUS, QTableWidgetItem(""))
+        main_layout.addWidget(self.table)
+
+        select_layout = QHBoxLayout()
+        btn_all = QPushButton("Select All")
+        btn_all.clicked.connect(lambda: self._set_all_checked(True))
+        btn_none = QPushButton("Select None")
+        btn_none.clicked.connect(lambda: self._set_all_checked(False))
+        select_layout.addWidget(btn_all)
+        select_layout.addWidget(btn_none)
+        select_layout.addStretch()
+        self.btn_check = QPushButton("Check for Updates")
+        self.btn_check.clicked.connect(self.start_update_check)
+        select_layout.addWidget(self.btn_check)
+        main_layout.addLayout(select_layout)
+
+        # Options
+        options_group = QGroupBox("Options")
+        options_layout = QHBoxLayout(options_group)
+
+        options_layout.addWidget(QLabel("Save to:"))
+        self.dest_input = QLineEdit(self.default_dir)
+        options_layout.addWidget(self.dest_input, stretch=1)
+        btn_browse = QPushButton("Browse...")
+        btn_browse.clicked.connect(self.browse_dest)
+        options_layout.addWidget(btn_browse)
+
+        options_layout.addWidget(QLabel("Parallel:"))
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, 8)
+        self.concurrency_spin.setValue(2)
+        options_layout.addWidget(self.concurrency_spin)
+
+        options_layout.addWidget(QLabel("Limit (MB/s, 0 = none):"))
+        self.rate_spin = QDoubleSpinBox()
+        self.rate_spin.setRange(0, 10000)
+        self.rate_spin.setDecimals(1)
+        self.rate_spin.setValue(0)
+        options_layout.addWidget(self.rate_spin)
+        main_layout.addWidget(options_group)
+
+        # Totals
+        self.total_label = QLabel("Select runtimes to download.")
+        self.total_bar = QProgressBar()
+        self.total_bar.setRange(0, 100)
+        self.total_bar.setValue(0)
+        main_layout.addWidget(self.total_label)
+        main_layout.addWidget(self.total_bar)
+
+        btn_layout = QHBoxLayout()
+        self.btn_start = QPushButton("Start Downloads")
+        self.btn_start.setMinimumHeight(40)
+        self.btn_start.clicked.connect(self.start_queue)
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.setMinimumHeight(40)
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_queue)
+        btn_layout.addWidget(self.btn_start)
+        btn_layout.addWidget(self.btn_cancel)
+        main_layout.addLayout(btn_layout)
+
+    # --- Helpers ---
+    def _set_all_checked(self, checked):
+        state = Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked
+        for row in range(self.table.rowCount()):
+            self.table.item(row, self.COL_NAME).setCheckState(state)
+
+    def browse_dest(self):
+        path = QFileDialog.getExistingDirectory(self, "Select Download Folder", self.dest_input.text())
+        if path:
+            self.dest_input.setText(path)
+
+    # --- Logic: Update Check ---
+    def start_update_check(self):
+        self.btn_check.setEnabled(False)
+        self.btn_start.setEnabled(False)
+        self.total_label.setText("Checking runtimes for updates...")
+
+        self.check_worker = CheckWorker([entry['url'] for entry in self.manifest])
+        self.check_worker.finished.connect(self.on_check_finished)
+        self.check_worker.error.connect(self.on_check_error)
+        self.check_worker.start()
+
+    def show_check_results(self, results):
+        for row, entry in enumerate(self.manifest):
+            result = results.get(entry['url'])
+            if not result:
+                continue
+            size = f"{result['size']/1024/1024:.1f} MB" if result.get('size') else "-"
+            checked = time.strftime('%Y-%m-%d %H:%M', time.localtime(result['checked_at']))
+            self.table.item(row, self.COL_SIZE).setText(size)
+            self.table.item(row, self.COL_CHECKED).setText(checked)
+            status = result['status'].capitalize()
+            if result.get('error'):
+                status = f"Check failed: {result['error']}"
+            self.table.item(row, self.COL_STATUS).setText(status)
+
+    def on_check_finished(self, results):
+        self.btn_check.setEnabled(True)
+        self.btn_start.setEnabled(True)
+        self.show_check_results(results)
+
+        # Pre-select exactly the runtimes that need fetching again
+        changed = 0
+        for row, entry in enumerate(self.manifest):
+            is_changed = results[entry['url']]['status'] == 'changed'
+            changed += is_changed
+            state = Qt.CheckState.Checked if is_changed else Qt.CheckState.Unchecked
+            self.table.item(row, self.COL_NAME).setCheckState(state)
+
+        current = sum(1 for r in results.values() if r['status'] == 'current')
+        self.total_label.setText(f"{current} up to date, {changed} changed (selected for download).")
+
+    def on_check_error(self, err_msg):
+        self.btn_check.setEnabled(True)
+        self.btn_start.setEnabled(True)
+        QMessageBox.critical(self, "Error", err_msg)
+
+    # --- Logic: Downloads ---
+    def start_queue(self):
+        dest = self.dest_input.text().strip()
+        if not dest or not os.path.isdir(dest):
+            QMessageBox.critical(self, "Error", "Please choose an existing download folder.")
+            return
+
+        rate_limit = int(self.rate_spin.value() * 1024 * 1024)
+        self.queue = DownloadQueue(self.concurrency_spin.value(), rate_limit)
+        self.queue_rows = []
+        for row, entry in enumerate(self.manifest):
+            if self.table.item(row, self.COL_NAME).checkState() == Qt.CheckState.Checked:
+                self.queue.add(entry, os.path.join(dest, os.path.basename(entry['url'])))
+                self.queue_rows.append(row)
+                self.row_progress[row].setValue(0)
+                self.table.item(row, self.COL_STATUS).setText("Queued")
+
+        if not self.queue.items:
+            QMessageBox.critical(self, "Error", "Please select at least one runtime.")
+            return
+
+        self.btn_start.setEnabled(False)
+        self.btn_check.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.table.setEnabled(False)
+
+        self.queue_worker = QueueWorker(self.queue)
+        self.queue_worker.item_changed.connect(self.on_item_changed)
+        self.queue_worker.finished.connect(self.on_queue_finished)
+        self.queue_worker.start()
+
+    def cancel_queue(self):
+        if self.queue:
+            self.queue.cancel()
+            self.total_label.setText("Cancelling... partial downloads will resume next time.")
+
+    def on_item_changed(self, queue_index, percent, status):
+        row = self.queue_rows[queue_index]
+        self.row_progress[row].setValue(percent)
+        self.table.item(row, self.COL_STATUS).setText(status)
+
+        downloaded, total = self.queue.totals()
+        done = sum(1 for item in self.queue.items if item['status'] == 'done')
+        self.total_bar.setValue(int(downloaded * 100 / total) if total else 0)
+        self.total_label.setText(
+            f"{done}/{len(self.queue.items)} complete - "
+            f"{downloaded/1024/1024:.1f} MB / {total/1024/1024:.1f} MB"
+        )
+
+    def on_queue_finished(self, succeeded, failed):
+        self.btn_start.setEnabled(True)
+        self.btn_check.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+        self.table.setEnabled(True)
+        if failed:
+            self.total_label.setText(f"{succeeded} downloaded, {failed} failed or cancelled.")
+        else:
+            self.total_bar.setValue(100)
+            self.total_label.setText(f"All {succeeded} runtimes downloaded.")
+
+    def closeEvent(self, event):
+        if self.queue_worker and self.queue_worker.isRunning():
+            self.queue.cancel()
+            self.queue_worker.wait()
+        super().closeEvent(event)
+
+
+if __name__ == "__main__":
+    import sys
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    window = DownloadQueueWindow()
+    window.show()
+    sys.exit(app.exec())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# Compression Analysis for KZI Generator
+# Samples a source folder and test-compresses it with every algorithm to recommend one
+
+import os
+import re
+import time
+import random
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from erofs_core import scan_source, get_mkfs_help
+
+SAMPLE_BYTES = 64 * 1024 * 1024 # total amount of data test-compressed
+SAMPLE_CHUNK = 1024 * 1024 # contiguous bytes read per sample position
+SEGMENT_SIZE = 64 * 1024 # compressed independently, roughly what fills one EROFS physical cluster
+BLOCK_SIZE = 4096
+
+# (algorithm, level) pairs tried; None is the default level
+CANDIDATES = [
+    ('uncompressed', None),
+    ('lz4', None),
+    ('lz4hc', 9), ('lz4hc', 12),
+    ('deflate', 6), ('deflate', 9),
+    ('libdeflate', 6), ('libdeflate', 12),
+    ('zstd', 3), ('zstd', 12), ('zstd', 19),
+    ('lzma', 6), ('lzma', 9),
+]
+
+GOALS = {
+    'smallest': "Smallest image",
+    'pack': "Fastest pack",
+    'load': "Fastest load",
+}
+
+
+# --- Codecs ---
+def get_codec(algo, level):
+    """
+    (compress, decompress) callables approximating mkfs.erofs' compressor with
+    Python modules, or None when the module isn't installed. libdeflate is
+    measured with zlib: same format and ratio, libdeflate itself packs faster.
+    """
+    if algo in ('deflate', 'libdeflate'):
+        import zlib
+        zlevel = min(level or 6, 9)
+        def compress(data):
+            c = zlib.compressobj(zlevel, zlib.DEFLATED, -15)
+            return c.compress(data) + c.flush()
+        return compress, lambda data: zlib.decompress(data, -15)
+    if algo == 'lzma':
+        import lzma
+        # mkfs.erofs sizes the dictionary to the cluster, not the preset's 8-64 MB
+        filters = [{'id': lzma.FILTER_LZMA1, 'preset': level or 6, 'dict_size': SEGMENT_SIZE}]
+        return (lambda data: lzma.compress(data, format=lzma.FORMAT_ALONE, filters=filters),
+                lambda data: lzma.decompress(data, format=lzma.FORMAT_ALONE))
+    if algo in ('lz4', 'lz4hc'):
+        try:
+            import lz4.block
+        except ImportError:
+            return None
+        mode = 'high_compression' if algo == 'lz4hc' else 'default'
+        return (lambda data: lz4.block.compress(data, mode=mode, compression=level or 0),
+                lambda data: lz4.block.decompress(data))
+    if algo == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            return None
+        compressor = zstandard.ZstdCompressor(level=level or 3)
+        decompressor = zstandard.ZstdDecompressor()
+        return compressor.compress, decompressor.decompress
+    return None
+
+def get_supported_algorithms():
+    """Compressors the installed mkfs.erofs lists in its help, or None if it can't be asked."""
+    mkfs = shutil.which("mkfs.erofs")
+    if not mkfs:
+        return None
+    text = get_mkfs_help(mkfs)
+    found = {algo for algo, _ in CANDIDATES if re.search(rf'\b{algo}\b', text)}
+    return found | {'uncompressed'} if found else None
+
+def algo_option(algo, level):
+    """The value build_mkfs_command turns into -z<value>."""
+    return f"{algo},{level}" if level is not None and algo != 'uncompressed' else algo
+
+
+# --- Sampling ---
+def choose_samples(source, sample_bytes=SAMPLE_BYTES, seed=0):
+    """
+    Picks (path, offset, length) chunks spread over the tree in proportion to
+    file size, so a folder that is 90% video is sampled as 90% video.
+    """
+    files = []
+    for folder, dirs, names in os.walk(source):
+        for name in names:
+            path = os.path.join(folder, name)
+            try:
+                if not os.path.islink(path):
+                    size = os.path.getsize(path)
+                    if size:
+                        files.append((path, size))
+            except OSError:
+                continue
+    total = sum(size for _, size in files)
+    if not total:
+        return []
+    if total <= sample_bytes:
+        return [(path, 0, size) for path, size in files]
+
+    rng = random.Random(seed)
+    samples = []
+    # Systematic sampling over the concatenated tree with a random start
+    step = total / max(1, sample_bytes // SAMPLE_CHUNK)
+    position = rng.uniform(0, step)
+    offset_base = 0
+    for path, size in files:
+        while position < offset_base + size:
+            offset = int(position - offset_base)
+            length = min(SAMPLE_CHUNK, size - offset)
+            samples.append((path, offset, length))
+            position += step
+        offset_base += size
+    return samples
+
+def _read_samples(samples):
+    for path, offset, length in samples:
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                yield f.read(length)
+        except OSError:
+            continue
+
+def measure_candidate(task):
+    """Compresses every sample segment with one (algo, level). Runs in a worker process."""
+    algo, level, samples = task
+    result = {'algo': algo, 'level': level, 'option': algo_option(algo, level), 'available': True}
+    if algo == 'uncompressed':
+        size = sum(length for _, _, length in samples)
+        result.update(bytes_in=size, bytes_out=size, compress_seconds=0.0, decompress_seconds=0.0)
+        return result
+
+    codec = get_codec(algo, level)
+    if codec is None:
+        result['available'] = False
+        return result
+    compress, decompress = codec
+
+    bytes_in = bytes_out = 0
+    compress_seconds = decompress_seconds = 0.0
+    for data in _read_samples(samples):
+        for start in range(0, len(data), SEGMENT_SIZE):
+            segment = data[start:start + SEGMENT_SIZE]
+            t0 = time.perf_counter()
+            packed = compress(segment)
+            t1 = time.perf_counter()
+            if len(packed) + BLOCK_SIZE > len(segment):
+                # EROFS keeps data raw unless compressing it saves at least a block
+                bytes_out += len(segment)
+            else:
+                decompress(packed)
+                decompress_seconds += time.perf_counter() - t1
+                bytes_out += len(packed)
+            compress_seconds += t1 - t0
+            bytes_in += len(segment)
+
+    result.update(bytes_in=bytes_in, bytes_out=bytes_out,
+                  compress_seconds=compress_seconds, decompress_seconds=decompress_seconds)
+    return result
+
+
+# --- Analysis ---
+def _finish(result, total_bytes):
+    if not result['available'] or not result['bytes_in']:
+        return result
+    ratio = result['bytes_out'] / result['bytes_in']
+    pack_rate = result['bytes_in'] / result['compress_seconds'] if result['compress_seconds'] else None
+    # Raw clusters cost nothing to "decompress", so load speed is over all bytes read
+    load_rate = result['bytes_in'] / result['decompress_seconds'] if result['decompress_seconds'] else None
+    result.update(
+        ratio=ratio,
+        pack_rate=pack_rate,
+        load_rate=load_rate,
+        estimated_size=int(total_bytes * ratio),
+        estimated_seconds=total_bytes / pack_rate if pack_rate else 0.0,
+    )
+    return result
+
+def recommend(results, goal):
+    """
+    Best option for a goal. Storing uncompressed only wins 'pack'/'load' when
+    nothing compresses by more than 5%, otherwise it would always win them.
+    """
+    measured = [r for r in results if r['available'] and r.get('ratio') is not None]
+    if not measured:
+        return None
+    best_ratio = min(r['ratio'] for r in measured)
+    if goal == 'smallest':
+        return min(measured, key=lambda r: (r['estimated_size'], r['estimated_seconds']))
+    if best_ratio > 0.95:
+        return next((r for r in measured if r['algo'] == 'uncompressed'), None)
+
+    compressed = [r for r in measured if r['algo'] != 'uncompressed']
+    if goal == 'pack':
+        return min(compressed, key=lambda r: (r['estimated_seconds'], r['ratio']))
+    return max(compressed, key=lambda r: (r['load_rate'] or float('inf'), -r['ratio']))
+
+def analyze_source(source, sample_bytes=SAMPLE_BYTES, jobs=None, progress_callback=None):
+    """
+    Test-compresses a representative sample of `source` with every candidate
+    in parallel. Returns {'total_bytes', 'sample_bytes', 'results', 'recommendations'}.
+    """
+    total_bytes, file_count = scan_source(source)
+    samples = choose_samples(source, sample_bytes)
+    supported = get_supported_algorithms()
+    candidates = [(algo, level) for algo, level in CANDIDATES if supported is None or algo in supported]
+
+    results = []
+    # spawn rather than fork: this also runs from a QThread inside the GUI
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1, mp_context=context) as pool:
+        tasks = [(algo, level, samples) for algo, level in candidates]
+        for i, result in enumerate(pool.map(measure_candidate, tasks)):
+            results.append(_finish(result, total_bytes))
+            if progress_callback:
+                progress_callback(i + 1, len(tasks))
+
+    recommendations = {}
+    for goal in GOALS:
+        choice = recommend(results, goal)
+        recommendations[goal] = choice['option'] if choice else None
+
+    return {
+        'source': os.path.abspath(source),
+        'total_bytes': total_bytes,
+        'file_count': file_count,
+        'sample_bytes': sum(length for _, _, length in samples),
+        'results': results,
+        'recommendations': recommendations,
+    }
+
+def format_analysis(analysis):
+    mb = 1024 * 1024
+    lines = [f"{analysis['file_count']} files, {analysis['total_bytes'] / mb:.0f} MB "
+             f"(sampled {analysis['sample_bytes'] / mb:.0f} MB)", "",
+             f"{'Option':<14} {'Ratio':>6} {'Est. size':>10} {'Pack MB/s':>10} {'Load MB/s':>10} {'Est. time':>10}"]
+    for r in analysis['results']:
+        if not r['available']:
+            lines.append(f"{r['option']:<14} (not measured: Python module missing)")
+            continue
+        pack = f"{r['pack_rate'] / mb:.0f}" if r['pack_rate'] else "-"
+        load = f"{r['load_rate'] / mb:.0f}" if r['load_rate'] else "-"
+        lines.append(f"{r['option']:<14} {r['ratio']:>6.3f} {r['estimated_size'] / mb:>8.0f}MB "
+                     f"{pack:>10} {load:>10} {r['estimated_seconds']:>9.0f}s")
+    lines.append("")
+    for goal, label in GOALS.items():
+        lines.append(f"{label}: {analysis['recommendations'][goal] or 'n/a'}")
+    return "\n".join(lines)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# Integrity Checksums for KZI Generator
+# Chunked SHA-256 hash trees for .kzp/.kzr images, computed and verified in parallel
+
+import os
+import mmap
+import time
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from app_config import write_json_atomic
+
+SIDECAR_EXTENSION = ".sha256tree"
+TREE_VERSION = 1
+CHUNK_SIZE = 4 * 1024 * 1024 # one digest per chunk; a bad chunk is what gets re-copied
+TASK_CHUNKS = 16 # chunks per thread-pool task, so tiny tasks don't dominate on fast disks
+COPY_BUFFER = 1024 * 1024
+
+
+class ChecksumError(Exception):
+    pass
+
+
+def get_sidecar_path(image_path):
+    return image_path + SIDECAR_EXTENSION
+
+def _default_jobs():
+    return min(32, os.cpu_count() or 1)
+
+def _root_digest(chunk_size, size, digests):
+    """The root covers the chunk size, the file size and every chunk digest in order."""
+    root = hashlib.sha256()
+    root.update(chunk_size.to_bytes(8, 'little'))
+    root.update(size.to_bytes(8, 'little'))
+    for digest in digests:
+        root.update(bytes.fromhex(digest))
+    return root.hexdigest()
+
+
+# --- Hashing ---
+def hash_chunks(image_path, chunk_size=CHUNK_SIZE, jobs=None, progress_callback=None, cancel_check=None):
+    """
+    SHA-256 of every `chunk_size` piece of a file, hex, in order. The file is
+    mapped once and slices are hashed straight from the page cache; hashlib
+    releases the GIL, so the threads run in parallel. The callback gets
+    (bytes done, total bytes). `cancel_check()` is called before each chunk,
+    on the hashing threads; whatever it raises stops every thread and is
+    re-raised here.
+    """
+    size = os.path.getsize(image_path)
+    count = (size + chunk_size - 1) // chunk_size
+    if not count:
+        return []
+
+    digests = [None] * count
+    done = [0]
+
+    with open(image_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, 'madvise'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped)
+
+        def hash_task(first):
+            hashed = 0
+            for i in range(first, min(first + TASK_CHUNKS, count)):
+                if cancel_check:
+                    cancel_check()
+                piece = view[i * chunk_size:(i + 1) * chunk_size]
+                digests[i] = hashlib.sha256(piece).hexdigest()
+                hashed += len(piece)
+                piece.release()
+            return hashed
+
+        try:
+            with ThreadPoolExecutor(max_workers=jobs or _default_jobs()) as pool:
+                for hashed in pool.map(hash_task, range(0, count, TASK_CHUNKS)):
+                    done[0] += hashed
+                    if progress_callback:
+                        progress_callback(done[0], size)
+        finally:
+            view.release()
+    return digests
+
+def compute_hash_tree(image_path, chunk_size=CHUNK_SIZE, jobs=None, progress_callback=None, cancel_check=None):
+    """Returns the hash tree of an image: {'version', 'algorithm', 'chunk_size', 'size', 'root', 'chunks'}."""
+    size = os.path.getsize(image_path)
+    digests = hash_chunks(image_path, chunk_size, jobs, progress_callback, cancel_check)
+    return {
+        'version': TREE_VERSION,
+        'algorithm': 'sha256',
+        'chunk_size': chunk_size,
+        'size': size,
+        'root': _root_digest(chunk_size, size, digests),
+        'chunks': digests,
+    }
+
+
+# --- Sidecar Files ---
+def write_hash_tree(image_path, tree=None, jobs=None, progress_callback=None, cancel_check=None):
+    """Writes `<image>.sha256tree`, computing the tree unless given. Returns the tree."""
+    tree = tree or compute_hash_tree(image_path, jobs=jobs, progress_callback=progress_callback,
+                                     cancel_check=cancel_check)
+    write_json_atomic(get_sidecar_path(image_path), tree)
+    return tree
+
+def refresh_hash_tree(image_path, jobs=None):
+    """Rewrites the sidecar of a rebuilt image if it has one, so it never describes the old image."""
+    if os.path.exists(get_sidecar_path(image_path)):
+        return write_hash_tree(image_path, jobs=jobs)
+    return None
+
+def load_hash_tree(sidecar_path):
+    try:
+        with open(sidecar_path, 'r') as f:
+            tree = json.load(f)
+    except FileNotFoundError:
+        raise ChecksumError(f"No checksum file: {sidecar_path}")
+    except (OSError, json.JSONDecodeError) as e:
+        raise ChecksumError(f"Cannot read {sidecar_path}: {e}")
+    if tree.get('version') != TREE_VERSION or tree.get('algorithm') != 'sha256':
+        raise ChecksumError(f"{sidecar_path} is not a version {TREE_VERSION} sha256 tree.")
+    if _root_digest(tree['chunk_size'], tree['size'], tree['chunks']) != tree['root']:
+        raise ChecksumError(f"{sidecar_path} is damaged (its chunk list does not match its root).")
+    return tree
+
+
+# --- Verification ---
+def _merge_ranges(bad_chunks, chunk_size, size):
+    """Turns bad chunk numbers into [start, end) byte ranges, joining neighbours."""
+    ranges = []
+    for i in bad_chunks:
+        start, end = i * chunk_size, min((i + 1) * chunk_size, size)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+def verify_image(image_path, sidecar_path=None, jobs=None, progress_callback=None):
+    """
+    Re-hashes an image and compares it with its hash tree. Returns
+    {'ok', 'size', 'expected_size', 'chunks', 'bad_chunks', 'bad_ranges',
+    'bad_bytes', 'elapsed'}. bad_ranges are [start, end) byte offsets in the
+    expected image, so a damaged copy can be fixed by re-copying just those.
+    A copy of the wrong length marks every chunk past the shorter end bad.
+    """
+    start_time = time.time()
+    tree = load_hash_tree(sidecar_path or get_sidecar_path(image_path))
+    chunk_size, expected_size = tree['chunk_size'], tree['size']
+    size = os.path.getsize(image_path)
+
+    actual = hash_chunks(image_path, chunk_size, jobs, progress_callback)
+    if size != expected_size:
+        # Only whole chunks below both ends are comparable; the rest count as bad
+        actual = actual[:min(size, expected_size) // chunk_size]
+    bad_chunks = [i for i, digest in enumerate(tree['chunks']) if i >= len(actual) or actual[i] != digest]
+    bad_ranges = _merge_ranges(bad_chunks, chunk_size, expected_size)
+    return {
+        'ok': not bad_chunks and size == expected_size,
+        'size': size,
+        'expected_size': expected_size,
+        'chunks': len(tree['chunks']),
+        'bad_chunks': bad_chunks,
+        'bad_ranges': bad_ranges,
+        'bad_bytes': sum(end - start for start, end in bad_ranges),
+        'elapsed': time.time() - start_time,
+    }
+
+def repair_image(image_path, good_copy, ranges, size):
+    """
+    Copies the given [start, end) byte ranges from `good_copy` into
+    `image_path` in place and cuts/extends it to `size`. Run verify_image
+    again afterwards; a good copy that is itself damaged is not detected here.
+    """
+    with open(good_copy, 'rb') as src, open(image_path, 'r+b') as dst:
+        for start, end in ranges:
+            src.seek(start)
+            dst.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                data = src.read(min(COPY_BUFFER, remaining))
+                if not data:
+                    raise ChecksumError(f"{good_copy} is shorter than {end} bytes.")
+                dst.write(data)
+                remaining -= len(data)
+        dst.truncate(size)
+        dst.flush()
+        os.fsync(dst.fileno())
+
+def format_verify(image_path, result):
+    if result['ok']:
+        return f"{image_path}: OK ({result['chunks']} chunks, {result['elapsed']:.1f}s)"
+    lines = [f"{image_path}: {len(result['bad_chunks'])} of {result['chunks']} chunks bad "
+             f"({result['bad_bytes'] / 1024 / 1024:.1f} MB)"]
+    if result['size'] != result['expected_size']:
+        lines.append(f"  size is {result['size']}, expected {result['expected_size']}")
+    for start, end in result['bad_ranges']:
+        lines.append(f"  bad bytes {start}-{end - 1}")
+    return "\n".join(lines)
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# EROFS Core for KZI Generator
+# Qt-free helpers for building .kzr/.kzp images with mkfs.erofs
+
+import os
+import re
+import glob
+import shlex
+import time
+import shutil
+import threading
+import subprocess
+from collections import deque
+from functools import lru_cache
+
+from pack_profiles import ProfileError, wrap_command, effective_workers
+
+COMPRESSION_ALGORITHMS = ['lz4', 'lz4hc', 'lzma', 'deflate', 'libdeflate', 'zstd', 'uncompressed']
+
+PROGRESS_INTERVAL = 0.5 # seconds between progress reports
+OUTPUT_TAIL_LINES = 200 # mkfs.erofs output kept for error messages
+PERCENT_PATTERN = re.compile(r'(\d{1,3}(?:\.\d+)?)\s*%')
+
+
+class PackError(Exception):
+    pass
+
+class PackCancelled(PackError):
+    """Raised from a progress callback to stop mkfs.erofs mid-run."""
+    pass
+
+
+def find_kzi_files(source):
+    return glob.glob(os.path.join(source, "*.kzi"))
+
+def default_package_name(source, pkg_type):
+    """
+    File name a package gets by default: the .kzi basename for game packages,
+    'package.kzr' otherwise.
+    """
+    ext = f".{pkg_type}"
+    if pkg_type == "kzp":
+        kzi_files = find_kzi_files(source)
+        if kzi_files:
+            return os.path.basename(kzi_files[0]).replace(".kzi", ext)
+    return f"package{ext}"
+
+def scan_source(source, cancel_check=None):
+    """
+    Total size in bytes and number of regular files under `source`, symlinks
+    not followed. `cancel_check()` is called before each folder.
+    """
+    total_bytes = 0
+    file_count = 0
+    stack = [source]
+    while stack:
+        if cancel_check:
+            cancel_check()
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for dirent in it:
+                    try:
+                        if dirent.is_dir(follow_symlinks=False):
+                            stack.append(dirent.path)
+                        elif dirent.is_file(follow_symlinks=False):
+                            total_bytes += dirent.stat(follow_symlinks=False).st_size
+                            file_count += 1
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total_bytes, file_count
+
+@lru_cache(maxsize=None)
+def get_mkfs_help(mkfs):
+    """mkfs.erofs --help output, used to tell which options this version has."""
+    try:
+        process = subprocess.run([mkfs, "--help"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    return process.stdout + process.stderr
+
+def build_mkfs_command(source, save_path, algo, single_thread=False, extra_args=None, profile=None):
+    """
+    mkfs.erofs command for one image. `profile` (see pack_profiles) adds the
+    worker count and the nice/ionice/taskset prefix; `single_thread` is the old
+    checkbox and pins everything to CPU 0.
+    """
+    mkfs = shutil.which("mkfs.erofs")
+    if not mkfs:
+        raise PackError("mkfs.erofs not found. Please install erofs-utils.")
+
+    profile = dict(profile or {})
+    if single_thread:
+        profile.update(cpus="0", workers=1)
+
+    # 1. Build the base mkfs command
+    base_cmd = [mkfs]
+
+    if algo != "uncompressed":
+        base_cmd.append(f"-z{algo}")
+
+    # Multi-threaded compression only exists in erofs-utils 1.8+
+    workers = effective_workers(profile)
+    if workers and "--workers" in get_mkfs_help(mkfs):
+        base_cmd.append(f"--workers={workers}")
+
+    if extra_args:
+        base_cmd.extend(extra_args)
+
+    base_cmd.extend([save_path, source])
+
+    # 2. Apply the CPU set and priorities
+    try:
+        return wrap_command(base_cmd, profile)
+    except ProfileError as e:
+        raise PackError(str(e))
+
+def format_command(cmd):
+    """The command as it could be pasted into a shell."""
+    return " ".join(shlex.quote(part) for part in cmd)
+
+
+# --- Progress ---
+def _read_bytes_of(pid):
+    """Bytes the process has read so far (Linux /proc/<pid>/io), or None."""
+    try:
+        with open(f"/proc/{pid}/io", 'r') as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _file_size(path):
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+class MkfsProgress:
+    """
+    Turns what can be observed from outside mkfs.erofs into progress numbers:
+    bytes read by the process (/proc/<pid>/io) against the pre-scanned source
+    size, and the growing image file. The percentage mkfs prints itself is
+    only used when /proc/<pid>/io cannot be read.
+    """
+
+    def __init__(self, save_path, total_bytes):
+        self.save_path = save_path
+        self.total_bytes = total_bytes
+        self.start_time = time.time()
+        self.reported_percent = None
+        self.last = (self.start_time, 0, 0)
+
+    def sample(self, pid):
+        now = time.time()
+        bytes_out = _file_size(self.save_path)
+        bytes_in = _read_bytes_of(pid)
+        if bytes_in is None and self.reported_percent is not None:
+            bytes_in = self.total_bytes * self.reported_percent / 100
+        if bytes_in is not None and self.total_bytes:
+            bytes_in = min(bytes_in, self.total_bytes)
+
+        last_time, last_in, last_out = self.last
+        interval = max(now - last_time, 1e-6)
+        elapsed = now - self.start_time
+        in_rate = (bytes_in - last_in) / interval if bytes_in is not None else None
+        out_rate = (bytes_out - last_out) / interval
+        self.last = (now, bytes_in or 0, bytes_out)
+
+        percent = None
+        eta = None
+        if bytes_in is not None and self.total_bytes:
+            percent = 100.0 * bytes_in / self.total_bytes
+        elif self.reported_percent is not None:
+            percent = self.reported_percent
+        if percent and percent > 0:
+            # Average speed since the start is steadier than the last interval
+            eta = elapsed * (100.0 - percent) / percent
+
+        return {
+            'percent': percent,
+            'bytes_in': bytes_in,
+            'bytes_out': bytes_out,
+            'total_bytes': self.total_bytes,
+            'in_rate': in_rate,
+            'out_rate': out_rate,
+            'ratio': bytes_out / bytes_in if bytes_in else None,
+            'elapsed': elapsed,
+            'eta': eta,
+        }
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+def format_pack_progress(progress):
+    mb = 1024 * 1024
+    parts = []
+    if progress['bytes_in'] is not None:
+        parts.append(f"{progress['bytes_in'] / mb:.0f} / {progress['total_bytes'] / mb:.0f} MB read")
+    parts.append(f"{progress['bytes_out'] / mb:.0f} MB written")
+    if progress['in_rate'] is not None:
+        parts.append(f"in {progress['in_rate'] / mb:.1f} MB/s")
+    parts.append(f"out {progress['out_rate'] / mb:.1f} MB/s")
+    if progress['ratio']:
+        parts.append(f"ratio {progress['ratio']:.2f}")
+    if progress['eta'] is not None:
+        parts.append(f"ETA {format_duration(progress['eta'])}")
+    return ", ".join(parts)
+
+
+# --- Running mkfs.erofs ---
+def run_mkfs(cmd, progress_callback=None, save_path=None, total_bytes=0):
+    """
+    Runs mkfs.erofs, streaming its output instead of buffering it. Only the
+    last OUTPUT_TAIL_LINES lines are kept (for the error message). With a
+    callback, progress dicts (see MkfsProgress.sample) are reported every
+    PROGRESS_INTERVAL seconds.
+    """
+    tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    tracker = MkfsProgress(save_path, total_bytes) if progress_callback and save_path else None
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, errors='replace', bufsize=1)
+
+    def read_output():
+        # mkfs.erofs redraws its progress line with \r, so split on that too
+        for line in process.stdout:
+            for part in line.split('\r'):
+                part = part.strip()
+                if not part:
+                    continue
+                tail.append(part)
+                match = PERCENT_PATTERN.search(part)
+                if tracker and match:
+                    tracker.reported_percent = min(float(match.group(1)), 100.0)
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+
+    try:
+        while True:
+            try:
+                process.wait(timeout=PROGRESS_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                if tracker:
+                    progress_callback(tracker.sample(process.pid))
+    except BaseException:
+        # The callback cancelled (or Ctrl+C): don't leave mkfs and a half image behind
+        process.kill()
+        process.wait()
+        reader.join()
+        if save_path and os.path.exists(save_path):
+            os.remove(save_path)
+        raise
+    reader.join()
+
+    if process.returncode != 0:
+        raise PackError("mkfs.erofs failed:\n" + "\n".join(tail))
+    if tracker:
+        final = tracker.sample(process.pid)
+        final.update(percent=100.0, eta=0.0, bytes_in=total_bytes,
+                     ratio=final['bytes_out'] / total_bytes if total_bytes else None)
+        progress_callback(final)
+
+def create_package(source, save_path, algo="lz4", single_thread=False, pkg_type=None, progress_callback=None,
+                   auto_hints=False, profile=None, log_callback=None, incremental=False, hash_files=False,
+                   dedupe="never", checksum=False, stage_callback=None, checksum_callback=None, work_path=None,
+                   changes_callback=None, cancel_check=None):
+    """
+    Packs `source` into an EROFS image at `save_path`. Returns the command that
+    ran. With `incremental`, the source is first compared with the manifest of
+    the last build (see build_manifest) and None is returned, without running
+    mkfs.erofs, when nothing changed; the changed files of a rebuild go to
+    `changes_callback(changes)` (see build_manifest.compare_snapshots). Log
+    lines (the reason for a rebuild, the changes, the command) go to
+    `log_callback`, and a short description
+    of each slow step before it starts to `stage_callback`. `dedupe` ('never',
+    'auto' or 'always') adds mkfs.erofs -Ededupe/-Efragments (see erofs_dedupe).
+    With `checksum` a .sha256tree sidecar is written (see erofs_checksum); an
+    existing one is always rewritten so it matches the new image. Hashing
+    progress goes to `checksum_callback(done, total)`. With `work_path`,
+    mkfs.erofs writes there and the image replaces `save_path` only once it is
+    complete, so a failed build keeps the previous image. Raising
+    PackCancelled from `progress_callback` stops mkfs.erofs and removes the
+    partial image; `cancel_check()` is called throughout every step (the
+    source walks, hints, dedupe analysis, mkfs.erofs and hashing) and stops
+    the build the same way when it raises.
+    """
+    def stage(message):
+        if cancel_check:
+            cancel_check()
+        if stage_callback:
+            stage_callback(message)
+
+    def on_progress(progress):
+        if cancel_check:
+            cancel_check()
+        if progress_callback:
+            progress_callback(progress)
+
+    if not source or not os.path.isdir(source):
+        raise PackError("Invalid source folder.")
+    if pkg_type == "kzp" and not find_kzi_files(source):
+        raise PackError("Selected folder must contain a .kzi file for .kzp packages.")
+
+    build = None
+    if incremental:
+        from build_manifest import build_options, check_build, format_changes
+        stage("Comparing source with the last build...")
+        options = build_options(algo, pkg_type, auto_hints, dedupe)
+        build = check_build(source, save_path, options, hash_files, cancel_check)
+        if build['up_to_date']:
+            return None
+        if changes_callback and build['changes']:
+            changes_callback(build['changes'])
+        if log_callback:
+            log_callback(f"Rebuilding: {build['reason']}")
+            if build['changes']:
+                log_callback(format_changes(build['changes']))
+
+    extra_args = None
+    if auto_hints:
+        from erofs_hints import prepare_compress_hints
+        # Decisions are cached per file, so only changed files are probed again
+        stage("Checking which files are worth compressing...")
+        hints = prepare_compress_hints(source, algo, cancel_check=cancel_check)
+        if hints:
+            algo, extra_args = hints['algo'], hints['args']
+
+    if dedupe != "never":
+        from erofs_dedupe import prepare_dedupe_args
+        stage("Looking for duplicate data...")
+        dedupe_args, dedupe_options = prepare_dedupe_args(source, dedupe, algo, cancel_check)
+        extra_args = (extra_args or []) + dedupe_args
+        if log_callback:
+            log_callback(f"Dedupe: {', '.join(dedupe_options) or 'not worth it for this source'}")
+
+    out_path = work_path or save_path
+    cmd = build_mkfs_command(source, out_path, algo, single_thread, extra_args, profile)
+    if log_callback:
+        log_callback(f"$ {format_command(cmd)}")
+    total_bytes = 0
+    if progress_callback:
+        # The source size is what turns bytes read by mkfs.erofs into a percentage
+        stage("Scanning source folder...")
+        total_bytes, file_count = scan_source(source, cancel_check)
+        stage(f"Packing {file_count} files ({total_bytes / 1024 / 1024:.0f} MB)...")
+    run_mkfs(cmd, on_progress if progress_callback or cancel_check else None, out_path, total_bytes)
+    if work_path:
+        os.replace(work_path, save_path)
+    if build:
+        from build_manifest import record_build
+        record_build(source, save_path, options, build['snapshot'])
+
+    from erofs_checksum import get_sidecar_path, write_hash_tree
+    sidecar_path = get_sidecar_path(save_path)
+    if checksum or os.path.exists(sidecar_path):
+        stage("Computing checksums...")
+        try:
+            # Hashed on the CPUs the profile allows mkfs.erofs
+            tree = write_hash_tree(save_path, jobs=effective_workers(profile or {}) or None,
+                                   progress_callback=checksum_callback, cancel_check=cancel_check)
+        except BaseException:
+            # The image is complete, but an old sidecar would now make it look corrupt
+            if os.path.exists(sidecar_path):
+                os.remove(sidecar_path)
+            raise
+        if log_callback:
+            log_callback(f"Checksum: {tree['root']} ({len(tree['chunks'])} chunks)")
+    return cmd
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# Deduplication Analysis for KZI Generator
+# Finds byte-identical data within and across game folders and .kzp/.kzr images
+
+import os
+import time
+import shutil
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from erofs_core import get_mkfs_help
+
+CHUNK_SIZE = 1024 * 1024 # unit of the content-hash index
+TASK_BYTES = 64 * 1024 * 1024 # large files are hashed in segments of this size, in parallel
+BLOCK_SIZE = 4096
+
+# mkfs.erofs options only pay off past both thresholds
+MIN_SAVING_BYTES = 16 * 1024 * 1024
+MIN_SAVING_RATIO = 0.01
+
+TOP_DUPLICATES = 20
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# --- Hashing ---
+def list_folder(source):
+    """[(relative path, size)] for every regular file under `source`, symlinks not followed."""
+    files = []
+    stack = [("", source)]
+    while stack:
+        prefix, folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for dirent in it:
+                    try:
+                        if dirent.is_dir(follow_symlinks=False):
+                            stack.append((prefix + dirent.name + "/", dirent.path))
+                        elif dirent.is_file(follow_symlinks=False):
+                            files.append((prefix + dirent.name, dirent.stat(follow_symlinks=False).st_size))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files
+
+def _hash_segment(task, cancel_check=None):
+    """Chunk digests of `length` bytes of a file from `offset`; hashlib drops the GIL while hashing."""
+    path, offset, length = task
+    digests = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while length > 0:
+            if cancel_check:
+                cancel_check()
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            digests.append((_digest(chunk), len(chunk)))
+            length -= len(chunk)
+    return digests
+
+def hash_folder(source, pool, cancel_check=None):
+    """{relative path: [(digest, length)]} for a folder, segments hashed on `pool`."""
+    files = list_folder(source)
+    tasks = []
+    for rel_path, size in files:
+        path = os.path.join(source, rel_path)
+        for offset in range(0, max(size, 1), TASK_BYTES):
+            tasks.append((rel_path, (path, offset, min(TASK_BYTES, size - offset))))
+
+    chunks = {rel_path: [] for rel_path, _size in files}
+    hash_segment = functools.partial(_hash_segment, cancel_check=cancel_check)
+    for (rel_path, _task), digests in zip(tasks, pool.map(hash_segment, [task for _, task in tasks])):
+        chunks[rel_path].extend(digests)
+    return chunks
+
+def hash_image(image_path, cancel_check=None):
+    """{relative path: [(digest, length)]} for the files inside an image, read without mounting it."""
+    from erofs_reader import ErofsImage
+
+    chunks = {}
+    with ErofsImage(image_path) as image:
+        for rel_path, inode in image.walk():
+            if cancel_check:
+                cancel_check()
+            if inode.is_file:
+                chunks[rel_path] = [(_digest(data), len(data)) for data in image.iter_read(inode, CHUNK_SIZE)]
+    return chunks
+
+
+# --- Analysis ---
+def analyze_dedupe(paths, jobs=None, progress_callback=None, cancel_check=None):
+    """
+    Builds a chunk-hash index over game folders and/or images and works out
+    how many bytes are duplicated. Per source: 'internal_bytes' are repeats
+    inside the source (what mkfs.erofs -Ededupe can reclaim) and
+    'shared_bytes' are chunks another source also has. For the set:
+    'duplicate_bytes' is everything beyond the first copy of each chunk.
+    `cancel_check()` is called before every chunk is read; whatever it raises
+    stops the analysis.
+    """
+    start_time = time.time()
+    jobs = jobs or min(32, (os.cpu_count() or 1) * 2)
+    sources = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        # Each image is decompressed by one thread; folders are spread over the whole pool
+        pending = {path: pool.submit(_hash_image_safely, path, cancel_check)
+                   for path in paths if not os.path.isdir(path)}
+        for i, path in enumerate(paths):
+            if os.path.isdir(path):
+                chunks, error = hash_folder(path, pool, cancel_check), None
+            else:
+                chunks, error = pending[path].result()
+            sources.append({'path': os.path.abspath(path), 'kind': 'folder' if os.path.isdir(path) else 'image',
+                            'chunks': chunks, 'error': error})
+            if progress_callback:
+                progress_callback(i + 1, len(paths))
+
+    # digest -> [length, number of sources that have it, total occurrences]
+    index = {}
+    for source in sources:
+        seen = set()
+        for digests in source['chunks'].values():
+            for digest, length in digests:
+                entry = index.get(digest)
+                if entry is None:
+                    entry = index[digest] = [length, 0, 0]
+                entry[2] += 1
+                if digest not in seen:
+                    seen.add(digest)
+                    entry[1] += 1
+
+    results = []
+    for source in sources:
+        total = internal = shared = tail_waste = 0
+        seen = set()
+        for digests in source['chunks'].values():
+            size = 0
+            for digest, length in digests:
+                size += length
+                if digest in seen:
+                    internal += length
+                else:
+                    seen.add(digest)
+                if index[digest][1] > 1:
+                    shared += length
+            total += size
+            tail_waste += -size % BLOCK_SIZE
+        results.append({
+            'path': source['path'],
+            'kind': source['kind'],
+            'error': source['error'],
+            'files': len(source['chunks']),
+            'total_bytes': total,
+            'internal_bytes': internal,
+            'shared_bytes': shared,
+            'tail_waste_bytes': tail_waste,
+        })
+
+    total_bytes = sum(length * occurrences for length, _sources, occurrences in index.values())
+    unique_bytes = sum(length for length, _sources, _occurrences in index.values())
+    return {
+        'sources': results,
+        'total_bytes': total_bytes,
+        'unique_bytes': unique_bytes,
+        'duplicate_bytes': total_bytes - unique_bytes,
+        'chunk_size': CHUNK_SIZE,
+        'top_duplicates': _top_duplicate_files(sources),
+        'elapsed': time.time() - start_time,
+    }
+
+def _hash_image_safely(path, cancel_check=None):
+    from erofs_reader import ErofsError
+    try:
+        return hash_image(path, cancel_check), None
+    except (OSError, ErofsError) as e:
+        return {}, str(e)
+
+def _top_duplicate_files(sources, limit=TOP_DUPLICATES):
+    """Whole files that exist more than once, by bytes wasted."""
+    copies = {}
+    for source in sources:
+        for rel_path, digests in source['chunks'].items():
+            size = sum(length for _digest_, length in digests)
+            if size:
+                key = (size, tuple(digest for digest, _length in digests))
+                copies.setdefault(key, []).append(os.path.join(source['path'], rel_path))
+    duplicates = [{'size': key[0], 'copies': len(paths), 'wasted_bytes': key[0] * (len(paths) - 1), 'paths': paths}
+                  for key, paths in copies.items() if len(paths) > 1]
+    duplicates.sort(key=lambda d: d['wasted_bytes'], reverse=True)
+    return duplicates[:limit]
+
+
+# --- Packaging Options ---
+def get_dedupe_support():
+    """The -E options the installed mkfs.erofs accepts, out of dedupe and fragments."""
+    mkfs = shutil.which("mkfs.erofs")
+    text = get_mkfs_help(mkfs) if mkfs else ""
+    return {option for option in ('dedupe', 'fragments') if option in text}
+
+def _pays_off(saving, total):
+    return saving >= MIN_SAVING_BYTES and saving >= total * MIN_SAVING_RATIO
+
+def choose_dedupe_options(source_result, supported=None):
+    """
+    mkfs.erofs -E options worth using for one analysed source: dedupe when
+    data repeats inside it, fragments when many small file tails would each
+    fill a block. Options the installed mkfs.erofs lacks are left out.
+    """
+    supported = get_dedupe_support() if supported is None else supported
+    options = []
+    if 'dedupe' in supported and _pays_off(source_result['internal_bytes'], source_result['total_bytes']):
+        options.append('dedupe')
+    if 'fragments' in supported and _pays_off(source_result['tail_waste_bytes'], source_result['total_bytes']):
+        options.append('fragments')
+    return options
+
+def prepare_dedupe_args(source, mode="auto", algo="lz4", cancel_check=None):
+    """
+    Extra mkfs.erofs arguments for `mode`: 'never' adds nothing, 'always'
+    enables every supported option and 'auto' analyses `source` first.
+    Returns (args, options). Both need a compressed image.
+    """
+    if mode == "never" or algo == "uncompressed":
+        return [], []
+    supported = get_dedupe_support()
+    if mode == "always":
+        options = sorted(supported)
+    else:
+        options = choose_dedupe_options(analyze_dedupe([source], cancel_check=cancel_check)['sources'][0], supported)
+    return ([f"-E{','.join(options)}"] if options else []), options
+
+def format_dedupe(analysis):
+    mb = 1024 * 1024
+    lines = [f"{'Source':<40} {'Size':>9} {'Inside':>9} {'Shared':>9}  Suggested"]
+    for result in analysis['sources']:
+        name = os.path.basename(result['path']) or result['path']
+        if result['error']:
+            lines.append(f"{name:<40} error: {result['error']}")
+            continue
+        options = ",".join(choose_dedupe_options(result, {'dedupe', 'fragments'})) or "-"
+        lines.append(f"{name[:40]:<40} {result['total_bytes'] / mb:>7.0f}MB {result['internal_bytes'] / mb:>7.0f}MB "
+                     f"{result['shared_bytes'] / mb:>7.0f}MB  {options}")
+    lines.append("")
+    lines.append(f"{analysis['total_bytes'] / mb:.0f} MB in total, {analysis['unique_bytes'] / mb:.0f} MB unique, "
+                 f"{analysis['duplicate_bytes'] / mb:.0f} MB duplicated ({analysis['elapsed']:.1f}s)")
+    if analysis['top_duplicates']:
+        lines.append("")
+        lines.append("Largest duplicated files:")
+        for duplicate in analysis['top_duplicates']:
+            lines.append(f"  {duplicate['wasted_bytes'] / mb:7.1f} MB wasted, {duplicate['copies']} copies of "
+                         f"{duplicate['size'] / mb:.1f} MB:")
+            for path in duplicate['paths']:
+                lines.append(f"      {path}")
+    return "\n".join(lines)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# Compress Hints for KZI Generator
+# Classifies files by compressibility and writes a mkfs.erofs --compress-hints file
+
+import os
+import json
+import zlib
+import hashlib
+
+from app_config import get_cache_dir, write_json_atomic
+
+HINTS_VERSION = 1
+PROBE_SIZE = 64 * 1024 # bytes test-compressed at each probe position
+RAW_RATIO = 0.95 # worse than this and a file isn't worth compressing
+DENSE_RATIO = 0.5 # better than this and larger clusters pay off
+
+# Physical cluster size per class. 'normal' is mkfs.erofs' own default (one
+# block); it only gets a rule when a file must be kept out of an extension rule.
+CLUSTER_SIZES = {
+    'raw': 4096,
+    'normal': 4096,
+    'dense': 64 * 1024,
+}
+
+# Formats that are compressed already; not worth probing
+INCOMPRESSIBLE_EXTENSIONS = {
+    '.mp4', '.mkv', '.webm', '.avi', '.ogv', '.bk2', '.bik', '.usm', '.wmv',
+    '.ogg', '.opus', '.mp3', '.m4a', '.aac', '.flac', '.xma', '.wem',
+    '.png', '.jpg', '.jpeg', '.webp', '.ktx2', '.basis',
+    '.zip', '.7z', '.rar', '.gz', '.xz', '.bz2', '.zst', '.lz4', '.cab', '.chd', '.rvz',
+}
+
+# POSIX extended regex metacharacters, escaped in the generated patterns
+ERE_SPECIAL = set('.[]()*+?{}|^$\\')
+
+
+def _ere_escape(text):
+    # The hints file is split on whitespace, so blanks become "any character"
+    return "".join('\\' + c if c in ERE_SPECIAL else '.' if c.isspace() else c for c in text)
+
+def get_hints_cache_path(source):
+    key = hashlib.sha256(os.path.abspath(source).encode()).hexdigest()[:16]
+    return get_cache_dir("hints", f"{key}.json")
+
+
+# --- Classification ---
+def probe_ratio(path, size):
+    """
+    Compression ratio of up to three PROBE_SIZE blocks (start, middle, end)
+    with zlib level 1 -- cheap, and close enough to tell noise from data.
+    """
+    offsets = sorted({0, max(0, size // 2 - PROBE_SIZE // 2), max(0, size - PROBE_SIZE)})
+    bytes_in = bytes_out = 0
+    with open(path, 'rb') as f:
+        for offset in offsets:
+            f.seek(offset)
+            block = f.read(PROBE_SIZE)
+            if not block:
+                continue
+            bytes_in += len(block)
+            bytes_out += len(zlib.compress(block, 1))
+    return bytes_out / bytes_in if bytes_in else 1.0
+
+def classify_file(path, size):
+    """Returns (class, ratio) where class is 'raw', 'dense' or 'normal'."""
+    if os.path.splitext(path)[1].lower() in INCOMPRESSIBLE_EXTENSIONS:
+        return 'raw', None
+    if size < 4096:
+        # Fits one block either way
+        return 'normal', None
+    ratio = probe_ratio(path, size)
+    if ratio > RAW_RATIO:
+        return 'raw', ratio
+    if ratio < DENSE_RATIO:
+        return 'dense', ratio
+    return 'normal', ratio
+
+def classify_tree(source, cache_path=None, cancel_check=None):
+    """
+    Classifies every regular file under `source`. Decisions are cached per
+    file by size and mtime, so a repack only probes files that changed.
+    Returns ({relative path: class}, stats). `cancel_check()` is called before
+    each probe; raise from it to stop.
+    """
+    cache_path = cache_path or get_hints_cache_path(source)
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+        if cache.get('version') != HINTS_VERSION:
+            cache = {}
+    except (OSError, ValueError):
+        cache = {}
+    known = cache.get('files', {})
+
+    files = {}
+    classes = {}
+    stats = {'probed': 0, 'cached': 0}
+    for folder, dirs, names in os.walk(source):
+        for name in names:
+            path = os.path.join(folder, name)
+            rel_path = os.path.relpath(path, source)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if not os.path.isfile(path) or os.path.islink(path):
+                continue
+
+            entry = known.get(rel_path)
+            if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+                stats['cached'] += 1
+            else:
+                if cancel_check:
+                    cancel_check()
+                try:
+                    file_class, ratio = classify_file(path, st.st_size)
+                except OSError:
+                    continue
+                entry = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'class': file_class, 'ratio': ratio}
+                stats['probed'] += 1
+            files[rel_path] = entry
+            classes[rel_path] = entry['class']
+
+    write_json_atomic(cache_path, {'version': HINTS_VERSION, 'source': os.path.abspath(source), 'files': files})
+    return classes, stats
+
+
+# --- Hints File ---
+def build_hint_rules(classes):
+    """
+    (class, pattern) rules for mkfs.erofs. An extension whose files all share
+    a class gets one rule; otherwise its odd files are listed one by one. mkfs
+    tries each rule against each file, so fewer rules keep it fast.
+    """
+    by_ext = {}
+    for rel_path, file_class in classes.items():
+        ext = os.path.splitext(rel_path)[1].lower()
+        by_ext.setdefault(ext, {}).setdefault(file_class, []).append(rel_path)
+
+    rules = []
+    for ext, groups in sorted(by_ext.items()):
+        majority = max(groups, key=lambda c: len(groups[c]))
+        if majority != 'normal' and ext:
+            # Case-insensitive extension match without relying on REG_ICASE
+            pattern = "".join(f"[{c.lower()}{c.upper()}]" if c.isalpha() else _ere_escape(c) for c in ext)
+            rules.append((majority, f"{pattern}$"))
+        for file_class, paths in sorted(groups.items()):
+            if file_class == majority and (majority != 'normal' and ext):
+                continue
+            if file_class == 'normal' and (majority == 'normal' or not ext):
+                continue
+            for rel_path in sorted(paths):
+                rules.append((file_class, f"^{_ere_escape(rel_path)}$"))
+
+    # Exact paths first: mkfs.erofs uses the first rule that matches
+    rules.sort(key=lambda rule: not rule[1].startswith('^'))
+    return rules
+
+def prepare_compress_hints(source, algo, hints_path=None, cancel_check=None):
+    """
+    Classifies `source` and writes a hints file for it. Returns
+    {'algo', 'args', 'path', 'stats'} to build the mkfs.erofs command from,
+    or None when there is nothing to hint (uncompressed images).
+
+    EROFS has no per-file "store" setting, so incompressible files are sent to
+    lz4 as a secondary algorithm (-z<algo>:lz4): it gives up on noise at
+    memory speed and mkfs then keeps those clusters raw.
+    """
+    if algo == "uncompressed":
+        return None
+
+    classes, stats = classify_tree(source, cancel_check=cancel_check)
+    rules = build_hint_rules(classes)
+    counts = {}
+    for file_class in classes.values():
+        counts[file_class] = counts.get(file_class, 0) + 1
+    stats.update(counts)
+    if not rules:
+        return None
+
+    primary = algo.split(',')[0]
+    raw_index = 0 if primary == 'lz4' else 1
+    hints_path = hints_path or get_hints_cache_path(source).replace('.json', '.hints')
+
+    os.makedirs(os.path.dirname(hints_path), exist_ok=True)
+    with open(hints_path, 'w') as f:
+        for file_class, pattern in rules:
+            if file_class == 'raw':
+                f.write(f"{CLUSTER_SIZES['raw']} {pattern} {raw_index}\n")
+            else:
+                f.write(f"{CLUSTER_SIZES[file_class]} {pattern}\n")
+
+    # mkfs.erofs raises its maximum cluster size to the largest hint by itself
+    return {
+        'algo': algo if raw_index == 0 else f"{algo}:lz4",
+        'args': [f"--compress-hints={hints_path}"],
+        'path': hints_path,
+        'stats': stats,
+    }
@@ -3,120 +3,280 @@
 # Handles packing .kzr/.kzp files and mounting images
 
 import os
-import subprocess
-import shutil
-import glob
-import time
+import stat
 
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QTabWidget, QWidget,
     QGroupBox, QLineEdit, QPushButton, QRadioButton, QComboBox,
     QCheckBox, QLabel, QProgressBar, QFileDialog, QMessageBox,
-    QButtonGroup
+    QButtonGroup, QTextEdit, QSpinBox, QFormLayout, QTableWidget, QTableWidgetItem,
+    QHeaderView, QAbstractItemView
+)
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QFontDatabase
+
+from app_config import load_config, save_config
+from erofs_core import (
+    COMPRESSION_ALGORITHMS, PackCancelled, create_package, find_kzi_files, default_package_name, format_pack_progress
+)
+from erofs_analyze import GOALS, analyze_source, format_analysis
+from erofs_reader import ErofsImage, ErofsError
+from erofs_mount import MountManager, MountError, REAP_INTERVAL, get_gui_idle_timeout
+from pack_estimate import format_estimate
+from estimate_worker import EstimateWorker
+from pack_queue import PackQueue, read_pack_manifest, get_available_cpus, format_summary
+from pack_profiles import (
+    IONICE_CLASSES, DEFAULT_PROFILE, DEFAULT_PROFILES, ProfileError, load_profiles, save_profile, delete_profile,
+    effective_workers
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
 
 # --- Background Worker for Creating EROFS ---
 class CreateWorker(QThread):
+    progress = pyqtSignal(int, str)
+    log = pyqtSignal(str)
     finished = pyqtSignal(str)
+    up_to_date = pyqtSignal(str)
     error = pyqtSignal(str)
 
-    def __init__(self, source, save_path, algo, single_thread):
+    def __init__(self, source, save_path, algo, profile=None, auto_hints=False, pkg_type=None, incremental=False,
+                 dedupe="never"):
         super().__init__()
         self.source = source
         self.save_path = save_path
         self.algo = algo
-        self.single_thread = single_thread
+        self.profile = profile
+        self.auto_hints = auto_hints
+        self.pkg_type = pkg_type
+        self.incremental = incremental
+        self.dedupe = dedupe
+        self._cancelled = False
 
     def run(self):
         try:
-            mkfs = shutil.which("mkfs.erofs")
-            if not mkfs:
-                raise Exception("mkfs.erofs not found. Please install erofs-utils.")
+            # Same code path as 'kzi pack', so the GUI and the command line build identical images
+            cmd = create_package(self.source, self.save_path, self.algo, pkg_type=self.pkg_type,
+                                 progress_callback=self._report_progress, auto_hints=self.auto_hints,
+                                 profile=self.profile, log_callback=self.log.emit, incremental=self.incremental,
+                                 dedupe=self.dedupe, checksum=True, stage_callback=self._report_stage,
+                                 checksum_callback=self._report_checksum, cancel_check=self._check_cancelled)
+            if cmd is None:
+                self.up_to_date.emit(self.save_path)
+                return
+            self.finished.emit(self.save_path)
 
-            # 1. Build the base mkfs command
-            base_cmd = [mkfs]
+        except PackCancelled:
+            self.error.emit("Cancelled.")
+        except Exception as e:
+            self.error.emit(str(e))
 
-            if self.algo != "uncompressed":
-                base_cmd.append(f"-z{self.algo}")
+    def cancel(self):
+        self._cancelled = True
 
-            base_cmd.extend([self.save_path, self.source])
+    def _check_cancelled(self):
+        # Called from every step of create_package, including its hashing threads
+        if self._cancelled:
+            raise PackCancelled("Cancelled")
 
-            # 2. Handle Single Thread Mode
-            final_cmd = base_cmd
-            if self.single_thread:
-                taskset = shutil.which("taskset")
-                if not taskset:
-                    raise Exception("taskset command not found (required for single thread mode).")
-                # Prepend taskset -c 0
-                final_cmd = [taskset, "-c", "0"] + base_cmd
+    def _report_stage(self, message):
+        self.progress.emit(-1, message)
 
-            # 3. Run
-            process = subprocess.run(final_cmd, capture_output=True, text=True)
+    def _report_progress(self, progress):
+        percent = int(progress['percent']) if progress['percent'] is not None else -1
+        self.progress.emit(percent, format_pack_progress(progress))
 
-            if process.returncode != 0:
-                raise Exception(f"mkfs.erofs failed:\n{process.stderr}")
+    def _report_checksum(self, done, total):
+        self.progress.emit(int(done * 100 / total), "Computing checksums...")
 
-            self.finished.emit(self.save_path)
 
+# --- Background Worker for Compression Analysis ---
+class AnalyzeWorker(QThread):
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+
+    def run(self):
+        try:
+            analysis = analyze_source(self.source, progress_callback=self._report_progress)
+            self.finished.emit(analysis)
         except Exception as e:
             self.error.emit(str(e))
 
+    def _report_progress(self, done, total):
+        self.progress.emit(int(done * 100 / total), f"Test-compressing sample: {done}/{total} options done")
 
-# --- Background Worker for Mounting/Unmounting ---
-class MountWorker(QThread):
-    finished = pyqtSignal(str)
-    error = pyqtSignal(str)
 
-    def __init__(self, img_path, mount_point, action):
+# --- Background Worker for Batch Packing ---
+class BatchWorker(QThread):
+    job_changed = pyqtSignal(int, int, str)
+    finished = pyqtSignal(dict)
+
+    def __init__(self, queue):
         super().__init__()
-        self.img_path = img_path
-        self.mount_point = mount_point
-        self.action = action
+        self.queue = queue
 
     def run(self):
-        try:
-            mount_point = os.path.abspath(os.path.expanduser(self.mount_point))
-            img_path = os.path.abspath(os.path.expanduser(self.img_path)) if self.img_path else None
+        rows = {id(job): row for row, job in enumerate(self.queue.jobs)}
+        self.queue.run(lambda job: self._report(rows[id(job)], job))
+        self.finished.emit(self.queue.summary())
+
+    def _report(self, row, job):
+        percent = int(job['percent']) if job['percent'] is not None else 0
+        if job['status'] == 'running':
+            status = f"Packing on CPUs {job['cpus']}" + (f" (try {job['attempts']})" if job['attempts'] > 1 else "")
+        elif job['status'] == 'done':
+            status = f"Done, {job['size'] / 1024 / 1024:.1f} MB in {job['elapsed']:.0f}s"
+        elif job['status'] == 'queued' and job['error']:
+            status = f"Retrying: {job['error'].splitlines()[-1]}"
+        elif job['status'] in ('failed', 'skipped'):
+            status = f"{job['status'].capitalize()}: {job['error'].splitlines()[-1]}"
+        else:
+            status = job['status'].capitalize()
+        self.job_changed.emit(row, percent, status)
 
-            if self.action == "mount":
-                erofsfuse = shutil.which("erofsfuse")
-                if not erofsfuse:
-                    raise Exception("erofsfuse not found. Please install 'erofs-utils' or 'erofsfuse'.")
 
-                if not os.path.exists(mount_point):
-                    os.makedirs(mount_point, exist_ok=True)
+# --- Pack Profile Editor ---
+class ProfileDialog(QDialog):
+    """Edits the saved worker/CPU set/nice/ionice profiles used for packing."""
 
-                if os.listdir(mount_point):
-                    print(f"Warning: Mount point {mount_point} is not empty.")
+    def __init__(self, parent=None, current=None):
+        super().__init__(parent)
+        self.setWindowTitle("Pack Profiles")
+        self.profiles = load_profiles()
 
-                cmd = [erofsfuse, img_path, mount_point]
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
 
-            else: # Unmount
-                fusermount = shutil.which("fusermount")
-                if not fusermount:
-                     fusermount = "umount"
-                cmd = [fusermount, '-u', mount_point]
+        self.name_combo = QComboBox()
+        self.name_combo.setEditable(True)
+        self.name_combo.addItems(self.profiles.keys())
+        form.addRow("Profile:", self.name_combo)
 
-            # Run the command
-            process = subprocess.run(cmd, capture_output=True, text=True)
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(0, os.cpu_count() or 64)
+        self.workers_spin.setSpecialValueText("Automatic")
+        form.addRow("Worker threads:", self.workers_spin)
 
-            if process.returncode != 0:
-                raise Exception(f"{self.action.capitalize()} failed:\n{process.stderr}")
+        self.cpus_input = QLineEdit()
+        self.cpus_input.setPlaceholderText("All CPUs (or e.g. 0-3 or 0,2,4)")
+        form.addRow("CPU set:", self.cpus_input)
 
-            # Verification Step
-            if self.action == "mount":
-                time.sleep(0.5) # Give the filesystem a moment to initialize
-                if not os.path.ismount(mount_point):
-                    raise Exception("Mount command finished, but the folder is not mounted.\nThe background process likely crashed (check permissions or FUSE version).")
+        self.nice_spin = QSpinBox()
+        self.nice_spin.setRange(-20, 19)
+        form.addRow("Nice:", self.nice_spin)
+
+        self.ionice_combo = QComboBox()
+        for io_class in IONICE_CLASSES:
+            self.ionice_combo.addItem(io_class or "Default", io_class)
+        form.addRow("I/O class:", self.ionice_combo)
+
+        self.ionice_level_spin = QSpinBox()
+        self.ionice_level_spin.setRange(0, 7)
+        form.addRow("I/O priority (0 = highest):", self.ionice_level_spin)
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        self.btn_save = QPushButton("Save")
+        self.btn_delete = QPushButton("Delete")
+        self.btn_close = QPushButton("Close")
+        btn_layout.addWidget(self.btn_save)
+        btn_layout.addWidget(self.btn_delete)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.btn_close)
+        layout.addLayout(btn_layout)
+
+        self.name_combo.currentTextChanged.connect(self.show_profile)
+        self.btn_save.clicked.connect(self.save_current)
+        self.btn_delete.clicked.connect(self.delete_current)
+        self.btn_close.clicked.connect(self.accept)
+
+        if current in self.profiles:
+            self.name_combo.setCurrentText(current)
+        self.show_profile(self.name_combo.currentText())
 
-            self.finished.emit(mount_point)
+    def show_profile(self, name):
+        profile = self.profiles.get(name)
+        if not profile:
+            return
+        self.workers_spin.setValue(int(profile['workers']))
+        self.cpus_input.setText(profile['cpus'])
+        self.nice_spin.setValue(int(profile['nice']))
+        self.ionice_combo.setCurrentIndex(max(0, self.ionice_combo.findData(profile['ionice_class'])))
+        self.ionice_level_spin.setValue(int(profile['ionice_level']))
+
+    def save_current(self):
+        name = self.name_combo.currentText().strip()
+        if not name:
+            QMessageBox.critical(self, "Error", "Please enter a profile name.")
+            return
+        profile = {
+            'workers': self.workers_spin.value(),
+            'cpus': self.cpus_input.text().strip(),
+            'nice': self.nice_spin.value(),
+            'ionice_class': self.ionice_combo.currentData(),
+            'ionice_level': self.ionice_level_spin.value(),
+        }
+        try:
+            save_profile(name, profile)
+        except ProfileError as e:
+            QMessageBox.critical(self, "Invalid Profile", str(e))
+            return
+        self.profiles = load_profiles()
+        if self.name_combo.findText(name) < 0:
+            self.name_combo.addItem(name)
+
+    def delete_current(self):
+        name = self.name_combo.currentText().strip()
+        if not delete_profile(name):
+            QMessageBox.information(self, "Pack Profiles", f"'{name}' has no saved changes to delete.")
+            return
+        self.profiles = load_profiles()
+        if name in DEFAULT_PROFILES:
+            self.show_profile(name)
+        else:
+            self.name_combo.removeItem(self.name_combo.findText(name))
+
+
+# --- Background Worker for Mounting/Unmounting ---
+class MountWorker(QThread):
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, manager, img_path, mount_point, action, idle_timeout=None):
+        super().__init__()
+        self.manager = manager
+        self.img_path = img_path
+        self.mount_point = mount_point
+        self.action = action
+        self.idle_timeout = idle_timeout
+        self.reused = False
+
+    def run(self):
+        try:
+            if self.action == "mount":
+                # Polls until erofsfuse is ready; an image that is already mounted comes straight back
+                record = self.manager.mount(self.img_path, self.mount_point, self.idle_timeout)
+                self.reused = record['reused']
+                self.finished.emit(record['mount_point'])
+            elif self.action == "unmount_all":
+                results = self.manager.unmount_many([r['mount_point'] for r in self.manager.mounts()])
+                failed = [f"{r['target']}: {r['error']}" for r in results if r['error']]
+                if failed:
+                    raise MountError("Some images could not be unmounted:\n" + "\n".join(failed))
+                self.finished.emit(f"{len(results)} mount points")
+            else:
+                self.finished.emit(self.manager.unmount(self.mount_point))
 
         except Exception as e:
             self.error.emit(str(e))
 
 
 class ErofsManagerWindow(QDialog):
+    BATCH_COL_SOURCE, BATCH_COL_IMAGE, BATCH_COL_PROGRESS, BATCH_COL_STATUS = range(4)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Kazeta Package Manager (EROFS)")
@@ -125,8 +285,15 @@ class ErofsManagerWindow(QDialog):
         # Since this acts as a tool window, we make it modal to the main app
         self.setWindowModality(Qt.WindowModality.WindowModal)
 
+        self.mount_manager = MountManager()
         self.setup_ui()
 
+        # Mounts made here are unmounted once unused for the configured time (see get_gui_idle_timeout)
+        self.mount_manager.start_reaper()
+        self.mount_timer = QTimer(self)
+        self.mount_timer.timeout.connect(self.refresh_mount_state)
+        self.mount_timer.start(int(REAP_INTERVAL * 1000))
+
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
 
@@ -139,7 +306,12 @@ class ErofsManagerWindow(QDialog):
         self.setup_create_tab(self.tab_create)
         self.tabs.addTab(self.tab_create, "Create Package (.kzr/.kzp)")
 
-        # Tab 2: Mount
+        # Tab 2: Batch
+        self.tab_batch = QWidget()
+        self.setup_batch_tab(self.tab_batch)
+        self.tabs.addTab(self.tab_batch, "Batch Pack")
+
+        # Tab 3: Mount
         self.tab_mount = QWidget()
         self.setup_mount_tab(self.tab_mount)
         self.tabs.addTab(self.tab_mount, "Mount Image")
@@ -153,6 +325,12 @@ class ErofsManagerWindow(QDialog):
 
         status_layout.addWidget(self.status_label)
         status_layout.addWidget(self.progress_bar)
+
+        self.log_text = QTextEdit()
+        self.log_text.setReadOnly(True)
+        self.log_text.setMaximumHeight(90)
+        self.log_text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        status_layout.addWidget(self.log_text)
         main_layout.addLayout(status_layout)
 
     def setup_create_tab(self, parent_widget):
@@ -164,10 +342,20 @@ class ErofsManagerWindow(QDialog):
         self.source_input = QLineEdit()
         self.btn_browse_src = QPushButton("Browse...")
         self.btn_browse_src.clicked.connect(self.browse_source)
+        self.source_input.editingFinished.connect(self.request_estimate)
         src_layout.addWidget(self.source_input)
         src_layout.addWidget(self.btn_browse_src)
         layout.addWidget(src_group)
 
+        self.estimate_label = QLabel("")
+        self.estimate_label.setWordWrap(True)
+        self.estimate_label.setStyleSheet("color: gray; font-size: 11px;")
+        layout.addWidget(self.estimate_label)
+        self.create_worker = None
+        self.estimate_worker = None
+        self.estimate_scan = None # (source, scan_tree result) of the last estimate
+        self.estimate_pending = False
+
         # Type Selection
         type_group = QGroupBox("2. Package Type")
         type_layout = QVBoxLayout(type_group)
@@ -190,14 +378,52 @@ class ErofsManagerWindow(QDialog):
 
         comp_layout.addWidget(QLabel("Algorithm:"))
         self.algo_combo = QComboBox()
-        self.algo_combo.addItems(['lz4', 'lz4hc', 'lzma', 'deflate', 'libdeflate', 'zstd', 'uncompressed'])
+        self.algo_combo.addItems(COMPRESSION_ALGORITHMS)
+        self.algo_combo.currentTextChanged.connect(self.request_estimate)
         comp_layout.addWidget(self.algo_combo)
 
-        self.single_thread_check = QCheckBox("Single Thread Mode (taskset -c 0)")
-        comp_layout.addWidget(self.single_thread_check)
+        self.auto_hints_check = QCheckBox("Skip incompressible files")
+        self.auto_hints_check.setToolTip("Generate a compress-hints file so videos, audio and other already-compressed data are stored as-is")
+        self.auto_hints_check.setChecked(True)
+        comp_layout.addWidget(self.auto_hints_check)
+
+        self.dedupe_check = QCheckBox("Deduplicate")
+        self.dedupe_check.setToolTip("Hash the source first and enable mkfs.erofs dedupe/fragments when repeated data or many small files make it pay off")
+        comp_layout.addWidget(self.dedupe_check)
+
+        self.incremental_check = QCheckBox("Skip if unchanged")
+        self.incremental_check.setToolTip("Don't repack when nothing in the source changed since the image was last built with these settings")
+        self.incremental_check.setChecked(True)
+        comp_layout.addWidget(self.incremental_check)
         comp_layout.addStretch() # Push everything to the left
         layout.addWidget(comp_group)
 
+        analyze_layout = QHBoxLayout()
+        analyze_layout.addWidget(QLabel("Goal:"))
+        self.goal_combo = QComboBox()
+        for goal, label in GOALS.items():
+            self.goal_combo.addItem(label, goal)
+        analyze_layout.addWidget(self.goal_combo)
+        self.btn_analyze = QPushButton("Analyze...")
+        self.btn_analyze.setToolTip("Test-compress a sample of the source folder with every algorithm and pick one for the goal")
+        self.btn_analyze.clicked.connect(self.start_analysis)
+        analyze_layout.addWidget(self.btn_analyze)
+        analyze_layout.addStretch()
+        comp_layout.addLayout(analyze_layout)
+
+        # Performance Profile
+        perf_group = QGroupBox("4. Performance")
+        perf_layout = QHBoxLayout(perf_group)
+        perf_layout.addWidget(QLabel("Profile:"))
+        self.profile_combo = QComboBox()
+        perf_layout.addWidget(self.profile_combo)
+        self.btn_edit_profiles = QPushButton("Edit Profiles...")
+        self.btn_edit_profiles.clicked.connect(self.edit_profiles)
+        perf_layout.addWidget(self.btn_edit_profiles)
+        perf_layout.addStretch()
+        layout.addWidget(perf_group)
+        self.refresh_profiles()
+
         # Action Button
         layout.addStretch() # Push button to bottom
         self.btn_create = QPushButton("Create EROFS Image")
@@ -205,6 +431,91 @@ class ErofsManagerWindow(QDialog):
         self.btn_create.clicked.connect(self.start_creation)
         layout.addWidget(self.btn_create)
 
+    def setup_batch_tab(self, parent_widget):
+        layout = QVBoxLayout(parent_widget)
+        self.batch_entries = []
+        self.batch_queue = None
+        self.batch_worker = None
+
+        # Sources
+        src_layout = QHBoxLayout()
+        self.btn_batch_add = QPushButton("Add Folder...")
+        self.btn_batch_add.clicked.connect(self.batch_add_folder)
+        self.btn_batch_add_subfolders = QPushButton("Add Subfolders...")
+        self.btn_batch_add_subfolders.setToolTip("Add every folder with a .kzi file directly inside the chosen folder")
+        self.btn_batch_add_subfolders.clicked.connect(self.batch_add_subfolders)
+        self.btn_batch_manifest = QPushButton("Load Manifest...")
+        self.btn_batch_manifest.setToolTip("CSV/JSON/TOML with folder, output, algo and type columns")
+        self.btn_batch_manifest.clicked.connect(self.batch_load_manifest)
+        self.btn_batch_clear = QPushButton("Clear")
+        self.btn_batch_clear.clicked.connect(self.batch_clear)
+        for button in (self.btn_batch_add, self.btn_batch_add_subfolders, self.btn_batch_manifest, self.btn_batch_clear):
+            src_layout.addWidget(button)
+        src_layout.addStretch()
+        layout.addLayout(src_layout)
+
+        self.batch_table = QTableWidget(0, 4)
+        self.batch_table.setHorizontalHeaderLabels(["Source", "Image", "Progress", "Status"])
+        self.batch_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.batch_table.verticalHeader().setVisible(False)
+        self.batch_table.horizontalHeader().setSectionResizeMode(self.BATCH_COL_STATUS, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.batch_table)
+
+        # Budget
+        budget_group = QGroupBox("Budget")
+        budget_layout = QFormLayout(budget_group)
+        dest_layout = QHBoxLayout()
+        self.batch_dest_input = QLineEdit()
+        self.batch_dest_input.setPlaceholderText("Beside each source folder")
+        btn_browse_dest = QPushButton("Browse...")
+        btn_browse_dest.clicked.connect(self.batch_browse_dest)
+        dest_layout.addWidget(self.batch_dest_input)
+        dest_layout.addWidget(btn_browse_dest)
+        budget_layout.addRow("Output folder:", dest_layout)
+
+        cpu_count = len(get_available_cpus())
+        self.batch_cpus_spin = QSpinBox()
+        self.batch_cpus_spin.setRange(1, cpu_count)
+        self.batch_cpus_spin.setValue(cpu_count)
+        self.batch_cpus_spin.setToolTip("CPUs shared by all running images; each image gets one worker per CPU it holds")
+        budget_layout.addRow("CPUs:", self.batch_cpus_spin)
+        self.batch_slots_spin = QSpinBox()
+        self.batch_slots_spin.setRange(1, 16)
+        self.batch_slots_spin.setValue(2)
+        self.batch_slots_spin.setToolTip("mkfs.erofs processes reading and writing at once (the disk budget)")
+        budget_layout.addRow("Images at once:", self.batch_slots_spin)
+        self.batch_retries_spin = QSpinBox()
+        self.batch_retries_spin.setRange(0, 5)
+        self.batch_retries_spin.setValue(1)
+        budget_layout.addRow("Retries:", self.batch_retries_spin)
+        self.batch_overwrite_check = QCheckBox("Rebuild images that already exist")
+        budget_layout.addRow(self.batch_overwrite_check)
+        self.batch_incremental_check = QCheckBox("Rebuild existing images only when their source changed")
+        self.batch_incremental_check.setChecked(True)
+        budget_layout.addRow(self.batch_incremental_check)
+        note_label = QLabel("Compression, hints and the nice/ionice profile come from the Create tab.")
+        note_label.setStyleSheet("font-size: 11px;")
+        budget_layout.addRow(note_label)
+        layout.addWidget(budget_group)
+
+        # Buttons
+        btn_layout = QHBoxLayout()
+        self.btn_batch_start = QPushButton("Start Batch")
+        self.btn_batch_start.setMinimumHeight(40)
+        self.btn_batch_start.clicked.connect(self.start_batch)
+        self.btn_batch_retry = QPushButton("Retry Failed")
+        self.btn_batch_retry.setMinimumHeight(40)
+        self.btn_batch_retry.setEnabled(False)
+        self.btn_batch_retry.clicked.connect(self.retry_batch)
+        self.btn_batch_cancel = QPushButton("Cancel")
+        self.btn_batch_cancel.setMinimumHeight(40)
+        self.btn_batch_cancel.setEnabled(False)
+        self.btn_batch_cancel.clicked.connect(self.cancel_batch)
+        btn_layout.addWidget(self.btn_batch_start)
+        btn_layout.addWidget(self.btn_batch_retry)
+        btn_layout.addWidget(self.btn_batch_cancel)
+        layout.addLayout(btn_layout)
+
     def setup_mount_tab(self, parent_widget):
         layout = QVBoxLayout(parent_widget)
 
@@ -214,6 +525,7 @@ class ErofsManagerWindow(QDialog):
         self.mount_img_input = QLineEdit()
         self.btn_browse_img = QPushButton("Browse...")
         self.btn_browse_img.clicked.connect(self.browse_image_to_mount)
+        self.mount_img_input.editingFinished.connect(self.refresh_mount_state)
         img_layout.addWidget(self.mount_img_input)
         img_layout.addWidget(self.btn_browse_img)
         layout.addWidget(img_group)
@@ -233,6 +545,10 @@ class ErofsManagerWindow(QDialog):
         note_label = QLabel("Note: Uses FUSE. No sudo required.")
         note_label.setStyleSheet("color: green; font-size: 11px;")
         mnt_layout.addWidget(note_label)
+
+        self.mount_state_label = QLabel("")
+        self.mount_state_label.setStyleSheet("color: gray; font-size: 11px;")
+        mnt_layout.addWidget(self.mount_state_label)
         layout.addWidget(mnt_group)
 
         # Buttons
@@ -246,15 +562,57 @@ class ErofsManagerWindow(QDialog):
         self.btn_unmount.setMinimumHeight(40)
         self.btn_unmount.clicked.connect(self.start_unmount)
 
+        self.btn_inspect = QPushButton("Inspect Image")
+        self.btn_inspect.setMinimumHeight(40)
+        self.btn_inspect.setToolTip("Show the embedded .kzi and the files in the image without mounting it")
+        self.btn_inspect.clicked.connect(self.inspect_image)
+
+        self.btn_unmount_all = QPushButton("Unmount All")
+        self.btn_unmount_all.setMinimumHeight(40)
+        self.btn_unmount_all.setToolTip("Unmount every image mounted by this app")
+        self.btn_unmount_all.clicked.connect(self.start_unmount_all)
+
         btn_layout.addWidget(self.btn_mount)
         btn_layout.addWidget(self.btn_unmount)
+        btn_layout.addWidget(self.btn_unmount_all)
+        btn_layout.addWidget(self.btn_inspect)
         layout.addLayout(btn_layout)
+        self.refresh_mount_state()
 
     # --- Helpers ---
     def browse_source(self):
         path = QFileDialog.getExistingDirectory(self, "Select Source Directory")
         if path:
             self.source_input.setText(path)
+            self.request_estimate()
+
+    def request_estimate(self):
+        """Estimates size, pack time and media fit for the chosen folder and algorithm in the background."""
+        source = os.path.abspath(self.source_input.text().strip()) if self.source_input.text().strip() else ""
+        if not source or not os.path.isdir(source):
+            self.estimate_label.setText("")
+            return
+        if self.estimate_worker and self.estimate_worker.isRunning():
+            # Only the latest choice matters; it runs once the current estimate is done
+            self.estimate_pending = True
+            return
+
+        scan = self.estimate_scan[1] if self.estimate_scan and self.estimate_scan[0] == source else None
+        profile = self.profiles.get(self.profile_combo.currentText()) or {}
+        self.estimate_pending = False
+        self.estimate_label.setText("Estimating size...")
+        self.estimate_worker = EstimateWorker(source, self.algo_combo.currentText(), "erofs",
+                                              effective_workers(profile) or None, scan)
+        self.estimate_worker.finished.connect(self.on_estimate_finished)
+        self.estimate_worker.error.connect(lambda err: self.estimate_label.setText(f"Could not estimate: {err}"))
+        self.estimate_worker.start()
+
+    def on_estimate_finished(self, estimate):
+        self.estimate_scan = (estimate['source'], self.estimate_worker.scan)
+        self.estimate_label.setText(format_estimate(estimate, short=True))
+        self.estimate_label.setToolTip(format_estimate(estimate))
+        if self.estimate_pending:
+            self.request_estimate()
 
     def browse_image_to_mount(self):
         path, _ = QFileDialog.getOpenFileName(
@@ -262,16 +620,45 @@ class ErofsManagerWindow(QDialog):
         )
         if path:
             self.mount_img_input.setText(path)
+            self.refresh_mount_state()
+
+    def refresh_mount_state(self):
+        """Shows where the chosen image is mounted already, and how many images are mounted."""
+        img = self.mount_img_input.text().strip()
+        record = self.mount_manager.find(img) if img and os.path.isfile(img) else None
+        if record:
+            self.mount_point_input.setText(record['mount_point'])
+        count = len(self.mount_manager.mounts())
+        text = f"Already mounted at {record['mount_point']}. " if record else ""
+        self.mount_state_label.setText(text + (f"{count} images mounted by this app." if count else ""))
 
     def browse_mount_point(self):
         path = QFileDialog.getExistingDirectory(self, "Select Mount Point Directory")
         if path:
             self.mount_point_input.setText(path)
 
+    def refresh_profiles(self, selected=None):
+        selected = selected or self.profile_combo.currentText() or load_config().get('pack_profile', DEFAULT_PROFILE)
+        self.profiles = load_profiles()
+        self.profile_combo.clear()
+        self.profile_combo.addItems(self.profiles.keys())
+        if selected in self.profiles:
+            self.profile_combo.setCurrentText(selected)
+
+    def edit_profiles(self):
+        dialog = ProfileDialog(self, self.profile_combo.currentText())
+        dialog.exec()
+        self.refresh_profiles()
+
+    def append_log(self, text):
+        self.log_text.append(text)
+
     def _toggle_ui(self, enable):
         self.btn_create.setEnabled(enable)
+        self.btn_analyze.setEnabled(enable)
         self.btn_mount.setEnabled(enable)
         self.btn_unmount.setEnabled(enable)
+        self.btn_unmount_all.setEnabled(enable)
         self.tabs.setEnabled(enable) # Optionally lock the whole tab widget during ops
 
         if enable:
@@ -290,16 +677,12 @@ class ErofsManagerWindow(QDialog):
             QMessageBox.critical(self, "Error", "Invalid source folder.")
             return
 
-        if pkg_type == "kzp":
-            kzi_files = glob.glob(os.path.join(source, "*.kzi"))
-            if not kzi_files:
-                QMessageBox.critical(self, "Error", "Selected folder must contain a .kzi file for .kzp packages.")
-                return
+        if pkg_type == "kzp" and not find_kzi_files(source):
+            QMessageBox.critical(self, "Error", "Selected folder must contain a .kzi file for .kzp packages.")
+            return
 
         ext = f".{pkg_type}"
-        default_name = f"package{ext}"
-        if pkg_type == "kzp" and kzi_files:
-            default_name = os.path.basename(kzi_files[0]).replace(".kzi", ext)
+        default_name = default_package_name(source, pkg_type)
 
         save_path, _ = QFileDialog.getSaveFileName(
             self, f"Save {pkg_type.upper()} File", default_name, f"{pkg_type.upper()} Image (*{ext})"
@@ -309,20 +692,221 @@ class ErofsManagerWindow(QDialog):
             return
 
         algo = self.algo_combo.currentText()
-        single_thread = self.single_thread_check.isChecked()
+        profile_name = self.profile_combo.currentText()
+        config = load_config()
+        config['pack_profile'] = profile_name
+        save_config(config)
 
         self._toggle_ui(False)
         self.status_label.setText("Packing EROFS image...")
 
-        self.create_worker = CreateWorker(source, save_path, algo, single_thread)
+        self.create_worker = CreateWorker(source, save_path, algo, self.profiles.get(profile_name),
+                                          self.auto_hints_check.isChecked(), pkg_type,
+                                          self.incremental_check.isChecked(),
+                                          "auto" if self.dedupe_check.isChecked() else "never")
+        self.create_worker.progress.connect(self.update_create_progress)
+        self.create_worker.log.connect(self.append_log)
         self.create_worker.finished.connect(self.on_create_finished)
+        self.create_worker.up_to_date.connect(self.on_create_up_to_date)
         self.create_worker.error.connect(self.on_worker_error)
         self.create_worker.start()
 
+    def update_create_progress(self, percent, status_text):
+        # -1 means the percentage isn't known (yet); keep the bar bouncing
+        if percent < 0:
+            self.progress_bar.setRange(0, 0)
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(percent)
+        self.status_label.setText(status_text)
+
     def on_create_finished(self, save_path):
         self._toggle_ui(True)
         QMessageBox.information(self, "Success", f"Created {os.path.basename(save_path)}")
 
+    def on_create_up_to_date(self, save_path):
+        self._toggle_ui(True)
+        QMessageBox.information(self, "Up to Date",
+                                f"{os.path.basename(save_path)} is up to date; nothing in the source changed since it was built.")
+
+    # --- Logic: Analyze ---
+    def start_analysis(self):
+        source = self.source_input.text().strip()
+        if not source or not os.path.isdir(source):
+            QMessageBox.critical(self, "Error", "Invalid source folder.")
+            return
+
+        self._toggle_ui(False)
+        self.status_label.setText("Sampling source folder...")
+
+        self.analyze_worker = AnalyzeWorker(source)
+        self.analyze_worker.progress.connect(self.update_create_progress)
+        self.analyze_worker.finished.connect(self.on_analysis_finished)
+        self.analyze_worker.error.connect(self.on_worker_error)
+        self.analyze_worker.start()
+
+    def on_analysis_finished(self, analysis):
+        self._toggle_ui(True)
+        option = analysis['recommendations'].get(self.goal_combo.currentData())
+        if option:
+            # Options with a level (e.g. "lzma,9") are passed straight through as -z<option>
+            if self.algo_combo.findText(option) < 0:
+                self.algo_combo.addItem(option)
+            self.algo_combo.setCurrentText(option)
+            self.status_label.setText(f"Recommended for '{self.goal_combo.currentText()}': {option}")
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Compression Analysis")
+        dialog.resize(620, 420)
+        dialog_layout = QVBoxLayout(dialog)
+        report = QTextEdit()
+        report.setReadOnly(True)
+        report.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        report.setPlainText(format_analysis(analysis))
+        dialog_layout.addWidget(report)
+        btn_close = QPushButton("Close")
+        btn_close.clicked.connect(dialog.accept)
+        dialog_layout.addWidget(btn_close)
+        dialog.exec()
+
+    # --- Logic: Batch ---
+    def _add_batch_row(self, entry):
+        self.batch_entries.append(entry)
+        row = self.batch_table.rowCount()
+        self.batch_table.insertRow(row)
+        self.batch_table.setItem(row, self.BATCH_COL_SOURCE, QTableWidgetItem(entry['source']))
+        self.batch_table.setItem(row, self.BATCH_COL_IMAGE, QTableWidgetItem(
+            os.path.basename(entry['output']) if entry['output'] else ""))
+        bar = QProgressBar()
+        bar.setRange(0, 100)
+        bar.setValue(0)
+        self.batch_table.setCellWidget(row, self.BATCH_COL_PROGRESS, bar)
+        self.batch_table.setItem(row, self.BATCH_COL_STATUS, QTableWidgetItem(""))
+        # A new row needs a new queue
+        self.batch_queue = None
+
+    def batch_add_folder(self):
+        path = QFileDialog.getExistingDirectory(self, "Select Game Folder")
+        if not path:
+            return
+        if not find_kzi_files(path):
+            QMessageBox.critical(self, "Error", "Selected folder must contain a .kzi file for .kzp packages.")
+            return
+        self._add_batch_row({'source': path, 'output': None, 'algo': None, 'pkg_type': "kzp"})
+
+    def batch_add_subfolders(self):
+        parent = QFileDialog.getExistingDirectory(self, "Select Folder Containing Game Folders")
+        if not parent:
+            return
+        added = 0
+        for entry in sorted(os.scandir(parent), key=lambda e: e.name.lower()):
+            if entry.is_dir() and find_kzi_files(entry.path):
+                self._add_batch_row({'source': entry.path, 'output': None, 'algo': None, 'pkg_type': "kzp"})
+                added += 1
+        if not added:
+            QMessageBox.information(self, "Batch Pack", "No subfolder contains a .kzi file.")
+
+    def batch_load_manifest(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Select Manifest", "", "Manifests (*.csv *.json *.toml);;All files (*.*)"
+        )
+        if not path:
+            return
+        try:
+            rows = read_pack_manifest(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not read manifest:\n{e}")
+            return
+        for entry in rows:
+            self._add_batch_row(entry)
+
+    def batch_clear(self):
+        self.batch_entries = []
+        self.batch_queue = None
+        self.batch_table.setRowCount(0)
+        self.btn_batch_retry.setEnabled(False)
+
+    def batch_browse_dest(self):
+        path = QFileDialog.getExistingDirectory(self, "Select Output Folder")
+        if path:
+            self.batch_dest_input.setText(path)
+
+    def _toggle_batch_ui(self, running):
+        for button in (self.btn_batch_add, self.btn_batch_add_subfolders, self.btn_batch_manifest,
+                       self.btn_batch_clear, self.btn_batch_start, self.btn_create, self.btn_analyze):
+            button.setEnabled(not running)
+        self.btn_batch_retry.setEnabled(not running and bool(self.batch_queue) and
+                                        any(job['status'] in ('failed', 'cancelled') for job in self.batch_queue.jobs))
+        self.btn_batch_cancel.setEnabled(running)
+
+    def start_batch(self):
+        if not self.batch_entries:
+            QMessageBox.critical(self, "Error", "Add some source folders or a manifest first.")
+            return
+
+        profile_name = self.profile_combo.currentText()
+        profile = self.profiles.get(profile_name, {})
+        # The scheduler hands out CPUs itself; keep only the profile's priorities
+        profile = dict(profile, cpus="", workers=0)
+        dest = self.batch_dest_input.text().strip() or None
+        try:
+            self.batch_queue = PackQueue(
+                self.batch_slots_spin.value(), get_available_cpus()[:self.batch_cpus_spin.value()], profile,
+                self.algo_combo.currentText(), auto_hints=self.auto_hints_check.isChecked(),
+                retries=self.batch_retries_spin.value(), overwrite=self.batch_overwrite_check.isChecked(),
+                incremental=self.batch_incremental_check.isChecked(),
+                dedupe="auto" if self.dedupe_check.isChecked() else "never", checksum=True
+            )
+            for entry in self.batch_entries:
+                self.batch_queue.add(entry['source'], entry['output'], entry['algo'], entry['pkg_type'], dest)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+
+        for row, job in enumerate(self.batch_queue.jobs):
+            self.batch_table.item(row, self.BATCH_COL_IMAGE).setText(os.path.basename(job['output']))
+            self.batch_table.item(row, self.BATCH_COL_IMAGE).setToolTip(job['output'])
+        self._run_batch()
+
+    def retry_batch(self):
+        if not self.batch_queue or not self.batch_queue.retry_failed():
+            return
+        self._run_batch()
+
+    def _run_batch(self):
+        for row, job in enumerate(self.batch_queue.jobs):
+            if job['status'] == 'queued':
+                self.batch_table.cellWidget(row, self.BATCH_COL_PROGRESS).setValue(0)
+                self.batch_table.item(row, self.BATCH_COL_STATUS).setText("Queued")
+
+        self._toggle_batch_ui(True)
+        self.status_label.setText(f"Packing {len(self.batch_queue.jobs)} images, "
+                                  f"{self.batch_queue.io_slots} at a time on {len(self.batch_queue.cpus)} CPUs...")
+        self.batch_worker = BatchWorker(self.batch_queue)
+        self.batch_worker.job_changed.connect(self.on_batch_job_changed)
+        self.batch_worker.finished.connect(self.on_batch_finished)
+        self.batch_worker.start()
+
+    def cancel_batch(self):
+        if self.batch_queue:
+            self.batch_queue.cancel()
+            self.btn_batch_cancel.setEnabled(False)
+            self.status_label.setText("Cancelling...")
+
+    def on_batch_job_changed(self, row, percent, status):
+        self.batch_table.cellWidget(row, self.BATCH_COL_PROGRESS).setValue(percent)
+        self.batch_table.item(row, self.BATCH_COL_STATUS).setText(status)
+
+    def on_batch_finished(self, summary):
+        self._toggle_batch_ui(False)
+        self.status_label.setText("Ready")
+        report = format_summary(summary)
+        self.append_log(report)
+        if summary['failed']:
+            QMessageBox.warning(self, "Batch Pack", report)
+        else:
+            QMessageBox.information(self, "Batch Pack", report)
+
     # --- Logic: Mount/Unmount ---
     def start_mount(self):
         img = self.mount_img_input.text().strip()
@@ -338,11 +922,49 @@ class ErofsManagerWindow(QDialog):
         self._toggle_ui(False)
         self.status_label.setText("Performing mount...")
 
-        self.mount_worker = MountWorker(img, mnt, "mount")
-        self.mount_worker.finished.connect(lambda p: self.on_mount_action_finished("mount", p))
+        self.mount_worker = MountWorker(self.mount_manager, img, mnt, "mount", get_gui_idle_timeout())
+        self.mount_worker.finished.connect(
+            lambda p: self.on_mount_action_finished("reuse" if self.mount_worker.reused else "mount", p))
         self.mount_worker.error.connect(self.on_worker_error)
         self.mount_worker.start()
 
+    def inspect_image(self):
+        img = self.mount_img_input.text().strip()
+        if not img or not os.path.exists(img):
+            QMessageBox.critical(self, "Error", "Invalid image file.")
+            return
+
+        # Reading the image in-process takes milliseconds, so no worker thread is needed
+        lines = []
+        try:
+            with ErofsImage(img) as image:
+                for name in image.find_kzi_files():
+                    lines += [f"--- {name} ---", image.read(name).decode('utf-8', 'replace').rstrip(), ""]
+                files = total = 0
+                for rel_path, inode in image.walk():
+                    if inode.is_file:
+                        files += 1
+                        total += inode.size
+                    lines.append(f"{stat.filemode(inode.mode)} {inode.size:>12}  {rel_path}")
+        except (OSError, ErofsError) as e:
+            QMessageBox.critical(self, "Error", f"Cannot read {os.path.basename(img)}: {e}")
+            return
+        lines.append(f"\n{files} files, {total / 1024 / 1024:.1f} MB uncompressed")
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Contents of {os.path.basename(img)}")
+        dialog.resize(620, 420)
+        dialog_layout = QVBoxLayout(dialog)
+        report = QTextEdit()
+        report.setReadOnly(True)
+        report.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        report.setPlainText("\n".join(lines))
+        dialog_layout.addWidget(report)
+        btn_close = QPushButton("Close")
+        btn_close.clicked.connect(dialog.accept)
+        dialog_layout.addWidget(btn_close)
+        dialog.exec()
+
     def start_unmount(self):
         mnt = self.mount_point_input.text().strip()
         if not mnt:
@@ -352,19 +974,53 @@ class ErofsManagerWindow(QDialog):
         self._toggle_ui(False)
         self.status_label.setText("Performing unmount...")
 
-        self.unmount_worker = MountWorker(None, mnt, "unmount")
+        self.unmount_worker = MountWorker(self.mount_manager, None, mnt, "unmount")
+        self.unmount_worker.finished.connect(lambda p: self.on_mount_action_finished("unmount", p))
+        self.unmount_worker.error.connect(self.on_worker_error)
+        self.unmount_worker.start()
+
+    def start_unmount_all(self):
+        if not self.mount_manager.mounts():
+            QMessageBox.information(self, "Unmount All", "No images are mounted.")
+            return
+
+        self._toggle_ui(False)
+        self.status_label.setText("Unmounting all images...")
+
+        self.unmount_worker = MountWorker(self.mount_manager, None, None, "unmount_all")
         self.unmount_worker.finished.connect(lambda p: self.on_mount_action_finished("unmount", p))
         self.unmount_worker.error.connect(self.on_worker_error)
         self.unmount_worker.start()
 
     def on_mount_action_finished(self, action, mount_point):
         self._toggle_ui(True)
+        self.refresh_mount_state()
+        if action == "reuse":
+            QMessageBox.information(self, "Already Mounted", f"The image is already mounted at:\n{mount_point}")
+            return
         QMessageBox.information(self, "Success", f"Successfully {action}ed at:\n{mount_point}")
 
     def on_worker_error(self, err_msg):
         self._toggle_ui(True)
+        self.refresh_mount_state()
         QMessageBox.critical(self, "Error", err_msg)
 
+    def done(self, result):
+        # Every way out (Esc, Close, the window's X via closeEvent) ends here.
+        # Running mkfs processes are killed and their partial images removed
+        if self.create_worker and self.create_worker.isRunning():
+            self.create_worker.cancel()
+            self.create_worker.wait()
+        if self.batch_worker and self.batch_worker.isRunning():
+            self.batch_queue.cancel()
+            self.batch_worker.wait()
+        # An estimate only takes seconds; let it finish rather than destroy a running thread
+        if self.estimate_worker and self.estimate_worker.isRunning():
+            self.estimate_worker.wait()
+        self.mount_timer.stop()
+        self.mount_manager.stop_reaper()
+        super().done(result)
+
 
 if __name__ == "__main__":
     # Standard testing block if you want to run this file directly
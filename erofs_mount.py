@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# Mount Manager for KZI Generator
+# Mounts .kzp/.kzr images with erofsfuse, reuses existing mounts and unmounts idle ones
+
+import os
+import json
+import time
+import fcntl
+import shutil
+import signal
+import threading
+import subprocess
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app_config import get_runtime_dir, load_config, write_json_atomic
+
+MOUNT_TIMEOUT = 10.0 # seconds erofsfuse gets to make the folder a mount point
+UNMOUNT_TIMEOUT = 5.0
+POLL_FIRST = 0.005 # readiness polling starts here and doubles up to POLL_MAX
+POLL_MAX = 0.25
+REAP_INTERVAL = 15.0
+GUI_IDLE_TIMEOUT = 30 * 60 # seconds a mount made from the GUI may sit unused
+MOUNT_JOBS = 8
+LOG_TAIL_BYTES = 4096
+
+
+class MountError(Exception):
+    pass
+
+
+def get_mount_registry_path():
+    return get_runtime_dir("mounts.json")
+
+def get_gui_idle_timeout():
+    """Idle timeout for GUI mounts, configurable through 'mount_idle_minutes' in config.json (0 = never)."""
+    minutes = load_config().get('mount_idle_minutes')
+    if minutes is None:
+        return GUI_IDLE_TIMEOUT
+    return float(minutes) * 60 or None
+
+def default_mount_root():
+    return get_runtime_dir("mounts")
+
+def wait_for(predicate, timeout, first=POLL_FIRST, longest=POLL_MAX):
+    """
+    Polls `predicate` with exponential backoff until it is true or `timeout`
+    seconds pass. Returns its last value, so a fast mount costs milliseconds
+    and a slow one is not cut off by a fixed sleep.
+    """
+    deadline = time.monotonic() + timeout
+    delay = first
+    while True:
+        result = predicate()
+        if result or time.monotonic() >= deadline:
+            return result
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, longest)
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # A zombie has exited but still answers kill(0)
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (OSError, IndexError):
+        return True
+
+def _image_key(image_path):
+    st = os.stat(image_path)
+    return st.st_dev, st.st_ino
+
+def _read_log_tail(path):
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - LOG_TAIL_BYTES))
+            return f.read().decode('utf-8', 'replace').strip()
+    except OSError:
+        return ""
+
+def _fusermount_command(mount_point, lazy=False):
+    fusermount = shutil.which("fusermount3") or shutil.which("fusermount")
+    if fusermount:
+        return [fusermount, '-u'] + (['-z'] if lazy else []) + [mount_point]
+    return ['umount'] + (['-l'] if lazy else []) + [mount_point]
+
+
+class MountManager:
+    """
+    Keeps track of erofsfuse mounts in a registry shared by every process of
+    the app: image path, image device/inode, mount point, FUSE pid, when it was
+    last used and how long it may sit idle. Mounting an image that is already
+    mounted returns the existing mount. Mounts with an idle timeout are
+    unmounted by unmount_idle() (or the reaper thread) once they have not been
+    used for that long; mounts without one stay until unmounted.
+    """
+
+    def __init__(self, registry_path=None, mount_root=None):
+        self.registry_path = registry_path or get_mount_registry_path()
+        self.mount_root = mount_root or default_mount_root()
+        self._lock = threading.Lock()
+        self._image_locks = {}
+        self._reaper = None
+        self._stop_reaper = threading.Event()
+
+    # --- Registry ---
+    @contextmanager
+    def _registry(self, write=False):
+        """Yields the live mount records, holding a file lock so other processes see a consistent list."""
+        os.makedirs(os.path.dirname(self.registry_path), exist_ok=True)
+        with open(self.registry_path + ".lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.registry_path, 'r') as f:
+                        records = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    records = []
+                # Entries whose mount went away (crash, reboot, manual fusermount) are dropped
+                live = [r for r in records if os.path.ismount(r['mount_point']) and _pid_alive(r['pid'])]
+                yield live
+                if write or len(live) != len(records):
+                    write_json_atomic(self.registry_path, live)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def mounts(self):
+        """Every live mount record, oldest first."""
+        with self._registry() as records:
+            return [dict(r) for r in records]
+
+    def find(self, target):
+        """The record for an image path or mount point, or None."""
+        mount_point = os.path.abspath(os.path.expanduser(target))
+        try:
+            key = list(_image_key(target)) if os.path.isfile(target) else None
+        except OSError:
+            key = None
+        with self._registry() as records:
+            for record in records:
+                if record['mount_point'] == mount_point or (key and [record['dev'], record['inode']] == key):
+                    return dict(record)
+        return None
+
+    # --- Mounting ---
+    def _image_lock(self, key):
+        with self._lock:
+            return self._image_locks.setdefault(key, threading.Lock())
+
+    def mount(self, image_path, mount_point=None, idle_timeout=None):
+        """
+        Mounts `image_path` and returns its record, with 'reused' set when it
+        was already mounted. Without a mount point one is made under the
+        runtime dir. `idle_timeout` (seconds) lets unmount_idle() take it down.
+        """
+        image_path = os.path.abspath(os.path.expanduser(image_path))
+        try:
+            key = _image_key(image_path)
+        except OSError as e:
+            raise MountError(f"Cannot read {image_path}: {e.strerror}")
+
+        # Two threads asking for the same image wait for one mount; different images mount in parallel
+        with self._image_lock(key):
+            with self._registry(write=True) as records:
+                for record in records:
+                    if (record['dev'], record['inode']) == key:
+                        record['last_used'] = time.time()
+                        if idle_timeout is None:
+                            record['idle_timeout'] = None
+                        return dict(record, reused=True)
+                if mount_point:
+                    mount_point = os.path.abspath(os.path.expanduser(mount_point))
+                    for record in records:
+                        if record['mount_point'] == mount_point:
+                            raise MountError(f"{mount_point} already has {record['image']} mounted.")
+                else:
+                    stem = os.path.splitext(os.path.basename(image_path))[0]
+                    mount_point = os.path.join(self.mount_root, f"{stem}-{key[1]}")
+
+            if os.path.ismount(mount_point):
+                raise MountError(f"Something else is already mounted at {mount_point}.")
+            record = self._start_fuse(image_path, mount_point, idle_timeout)
+            record.update(dev=key[0], inode=key[1])
+
+            with self._registry(write=True) as records:
+                records.append(record)
+            return dict(record, reused=False)
+
+    def _start_fuse(self, image_path, mount_point, idle_timeout):
+        erofsfuse = shutil.which("erofsfuse")
+        if not erofsfuse:
+            raise MountError("erofsfuse not found. Please install 'erofs-utils' or 'erofsfuse'.")
+
+        created_dir = not os.path.exists(mount_point)
+        os.makedirs(mount_point, exist_ok=True)
+        if not created_dir and os.listdir(mount_point):
+            print(f"Warning: Mount point {mount_point} is not empty.")
+
+        # Run in the foreground so the pid we get is the FUSE daemon itself; its own
+        # session keeps it alive after the app exits, like the forking default did
+        log_path = os.path.join(os.path.dirname(self.registry_path), f"erofsfuse-{os.getpid()}-{time.time_ns()}.log")
+        with open(log_path, 'wb') as log:
+            process = subprocess.Popen([erofsfuse, '-f', image_path, mount_point], stdin=subprocess.DEVNULL,
+                                       stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+
+        mounted = wait_for(lambda: os.path.ismount(mount_point) or process.poll() is not None, MOUNT_TIMEOUT)
+        if not mounted or not os.path.ismount(mount_point):
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            output = _read_log_tail(log_path)
+            os.remove(log_path)
+            if created_dir:
+                self._remove_dir(mount_point)
+            if mounted:
+                raise MountError("erofsfuse exited before the folder was mounted.\n"
+                                 f"{output or 'Check permissions or the FUSE version.'}")
+            raise MountError(f"{mount_point} was not mounted after {MOUNT_TIMEOUT:.0f}s.\n{output}".strip())
+        os.remove(log_path)
+
+        now = time.time()
+        return {
+            'image': image_path,
+            'mount_point': mount_point,
+            'pid': process.pid,
+            'created_dir': created_dir,
+            'mounted_at': now,
+            'last_used': now,
+            'idle_timeout': idle_timeout,
+        }
+
+    def _remove_dir(self, mount_point):
+        try:
+            os.rmdir(mount_point)
+        except OSError:
+            pass
+
+    # --- Unmounting ---
+    def unmount(self, target, lazy=False):
+        """
+        Unmounts by mount point or image path and returns the mount point.
+        Folders that are mounted but not in the registry are unmounted too.
+        `lazy` detaches a busy mount instead of failing.
+        """
+        record = self.find(target)
+        mount_point = record['mount_point'] if record else os.path.abspath(os.path.expanduser(target))
+        if not record and not os.path.ismount(mount_point):
+            raise MountError(f"{target} is not mounted.")
+
+        process = subprocess.run(_fusermount_command(mount_point, lazy), capture_output=True, text=True)
+        if process.returncode != 0 and os.path.ismount(mount_point):
+            raise MountError(f"Unmount failed:\n{process.stderr}")
+
+        if record:
+            # The daemon exits once the kernel lets go; wait so the image is closed when we return
+            if not wait_for(lambda: not _pid_alive(record['pid']), UNMOUNT_TIMEOUT) and not lazy:
+                os.kill(record['pid'], signal.SIGTERM)
+            with self._registry(write=True) as records:
+                records[:] = [r for r in records if r['mount_point'] != mount_point]
+            if record['created_dir']:
+                self._remove_dir(mount_point)
+        return mount_point
+
+    def unmount_idle(self, now=None):
+        """
+        Unmounts mounts that have an idle timeout and were last used longer
+        ago than the timeout. Busy mounts fail to unmount and are tried again
+        next time. Returns the mount points.
+        """
+        now = time.time() if now is None else now
+        done = []
+        for record in self.mounts():
+            if record['idle_timeout'] is None:
+                continue
+            if now - record['last_used'] >= record['idle_timeout']:
+                try:
+                    done.append(self.unmount(record['mount_point']))
+                except MountError:
+                    continue
+        return done
+
+    def start_reaper(self, interval=REAP_INTERVAL):
+        """Calls unmount_idle() every `interval` seconds on a daemon thread."""
+        if self._reaper and self._reaper.is_alive():
+            return
+        self._stop_reaper.clear()
+
+        def reap():
+            while not self._stop_reaper.wait(interval):
+                self.unmount_idle()
+
+        self._reaper = threading.Thread(target=reap, daemon=True)
+        self._reaper.start()
+
+    def stop_reaper(self):
+        self._stop_reaper.set()
+
+    def mount_many(self, image_paths, jobs=MOUNT_JOBS, idle_timeout=None, progress_callback=None):
+        """Mounts many images in parallel. Returns [{'image', 'mount_point', 'reused', 'error'}] in order."""
+        def mount_one(image_path):
+            try:
+                record = self.mount(image_path, idle_timeout=idle_timeout)
+                return {'image': image_path, 'mount_point': record['mount_point'],
+                        'reused': record['reused'], 'error': None}
+            except (MountError, OSError) as e:
+                return {'image': image_path, 'mount_point': None, 'reused': False, 'error': str(e)}
+        return self._run_many(mount_one, image_paths, jobs, progress_callback)
+
+    def unmount_many(self, targets, jobs=MOUNT_JOBS, lazy=False, progress_callback=None):
+        """Unmounts many mount points or images in parallel. Returns [{'target', 'mount_point', 'error'}]."""
+        def unmount_one(target):
+            try:
+                return {'target': target, 'mount_point': self.unmount(target, lazy), 'error': None}
+            except (MountError, OSError) as e:
+                return {'target': target, 'mount_point': None, 'error': str(e)}
+        return self._run_many(unmount_one, targets, jobs, progress_callback)
+
+    def _run_many(self, func, items, jobs, progress_callback):
+        items = list(items)
+        results = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            futures = {pool.submit(func, item): i for i, item in enumerate(items)}
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress_callback:
+                    progress_callback(done, len(items))
+        return results
+
+
+def format_mounts(records):
+    if not records:
+        return "Nothing mounted"
+    now = time.time()
+    lines = []
+    for record in records:
+        idle = now - record['last_used']
+        timeout = f", unmounts after {record['idle_timeout']:.0f}s idle" if record['idle_timeout'] is not None else ""
+        lines.append(f"{record['mount_point']}  <- {record['image']} (pid {record['pid']}, idle {idle:.0f}s{timeout})")
+    return "\n".join(lines)
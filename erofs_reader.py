@@ -0,0 +1,825 @@
+#!/usr/bin/env python3
+# EROFS Reader for KZI Generator
+# Lists, reads and extracts .kzp/.kzr images in-process, without erofsfuse or /dev/fuse
+
+import os
+import stat
+import mmap
+import struct
+import posixpath
+from collections import OrderedDict
+
+EROFS_MAGIC = 0xE0F5E1E2
+SUPER_OFFSET = 1024
+
+# Superblock feature_incompat bits this reader understands
+FEATURE_ZERO_PADDING = 0x01
+FEATURE_BIG_PCLUSTER = 0x02 # also COMPR_CFGS
+FEATURE_CHUNKED_FILE = 0x04
+FEATURE_DEVICE_TABLE = 0x08 # also COMPR_HEAD2
+FEATURE_ZTAILPACKING = 0x10
+FEATURE_FRAGMENTS = 0x20 # also DEDUPE
+FEATURE_XATTR_PREFIXES = 0x40
+KNOWN_FEATURES = 0x7F
+
+# Inode data layouts
+LAYOUT_FLAT_PLAIN, LAYOUT_COMPRESSED_FULL, LAYOUT_FLAT_INLINE, LAYOUT_COMPRESSED_COMPACT, LAYOUT_CHUNK_BASED = range(5)
+
+CHUNK_FORMAT_BLKBITS_MASK = 0x1F
+CHUNK_FORMAT_INDEXES = 0x20
+NULL_ADDR = 0xFFFFFFFF
+
+# Compressed files: map header advise bits, lcluster types and algorithms
+Z_ADVISE_COMPACTED_2B = 0x01
+Z_ADVISE_BIG_PCLUSTER_1 = 0x02
+Z_ADVISE_BIG_PCLUSTER_2 = 0x04
+Z_ADVISE_INLINE_PCLUSTER = 0x08
+Z_ADVISE_INTERLACED_PCLUSTER = 0x10
+Z_ADVISE_FRAGMENT_PCLUSTER = 0x20
+Z_TYPE_PLAIN, Z_TYPE_HEAD1, Z_TYPE_NONHEAD, Z_TYPE_HEAD2 = range(4)
+Z_D0_CBLKCNT = 1 << 11
+Z_PARTIAL_REF = 1 << 15
+ALGORITHMS = {0: 'lz4', 1: 'lzma', 2: 'deflate', 3: 'zstd'}
+LZMA_MAX_DICT_SIZE = 8 * 1024 * 1024
+
+DIRENT_SIZE = 12
+EXTENT_CACHE_SIZE = 16 # decompressed extents kept per image
+SYMLINK_HOPS = 40
+
+
+class ErofsError(Exception):
+    pass
+
+
+# --- Decompressors ---
+def _lz4_decompress_py(src, size):
+    """LZ4 block decoder that stops after `size` bytes, like the kernel's partial decoding."""
+    out = bytearray()
+    i = 0
+    n = len(src)
+    try:
+        while i < n and len(out) < size:
+            token = src[i]
+            i += 1
+            length = token >> 4
+            if length == 15:
+                while True:
+                    extra = src[i]
+                    i += 1
+                    length += extra
+                    if extra != 255:
+                        break
+            out += src[i:i + length]
+            i += length
+            if i >= n or len(out) >= size:
+                break
+
+            offset = src[i] | (src[i + 1] << 8)
+            i += 2
+            if not 0 < offset <= len(out):
+                raise ErofsError("Corrupted lz4 data (bad match offset).")
+            length = (token & 15) + 4
+            if length == 19:
+                while True:
+                    extra = src[i]
+                    i += 1
+                    length += extra
+                    if extra != 255:
+                        break
+            start = len(out) - offset
+            if length <= offset:
+                out += out[start:start + length]
+            else:
+                # Overlapping match: the last `offset` bytes repeat
+                pattern = bytes(out[start:])
+                out += (pattern * (length // offset + 1))[:length]
+    except IndexError:
+        raise ErofsError("Corrupted lz4 data (truncated).")
+    return bytes(out[:size])
+
+def _lz4_decompress(src, size):
+    try:
+        import lz4.block
+    except ImportError:
+        return _lz4_decompress_py(src, size)
+    try:
+        return lz4.block.decompress(src, uncompressed_size=size)
+    except Exception:
+        # Partially referenced (deduplicated) extents decode to more than `size`
+        return _lz4_decompress_py(src, size)
+
+def _lzma_decompress(src, size):
+    import lzma
+    # MicroLZMA: the range coder's first byte (always 0) is replaced by the inverted lc/lp/pb byte
+    props = ~src[0] & 0xFF
+    filters = [{'id': lzma.FILTER_LZMA1, 'dict_size': LZMA_MAX_DICT_SIZE,
+                'lc': props % 9, 'lp': props // 9 % 5, 'pb': props // 45}]
+    decompressor = lzma.LZMADecompressor(lzma.FORMAT_RAW, filters=filters)
+    try:
+        return decompressor.decompress(b'\x00' + bytes(src[1:]), max_length=size)
+    except lzma.LZMAError as e:
+        raise ErofsError(f"Corrupted lzma data: {e}")
+
+def _deflate_decompress(src, size):
+    import zlib
+    try:
+        return zlib.decompressobj(-15).decompress(src, size)
+    except zlib.error as e:
+        raise ErofsError(f"Corrupted deflate data: {e}")
+
+def _zstd_decompress(src, size):
+    try:
+        import zstandard
+    except ImportError:
+        raise ErofsError("This image uses zstd; install the 'zstandard' package to read it.")
+    try:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(src)[:size]
+    except zstandard.ZstdError as e:
+        raise ErofsError(f"Corrupted zstd data: {e}")
+
+DECOMPRESSORS = {
+    'lz4': _lz4_decompress,
+    'lzma': _lzma_decompress,
+    'deflate': _deflate_decompress,
+    'zstd': _zstd_decompress,
+}
+
+
+# --- Inodes ---
+class ErofsInode:
+    """One on-disk inode; `meta_end` is where inline data or indexes start."""
+
+    __slots__ = ('nid', 'layout', 'mode', 'nlink', 'size', 'uid', 'gid', 'mtime', 'raw_blkaddr',
+                 'chunk_format', 'meta_end', 'zmap')
+
+    @property
+    def is_dir(self):
+        return stat.S_ISDIR(self.mode)
+
+    @property
+    def is_file(self):
+        return stat.S_ISREG(self.mode)
+
+    @property
+    def is_symlink(self):
+        return stat.S_ISLNK(self.mode)
+
+    @property
+    def compressed(self):
+        return self.layout in (LAYOUT_COMPRESSED_FULL, LAYOUT_COMPRESSED_COMPACT)
+
+
+class _ZMap:
+    """Per-inode state of a compressed file (the map header plus what FINDTAIL works out)."""
+
+    __slots__ = ('header_pos', 'advise', 'algorithms', 'lclusterbits', 'total_lclusters',
+                 'idata_size', 'idata_off', 'tail_head_lcn', 'fragment_off', 'whole_fragment')
+
+
+class _LclusterRecord:
+    """What one lcluster index says; mirrors the kernel's z_erofs_maprecorder."""
+
+    __slots__ = ('lcn', 'type', 'head_type', 'clusterofs', 'delta0', 'pblk', 'compressed_blocks',
+                 'partial_ref', 'next_pack_off', 'la', 'llen', 'pa', 'plen', 'kind', 'where')
+
+    def __init__(self):
+        self.compressed_blocks = 0
+        self.partial_ref = False
+
+
+# --- Image ---
+class ErofsImage:
+    """
+    Read-only view of an EROFS image through mmap. Paths are relative to the
+    image root ('' or '/' is the root itself) and use '/' separators.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ErofsError(f"{path} is empty.")
+        self._inodes = {}
+        self._extents = OrderedDict()
+        try:
+            self._read_superblock()
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_superblock(self):
+        sb = self._mm[SUPER_OFFSET:SUPER_OFFSET + 128]
+        if len(sb) < 128 or struct.unpack_from('<I', sb, 0)[0] != EROFS_MAGIC:
+            raise ErofsError(f"{self.path} is not an EROFS image.")
+        self.block_bits = sb[12]
+        if not 9 <= self.block_bits <= 16:
+            raise ErofsError(f"Unsupported block size 2^{self.block_bits}.")
+        self.block_size = 1 << self.block_bits
+        self.root_nid = struct.unpack_from('<H', sb, 14)[0]
+        self.inode_count, self.build_time = struct.unpack_from('<QQ', sb, 16)
+        self.blocks, self.meta_blkaddr = struct.unpack_from('<II', sb, 36)
+        self.uuid = sb[48:64].hex()
+        self.volume_name = sb[64:80].split(b'\0')[0].decode('utf-8', 'replace')
+        self.features = struct.unpack_from('<I', sb, 80)[0]
+        if self.features & ~KNOWN_FEATURES:
+            raise ErofsError(f"Unsupported EROFS features: {self.features & ~KNOWN_FEATURES:#x}")
+        self.packed_nid = struct.unpack_from('<Q', sb, 96)[0]
+
+    # --- Inodes ---
+    def inode(self, nid):
+        inode = self._inodes.get(nid)
+        if inode is not None:
+            return inode
+
+        pos = self.meta_blkaddr * self.block_size + nid * 32
+        raw = self._mm[pos:pos + 64]
+        if len(raw) < 32:
+            raise ErofsError(f"Inode {nid} is outside the image.")
+        i_format, xattr_count, mode = struct.unpack_from('<HHH', raw, 0)
+        inode = ErofsInode()
+        inode.nid = nid
+        inode.layout = (i_format >> 1) & 7
+        inode.mode = mode
+        inode.zmap = None
+        if i_format & 1:
+            if len(raw) < 64:
+                raise ErofsError(f"Inode {nid} is outside the image.")
+            inode.size, inode.raw_blkaddr, _ino, inode.uid, inode.gid, mtime = struct.unpack_from('<QIIIIQ', raw, 8)
+            inode.nlink = struct.unpack_from('<I', raw, 44)[0]
+            inode.mtime = mtime
+            inode_size = 64
+        else:
+            inode.nlink, inode.size, mtime_offset, inode.raw_blkaddr = struct.unpack_from('<HIII', raw, 6)
+            inode.uid, inode.gid = struct.unpack_from('<HH', raw, 24)
+            inode.mtime = self.build_time + mtime_offset
+            inode_size = 32
+        inode.chunk_format = inode.raw_blkaddr & 0xFFFF
+        xattr_size = 12 + (xattr_count - 1) * 4 if xattr_count else 0
+        inode.meta_end = pos + inode_size + xattr_size
+        if inode.layout > LAYOUT_CHUNK_BASED:
+            raise ErofsError(f"Inode {nid} has an unknown data layout {inode.layout}.")
+
+        self._inodes[nid] = inode
+        return inode
+
+    @property
+    def root(self):
+        return self.inode(self.root_nid)
+
+    # --- Directories ---
+    def _dir_entries(self, inode):
+        """[(name, nid, file_type)] of a directory inode, without '.' and '..'."""
+        data = self._read(inode, 0, inode.size)
+        entries = []
+        for block_start in range(0, len(data), self.block_size):
+            block = data[block_start:block_start + self.block_size]
+            if len(block) < DIRENT_SIZE:
+                break
+            count = struct.unpack_from('<H', block, 8)[0] // DIRENT_SIZE
+            dirents = [struct.unpack_from('<QHB', block, i * DIRENT_SIZE) for i in range(count)]
+            for i, (nid, name_off, file_type) in enumerate(dirents):
+                if i + 1 < count:
+                    name = block[name_off:dirents[i + 1][1]]
+                else:
+                    name = block[name_off:].split(b'\0')[0]
+                name = name.decode('utf-8', 'surrogateescape')
+                if name not in ('.', '..'):
+                    entries.append((name, nid, file_type))
+        return entries
+
+    def _resolve(self, path, follow=True, hops=0):
+        """Inode at `path`; relative symlinks inside the image are followed."""
+        parts = [part for part in path.split('/') if part and part != '.']
+        inode = self.root
+        walked = []
+        for i, part in enumerate(parts):
+            if part == '..':
+                walked = walked[:-1]
+                inode = self._resolve("/".join(walked), hops=hops)
+                continue
+            if not inode.is_dir:
+                raise FileNotFoundError(f"{'/'.join(walked)} is not a folder")
+            for name, nid, _file_type in self._dir_entries(inode):
+                if name == part:
+                    inode = self.inode(nid)
+                    break
+            else:
+                raise FileNotFoundError(f"No such file in image: {'/'.join(parts[:i + 1])}")
+
+            last = i + 1 == len(parts)
+            if inode.is_symlink and (follow or not last):
+                target = self.readlink(inode)
+                if target.startswith('/') or hops >= SYMLINK_HOPS:
+                    # Absolute links point into the running system, not the image
+                    raise FileNotFoundError(f"Cannot follow symlink in image: {'/'.join(parts[:i + 1])}")
+                rest = parts[i + 1:]
+                return self._resolve(posixpath.join("/".join(walked), target, *rest), follow, hops + 1)
+            walked.append(part)
+        return inode
+
+    def lookup(self, path, follow=True):
+        return self._resolve(path, follow)
+
+    def exists(self, path):
+        normalized = posixpath.normpath("/" + path.replace(os.sep, '/'))
+        try:
+            self._resolve(normalized)
+            return True
+        except (FileNotFoundError, ErofsError):
+            return False
+
+    def listdir(self, path=""):
+        """Names in the folder at `path`, sorted."""
+        inode = self.lookup(path)
+        if not inode.is_dir:
+            raise NotADirectoryError(path)
+        return sorted(name for name, _nid, _type in self._dir_entries(inode))
+
+    def scandir(self, path=""):
+        """[(name, inode)] for the folder at `path`, sorted by name."""
+        inode = self.lookup(path)
+        if not inode.is_dir:
+            raise NotADirectoryError(path)
+        return [(name, self.inode(nid)) for name, nid, _type in sorted(self._dir_entries(inode))]
+
+    def walk(self, path=""):
+        """Yields (relative path, inode) for everything under `path`, depth first, symlinks not followed."""
+        top = path.strip('/')
+        stack = [(top, self.lookup(top))]
+        while stack:
+            rel_path, inode = stack.pop()
+            if rel_path != top:
+                yield rel_path, inode
+            if inode.is_dir:
+                for name, nid, _type in sorted(self._dir_entries(inode), reverse=True):
+                    stack.append((f"{rel_path}/{name}" if rel_path else name, self.inode(nid)))
+
+    def readlink(self, inode_or_path):
+        inode = self._as_inode(inode_or_path, follow=False)
+        if not inode.is_symlink:
+            raise ErofsError("Not a symlink.")
+        return self._read(inode, 0, inode.size).decode('utf-8', 'surrogateescape')
+
+    # --- File data ---
+    def _as_inode(self, inode_or_path, follow=True):
+        if isinstance(inode_or_path, ErofsInode):
+            return inode_or_path
+        return self.lookup(inode_or_path, follow)
+
+    def read(self, inode_or_path, offset=0, size=None):
+        """Bytes of a file, all of it or `size` bytes from `offset`."""
+        inode = self._as_inode(inode_or_path)
+        if inode.is_dir:
+            raise IsADirectoryError(inode_or_path)
+        if size is None:
+            size = inode.size
+        return self._read(inode, offset, size)
+
+    def iter_read(self, inode_or_path, chunk_size=1024 * 1024):
+        """The file in pieces of about `chunk_size` bytes, for copying large files."""
+        inode = self._as_inode(inode_or_path)
+        for offset in range(0, inode.size, chunk_size):
+            yield self._read(inode, offset, min(chunk_size, inode.size - offset))
+
+    def _read(self, inode, offset, size):
+        size = max(0, min(size, inode.size - offset))
+        if not size:
+            return b""
+        if inode.compressed:
+            return self._read_compressed(inode, offset, size)
+        if inode.layout == LAYOUT_CHUNK_BASED:
+            return self._read_chunked(inode, offset, size)
+        return self._read_flat(inode, offset, size)
+
+    def _read_flat(self, inode, offset, size):
+        end = offset + size
+        inline = inode.layout == LAYOUT_FLAT_INLINE
+        # With inline data, the last (partial or full) block lives right after the inode
+        last_block = -(-inode.size // self.block_size) - (1 if inline else 0)
+        block_end = last_block * self.block_size
+        parts = []
+        if offset < block_end:
+            start = inode.raw_blkaddr * self.block_size + offset
+            parts.append(self._mm[start:start + min(end, block_end) - offset])
+        if inline and end > block_end:
+            start = inode.meta_end + max(offset, block_end) - block_end
+            parts.append(self._mm[start:start + end - max(offset, block_end)])
+        data = b"".join(parts)
+        if len(data) != size:
+            raise ErofsError(f"Inode {inode.nid} points outside the image.")
+        return data
+
+    def _read_chunked(self, inode, offset, size):
+        chunk_bits = self.block_bits + (inode.chunk_format & CHUNK_FORMAT_BLKBITS_MASK)
+        unit = 8 if inode.chunk_format & CHUNK_FORMAT_INDEXES else 4
+        table = -(-inode.meta_end // unit) * unit
+        parts = []
+        pos = offset
+        end = offset + size
+        while pos < end:
+            chunk = pos >> chunk_bits
+            chunk_end = min((chunk + 1) << chunk_bits, end)
+            entry = table + chunk * unit
+            blkaddr = struct.unpack_from('<I', self._mm, entry + (4 if unit == 8 else 0))[0]
+            if blkaddr == NULL_ADDR:
+                parts.append(bytes(chunk_end - pos))
+            else:
+                start = blkaddr * self.block_size + pos - (chunk << chunk_bits)
+                parts.append(self._mm[start:start + chunk_end - pos])
+            pos = chunk_end
+        return b"".join(parts)
+
+    # --- Compressed files ---
+    def _zmap(self, inode):
+        if inode.zmap is not None:
+            return inode.zmap
+        z = _ZMap()
+        z.header_pos = -(-inode.meta_end // 8) * 8
+        header = self._mm[z.header_pos:z.header_pos + 8]
+        fragment_off, advise, algorithms, clusterbits = struct.unpack('<IHBB', header)
+        z.tail_head_lcn = None
+        z.idata_off = z.idata_size = 0
+        z.whole_fragment = False
+        z.lclusterbits = self.block_bits
+        z.total_lclusters = 0
+        inode.zmap = z
+
+        if clusterbits >> 7:
+            # The whole file is stored in the packed inode
+            z.advise = Z_ADVISE_FRAGMENT_PCLUSTER
+            z.algorithms = (0, 0)
+            z.fragment_off = struct.unpack('<Q', header)[0] ^ (1 << 63)
+            z.whole_fragment = True
+            return z
+
+        z.advise = advise
+        z.algorithms = (algorithms & 15, algorithms >> 4)
+        z.lclusterbits = self.block_bits + (clusterbits & 7)
+        z.total_lclusters = -(-inode.size // (1 << z.lclusterbits))
+        z.fragment_off = fragment_off
+        z.idata_size = fragment_off >> 16
+        if advise & (Z_ADVISE_INLINE_PCLUSTER | Z_ADVISE_FRAGMENT_PCLUSTER):
+            tail = self._z_map(inode, inode.size - 1, find_tail=True)
+            z.tail_head_lcn = tail.lcn
+            if advise & Z_ADVISE_FRAGMENT_PCLUSTER:
+                if advise & Z_ADVISE_INLINE_PCLUSTER:
+                    raise ErofsError("Tail packing combined with fragments is not supported.")
+                if inode.layout == LAYOUT_COMPRESSED_FULL:
+                    z.fragment_off |= tail.pblk << 32
+                if tail.lcn == 0:
+                    z.whole_fragment = True
+        return z
+
+    def _z_load(self, inode, z, lcn, m):
+        if lcn >= z.total_lclusters:
+            raise ErofsError(f"Inode {inode.nid}: lcluster {lcn} is out of range.")
+        if inode.layout == LAYOUT_COMPRESSED_FULL:
+            self._z_load_full(inode, z, lcn, m)
+        else:
+            self._z_load_compact(inode, z, lcn, m)
+
+    def _z_load_full(self, inode, z, lcn, m):
+        pos = z.header_pos + 8 + lcn * 8
+        advise, clusterofs, value = struct.unpack_from('<HHI', self._mm, pos)
+        m.lcn = lcn
+        m.next_pack_off = pos + 8
+        m.type = advise & 3
+        if m.type == Z_TYPE_NONHEAD:
+            m.clusterofs = 1 << z.lclusterbits
+            m.delta0 = value & 0xFFFF
+            if m.delta0 & Z_D0_CBLKCNT:
+                if not z.advise & (Z_ADVISE_BIG_PCLUSTER_1 | Z_ADVISE_BIG_PCLUSTER_2):
+                    raise ErofsError(f"Inode {inode.nid}: unexpected big pcluster.")
+                m.compressed_blocks = m.delta0 & ~Z_D0_CBLKCNT
+                m.delta0 = 1
+        else:
+            m.partial_ref = bool(advise & Z_PARTIAL_REF)
+            m.clusterofs = clusterofs
+            if clusterofs >= 1 << z.lclusterbits:
+                raise ErofsError(f"Inode {inode.nid}: bad cluster offset.")
+            m.pblk = value
+
+    def _z_load_compact(self, inode, z, lcn, m):
+        ebase = z.header_pos + 8
+        lclusterbits = z.lclusterbits
+        big_pcluster = z.advise & Z_ADVISE_BIG_PCLUSTER_1
+
+        # Up to seven 4-byte entries align the 2-byte packs to 32 bytes
+        compacted_4b_initial = ((32 - ebase % 32) // 4) & 7
+        compacted_2b = 0
+        if z.advise & Z_ADVISE_COMPACTED_2B and compacted_4b_initial < z.total_lclusters:
+            compacted_2b = (z.total_lclusters - compacted_4b_initial) // 16 * 16
+
+        pos = ebase
+        index = lcn
+        amortized_shift = 2
+        if index >= compacted_4b_initial:
+            pos += compacted_4b_initial * 4
+            index -= compacted_4b_initial
+            if index < compacted_2b:
+                amortized_shift = 1
+            else:
+                pos += compacted_2b * 2
+                index -= compacted_2b
+        pos += index << amortized_shift
+
+        if amortized_shift == 2 and lclusterbits <= 14:
+            vcnt = 2
+        elif amortized_shift == 1 and lclusterbits <= 12:
+            vcnt = 16
+        else:
+            raise ErofsError(f"Inode {inode.nid}: unsupported compact index layout.")
+
+        pack_size = vcnt << amortized_shift
+        pack_pos = pos - pos % pack_size
+        pack = self._mm[pack_pos:pack_pos + pack_size + 4]
+        lobits = max(lclusterbits, Z_D0_CBLKCNT.bit_length())
+        encode_bits = (pack_size - 4) * 8 // vcnt
+        i = (pos - pack_pos) >> amortized_shift
+
+        def decode(i):
+            bit = encode_bits * i
+            value = int.from_bytes(pack[bit // 8:bit // 8 + 4], 'little') >> (bit & 7)
+            return value & ((1 << lobits) - 1), (value >> lobits) & 3
+
+        m.lcn = lcn
+        m.next_pack_off = pack_pos + pack_size
+        lo, m.type = decode(i)
+        if m.type == Z_TYPE_NONHEAD:
+            m.clusterofs = 1 << lclusterbits
+            if lo & Z_D0_CBLKCNT:
+                if not big_pcluster:
+                    raise ErofsError(f"Inode {inode.nid}: unexpected big pcluster.")
+                m.compressed_blocks = lo & ~Z_D0_CBLKCNT
+                m.delta0 = 1
+            elif i + 1 != vcnt:
+                m.delta0 = lo
+            else:
+                # The last entry of a pack holds delta[1]; delta[0] comes from the one before
+                lo, lo_type = decode(i - 1)
+                if lo_type != Z_TYPE_NONHEAD:
+                    lo = 0
+                elif lo & Z_D0_CBLKCNT:
+                    lo = 1
+                m.delta0 = lo + 1
+            return
+
+        m.clusterofs = lo
+        m.delta0 = 0
+        # A HEAD's block is the pack's base block plus the blocks of the pclusters before it
+        blocks = 0
+        if not big_pcluster:
+            blocks = 1
+            while i > 0:
+                i -= 1
+                lo, lo_type = decode(i)
+                if lo_type == Z_TYPE_NONHEAD:
+                    i -= lo
+                if i >= 0:
+                    blocks += 1
+        else:
+            while i > 0:
+                i -= 1
+                lo, lo_type = decode(i)
+                if lo_type == Z_TYPE_NONHEAD:
+                    if lo & Z_D0_CBLKCNT:
+                        i -= 1
+                        blocks += lo & ~Z_D0_CBLKCNT
+                        continue
+                    if lo <= 1:
+                        raise ErofsError(f"Inode {inode.nid}: corrupted compact index.")
+                    i -= lo - 2
+                    continue
+                blocks += 1
+        m.pblk = struct.unpack_from('<I', pack, pack_size - 4)[0] + blocks
+
+    def _z_lookback(self, inode, z, m, distance):
+        while m.lcn >= distance:
+            lcn = m.lcn - distance
+            self._z_load(inode, z, lcn, m)
+            if m.type == Z_TYPE_NONHEAD:
+                distance = m.delta0
+                if not distance:
+                    break
+                continue
+            m.head_type = m.type
+            return (lcn << z.lclusterbits) | m.clusterofs
+        raise ErofsError(f"Inode {inode.nid}: cannot find the start of an extent.")
+
+    def _z_map(self, inode, la, find_tail=False):
+        """
+        The extent containing logical offset `la`, as the kernel's
+        z_erofs_map_blocks_iter works it out. Returns the lcluster record with
+        the extent filled in: la, llen, pa, plen, kind ('plain' or an
+        algorithm name) and where ('block', 'inline' or 'fragment').
+        """
+        z = self._zmap(inode) if not find_tail else inode.zmap
+        if not find_tail and z.whole_fragment:
+            m = _LclusterRecord()
+            m.la, m.llen, m.where = 0, inode.size, 'fragment'
+            return m
+
+        bits = z.lclusterbits
+        initial_lcn = la >> bits
+        end_off = la & ((1 << bits) - 1)
+        m = _LclusterRecord()
+        self._z_load(inode, z, initial_lcn, m)
+        if find_tail and z.advise & Z_ADVISE_INLINE_PCLUSTER:
+            z.idata_off = m.next_pack_off
+
+        end = (m.lcn + 1) << bits
+        open_ended = True # the extent may go on past this lcluster
+        if m.type != Z_TYPE_NONHEAD:
+            if end_off >= m.clusterofs:
+                m.head_type = m.type
+                m.la = (m.lcn << bits) | m.clusterofs
+                if z.advise & Z_ADVISE_INLINE_PCLUSTER and end > inode.size:
+                    end = inode.size
+            else:
+                if not m.lcn:
+                    raise ErofsError(f"Inode {inode.nid}: corrupted first lcluster.")
+                end = (m.lcn << bits) | m.clusterofs
+                open_ended = False
+                m.la = self._z_lookback(inode, z, m, 1)
+        else:
+            m.la = self._z_lookback(inode, z, m, m.delta0)
+        if find_tail:
+            m.llen = end - m.la
+            return m
+        # Every offset in an extent must map to the same (la, llen), or the extent cache mixes lengths
+        if open_ended:
+            end = self._z_extent_end(inode, z, initial_lcn + 1)
+        m.llen = end - m.la
+
+        if z.advise & Z_ADVISE_INLINE_PCLUSTER and m.lcn == z.tail_head_lcn:
+            m.where = 'inline'
+            m.pa, m.plen = z.idata_off, z.idata_size
+        elif z.advise & Z_ADVISE_FRAGMENT_PCLUSTER and m.lcn == z.tail_head_lcn:
+            m.where = 'fragment'
+            return m
+        else:
+            m.where = 'block'
+            m.pa = m.pblk * self.block_size
+            m.plen = self._z_compressed_length(inode, z, m)
+
+        if m.head_type == Z_TYPE_PLAIN:
+            m.kind = 'plain'
+        else:
+            algorithm = z.algorithms[1 if m.head_type == Z_TYPE_HEAD2 else 0]
+            m.kind = ALGORITHMS.get(algorithm)
+            if m.kind is None:
+                raise ErofsError(f"Inode {inode.nid}: unknown compression algorithm {algorithm}.")
+        return m
+
+    def _z_extent_end(self, inode, z, lcn):
+        """Logical end of an extent that reaches lcluster `lcn`: the next HEAD or PLAIN, or the end of the file."""
+        record = _LclusterRecord()
+        while lcn < z.total_lclusters:
+            self._z_load(inode, z, lcn, record)
+            if record.type != Z_TYPE_NONHEAD:
+                return (lcn << z.lclusterbits) | record.clusterofs
+            lcn += 1
+        return inode.size
+
+    def _z_compressed_length(self, inode, z, m):
+        big = z.advise & (Z_ADVISE_BIG_PCLUSTER_2 if m.head_type == Z_TYPE_HEAD2 else Z_ADVISE_BIG_PCLUSTER_1)
+        if not big:
+            return 1 << z.lclusterbits
+        if not m.compressed_blocks:
+            head = _LclusterRecord()
+            if m.lcn + 1 >= z.total_lclusters:
+                return self.block_size
+            self._z_load(inode, z, m.lcn + 1, head)
+            if head.type != Z_TYPE_NONHEAD:
+                return self.block_size
+            if head.delta0 != 1 or not head.compressed_blocks:
+                raise ErofsError(f"Inode {inode.nid}: cannot tell the compressed size of an extent.")
+            m.compressed_blocks = head.compressed_blocks
+        return m.compressed_blocks * self.block_size
+
+    def _z_decode(self, inode, m):
+        """Decompressed bytes of the extent `m`, clipped to the end of the file."""
+        key = (inode.nid, m.la)
+        data = self._extents.get(key)
+        if data is not None:
+            self._extents.move_to_end(key)
+            return data
+
+        z = inode.zmap
+        out_size = min(m.llen, inode.size - m.la)
+        if m.where == 'fragment':
+            if not self.features & FEATURE_FRAGMENTS:
+                raise ErofsError(f"Inode {inode.nid} uses fragments but the image has no packed inode.")
+            data = self._read(self.inode(self.packed_nid), z.fragment_off, out_size)
+        else:
+            raw = self._mm[m.pa:m.pa + m.plen]
+            if len(raw) < m.plen:
+                raise ErofsError(f"Inode {inode.nid} points outside the image.")
+            if m.kind == 'plain':
+                data = self._transform_plain(z, m, raw, out_size)
+            else:
+                if m.kind != 'lz4' or self.features & FEATURE_ZERO_PADDING:
+                    # Compressed data is right-aligned in its pcluster; skip the zeros in front
+                    first_block = raw[:self.block_size - m.pa % self.block_size]
+                    raw = raw[len(first_block) - len(first_block.lstrip(b'\0')):]
+                data = DECOMPRESSORS[m.kind](raw, out_size)
+        if len(data) < out_size:
+            raise ErofsError(f"Inode {inode.nid}: extent at {m.la} decompressed to {len(data)} of {out_size} bytes.")
+
+        self._extents[key] = data
+        if len(self._extents) > EXTENT_CACHE_SIZE:
+            self._extents.popitem(last=False)
+        return data
+
+    def _transform_plain(self, z, m, raw, out_size):
+        if out_size > len(raw):
+            raise ErofsError("Uncompressed extent is larger than its pcluster.")
+        if not z.advise & Z_ADVISE_INTERLACED_PCLUSTER:
+            return bytes(raw[:out_size])
+        # Interlaced: the first (partial) block of the extent is stored at the end of the pcluster
+        head = self.block_size - m.la % self.block_size
+        start = len(raw) - head
+        head = min(head, out_size)
+        return bytes(raw[start:start + head]) + bytes(raw[:out_size - head])
+
+    def _read_compressed(self, inode, offset, size):
+        parts = []
+        pos = offset
+        end = offset + size
+        while pos < end:
+            m = self._z_map(inode, pos)
+            data = self._z_decode(inode, m)
+            if m.la + len(data) <= pos:
+                raise ErofsError(f"Inode {inode.nid}: empty extent at {pos}.")
+            parts.append(data[pos - m.la:end - m.la])
+            pos = m.la + len(data)
+        return b"".join(parts)
+
+    # --- Extraction ---
+    def extract(self, path, dest):
+        """
+        Copies the file or folder at `path` to `dest`, keeping permissions,
+        mtimes and symlinks. Returns the number of files written.
+        """
+        inode = self.lookup(path, follow=False)
+        if not inode.is_dir:
+            self._extract_one(inode, dest)
+            return 1
+
+        count = 0
+        os.makedirs(dest, exist_ok=True)
+        folders = [(dest, inode)]
+        for rel_path, child in self.walk(path):
+            rel_path = rel_path[len(path.strip('/')):].lstrip('/')
+            target = os.path.join(dest, *rel_path.split('/'))
+            if child.is_dir:
+                os.makedirs(target, exist_ok=True)
+                folders.append((target, child))
+            else:
+                self._extract_one(child, target)
+                count += 1
+        # Folder times last, since writing their contents changed them
+        for target, child in reversed(folders):
+            os.chmod(target, stat.S_IMODE(child.mode) | stat.S_IWUSR)
+            os.utime(target, (child.mtime, child.mtime))
+        return count
+
+    def _extract_one(self, inode, target):
+        if inode.is_symlink:
+            if os.path.lexists(target):
+                os.remove(target)
+            os.symlink(self.readlink(inode), target)
+            return
+        if not inode.is_file:
+            return # device nodes, fifos and sockets are skipped
+        with open(target, 'wb') as f:
+            for chunk in self.iter_read(inode):
+                f.write(chunk)
+        os.chmod(target, stat.S_IMODE(inode.mode))
+        os.utime(target, (inode.mtime, inode.mtime))
+
+    # --- Cartridges ---
+    def find_kzi_files(self):
+        """Names of the .kzi files at the image root, where packages keep theirs."""
+        return [name for name, inode in self.scandir() if name.lower().endswith('.kzi') and inode.is_file]
+
+
+def read_embedded_kzi(image_path):
+    """[(name, text)] for every .kzi at the root of a .kzp image."""
+    with ErofsImage(image_path) as image:
+        return [(name, image.read(name).decode('utf-8', 'replace')) for name in image.find_kzi_files()]
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# Estimate Worker for KZI Generator
+# Runs pack_estimate off the GUI thread for the package creator and the ISO creator
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from pack_estimate import estimate_pack, scan_tree
+
+
+class EstimateWorker(QThread):
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, source, algo, fmt="erofs", workers=None, scan=None):
+        super().__init__()
+        self.source = source
+        self.algo = algo
+        self.fmt = fmt
+        self.workers = workers
+        self.scan = scan
+
+    def run(self):
+        try:
+            # The scan is kept so changing the algorithm only repeats the sampling
+            if self.scan is None:
+                self.scan = scan_tree(self.source)
+            self.finished.emit(estimate_pack(self.source, self.algo, self.fmt, self.workers, self.scan))
+        except Exception as e:
+            self.error.emit(str(e))
@@ -15,6 +15,10 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 
+from kzi_lint import lint_paths
+from estimate_worker import EstimateWorker
+from pack_estimate import format_estimate
+
 # --- Background Worker for Creating ISO ---
 class CreateIsoWorker(QThread):
     finished = pyqtSignal(str)
@@ -38,6 +42,23 @@ class CreateIsoWorker(QThread):
             self.error.emit(str(e))
 
 
+# --- Background Worker for Checking Cartridges ---
+class LintWorker(QThread):
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+
+    def run(self):
+        try:
+            # Reads every .kzi and .kzp under the folder, which can take a while on slow media
+            self.finished.emit(lint_paths([self.source]))
+        except Exception as e:
+            self.error.emit(str(e))
+
+
 # --- Background Worker for Burning (Wodim) ---
 class WodimWorker(QThread):
     progress = pyqtSignal(str)
@@ -134,8 +155,17 @@ class IsoBurnerWindow(QDialog):
 
         self.btn_browse_source = QPushButton("Browse...")
         self.btn_browse_source.clicked.connect(self.browse_source_folder)
+        self.source_input.editingFinished.connect(self.request_estimate)
         source_layout.addWidget(self.btn_browse_source, 0, 2)
 
+        self.estimate_label = QLabel("")
+        self.estimate_label.setWordWrap(True)
+        self.estimate_label.setStyleSheet("color: gray; font-size: 11px;")
+        source_layout.addWidget(self.estimate_label, 2, 1, 1, 2)
+        self.estimate_worker = None
+        self.estimate_pending = False
+        self.lint_worker = None
+
         self.btn_create_iso = QPushButton("Create ISO from Folder")
         self.btn_create_iso.clicked.connect(self.start_create_iso)
         source_layout.addWidget(self.btn_create_iso, 1, 1, 1, 2) # Span columns
@@ -240,6 +270,30 @@ class IsoBurnerWindow(QDialog):
         path = QFileDialog.getExistingDirectory(self, "Select Source Directory")
         if path:
             self.source_input.setText(path)
+            self.request_estimate()
+
+    def request_estimate(self):
+        # Shows the ISO size and which discs it fits on as soon as a folder is picked
+        source = self.source_input.text().strip()
+        if not source or not os.path.isdir(source):
+            self.estimate_label.setText("")
+            return
+        if self.estimate_worker and self.estimate_worker.isRunning():
+            self.estimate_pending = True
+            return
+
+        self.estimate_pending = False
+        self.estimate_label.setText("Estimating size...")
+        self.estimate_worker = EstimateWorker(os.path.abspath(source), None, "iso")
+        self.estimate_worker.finished.connect(self.on_estimate_finished)
+        self.estimate_worker.error.connect(lambda err: self.estimate_label.setText(f"Could not estimate: {err}"))
+        self.estimate_worker.start()
+
+    def on_estimate_finished(self, estimate):
+        self.estimate_label.setText(format_estimate(estimate, short=True))
+        self.estimate_label.setToolTip(format_estimate(estimate))
+        if self.estimate_pending:
+            self.request_estimate()
 
     def browse_iso_file(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select ISO Image", "", "ISO Image (*.iso);;All files (*.*)")
@@ -258,7 +312,30 @@ class IsoBurnerWindow(QDialog):
             QMessageBox.critical(self, "Error", "No .kzi file found in the selected folder.\nPlease ensure the game folder contains a valid Kazeta cartridge definition.")
             return
 
-        kzi_basename = os.path.splitext(os.path.basename(kzi_files[0]))[0]
+        # Catch broken cartridges before they end up on a disc
+        self._toggle_ui(False)
+        self.status_label.setText("Checking cartridges...")
+        self.progress_bar.setRange(0, 0)
+
+        self.lint_worker = LintWorker(source)
+        self.lint_worker.finished.connect(lambda report: self.on_lint_finished(source, kzi_files[0], report))
+        self.lint_worker.error.connect(self.on_worker_error)
+        self.lint_worker.start()
+
+    def on_lint_finished(self, source, kzi_file, report):
+        self._toggle_ui(True)
+        if report['summary']['errors']:
+            problems = [f"{os.path.relpath(r['path'], source)}: {e}" for r in report['results'] for e in r['errors']]
+            reply = QMessageBox.question(
+                self, "Cartridge Problems",
+                "The following problems were found:\n\n" + "\n".join(problems[:15]) +
+                ("\n..." if len(problems) > 15 else "") + "\n\nCreate the ISO anyway?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if reply == QMessageBox.StandardButton.No:
+                return
+
+        kzi_basename = os.path.splitext(os.path.basename(kzi_file))[0]
         default_name = f"{kzi_basename}.iso"
 
         save_path, _ = QFileDialog.getSaveFileName(self, "Save ISO As...", default_name, "ISO Image (*.iso)")
@@ -475,6 +552,12 @@ class IsoBurnerWindow(QDialog):
             self.progress_bar.setValue(0)
             self.status_label.setText("Ready")
 
+    def closeEvent(self, event):
+        for worker in (self.estimate_worker, self.lint_worker):
+            if worker and worker.isRunning():
+                worker.wait()
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":
     import sys
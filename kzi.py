@@ -0,0 +1,771 @@
+#!/usr/bin/env python3
+# kzi - command line front end for KZI Generator
+# Generates, parses, validates and packs cartridges without starting the Qt GUI
+
+import os
+import sys
+import json
+import argparse
+
+from kzi_core import (
+    KziEntry, sanitize_game_id, normalize_runtime, validate_entry, build_kzi_content,
+    write_kzi, parse_kzi_file, parse_kzi_text, KNOWN_RUNTIMES
+)
+from erofs_core import (
+    COMPRESSION_ALGORITHMS, PackError, create_package, default_package_name, format_pack_progress
+)
+
+
+# --- Subcommands ---
+def cmd_generate(args):
+    entry = KziEntry(
+        name=args.name.strip(),
+        game_id=(args.id or sanitize_game_id(args.name)).strip(),
+        exec_path=os.path.abspath(args.exec_path) if os.path.exists(args.exec_path) else args.exec_path,
+        params=args.params.strip(),
+        icon_path=os.path.abspath(args.icon) if args.icon else "",
+        gamescope_options=args.gamescope.strip(),
+        runtime=normalize_runtime(args.runtime),
+        controller_profile=args.controller,
+        set_as_default=args.default,
+    )
+
+    errors = validate_entry(entry)
+    if entry.runtime not in KNOWN_RUNTIMES:
+        errors.append(f"Unknown runtime '{entry.runtime}'.")
+    if errors:
+        for error in errors:
+            print(f"error: {error}", file=sys.stderr)
+        return 1
+
+    if args.output == '-':
+        sys.stdout.write(build_kzi_content(entry, os.getcwd(), args.media_root))
+        return 0
+
+    output = args.output or f"{entry.game_id}.kzi"
+    write_kzi(entry, output, args.media_root)
+    print(f"Wrote {output}")
+    return 0
+
+def cmd_parse(args):
+    if args.raw:
+        with open(args.file, 'r') as f:
+            data = parse_kzi_text(f.read())
+    else:
+        data = parse_kzi_file(args.file).to_dict()
+
+    if args.json:
+        print(json.dumps(data, indent=2))
+    else:
+        for key, value in data.items():
+            print(f"{key}: {value}")
+    return 0
+
+def cmd_validate(args):
+    failed = 0
+    for path in args.files:
+        try:
+            entry = parse_kzi_file(path)
+        except OSError as e:
+            print(f"{path}: {e}")
+            failed += 1
+            continue
+
+        errors = validate_entry(entry)
+        if entry.runtime not in KNOWN_RUNTIMES:
+            errors.append(f"Unknown runtime '{entry.runtime}'.")
+        if errors:
+            failed += 1
+            for error in errors:
+                print(f"{path}: {error}")
+        elif not args.quiet:
+            print(f"{path}: OK")
+    return 1 if failed else 0
+
+def cmd_pack(args):
+    from pack_profiles import ProfileError, get_profile, validate_profile
+
+    if args.algo.split(',')[0] not in COMPRESSION_ALGORITHMS:
+        print(f"error: Unknown compression algorithm '{args.algo}'.", file=sys.stderr)
+        return 1
+    try:
+        profile = dict(get_profile(args.profile))
+        for key in ('workers', 'cpus', 'nice', 'ionice_class'):
+            if getattr(args, key) is not None:
+                profile[key] = getattr(args, key)
+        validate_profile(profile)
+    except ProfileError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    output = args.output or default_package_name(args.source, args.type)
+
+    if args.check:
+        from build_manifest import build_options, check_build, format_changes
+        build = check_build(args.source, output, build_options(args.algo, args.type, not args.no_hints, args.dedupe), args.hash)
+        print(f"{output}: {build['reason']}")
+        if build['changes']:
+            print(format_changes(build['changes'], limit=args.check_limit))
+        return 0 if build['up_to_date'] else 1
+
+    def report(progress):
+        percent = f"{progress['percent']:5.1f}% " if progress['percent'] is not None else ""
+        sys.stderr.write(f"\r{percent}{format_pack_progress(progress)}\033[K")
+        sys.stderr.flush()
+
+    callback = report if sys.stderr.isatty() and not args.quiet else None
+    try:
+        cmd = create_package(args.source, output, args.algo, args.single_thread, args.type,
+                             progress_callback=callback, auto_hints=not args.no_hints, profile=profile,
+                             log_callback=lambda line: print(line, flush=True),
+                             incremental=args.incremental or args.hash, hash_files=args.hash,
+                             dedupe=args.dedupe, checksum=args.checksum)
+    except PackError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if cmd is None:
+        print(f"{output} is up to date")
+        return 0
+    if callback:
+        sys.stderr.write("\n")
+    print(f"Created {output}")
+    return 0
+
+def cmd_pack_batch(args):
+    from kzi_batch import ManifestError
+    from pack_profiles import ProfileError, get_profile, parse_cpu_list, validate_profile
+    from pack_queue import PackQueue, format_summary
+
+    if not args.sources and not args.manifest:
+        print("error: name some source folders or pass --manifest", file=sys.stderr)
+        return 1
+    try:
+        profile = dict(get_profile(args.profile))
+        if args.cpus is not None:
+            profile['cpus'] = args.cpus
+        validate_profile(profile)
+        queue = PackQueue(args.jobs, parse_cpu_list(args.cpus) if args.cpus else None, profile,
+                          args.algo, auto_hints=not args.no_hints, retries=args.retries,
+                          overwrite=args.overwrite, incremental=args.incremental, dedupe=args.dedupe,
+                          checksum=args.checksum)
+        for source in args.sources:
+            queue.add(source, algo=args.algo, pkg_type=args.type, dest=args.dest)
+        if args.manifest:
+            queue.add_manifest(args.manifest, dest=args.dest)
+    except (OSError, ValueError, ManifestError, ProfileError, PackError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    def report(job):
+        if job['status'] == 'running' and job['percent'] is None:
+            print(f"{'started':>9}  {job['source']}  (CPUs {job['cpus']}, try {job['attempts']})", flush=True)
+        elif job['status'] in ('done', 'failed', 'cancelled', 'skipped', 'queued') and job['attempts'] or job['status'] == 'skipped':
+            detail = job['error'] or job['output']
+            status = 'retrying' if job['status'] == 'queued' else job['status']
+            print(f"{status:>9}  {job['source']}  {detail}", flush=True)
+
+    try:
+        queue.run(report)
+    except KeyboardInterrupt:
+        queue.cancel()
+        print("Cancelled.")
+        return 130
+
+    summary = queue.summary()
+    if args.report:
+        queue.write_report(args.report)
+    print(format_summary(summary))
+    return 1 if summary['failed'] else 0
+
+def cmd_analyze(args):
+    from erofs_analyze import analyze_source, format_analysis
+
+    if not os.path.isdir(args.source):
+        print(f"error: Not a folder: {args.source}", file=sys.stderr)
+        return 1
+    analysis = analyze_source(args.source, sample_bytes=int(args.sample_mb * 1024 * 1024), jobs=args.jobs)
+    if args.json:
+        print(json.dumps(analysis, indent=2))
+    else:
+        print(format_analysis(analysis))
+    return 0
+
+def cmd_estimate(args):
+    from pack_estimate import estimate_pack, format_estimate
+
+    if not os.path.isdir(args.source):
+        print(f"error: Not a folder: {args.source}", file=sys.stderr)
+        return 1
+    if args.algo.split(',')[0] not in COMPRESSION_ALGORITHMS:
+        print(f"error: Unknown compression algorithm '{args.algo}'.", file=sys.stderr)
+        return 1
+    estimate = estimate_pack(args.source, args.algo, 'iso' if args.iso else 'erofs', args.workers,
+                             sample_bytes=int(args.sample_mb * 1024 * 1024))
+    if args.json:
+        print(json.dumps(estimate, indent=2))
+    else:
+        print(format_estimate(estimate))
+    return 0
+
+def cmd_dedupe(args):
+    from erofs_dedupe import analyze_dedupe, format_dedupe
+
+    missing = [path for path in args.paths if not os.path.exists(path)]
+    if missing:
+        print(f"error: Not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    analysis = analyze_dedupe(args.paths, jobs=args.jobs)
+    if args.json:
+        print(json.dumps(analysis, indent=2))
+    else:
+        print(format_dedupe(analysis))
+    return 0
+
+def cmd_batch(args):
+    from kzi_batch import generate_batch, ManifestError
+
+    try:
+        report = generate_batch(args.manifest, overwrite=args.overwrite, jobs=args.jobs, media_root=args.media_root)
+    except (OSError, ValueError, ManifestError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    if args.report == '-':
+        print(json.dumps(report, indent=2))
+    else:
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+        for result in report['results']:
+            if result['errors']:
+                print(f"row {result['row']} ({result['status']}): {'; '.join(result['errors'])}")
+        print(", ".join(f"{count} {status}" for status, count in sorted(report['summary'].items())))
+
+    failed = report['summary'].get('invalid', 0) + report['summary'].get('error', 0)
+    return 1 if failed else 0
+
+def cmd_lint(args):
+    from kzi_lint import lint_paths, format_report
+
+    report = lint_paths(args.paths, jobs=args.jobs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report, show_ok=args.verbose))
+
+    failed = report['summary']['errors'] or (args.strict and report['summary']['warnings'])
+    return 1 if failed else 0
+
+def cmd_scan(args):
+    import csv
+    from kzi_core import get_default_media_path
+    from library_scanner import scan_library, suggest_manifest_rows
+
+    root = args.root or get_default_media_path()
+    if not os.path.isdir(root):
+        print(f"error: Not a folder: {root}", file=sys.stderr)
+        return 1
+    result = scan_library(root, max_depth=args.depth)
+
+    if args.manifest:
+        rows = suggest_manifest_rows(result)
+        with open(args.manifest, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['folder', 'name', 'exec', 'runtime'])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Wrote {len(rows)} rows to {args.manifest}", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for candidate in result['candidates']:
+            marker = " " if candidate['has_kzi'] else "*"
+            print(f"{marker} {candidate['runtime']:<12} {candidate['path']}")
+        print(f"{len(result['candidates'])} candidates in {result['dirs_total']} folders "
+              f"({result['dirs_listed']} listed, {result['elapsed']:.2f}s); * = folder has no .kzi")
+    return 0
+
+def cmd_catalog(args):
+    from kzi_catalog import KziCatalog
+
+    catalog = KziCatalog(args.db)
+    try:
+        if args.action == 'update':
+            from kzi_core import get_default_media_path
+            stats = catalog.update(args.roots or [get_default_media_path()], hash_packages=args.hash_packages)
+            print(f"{stats['added']} added, {stats['updated']} updated, {stats['removed']} removed, "
+                  f"{stats['unchanged']} unchanged in {stats['elapsed']:.2f}s")
+        elif args.action == 'search':
+            results = catalog.search(" ".join(args.query), runtime=args.runtime,
+                                     missing_icon=args.missing_icon, limit=args.limit)
+            if args.json:
+                print(json.dumps(results, indent=2))
+            else:
+                for result in results:
+                    print(f"{result['game_id']:<30} {result['runtime']:<12} {result['path']}")
+        else:
+            summary = catalog.summary()
+            if args.json:
+                print(json.dumps(summary, indent=2))
+            else:
+                print(f"{summary['cartridges']} cartridges ({summary['missing_icons']} missing icons), "
+                      f"{summary['packages']} packages ({summary['package_bytes'] / 1024**3:.1f} GB)")
+                for runtime, count in summary['runtimes'].items():
+                    print(f"  {runtime:<12} {count}")
+    finally:
+        catalog.close()
+    return 0
+
+def cmd_watch(args):
+    from kzi_watch import (
+        FolderWatch, get_watched_folders, add_watched_folder, remove_watched_folder
+    )
+
+    if args.action == 'add':
+        for folder in args.folders:
+            try:
+                print(f"Watching {add_watched_folder(folder)}")
+            except Exception as e:
+                print(f"error: {e}", file=sys.stderr)
+                return 1
+        return 0
+    if args.action == 'remove':
+        for folder in args.folders:
+            if not remove_watched_folder(folder):
+                print(f"{folder} was not being watched", file=sys.stderr)
+        return 0
+    if args.action == 'list':
+        for folder in get_watched_folders():
+            print(folder)
+        return 0
+
+    folders = args.folders or get_watched_folders()
+    if not folders:
+        print("error: No folders registered (use 'kzi watch add FOLDER').", file=sys.stderr)
+        return 1
+
+    def report(result):
+        for change in result['changes']:
+            print(f"{result['path']}: {change}")
+        for error in result['errors']:
+            print(f"{result['path']}: error: {error}")
+        sys.stdout.flush()
+
+    watch = FolderWatch(folders, debounce=args.debounce, use_polling=args.poll, media_root=args.media_root)
+    print(f"Watching {len(folders)} folders ({watch.backend}); Ctrl+C to stop")
+    try:
+        watch.run(report)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def cmd_profiles(args):
+    from pack_profiles import ProfileError, load_profiles, save_profile, delete_profile, DEFAULT_PROFILE
+
+    if args.action == 'list':
+        for name, profile in load_profiles().items():
+            print(f"{name}: workers={profile['workers'] or 'auto'} cpus={profile['cpus'] or 'all'} "
+                  f"nice={profile['nice']} ionice={profile['ionice_class'] or 'default'}")
+        return 0
+    if args.action == 'delete':
+        if not delete_profile(args.name):
+            print(f"error: No saved profile named '{args.name}'.", file=sys.stderr)
+            return 1
+        return 0
+
+    profile = dict(load_profiles().get(args.name) or load_profiles()[DEFAULT_PROFILE])
+    for key in ('workers', 'cpus', 'nice', 'ionice_class', 'ionice_level'):
+        if getattr(args, key) is not None:
+            profile[key] = getattr(args, key)
+    try:
+        save_profile(args.name, profile)
+    except ProfileError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"Saved profile '{args.name}'")
+    return 0
+
+def cmd_image(args):
+    import stat
+    import time
+    from erofs_reader import ErofsImage, ErofsError
+
+    try:
+        with ErofsImage(args.image) as image:
+            if args.action == 'ls':
+                if args.recursive:
+                    entries = list(image.walk(args.path))
+                else:
+                    inode = image.lookup(args.path)
+                    entries = image.scandir(args.path) if inode.is_dir else [(args.path, inode)]
+                for name, inode in entries:
+                    if inode.is_symlink and args.long:
+                        name = f"{name} -> {image.readlink(inode)}"
+                    if args.long:
+                        mtime = time.strftime('%Y-%m-%d %H:%M', time.localtime(inode.mtime))
+                        print(f"{stat.filemode(inode.mode)} {inode.size:>12} {mtime}  {name}")
+                    else:
+                        print(name + ("/" if inode.is_dir else ""))
+            elif args.action == 'cat':
+                for chunk in image.iter_read(args.path):
+                    sys.stdout.buffer.write(chunk)
+                sys.stdout.flush()
+            elif args.action == 'extract':
+                count = image.extract(args.path, args.dest)
+                print(f"Extracted {count} files to {args.dest}")
+            else:
+                names = image.find_kzi_files()
+                if not names:
+                    print(f"error: No .kzi file in {args.image}", file=sys.stderr)
+                    return 1
+                for name in names:
+                    data = parse_kzi_text(image.read(name).decode('utf-8', 'replace'))
+                    if args.json:
+                        print(json.dumps(data, indent=2))
+                    else:
+                        print(f"# {name}")
+                        for key, value in data.items():
+                            print(f"{key}: {value}")
+    except (OSError, ErofsError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def cmd_mount(args):
+    from erofs_mount import MountManager, MountError
+
+    manager = MountManager()
+    if args.at and len(args.images) > 1:
+        print("error: --at only works with a single image.", file=sys.stderr)
+        return 1
+    if args.at:
+        try:
+            record = manager.mount(args.images[0], args.at, args.idle)
+        except MountError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        results = [{'image': args.images[0], 'mount_point': record['mount_point'],
+                    'reused': record['reused'], 'error': None}]
+    else:
+        results = manager.mount_many(args.images, args.jobs, args.idle)
+
+    for result in results:
+        if result['error']:
+            print(f"{result['image']}: error: {result['error']}", file=sys.stderr)
+        else:
+            print(f"{result['image']}: {'already mounted at' if result['reused'] else 'mounted at'} "
+                  f"{result['mount_point']}")
+    return 1 if any(result['error'] for result in results) else 0
+
+def cmd_unmount(args):
+    from erofs_mount import MountManager
+
+    manager = MountManager()
+    if args.idle:
+        for mount_point in manager.unmount_idle():
+            print(f"Unmounted idle {mount_point}")
+        return 0
+    targets = [record['mount_point'] for record in manager.mounts()] if args.all else args.targets
+    if not targets:
+        print("error: Give mount points or images, or use --all.", file=sys.stderr)
+        return 1
+
+    results = manager.unmount_many(targets, args.jobs, args.lazy)
+    for result in results:
+        if result['error']:
+            print(f"{result['target']}: error: {result['error']}", file=sys.stderr)
+        else:
+            print(f"Unmounted {result['mount_point']}")
+    return 1 if any(result['error'] for result in results) else 0
+
+def cmd_mounts(args):
+    from erofs_mount import MountManager, format_mounts
+
+    records = MountManager().mounts()
+    if args.json:
+        print(json.dumps(records, indent=2))
+    else:
+        print(format_mounts(records))
+    return 0
+
+def cmd_checksum(args):
+    from erofs_checksum import write_hash_tree, get_sidecar_path
+
+    status = 0
+    for image in args.images:
+        try:
+            tree = write_hash_tree(image, jobs=args.jobs)
+        except OSError as e:
+            print(f"{image}: error: {e}", file=sys.stderr)
+            status = 1
+            continue
+        print(f"{tree['root']}  {image} ({len(tree['chunks'])} chunks, {get_sidecar_path(image)})")
+    return status
+
+def cmd_verify(args):
+    from erofs_checksum import ChecksumError, verify_image, repair_image, format_verify, get_sidecar_path
+
+    if (args.tree or args.repair_from) and len(args.images) > 1:
+        print("error: --tree and --repair-from only work with a single image.", file=sys.stderr)
+        return 1
+    status = 0
+    results = {}
+    for image in args.images:
+        try:
+            result = verify_image(image, args.tree, jobs=args.jobs)
+            if not result['ok'] and args.repair_from:
+                print(format_verify(image, result))
+                repair_image(image, args.repair_from, result['bad_ranges'], result['expected_size'])
+                print(f"Re-copied {result['bad_bytes']} bytes from {args.repair_from}")
+                result = verify_image(image, args.tree, jobs=args.jobs)
+        except (OSError, ChecksumError) as e:
+            print(f"{image}: error: {e}", file=sys.stderr)
+            status = 1
+            continue
+        results[image] = result
+        if not result['ok']:
+            status = 1
+        if not args.json:
+            print(format_verify(image, result))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return status
+
+def cmd_runtimes(args):
+    from runtime_downloader import main as runtimes_main
+    return runtimes_main(args.runtime_args)
+
+
+# --- Parser ---
+def build_parser():
+    parser = argparse.ArgumentParser(prog="kzi", description="Kazeta cartridge tools without the GUI.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('generate', help="Write a .kzi file")
+    p.add_argument('--name', required=True, help="Game name")
+    p.add_argument('--id', help="Game ID (default: derived from the name)")
+    p.add_argument('--exec', dest='exec_path', required=True, help="Executable or ROM path")
+    p.add_argument('--params', default="", help="Additional launch parameters")
+    p.add_argument('--icon', default="", help="Icon path")
+    p.add_argument('--gamescope', default="", help="Gamescope options")
+    p.add_argument('--runtime', default="none", help=f"One of: {', '.join(KNOWN_RUNTIMES)}")
+    p.add_argument('--controller', default="", help="Controller profile (.yaml)")
+    p.add_argument('--default', action='store_true', help="Set as the default game (Kazeta+)")
+    p.add_argument('--media-root', help="Media root used for relative paths (default: auto-detected)")
+    p.add_argument('-o', '--output', help="Output .kzi path, or - for stdout (default: <id>.kzi)")
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser('parse', help="Print the fields of a .kzi file")
+    p.add_argument('file')
+    p.add_argument('--json', action='store_true', help="Print JSON")
+    p.add_argument('--raw', action='store_true', help="Print the keys as written, without resolving paths")
+    p.set_defaults(func=cmd_parse)
+
+    p = sub.add_parser('validate', help="Check .kzi files for required fields, Id format and runtime")
+    p.add_argument('files', nargs='+')
+    p.add_argument('-q', '--quiet', action='store_true', help="Only print problems")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser('batch', help="Write many .kzi files from a CSV/JSON/TOML manifest")
+    p.add_argument('manifest', help="Manifest with one row per game (folder, name, exec, icon, runtime, ...)")
+    p.add_argument('--overwrite', action='store_true', help="Replace existing .kzi files that differ")
+    p.add_argument('--jobs', type=int, help="Worker processes (default: one per CPU)")
+    p.add_argument('--media-root', help="Media root used for relative paths (default: auto-detected)")
+    p.add_argument('--report', help="Write the JSON report to this file, or - for stdout")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser('pack', help="Build a .kzr/.kzp image with mkfs.erofs")
+    p.add_argument('source', help="Folder to pack")
+    p.add_argument('output', nargs='?', help="Image path (default: derived from the .kzi name)")
+    p.add_argument('--type', choices=['kzr', 'kzp'], default='kzp')
+    p.add_argument('--algo', default='lz4',
+                   help=f"One of {', '.join(COMPRESSION_ALGORITHMS)}, optionally with a level (e.g. lzma,9)")
+    p.add_argument('--single-thread', action='store_true', help="Pin mkfs.erofs to CPU 0")
+    p.add_argument('--profile', help="Pack profile to apply (see 'kzi profiles list')")
+    p.add_argument('--workers', type=int, help="mkfs.erofs worker threads (overrides the profile)")
+    p.add_argument('--cpus', help="CPU set, e.g. 0-3 (overrides the profile)")
+    p.add_argument('--nice', type=int, help="Nice level (overrides the profile)")
+    p.add_argument('--ionice', dest='ionice_class', choices=['realtime', 'best-effort', 'idle'],
+                   help="I/O scheduling class (overrides the profile)")
+    p.add_argument('--no-hints', action='store_true', help="Compress every file, even video/audio/archives")
+    p.add_argument('--dedupe', choices=['never', 'auto', 'always'], default='never',
+                   help="Use mkfs.erofs dedupe/fragments: auto = only when an analysis says it pays off")
+    p.add_argument('--incremental', action='store_true',
+                   help="Skip the build when the source hasn't changed since the last one")
+    p.add_argument('--hash', action='store_true',
+                   help="Also record content hashes, so touched but identical files don't force a rebuild")
+    p.add_argument('--check', action='store_true',
+                   help="Only list what changed since the last build; exit status 1 if a rebuild is needed")
+    p.add_argument('--check-limit', type=int, default=50, help="Changed paths listed by --check (default: 50)")
+    p.add_argument('--checksum', action='store_true', help="Write a .sha256tree sidecar for 'kzi verify'")
+    p.add_argument('-q', '--quiet', action='store_true', help="Don't show progress")
+    p.set_defaults(func=cmd_pack)
+
+    p = sub.add_parser('pack-batch', help="Build images for many folders at once under a CPU/IO budget")
+    p.add_argument('sources', nargs='*', help="Folders to pack")
+    p.add_argument('--manifest', help="CSV/JSON/TOML manifest with folder, output, algo and type columns")
+    p.add_argument('--dest', help="Folder for the images (default: beside each source folder)")
+    p.add_argument('--type', choices=['kzr', 'kzp'], default='kzp')
+    p.add_argument('--algo', default='lz4', help="Compression for folders without their own (default: lz4)")
+    p.add_argument('--jobs', type=int, default=2, help="mkfs.erofs processes at once, the disk budget (default: 2)")
+    p.add_argument('--cpus', help="CPU budget shared by all jobs, e.g. 0-7 (default: all)")
+    p.add_argument('--profile', help="Pack profile for nice/ionice (its worker count is replaced per job)")
+    p.add_argument('--retries', type=int, default=1, help="Extra attempts for a failed job (default: 1)")
+    p.add_argument('--overwrite', action='store_true', help="Rebuild images that already exist")
+    p.add_argument('--incremental', action='store_true',
+                   help="Rebuild existing images only when their source changed since the last build")
+    p.add_argument('--dedupe', choices=['never', 'auto', 'always'], default='never',
+                   help="Use mkfs.erofs dedupe/fragments: auto = only when an analysis says it pays off")
+    p.add_argument('--no-hints', action='store_true', help="Compress every file, even video/audio/archives")
+    p.add_argument('--report', help="Write a JSON report of every job to this file")
+    p.add_argument('--checksum', action='store_true', help="Write a .sha256tree sidecar beside each image")
+    p.set_defaults(func=cmd_pack_batch)
+
+    p = sub.add_parser('lint', help="Check every .kzi under folders or mounted images (pre-burn gate)")
+    p.add_argument('paths', nargs='+', help="Folders to walk and/or .kzi files")
+    p.add_argument('--jobs', type=int, default=16, help="Parallel checks (default: 16)")
+    p.add_argument('--json', action='store_true', help="Print the report as JSON")
+    p.add_argument('--strict', action='store_true', help="Fail on warnings too")
+    p.add_argument('-v', '--verbose', action='store_true', help="Also list files without problems")
+    p.set_defaults(func=cmd_lint)
+
+    p = sub.add_parser('scan', help="Find executables/ROMs under a media root")
+    p.add_argument('root', nargs='?', help="Folder to scan (default: auto-detected media root)")
+    p.add_argument('--depth', type=int, default=6, help="How many folder levels to descend (default: 6)")
+    p.add_argument('--json', action='store_true', help="Print JSON")
+    p.add_argument('--manifest', help="Write a batch manifest (CSV) for folders without a .kzi")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser('catalog', help="Index cartridges in a searchable database and query it")
+    p.add_argument('--db', help="Catalog database (default: in the cache directory)")
+    catalog_sub = p.add_subparsers(dest='action', required=True)
+    c = catalog_sub.add_parser('update', help="Index new and changed .kzi/.kzp/.kzr files")
+    c.add_argument('roots', nargs='*', help="Folders to index (default: auto-detected media root)")
+    c.add_argument('--hash-packages', action='store_true', help="Also record the SHA-256 of every package")
+    c = catalog_sub.add_parser('search', help="Search by name, Id, executable, runtime or path")
+    c.add_argument('query', nargs='*', help="Words that must all match (prefixes are fine)")
+    c.add_argument('--runtime', help="Only cartridges using this runtime")
+    c.add_argument('--missing-icon', action='store_true', help="Only cartridges whose icon is missing")
+    c.add_argument('--limit', type=int, default=200)
+    c.add_argument('--json', action='store_true', help="Print JSON")
+    c = catalog_sub.add_parser('stats', help="Cartridge counts per runtime")
+    c.add_argument('--json', action='store_true', help="Print JSON")
+    p.set_defaults(func=cmd_catalog)
+
+    p = sub.add_parser('watch', help="Keep the .kzi of game folders in step with renamed executables and icons")
+    watch_sub = p.add_subparsers(dest='action', required=True)
+    w = watch_sub.add_parser('add', help="Register game folders (each must contain a .kzi)")
+    w.add_argument('folders', nargs='+')
+    w = watch_sub.add_parser('remove', help="Unregister game folders")
+    w.add_argument('folders', nargs='+')
+    watch_sub.add_parser('list', help="Show registered folders")
+    w = watch_sub.add_parser('run', help="Watch folders until interrupted")
+    w.add_argument('folders', nargs='*', help="Folders to watch (default: the registered ones)")
+    w.add_argument('--debounce', type=float, default=2.0, help="Seconds of quiet before a folder is re-checked")
+    w.add_argument('--poll', action='store_true', help="Poll instead of using inotify (e.g. network mounts)")
+    w.add_argument('--media-root', help="Media root used for relative paths (default: auto-detected)")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('analyze', help="Test-compress a sample of a folder and recommend an algorithm")
+    p.add_argument('source', help="Folder that will be packed")
+    p.add_argument('--sample-mb', type=float, default=64, help="How much data to test-compress (default: 64)")
+    p.add_argument('--jobs', type=int, help="Worker processes (default: one per CPU)")
+    p.add_argument('--json', action='store_true', help="Print JSON")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser('estimate', help="Predict image size, pack time and which media it fits on")
+    p.add_argument('source', help="Folder that will be packed")
+    p.add_argument('--algo', default='lz4', help="Compression the image will use (default: lz4)")
+    p.add_argument('--iso', action='store_true', help="Estimate a genisoimage ISO instead")
+    p.add_argument('--workers', type=int, help="mkfs.erofs worker threads the time is based on (default: one per CPU)")
+    p.add_argument('--sample-mb', type=float, default=24, help="How much data to test-compress (default: 24)")
+    p.add_argument('--json', action='store_true', help="Print JSON")
+    p.set_defaults(func=cmd_estimate)
+
+    p = sub.add_parser('dedupe', help="Measure duplicate data within and across game folders and images")
+    p.add_argument('paths', nargs='+', help="Game folders and/or .kzp/.kzr images")
+    p.add_argument('--jobs', type=int, help="Hashing threads (default: two per CPU)")
+    p.add_argument('--json', action='store_true', help="Print JSON")
+    p.set_defaults(func=cmd_dedupe)
+
+    p = sub.add_parser('profiles', help="Manage pack profiles (workers, CPU set, nice, ionice)")
+    profiles_sub = p.add_subparsers(dest='action', required=True)
+    profiles_sub.add_parser('list', help="Show all profiles")
+    pr = profiles_sub.add_parser('set', help="Create or change a profile")
+    pr.add_argument('name')
+    pr.add_argument('--workers', type=int, help="Worker threads, 0 = automatic")
+    pr.add_argument('--cpus', help="CPU set, e.g. 0-3; empty for all")
+    pr.add_argument('--nice', type=int)
+    pr.add_argument('--ionice', dest='ionice_class', choices=['', 'realtime', 'best-effort', 'idle'])
+    pr.add_argument('--ionice-level', type=int)
+    pr = profiles_sub.add_parser('delete', help="Delete a saved profile")
+    pr.add_argument('name')
+    p.set_defaults(func=cmd_profiles)
+
+    p = sub.add_parser('image', help="Look inside .kzp/.kzr images without mounting them")
+    image_sub = p.add_subparsers(dest='action', required=True)
+    i = image_sub.add_parser('ls', help="List a folder in the image")
+    i.add_argument('image')
+    i.add_argument('path', nargs='?', default="", help="Folder inside the image (default: the root)")
+    i.add_argument('-l', '--long', action='store_true', help="Show mode, size and mtime")
+    i.add_argument('-R', '--recursive', action='store_true', help="List everything below the folder")
+    i = image_sub.add_parser('cat', help="Write a file from the image to stdout")
+    i.add_argument('image')
+    i.add_argument('path')
+    i = image_sub.add_parser('extract', help="Copy a file or folder out of the image")
+    i.add_argument('image')
+    i.add_argument('dest', help="Where to put it")
+    i.add_argument('--path', default="", help="File or folder inside the image (default: everything)")
+    i = image_sub.add_parser('kzi', help="Print the .kzi embedded in a .kzp")
+    i.add_argument('image')
+    i.add_argument('--json', action='store_true', help="Print JSON")
+    p.set_defaults(func=cmd_image)
+
+    p = sub.add_parser('checksum', help="Write a chunked .sha256tree sidecar beside images")
+    p.add_argument('images', nargs='+', help=".kzp/.kzr images")
+    p.add_argument('--jobs', type=int, help="Hashing threads (default: one per CPU)")
+    p.set_defaults(func=cmd_checksum)
+
+    p = sub.add_parser('verify', help="Check images against their .sha256tree and list damaged byte ranges")
+    p.add_argument('images', nargs='+', help=".kzp/.kzr images")
+    p.add_argument('--tree', help="Hash tree to check against (default: <image>.sha256tree)")
+    p.add_argument('--repair-from', help="Good copy to re-copy the damaged ranges from")
+    p.add_argument('--jobs', type=int, help="Hashing threads (default: one per CPU)")
+    p.add_argument('--json', action='store_true', help="Print JSON")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser('mount', help="Mount images with erofsfuse, reusing existing mounts")
+    p.add_argument('images', nargs='+', help=".kzp/.kzr images")
+    p.add_argument('--at', help="Mount point (one image only; default: a folder under the runtime dir)")
+    p.add_argument('--idle', type=float, help="Allow 'kzi unmount --idle' to unmount it after this many idle seconds")
+    p.add_argument('--jobs', type=int, default=8, help="Images mounted at once")
+    p.set_defaults(func=cmd_mount)
+
+    p = sub.add_parser('unmount', help="Unmount images by mount point or image path")
+    p.add_argument('targets', nargs='*', help="Mount points or images")
+    p.add_argument('--all', action='store_true', help="Everything mounted by kzi or the GUI")
+    p.add_argument('--idle', action='store_true', help="Only mounts past their idle timeout")
+    p.add_argument('--lazy', action='store_true', help="Detach busy mounts instead of failing")
+    p.add_argument('--jobs', type=int, default=8, help="Images unmounted at once")
+    p.set_defaults(func=cmd_unmount)
+
+    p = sub.add_parser('mounts', help="List images mounted by kzi or the GUI")
+    p.add_argument('--json', action='store_true', help="Print JSON")
+    p.set_defaults(func=cmd_mounts)
+
+    p = sub.add_parser('runtimes', help="Download runtimes (see 'kzi runtimes -h')", add_help=False)
+    p.add_argument('runtime_args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=cmd_runtimes)
+
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'runtimes':
+        # Hand everything after 'runtimes' over untouched; argparse would claim its options
+        return cmd_runtimes(argparse.Namespace(runtime_args=argv[1:]))
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# Batch KZI Generation for KZI Generator
+# Writes one .kzi per manifest row using a process pool
+
+import os
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from kzi_core import (
+    KziEntry, sanitize_game_id, normalize_runtime, validate_entry, build_kzi_content,
+    get_default_media_path, KNOWN_RUNTIMES
+)
+
+# Below this many rows the pool costs more to start than it saves
+POOL_THRESHOLD = 64
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on')
+
+
+class ManifestError(Exception):
+    pass
+
+
+# --- Manifest Loading ---
+def _load_toml(path):
+    try:
+        import tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    except ImportError:
+        import toml
+        with open(path, 'r') as f:
+            return toml.load(f)
+
+def load_manifest(path):
+    """
+    Reads a CSV, JSON or TOML manifest into a list of row dicts with lowercase
+    keys. JSON may be a list or {"games": [...]}; TOML uses [[games]] tables.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        with open(path, 'r', newline='') as f:
+            rows = list(csv.DictReader(f))
+    elif ext == '.json':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        rows = data.get('games', []) if isinstance(data, dict) else data
+    elif ext == '.toml':
+        rows = _load_toml(path).get('games', [])
+    else:
+        raise ManifestError(f"Unsupported manifest type '{ext}' (use .csv, .json or .toml).")
+
+    if not isinstance(rows, list):
+        raise ManifestError("The manifest must contain a list of games.")
+    return [{str(k).strip().lower(): v for k, v in row.items() if k is not None} for row in rows]
+
+
+# --- Row Processing ---
+def _text(row, key):
+    value = row.get(key)
+    return "" if value is None else str(value).strip()
+
+def _resolve(folder, path):
+    if not path:
+        return ""
+    return os.path.normpath(path if os.path.isabs(path) else os.path.join(folder, path))
+
+def entry_from_row(row, manifest_dir):
+    """
+    Turns one manifest row into (KziEntry, output path). Exec, Icon and
+    Controller may be relative to the row's folder, which itself may be
+    relative to the manifest. Raises ManifestError without a folder.
+    """
+    folder = _resolve(manifest_dir, _text(row, 'folder'))
+    if not folder:
+        raise ManifestError("'folder' is required.")
+    name = _text(row, 'name')
+    default = row.get('default', row.get('setasdefaultgame', False))
+
+    entry = KziEntry(
+        name=name,
+        game_id=_text(row, 'id') or sanitize_game_id(name),
+        exec_path=_resolve(folder, _text(row, 'exec')),
+        params=_text(row, 'params'),
+        icon_path=_resolve(folder, _text(row, 'icon')),
+        gamescope_options=_text(row, 'gamescope'),
+        runtime=normalize_runtime(_text(row, 'runtime') or "none"),
+        controller_profile=_text(row, 'controller'),
+        set_as_default=default is True or str(default).strip().lower() in TRUE_VALUES,
+    )
+    output = _resolve(folder, _text(row, 'output')) or os.path.join(folder, f"{entry.game_id}.kzi")
+    return entry, output
+
+def process_row(task):
+    """Validates and writes one row (numbered from 1). Runs inside the worker processes."""
+    index, row, manifest_dir, media_root, overwrite = task
+    result = {'row': index, 'status': None, 'path': None, 'errors': []}
+    try:
+        try:
+            entry, output = entry_from_row(row, manifest_dir)
+        except ManifestError as e:
+            result.update(status='invalid', errors=[str(e)])
+            return result
+        result['path'] = output
+
+        errors = validate_entry(entry)
+        if entry.runtime not in KNOWN_RUNTIMES:
+            errors.append(f"Unknown runtime '{entry.runtime}'.")
+        if not os.path.isdir(os.path.dirname(output)):
+            errors.append(f"Folder does not exist: {os.path.dirname(output)}")
+        if errors:
+            result.update(status='invalid', errors=errors)
+            return result
+
+        content = build_kzi_content(entry, os.path.dirname(output), media_root)
+
+        if os.path.exists(output):
+            with open(output, 'r') as f:
+                existing = f.read()
+            if existing == content:
+                result['status'] = 'unchanged'
+                return result
+            if not overwrite:
+                result.update(status='skipped', errors=["File exists (pass --overwrite to replace it)."])
+                return result
+
+        with open(output, 'w') as f:
+            f.write(content)
+        result['status'] = 'written'
+    except Exception as e:
+        result.update(status='error', errors=[str(e)])
+    return result
+
+def generate_batch(manifest_path, overwrite=False, jobs=None, media_root=None):
+    """
+    Writes every .kzi described by the manifest. Returns a report dict with
+    per-row results and a count per status.
+    """
+    rows = load_manifest(manifest_path)
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    # Resolved once here instead of once per row in every worker
+    media_root = media_root or get_default_media_path()
+
+    # Two rows writing the same file would race each other in the pool, so
+    # later duplicates are rejected up front
+    duplicates = {}
+    seen = {}
+    tasks = []
+    for i, row in enumerate(rows, 1):
+        try:
+            _, output = entry_from_row(row, manifest_dir)
+        except Exception:
+            output = None
+        if output and output in seen:
+            duplicates[i] = {'row': i, 'status': 'invalid', 'path': output,
+                             'errors': [f"Same output file as row {seen[output]}."]}
+            continue
+        seen[output] = i
+        tasks.append((i, row, manifest_dir, media_root, overwrite))
+
+    if len(tasks) < POOL_THRESHOLD or jobs == 1:
+        results = [process_row(task) for task in tasks]
+    else:
+        workers = jobs or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(process_row, tasks, chunksize=chunksize))
+
+    results = sorted(results + list(duplicates.values()), key=lambda result: result['row'])
+
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+
+    return {'manifest': os.path.abspath(manifest_path), 'summary': summary, 'results': results}
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# Cartridge Catalog for KZI Generator
+# SQLite index of parsed .kzi files and packages, with full-text search
+
+import os
+import re
+import time
+import hashlib
+import sqlite3
+
+from app_config import get_cache_dir
+from kzi_core import parse_kzi_text, split_exec_value, normalize_runtime
+
+PACKAGE_EXTENSIONS = ('.kzp', '.kzr')
+SKIPPED_DIRS = {'compatdata', 'shadercache', '__pycache__', 'lost+found'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cartridges (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    root TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    name TEXT, game_id TEXT, exec TEXT, params TEXT, icon TEXT, icon_found INTEGER,
+    gamescope TEXT, runtime TEXT, controller TEXT, set_as_default INTEGER
+);
+CREATE INDEX IF NOT EXISTS cartridges_root ON cartridges(root);
+CREATE INDEX IF NOT EXISTS cartridges_runtime ON cartridges(runtime);
+CREATE INDEX IF NOT EXISTS cartridges_game_id ON cartridges(game_id);
+CREATE INDEX IF NOT EXISTS cartridges_stem ON cartridges(stem);
+
+CREATE TABLE IF NOT EXISTS packages (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS packages_root ON packages(root);
+CREATE INDEX IF NOT EXISTS packages_stem ON packages(stem);
+"""
+
+# External-content FTS table kept in sync by triggers, so text is stored once
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS cartridges_fts USING fts5(
+    name, game_id, exec, runtime, path, content='cartridges', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS cartridges_ai AFTER INSERT ON cartridges BEGIN
+    INSERT INTO cartridges_fts(rowid, name, game_id, exec, runtime, path)
+    VALUES (new.id, new.name, new.game_id, new.exec, new.runtime, new.path);
+END;
+CREATE TRIGGER IF NOT EXISTS cartridges_ad AFTER DELETE ON cartridges BEGIN
+    INSERT INTO cartridges_fts(cartridges_fts, rowid, name, game_id, exec, runtime, path)
+    VALUES ('delete', old.id, old.name, old.game_id, old.exec, old.runtime, old.path);
+END;
+CREATE TRIGGER IF NOT EXISTS cartridges_au AFTER UPDATE ON cartridges BEGIN
+    INSERT INTO cartridges_fts(cartridges_fts, rowid, name, game_id, exec, runtime, path)
+    VALUES ('delete', old.id, old.name, old.game_id, old.exec, old.runtime, old.path);
+    INSERT INTO cartridges_fts(rowid, name, game_id, exec, runtime, path)
+    VALUES (new.id, new.name, new.game_id, new.exec, new.runtime, new.path);
+END;
+"""
+
+RESULT_COLUMNS = ("path", "name", "game_id", "exec", "params", "icon", "icon_found", "gamescope",
+                  "runtime", "controller", "set_as_default", "size", "sha256", "package")
+
+
+def get_catalog_path():
+    return get_cache_dir("catalog.db")
+
+def _walk(root):
+    """Yields (path, stat) for every .kzi and package file under `root`."""
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for dirent in it:
+                    name = dirent.name
+                    if name.startswith('.'):
+                        continue
+                    try:
+                        if dirent.is_dir(follow_symlinks=False):
+                            if name.lower() not in SKIPPED_DIRS:
+                                stack.append(dirent.path)
+                        elif name.lower().endswith(('.kzi',) + PACKAGE_EXTENSIONS) and dirent.is_file():
+                            yield dirent.path, dirent.stat()
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0].lower()
+
+def _fts_query(text):
+    """Turns free text into an FTS5 query: every word must match as a prefix."""
+    words = re.findall(r'[\w.-]+', text)
+    return " ".join('"' + word.replace('"', '') + '"*' for word in words)
+
+
+class KziCatalog:
+    """
+    One SQLite database for every scanned media root. Files are only re-read
+    when their mtime or size changed; an sqlite3 connection belongs to the
+    thread that opened it, so each worker thread opens its own KziCatalog.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or get_catalog_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: searching falls back to LIKE
+            self.has_fts = False
+
+    def close(self):
+        self.conn.close()
+
+    # --- Indexing ---
+    def _read_cartridge(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        kzi_dir = os.path.dirname(path)
+        return self._parse_cartridge(data, lambda icon: os.path.exists(os.path.join(kzi_dir, icon)))
+
+    def _read_package_cartridges(self, path):
+        """{embedded .kzi path: record} for a .kzp, read straight from the image."""
+        from erofs_reader import ErofsImage, ErofsError
+
+        try:
+            with ErofsImage(path) as image:
+                return {os.path.join(path, name): self._parse_cartridge(image.read(name), image.exists)
+                        for name in image.find_kzi_files()}
+        except (OSError, ErofsError):
+            return {}
+
+    def _parse_cartridge(self, data, icon_exists):
+        fields = parse_kzi_text(data.decode('utf-8', errors='replace'))
+        exec_path, params = split_exec_value(fields.get('exec', '').strip())
+        icon = fields.get('icon', '')
+        return {
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'name': fields.get('name', ''),
+            'game_id': fields.get('id', ''),
+            'exec': exec_path or '',
+            'params': params,
+            'icon': icon,
+            'icon_found': int(bool(icon) and icon_exists(icon)),
+            'gamescope': fields.get('gamescopeoptions', ''),
+            'runtime': normalize_runtime(fields.get('runtime', 'none')),
+            'controller': fields.get('controller', ''),
+            'set_as_default': int(fields.get('setasdefaultgame', '').lower() == 'true'),
+        }
+
+    def _store_cartridge(self, record):
+        columns = ", ".join(record)
+        self.conn.execute(
+            f"INSERT INTO cartridges ({columns}) VALUES ({', '.join('?' * len(record))}) "
+            f"ON CONFLICT(path) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in record if c != 'path')}",
+            list(record.values())
+        )
+
+    def update(self, roots, hash_packages=False):
+        """
+        Brings the catalog in line with what is on disk under `roots`. Returns
+        counts of added/updated/removed/unchanged files and the elapsed time.
+        The .kzi inside each .kzp is indexed too, as <package>/<name>.kzi,
+        without mounting the image.
+        """
+        from runtime_cache import sha256_file
+
+        start_time = time.time()
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+
+        with self.conn:
+            for root in roots:
+                root = os.path.abspath(root)
+                known_kzi = {row['path']: (row['mtime_ns'], row['size']) for row in
+                             self.conn.execute("SELECT path, mtime_ns, size FROM cartridges WHERE root = ?", (root,))}
+                known_pkg = {row['path']: (row['mtime_ns'], row['size'], row['sha256']) for row in
+                             self.conn.execute("SELECT path, mtime_ns, size, sha256 FROM packages WHERE root = ?", (root,))}
+                # Cartridges read from inside a package live and die with it
+                embedded = {}
+                for kzi_path in known_kzi:
+                    if os.path.dirname(kzi_path) in known_pkg:
+                        embedded.setdefault(os.path.dirname(kzi_path), []).append(kzi_path)
+
+                for path, st in _walk(root):
+                    is_kzi = path.lower().endswith('.kzi')
+                    known = known_kzi.pop(path, None) if is_kzi else known_pkg.pop(path, None)
+                    unchanged = known is not None and known[0] == st.st_mtime_ns and known[1] == st.st_size
+
+                    if is_kzi:
+                        if unchanged:
+                            stats['unchanged'] += 1
+                            continue
+                        try:
+                            record = self._read_cartridge(path)
+                        except OSError:
+                            continue
+                        record.update(path=path, root=root, stem=_stem(path), mtime_ns=st.st_mtime_ns, size=st.st_size)
+                        self._store_cartridge(record)
+                    else:
+                        if unchanged:
+                            for kzi_path in embedded.get(path, ()):
+                                known_kzi.pop(kzi_path, None)
+                        if unchanged and (known[2] or not hash_packages):
+                            stats['unchanged'] += 1
+                            continue
+                        if not unchanged and path.lower().endswith('.kzp'):
+                            for kzi_path, record in self._read_package_cartridges(path).items():
+                                known_kzi.pop(kzi_path, None)
+                                record.update(path=kzi_path, root=root, stem=_stem(kzi_path),
+                                              mtime_ns=st.st_mtime_ns, size=st.st_size)
+                                self._store_cartridge(record)
+                        sha256 = None
+                        if hash_packages:
+                            try:
+                                sha256 = sha256_file(path)
+                            except OSError:
+                                continue
+                        self.conn.execute(
+                            "INSERT OR REPLACE INTO packages (path, root, stem, mtime_ns, size, sha256) VALUES (?, ?, ?, ?, ?, ?)",
+                            (path, root, _stem(path), st.st_mtime_ns, st.st_size, sha256)
+                        )
+                    stats['updated' if known is not None else 'added'] += 1
+
+                # Whatever was not seen on this walk is gone from disk
+                for path in known_kzi:
+                    self.conn.execute("DELETE FROM cartridges WHERE path = ?", (path,))
+                for path in known_pkg:
+                    self.conn.execute("DELETE FROM packages WHERE path = ?", (path,))
+                stats['removed'] += len(known_kzi) + len(known_pkg)
+
+        stats['elapsed'] = time.time() - start_time
+        return stats
+
+    # --- Queries ---
+    def search(self, text="", runtime=None, missing_icon=False, limit=200):
+        """
+        Cartridges matching free text (prefix match on name, Id, exec, runtime
+        and path), optionally narrowed to one runtime or to missing icons.
+        """
+        clauses = []
+        params = []
+        order = "c.name COLLATE NOCASE"
+        source = "cartridges c"
+
+        query = _fts_query(text) if text else ""
+        if query and self.has_fts:
+            source = "cartridges_fts JOIN cartridges c ON c.id = cartridges_fts.rowid"
+            clauses.append("cartridges_fts MATCH ?")
+            params.append(query)
+            order = "bm25(cartridges_fts)"
+        elif query:
+            for word in text.split():
+                clauses.append("(c.name LIKE ? OR c.game_id LIKE ? OR c.exec LIKE ? OR c.runtime LIKE ? OR c.path LIKE ?)")
+                params.extend([f"%{word}%"] * 5)
+
+        if runtime:
+            clauses.append("c.runtime = ?")
+            params.append(normalize_runtime(runtime))
+        if missing_icon:
+            clauses.append("c.icon_found = 0")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT c.*, (SELECT p.path FROM packages p WHERE p.stem = c.stem LIMIT 1) AS package "
+               f"FROM {source} {where} ORDER BY {order} LIMIT ?")
+        params.append(limit)
+        return [{column: row[column] for column in RESULT_COLUMNS} for row in self.conn.execute(sql, params)]
+
+    def summary(self):
+        """Cartridge count per runtime plus totals."""
+        runtimes = {row[0]: row[1] for row in
+                    self.conn.execute("SELECT runtime, COUNT(*) FROM cartridges GROUP BY runtime ORDER BY 2 DESC")}
+        cartridges, missing_icons = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(icon_found = 0), 0) FROM cartridges").fetchone()
+        packages, package_bytes = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM packages").fetchone()
+        return {'cartridges': cartridges, 'missing_icons': missing_icons, 'packages': packages,
+                'package_bytes': package_bytes, 'runtimes': runtimes}
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# KZI Core for KZI Generator
+# Qt-free model, serializer and parser for .kzi cartridge files
+
+import os
+import re
+import getpass
+import shutil
+from dataclasses import dataclass, asdict
+
+GAME_ID_PATTERN = re.compile(r'^[a-z0-9-]+$')
+EXEC_VALUE_PATTERN = re.compile(r'^(?:"([^"]+)"|([^\s]+))(?:\s+(.*))?$')
+
+# Values accepted in the Runtime= key, in the order the GUI lists them
+KNOWN_RUNTIMES = [
+    "none", "linux", "linux-1.1", "windows", "windows-1.1", "windows-1.2",
+    "nes", "snes", "megadrive", "nintendo64", "dreamcast", "dolphin",
+]
+
+# Executable/ROM types the generator knows about: (label, extensions, runtime guessed for them)
+EXECUTABLE_TYPES = [
+    ("Windows Executables", [".exe"], "windows-1.1"),
+    ("Linux Executables", [".x86_64", ".sh", ".AppImage"], "linux-1.1"),
+    ("NES ROMs", [".nes"], "nes"),
+    ("SNES ROMs", [".sfc"], "snes"),
+    ("Nintendo 64 ROMs", [".n64", ".z64"], "nintendo64"),
+    ("Sega Genesis/Mega Drive ROMs", [".bin"], "megadrive"),
+    ("Dreamcast ROMs", [".cue", ".chd", ".gdi", ".cdi"], "dreamcast"),
+    ("GameCube/Wii ROMs", [".iso", ".gcm", ".wbfs", ".rvz"], "dolphin"),
+]
+
+# Legacy or explicit 1.0 spellings and the value the rest of the app uses for them
+RUNTIME_ALIASES = {
+    "windows-1.0": "windows",
+    "linux-1.0": "linux",
+}
+
+
+@dataclass
+class KziEntry:
+    """
+    Everything the generator form holds about one cartridge. Paths are kept the
+    way the user chose them (usually absolute); build_kzi_content relativizes them.
+    """
+    name: str = ""
+    game_id: str = ""
+    exec_path: str = ""
+    params: str = ""
+    icon_path: str = ""
+    gamescope_options: str = ""
+    runtime: str = "none"
+    controller_profile: str = ""
+    set_as_default: bool = False
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def get_media_path_candidates():
+    """Folders removable media may be mounted under, most specific first."""
+    username = getpass.getuser()
+    home_dir = os.path.expanduser("~")
+    return [f"/run/media/{username}", f"/media/{username}", "/media",
+            os.path.join(home_dir, "media"), os.path.join(home_dir, "run/media")]
+
+def get_default_media_path():
+    for path in get_media_path_candidates():
+        if os.path.isdir(path):
+            return path
+    return os.path.expanduser("~")
+
+def get_executable_file_filter():
+    """File dialog filter string listing every known executable/ROM type."""
+    filters = ["All files (*)"]
+    for label, extensions, _ in EXECUTABLE_TYPES:
+        filters.append(f"{label} ({' '.join('*' + ext for ext in extensions)})")
+    return ";;".join(filters)
+
+def guess_runtime(filename):
+    """Runtime value suggested by a file's extension, or None if it is not a known type."""
+    ext = os.path.splitext(filename)[1].lower()
+    for _, extensions, runtime in EXECUTABLE_TYPES:
+        if ext in (e.lower() for e in extensions):
+            return runtime
+    return None
+
+def sanitize_game_id(text):
+    """Turns a game name into a valid Id: lowercase, spaces to hyphens, nothing else."""
+    return re.sub(r'[^a-z0-9-]', '', text.lower().replace(' ', '-'))
+
+def is_valid_game_id(game_id):
+    return bool(GAME_ID_PATTERN.match(game_id))
+
+def normalize_runtime(value):
+    value = (value or "none").strip().lower()
+    return RUNTIME_ALIASES.get(value, value)
+
+
+# --- Serializer ---
+def relativize_exec(exec_path, params="", media_path_base=None, kzi_save_dir=None):
+    """
+    Builds the Exec= value. Paths on the media root (or beside the .kzi) become
+    relative and are quoted when they contain spaces; anything else is reduced to
+    its basename so the cartridge does not depend on the machine it was made on.
+    """
+    if not exec_path:
+        return ""
+    if media_path_base is None:
+        media_path_base = get_default_media_path()
+    base_dir = kzi_save_dir if kzi_save_dir else media_path_base
+
+    if exec_path.startswith(media_path_base) or (kzi_save_dir and exec_path.startswith(kzi_save_dir)):
+        try:
+            exec_command = os.path.relpath(exec_path, base_dir)
+        except ValueError:
+            exec_command = exec_path
+
+        if ' ' in exec_command and not exec_command.startswith('"'):
+            exec_command = f'"{exec_command}"'
+    else:
+        if os.path.isabs(exec_path) or os.path.isfile(exec_path):
+            exec_command = os.path.basename(exec_path)
+        else:
+            exec_command = exec_path
+
+    if params:
+        exec_command += f" {params}"
+    return exec_command
+
+def relativize_path(path, base_dir):
+    try:
+        return os.path.relpath(path, base_dir)
+    except ValueError:
+        return path
+
+def build_kzi_content(entry, kzi_save_dir=None, media_path_base=None):
+    """Serializes a KziEntry the way it will be written next to the game."""
+    if media_path_base is None:
+        media_path_base = get_default_media_path()
+    base_dir = kzi_save_dir if kzi_save_dir else media_path_base
+
+    content_lines = []
+    content_lines.append(f"Name={entry.name}")
+    content_lines.append(f"Id={entry.game_id}")
+    content_lines.append(f"Exec={relativize_exec(entry.exec_path, entry.params, media_path_base, kzi_save_dir)}")
+
+    if entry.icon_path:
+        content_lines.append(f"Icon={relativize_path(entry.icon_path, base_dir)}")
+
+    if entry.gamescope_options:
+        content_lines.append(f"GamescopeOptions={entry.gamescope_options}")
+
+    if entry.runtime and entry.runtime != "none":
+        content_lines.append(f"Runtime={entry.runtime}")
+
+    if entry.controller_profile:
+        content_lines.append(f"Controller={os.path.basename(entry.controller_profile)}")
+
+    if entry.set_as_default:
+        content_lines.append("SetAsDefaultGame=true")
+
+    return "\n".join(content_lines) + "\n"
+
+def validate_entry(entry):
+    """Returns a list of problems that would stop generate_kzi from writing the file."""
+    errors = []
+    if not all([entry.name.strip(), entry.game_id.strip(), entry.exec_path.strip()]):
+        errors.append("Game Name, ID, and Executable Path are required.")
+    if entry.game_id and not is_valid_game_id(entry.game_id):
+        errors.append("The 'Game ID' field can only contain lowercase letters, numbers, and hyphens.")
+    return errors
+
+def write_kzi(entry, kzi_filepath, media_path_base=None):
+    content = build_kzi_content(entry, os.path.dirname(os.path.abspath(kzi_filepath)), media_path_base)
+    with open(kzi_filepath, "w") as f:
+        f.write(content)
+    return content
+
+
+# --- Parser ---
+def parse_kzi_text(text):
+    """Returns the raw key/value pairs of a .kzi file with lowercase keys."""
+    parsed_data = {}
+    for line in text.splitlines():
+        if '=' in line:
+            key, value = line.strip().split('=', 1)
+            parsed_data[key.lower()] = value
+    return parsed_data
+
+def split_exec_value(value):
+    """Splits an Exec= value into (path, params), honouring a quoted path."""
+    match = EXEC_VALUE_PATTERN.match(value)
+    if not match:
+        return None, ""
+    return match.group(1) or match.group(2), match.group(3) or ""
+
+def entry_from_fields(parsed_data, kzi_dir):
+    """
+    Builds a KziEntry from parsed fields, resolving Icon and Exec against the
+    directory the .kzi lives in.
+    """
+    entry = KziEntry(
+        name=parsed_data.get('name', ''),
+        game_id=parsed_data.get('id', ''),
+        gamescope_options=parsed_data.get('gamescopeoptions', ''),
+        runtime=normalize_runtime(parsed_data.get('runtime', 'none')),
+        controller_profile=parsed_data.get('controller', ''),
+        set_as_default=parsed_data.get('setasdefaultgame', '').lower() == 'true',
+    )
+
+    if parsed_data.get('icon'):
+        entry.icon_path = os.path.abspath(os.path.join(kzi_dir, parsed_data['icon']))
+
+    if parsed_data.get('exec'):
+        path_part, params = split_exec_value(parsed_data['exec'])
+        if path_part:
+            potential_path = os.path.abspath(os.path.join(kzi_dir, path_part))
+            if os.path.exists(potential_path):
+                entry.exec_path = potential_path
+            elif shutil.which(path_part):
+                entry.exec_path = path_part
+            else:
+                entry.exec_path = path_part
+            entry.params = params
+
+    return entry
+
+def parse_kzi_file(kzi_filepath):
+    with open(kzi_filepath, 'r') as f:
+        parsed_data = parse_kzi_text(f.read())
+    return entry_from_fields(parsed_data, os.path.dirname(os.path.abspath(kzi_filepath)))
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# KZI Linter for KZI Generator
+# Checks every .kzi under one or more folders (and inside .kzp images) in parallel
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from build_manifest import load_build_manifest
+from erofs_core import default_package_name
+from kzi_core import (
+    GAME_ID_PATTERN, KNOWN_RUNTIMES, normalize_runtime, parse_kzi_text, split_exec_value
+)
+
+LINT_THREADS = 16
+
+PACKAGE_EXTENSION = '.kzp'
+
+# Folders that never contain a cartridge's own .kzi
+SKIPPED_DIRS = {'compatdata', 'shadercache', '__pycache__', 'lost+found'}
+
+
+# --- Discovery ---
+def iter_kzi_files(paths):
+    """
+    Yields every .kzi and .kzp under the given folders (and any such paths
+    given directly), lazily, so checking can start before the walk has finished.
+    """
+    stack = []
+    for path in paths:
+        if os.path.isdir(path):
+            stack.append(path)
+        elif path.lower().endswith(('.kzi', PACKAGE_EXTENSION)):
+            yield path
+
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for dirent in it:
+                    if dirent.name.startswith('.'):
+                        continue
+                    try:
+                        if dirent.is_dir(follow_symlinks=False):
+                            if dirent.name.lower() not in SKIPPED_DIRS:
+                                stack.append(dirent.path)
+                        elif dirent.name.lower().endswith(('.kzi', PACKAGE_EXTENSION)) and dirent.is_file():
+                            yield dirent.path
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+# --- Checks ---
+def _check_fields(result, fields, resolves):
+    """Fills in `result` for parsed .kzi fields; `resolves(value)` says whether a relative path exists."""
+    errors = result['errors']
+    warnings = result['warnings']
+
+    for key, label in (('name', 'Name'), ('id', 'Id'), ('exec', 'Exec')):
+        if not fields.get(key, '').strip():
+            errors.append(f"Missing {label}=")
+
+    game_id = fields.get('id', '')
+    if game_id:
+        result['id'] = game_id
+        if not GAME_ID_PATTERN.match(game_id):
+            errors.append(f"Id '{game_id}' can only contain lowercase letters, numbers, and hyphens.")
+
+    if fields.get('exec', '').strip():
+        exec_path, _ = split_exec_value(fields['exec'].strip())
+        if not exec_path:
+            errors.append(f"Cannot parse Exec= value: {fields['exec']}")
+        elif not resolves(exec_path) and not shutil.which(exec_path):
+            errors.append(f"Exec not found: {exec_path}")
+
+    if fields.get('icon') and not resolves(fields['icon']):
+        errors.append(f"Icon not found: {fields['icon']}")
+
+    # Kazeta+ can also pick controller profiles from its own folder, so this is only a warning
+    if fields.get('controller') and not resolves(fields['controller']):
+        warnings.append(f"Controller profile not found beside the .kzi: {fields['controller']}")
+
+    if 'runtime' in fields:
+        runtime = normalize_runtime(fields['runtime'])
+        if runtime not in KNOWN_RUNTIMES:
+            errors.append(f"Unknown runtime '{fields['runtime']}'.")
+
+    default = fields.get('setasdefaultgame')
+    if default is not None and default.strip().lower() not in ('true', 'false'):
+        warnings.append(f"SetAsDefaultGame should be true or false, not '{default}'.")
+
+def lint_file(kzi_path):
+    """
+    Checks one .kzi. Returns {'path', 'package', 'id', 'errors', 'warnings'}
+    ('package' is None); duplicate Ids are only known once the whole library
+    has been read (see lint_paths).
+    """
+    result = {'path': kzi_path, 'package': None, 'id': None, 'errors': [], 'warnings': []}
+    try:
+        with open(kzi_path, 'r', encoding='utf-8') as f:
+            fields = parse_kzi_text(f.read())
+    except (OSError, UnicodeDecodeError) as e:
+        result['errors'].append(f"Cannot read file: {e}")
+        return result
+
+    kzi_dir = os.path.dirname(os.path.abspath(kzi_path))
+    _check_fields(result, fields, lambda value: os.path.exists(os.path.join(kzi_dir, value)))
+    return result
+
+def lint_package(image_path):
+    """
+    Checks the .kzi inside a .kzp image, reading the image directly (no mount).
+    Exec/Icon/Controller paths are resolved inside the image. Returns a list
+    of results like lint_file, one per embedded .kzi, with 'package' set.
+    """
+    from erofs_reader import ErofsImage, ErofsError
+
+    try:
+        with ErofsImage(image_path) as image:
+            names = image.find_kzi_files()
+            if not names:
+                return [{'path': image_path, 'package': image_path, 'id': None,
+                         'errors': ["No .kzi file in package"], 'warnings': []}]
+            results = []
+            for name in names:
+                result = {'path': os.path.join(image_path, name), 'package': image_path, 'id': None,
+                          'errors': [], 'warnings': []}
+                try:
+                    fields = parse_kzi_text(image.read(name).decode('utf-8'))
+                except (ErofsError, UnicodeDecodeError) as e:
+                    result['errors'].append(f"Cannot read file: {e}")
+                else:
+                    _check_fields(result, fields, image.exists)
+                results.append(result)
+            return results
+    except (OSError, ErofsError) as e:
+        return [{'path': image_path, 'package': image_path, 'id': None,
+                 'errors': [f"Cannot read package: {e}"], 'warnings': []}]
+
+def _lint_path(path):
+    if path.lower().endswith(PACKAGE_EXTENSION):
+        return lint_package(path)
+    return [lint_file(path)]
+
+def _same_cartridge(a, b):
+    """
+    True when one result is a .kzp packed from the folder holding the other's
+    .kzi: the package has the same .kzi name and either sits beside that folder
+    under its default name (where pack-batch saves it) or its build manifest
+    records the folder as its source.
+    """
+    if (a['package'] is None) == (b['package'] is None) or os.path.basename(a['path']) != os.path.basename(b['path']):
+        return False
+    package, loose = (a, b) if a['package'] else (b, a)
+    image = os.path.abspath(package['package'])
+    folder = os.path.dirname(os.path.abspath(loose['path']))
+    if image == os.path.join(os.path.dirname(folder), default_package_name(folder, 'kzp')):
+        return True
+    manifest = load_build_manifest(image)
+    return manifest is not None and manifest.get('source') == folder
+
+def lint_paths(paths, jobs=LINT_THREADS):
+    """
+    Lints every .kzi found under `paths` (including those inside .kzp images)
+    and flags Ids used more than once. A package built from a loose .kzi's
+    folder (see _same_cartridge) is not a duplicate of it. Returns
+    {'summary', 'results'} with results sorted by path.
+    """
+    # The work is mostly stat() and small reads, so threads are enough
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = sorted((result for results in pool.map(_lint_path, iter_kzi_files(paths)) for result in results),
+                         key=lambda result: result['path'])
+
+    by_id = {}
+    for result in results:
+        if result['id']:
+            by_id.setdefault(result['id'], []).append(result)
+    for game_id, group in by_id.items():
+        if len(group) > 1:
+            for result in group:
+                others = [r['path'] for r in group if r is not result and not _same_cartridge(result, r)]
+                if others:
+                    result['errors'].append(f"Duplicate Id '{game_id}' (also in {', '.join(others)})")
+
+    summary = {
+        'files': len(results),
+        'errors': sum(len(result['errors']) for result in results),
+        'warnings': sum(len(result['warnings']) for result in results),
+        'failed_files': sum(1 for result in results if result['errors']),
+    }
+    return {'summary': summary, 'results': results}
+
+def format_report(report, show_ok=False):
+    lines = []
+    for result in report['results']:
+        for error in result['errors']:
+            lines.append(f"{result['path']}: error: {error}")
+        for warning in result['warnings']:
+            lines.append(f"{result['path']}: warning: {warning}")
+        if show_ok and not result['errors'] and not result['warnings']:
+            lines.append(f"{result['path']}: OK")
+    summary = report['summary']
+    lines.append(f"{summary['files']} files checked, {summary['errors']} errors, {summary['warnings']} warnings")
+    return "\n".join(lines)
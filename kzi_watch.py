@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# Watch Mode for KZI Generator
+# Keeps the .kzi of registered game folders in step with renamed executables and moved icons
+
+import os
+import glob
+import shutil
+import time
+import errno
+import select
+import struct
+import difflib
+import ctypes
+import ctypes.util
+
+from app_config import load_config, save_config
+from kzi_core import build_kzi_content, parse_kzi_file, get_default_media_path, guess_runtime
+from library_scanner import classify_directory
+
+DEFAULT_DEBOUNCE = 2.0 # seconds of quiet before a folder is re-checked
+POLL_INTERVAL = 2.0
+ICON_SEARCH_DEPTH = 3
+
+# linux/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+# --- Registered Folders ---
+def get_watched_folders():
+    return load_config().get('watched_folders', [])
+
+def add_watched_folder(folder):
+    folder = os.path.abspath(folder)
+    if not glob.glob(os.path.join(glob.escape(folder), "*.kzi")):
+        raise Exception(f"No .kzi file found in {folder}")
+    config = load_config()
+    folders = config.setdefault('watched_folders', [])
+    if folder not in folders:
+        folders.append(folder)
+        save_config(config)
+    return folder
+
+def remove_watched_folder(folder):
+    folder = os.path.abspath(folder)
+    config = load_config()
+    folders = config.get('watched_folders', [])
+    if folder in folders:
+        folders.remove(folder)
+        save_config(config)
+        return True
+    return False
+
+
+# --- Watch Backends ---
+class InotifyWatcher:
+    """Directory watches through the inotify syscalls, loaded with ctypes."""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {path}")
+        return wd
+
+    def remove(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout):
+        """Returns [(wd, mask)] for everything queued, waiting up to `timeout` seconds."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        events = []
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    break
+                raise
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, name_len = EVENT_HEADER.unpack_from(buffer, offset)
+                events.append((wd, mask))
+                offset += EVENT_HEADER.size + name_len
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Fallback for systems without inotify (or network mounts that don't deliver
+    events): one stat per watched directory per interval, never a rescan.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.watches = {}
+        self.next_wd = 1
+        self.last_poll = time.monotonic()
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def add(self, path):
+        for wd, (watched_path, _) in self.watches.items():
+            if watched_path == path:
+                return wd
+        wd = self.next_wd
+        self.next_wd += 1
+        self.watches[wd] = (path, self._mtime(path))
+        return wd
+
+    def remove(self, wd):
+        self.watches.pop(wd, None)
+
+    def read_events(self, timeout):
+        time.sleep(timeout)
+        if time.monotonic() - self.last_poll < self.interval:
+            return []
+        self.last_poll = time.monotonic()
+        events = []
+        for wd, (path, mtime) in list(self.watches.items()):
+            current = self._mtime(path)
+            if current != mtime:
+                self.watches[wd] = (path, current)
+                events.append((wd, IN_CREATE if current is not None else IN_DELETE_SELF))
+        return events
+
+    def close(self):
+        self.watches.clear()
+
+def create_watcher(use_polling=False):
+    if not use_polling:
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher()
+
+
+# --- Repair ---
+def _closest(name, choices):
+    matches = difflib.get_close_matches(name, choices, n=1, cutoff=0.5)
+    return matches[0] if matches else None
+
+def find_exec_replacement(missing_path):
+    """
+    Picks the executable that most likely replaced `missing_path`: a file of the
+    same type in the same folder, the closest name winning if there are several.
+    """
+    folder = os.path.dirname(missing_path)
+    if not os.path.isdir(folder):
+        return None
+    runtime = guess_runtime(missing_path)
+    try:
+        candidates, _, _ = classify_directory(folder)
+    except OSError:
+        return None
+    names = [c['name'] for c in candidates if runtime is None or c['runtime'] == runtime]
+    if not names:
+        return None
+    choice = names[0] if len(names) == 1 else _closest(os.path.basename(missing_path), names)
+    return os.path.join(folder, choice) if choice else None
+
+def find_icon_replacement(missing_path, game_folder):
+    """Looks for the icon under its old name anywhere in the game folder, a few levels deep."""
+    name = os.path.basename(missing_path)
+    base_depth = game_folder.rstrip(os.sep).count(os.sep)
+    for folder, dirs, files in os.walk(game_folder):
+        if folder.count(os.sep) - base_depth >= ICON_SEARCH_DEPTH:
+            dirs[:] = []
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        if name in files:
+            return os.path.join(folder, name)
+    return None
+
+def refresh_kzi(kzi_path, media_root=None):
+    """
+    Re-resolves the Exec and Icon of one .kzi and rewrites it through
+    build_kzi_content when either had to be repointed. Returns
+    {'path', 'status': 'ok'|'updated'|'broken', 'changes', 'errors'}.
+    """
+    result = {'path': kzi_path, 'status': 'ok', 'changes': [], 'errors': []}
+    kzi_dir = os.path.dirname(os.path.abspath(kzi_path))
+    try:
+        entry = parse_kzi_file(kzi_path)
+    except OSError as e:
+        result.update(status='broken', errors=[str(e)])
+        return result
+
+    # parse_kzi_file only leaves Exec relative when it doesn't exist beside the .kzi
+    if entry.exec_path and not os.path.isabs(entry.exec_path) and not shutil.which(entry.exec_path):
+        replacement = find_exec_replacement(os.path.join(kzi_dir, entry.exec_path))
+        if replacement:
+            result['changes'].append(f"Exec: {entry.exec_path} -> {os.path.relpath(replacement, kzi_dir)}")
+            entry.exec_path = replacement
+        else:
+            result['errors'].append(f"Exec not found: {entry.exec_path}")
+
+    if entry.icon_path and not os.path.exists(entry.icon_path):
+        replacement = find_icon_replacement(entry.icon_path, kzi_dir)
+        if replacement:
+            result['changes'].append(f"Icon: {os.path.relpath(entry.icon_path, kzi_dir)} -> {os.path.relpath(replacement, kzi_dir)}")
+            entry.icon_path = replacement
+        else:
+            result['errors'].append(f"Icon not found: {os.path.relpath(entry.icon_path, kzi_dir)}")
+
+    if result['changes']:
+        content = build_kzi_content(entry, kzi_dir, media_root or get_default_media_path())
+        tmp_path = kzi_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, kzi_path)
+        result['status'] = 'updated'
+    if result['errors']:
+        result['status'] = 'broken'
+    return result
+
+
+# --- Watch Loop ---
+def _inside(path, folder):
+    return path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)
+
+class FolderWatch:
+    """
+    Watches the folders each registered game's .kzi depends on (its own folder
+    plus the folders holding Exec and Icon), so hundreds of games cost a few
+    watches each. Events only mark a game dirty; it is re-checked once its
+    folders have been quiet for `debounce` seconds.
+    """
+
+    def __init__(self, folders, debounce=DEFAULT_DEBOUNCE, use_polling=False, media_root=None):
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.debounce = debounce
+        self.media_root = media_root or get_default_media_path()
+        self.watcher = create_watcher(use_polling)
+        self.wd_games = {}   # wd -> set of game folders
+        self.game_wds = {}   # game folder -> set of wds
+        self.dirty = {}      # game folder -> time of the last event
+        self.stopped = False
+
+    @property
+    def backend(self):
+        return "inotify" if isinstance(self.watcher, InotifyWatcher) else "polling"
+
+    def _dependencies(self, folder):
+        paths = {folder}
+        for kzi_path in glob.glob(os.path.join(glob.escape(folder), "*.kzi")):
+            try:
+                entry = parse_kzi_file(kzi_path)
+            except OSError:
+                continue
+            for path in (entry.exec_path, entry.icon_path):
+                if path and os.path.isabs(path):
+                    parent = os.path.dirname(path)
+                    # The nearest existing folder notices the file coming back
+                    while _inside(parent, folder) and not os.path.isdir(parent):
+                        parent = os.path.dirname(parent)
+                    if _inside(parent, folder):
+                        paths.add(parent)
+        return paths
+
+    def _watch_game(self, folder):
+        for wd in self.game_wds.pop(folder, set()):
+            games = self.wd_games.get(wd, set())
+            games.discard(folder)
+            if not games:
+                self.wd_games.pop(wd, None)
+                self.watcher.remove(wd)
+
+        wds = set()
+        for path in self._dependencies(folder):
+            try:
+                wd = self.watcher.add(path)
+            except OSError:
+                continue
+            wds.add(wd)
+            self.wd_games.setdefault(wd, set()).add(folder)
+        self.game_wds[folder] = wds
+
+    def check_game(self, folder):
+        results = [refresh_kzi(kzi_path, self.media_root)
+                   for kzi_path in sorted(glob.glob(os.path.join(glob.escape(folder), "*.kzi")))]
+        # Exec/Icon may now live in different folders
+        self._watch_game(folder)
+        return results
+
+    def stop(self):
+        self.stopped = True
+
+    def run(self, callback=None, check_first=True):
+        """
+        Blocks until stop() is called. `callback(result)` receives every
+        refresh_kzi result that changed or found a problem.
+        """
+        for folder in self.folders:
+            self._watch_game(folder)
+            if check_first:
+                for result in self.check_game(folder):
+                    if callback and result['status'] != 'ok':
+                        callback(result)
+
+        try:
+            while not self.stopped:
+                for wd, mask in self.watcher.read_events(0.5):
+                    now = time.monotonic()
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were lost; every game gets re-checked
+                        for folder in self.folders:
+                            self.dirty[folder] = now
+                        continue
+                    if mask & IN_IGNORED:
+                        continue
+                    for folder in self.wd_games.get(wd, ()):
+                        self.dirty[folder] = now
+
+                now = time.monotonic()
+                ready = [folder for folder, last in self.dirty.items() if now - last >= self.debounce]
+                for folder in ready:
+                    del self.dirty[folder]
+                    for result in self.check_game(folder):
+                        if callback and result['status'] != 'ok':
+                            callback(result)
+        finally:
+            self.watcher.close()
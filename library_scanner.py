@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# Game Library Scanner for KZI Generator
+# Finds executables/ROMs under a media root with an incremental on-disk index
+
+import os
+import re
+import time
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from app_config import get_cache_dir, write_json_atomic
+from kzi_core import guess_runtime
+
+INDEX_VERSION = 1
+SCAN_THREADS = 8
+
+# Folders that never hold a game's own launcher
+SKIPPED_DIRS = {'compatdata', 'shadercache', '__pycache__', '$recycle.bin', 'system volume information', 'lost+found'}
+
+# Installers, redistributables and helpers that sit next to real game executables
+IGNORED_EXECUTABLES = re.compile(
+    r'^(unins\d*|setup|vc_?redist.*|dxsetup|dxwebsetup|oalinst|physx.*|ue4prereqsetup.*|'
+    r'unitycrashhandler(32|64)?|crashreport.*|crashpad_handler|notification_helper)\.exe$',
+    re.IGNORECASE
+)
+
+
+def get_index_path(root):
+    key = hashlib.sha256(os.path.abspath(root).encode()).hexdigest()[:16]
+    return get_cache_dir("library", f"{key}.json")
+
+def load_index(index_path, root):
+    try:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get('version') != INDEX_VERSION or index.get('root') != os.path.abspath(root):
+        return {}
+    return index.get('dirs', {})
+
+
+# --- Directory Listing ---
+def classify_directory(path):
+    """
+    Lists one directory. Returns (candidates, kzi_files, subdirs) where each
+    candidate is {'name', 'size', 'runtime'}.
+    """
+    candidates = []
+    kzi_files = []
+    subdirs = []
+    names = set()
+
+    with os.scandir(path) as it:
+        for dirent in it:
+            name = dirent.name
+            if name.startswith('.'):
+                continue
+            try:
+                if dirent.is_dir(follow_symlinks=False):
+                    if name.lower() not in SKIPPED_DIRS:
+                        subdirs.append(name)
+                    continue
+                if not dirent.is_file():
+                    continue
+            except OSError:
+                continue
+
+            names.add(name.lower())
+            if name.lower().endswith('.kzi'):
+                kzi_files.append(name)
+                continue
+
+            runtime = guess_runtime(name)
+            if runtime is None or IGNORED_EXECUTABLES.match(name):
+                continue
+            try:
+                size = dirent.stat(follow_symlinks=False).st_size
+            except OSError:
+                size = 0
+            candidates.append({'name': name, 'size': size, 'runtime': runtime})
+
+    # Track files of a .cue sheet are not games by themselves
+    if any(n.endswith('.cue') for n in names):
+        candidates = [c for c in candidates if not c['name'].lower().endswith('.bin')]
+
+    return candidates, kzi_files, subdirs
+
+def _has_kzi(dirs, rel_path):
+    """A game's .kzi usually sits in its top folder, above bin/ or similar."""
+    while rel_path:
+        if dirs.get(rel_path, {}).get('kzi'):
+            return True
+        rel_path = os.path.dirname(rel_path)
+    return False
+
+def _visit(root, rel_path, previous):
+    """Stats one directory and only lists it again if its mtime moved."""
+    path = os.path.join(root, rel_path) if rel_path else root
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return rel_path, None, False
+
+    if previous and previous.get('mtime_ns') == mtime_ns:
+        return rel_path, previous, False
+
+    try:
+        candidates, kzi_files, subdirs = classify_directory(path)
+    except OSError:
+        return rel_path, None, False
+    record = {'mtime_ns': mtime_ns, 'candidates': candidates, 'kzi': kzi_files, 'subdirs': subdirs}
+    return rel_path, record, True
+
+
+# --- Scanning ---
+def scan_library(root, index_path=None, max_depth=6, threads=SCAN_THREADS):
+    """
+    Walks `root` breadth-first. Every known directory is stat()ed, but only
+    directories whose mtime changed since the last scan are listed again, so a
+    rescan of an unchanged library costs one stat per folder.
+
+    Returns {'root', 'candidates', 'dirs_total', 'dirs_listed', 'elapsed'}.
+    """
+    root = os.path.abspath(root)
+    index_path = index_path or get_index_path(root)
+    previous = load_index(index_path, root)
+    start_time = time.time()
+
+    dirs = {}
+    listed = 0
+    frontier = [("", 0)]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        while frontier:
+            results = pool.map(lambda item: _visit(root, item[0], previous.get(item[0])), frontier)
+            depths = dict(frontier)
+            next_frontier = []
+            for rel_path, record, was_listed in results:
+                if record is None:
+                    continue
+                dirs[rel_path] = record
+                listed += was_listed
+                depth = depths[rel_path]
+                if depth < max_depth:
+                    next_frontier.extend((os.path.join(rel_path, sub), depth + 1) for sub in record['subdirs'])
+            frontier = next_frontier
+
+    write_json_atomic(index_path, {'version': INDEX_VERSION, 'root': root, 'dirs': dirs})
+
+    candidates = []
+    for rel_path, record in sorted(dirs.items()):
+        for candidate in record['candidates']:
+            candidates.append(dict(candidate,
+                                   path=os.path.join(root, rel_path, candidate['name']),
+                                   folder=os.path.join(root, rel_path),
+                                   has_kzi=_has_kzi(dirs, rel_path)))
+
+    return {
+        'root': root,
+        'candidates': candidates,
+        'dirs_total': len(dirs),
+        'dirs_listed': listed,
+        'elapsed': time.time() - start_time,
+    }
+
+def suggest_manifest_rows(scan_result):
+    """
+    One batch-manifest row per folder that has candidates but no .kzi yet,
+    picking the largest candidate as the likely main executable.
+    """
+    by_folder = {}
+    for candidate in scan_result['candidates']:
+        if candidate['has_kzi']:
+            continue
+        best = by_folder.get(candidate['folder'])
+        if best is None or candidate['size'] > best['size']:
+            by_folder[candidate['folder']] = candidate
+
+    rows = []
+    for folder, candidate in sorted(by_folder.items()):
+        rows.append({
+            'folder': folder,
+            'name': os.path.basename(folder) or os.path.splitext(candidate['name'])[0],
+            'exec': candidate['name'],
+            'runtime': candidate['runtime'],
+        })
+    return rows
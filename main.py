@@ -3,32 +3,44 @@
 
 import sys
 import os
-import getpass
-import time
-import re
 import subprocess
 import shlex
 import shutil
-import urllib.request
+import time
 import webbrowser
+from collections import deque
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QFormLayout, QLineEdit, QPushButton, QComboBox, QCheckBox,
     QTextEdit, QLabel, QFileDialog, QMessageBox, QGroupBox,
-    QProgressBar, QDialog
+    QProgressBar, QDialog, QListWidget, QListWidgetItem
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QThread, QTimer, QFileSystemWatcher, pyqtSignal
 from PyQt6.QtGui import QAction, QIcon
 
 # Import from our other modules
 from about_window import show_about_window
+from download_queue import DownloadQueueWindow
 from erofs_manager import ErofsManagerWindow
 from iso_burner import IsoBurnerWindow
+from kzi_catalog import KziCatalog
+from kzi_core import (
+    KziEntry, get_default_media_path, get_media_path_candidates, sanitize_game_id,
+    is_valid_game_id, build_kzi_content, write_kzi, parse_kzi_file, parse_kzi_text, entry_from_fields,
+    get_executable_file_filter
+)
+from runtime_downloader import fetch_runtime
+from runtime_manifest import load_runtime_manifest, get_runtime_entry, get_runtime_categories
 from steamgriddb_api import handle_fetch_icon_flow
 from steamgriddb_api import ssl_context
 from theme_creator import KazetaThemeCreator
 
+# Typing pauses shorter than this are coalesced into a single preview update
+PREVIEW_DEBOUNCE_MS = 80
+# Recent (render ms, ms since the first edit of a burst) pairs kept in preview_latencies
+PREVIEW_LATENCY_SAMPLES = 500
+
 def get_resource_path(relative_path):
     """ Get the absolute path to a resource, working for both dev and PyInstaller """
     if hasattr(sys, '_MEIPASS'):
@@ -37,18 +49,6 @@ def get_resource_path(relative_path):
     # Running as a normal Python script
     return os.path.join(os.path.dirname(os.path.abspath(__file__)), relative_path)
 
-def get_default_media_path():
-    username = getpass.getuser()
-    possible_paths = [f"/run/media/{username}", f"/media/{username}", "/media"]
-    for path in possible_paths:
-        if os.path.isdir(path):
-            return path
-    home_dir = os.path.expanduser("~")
-    for path in [os.path.join(home_dir, "media"), os.path.join(home_dir, "run/media")]:
-        if os.path.isdir(path):
-            return path
-    return home_dir
-
 def is_steam_running():
     try:
         subprocess.check_call(['pgrep', '-x', 'steam'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -121,47 +121,58 @@ class DownloadWorker(QThread):
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
 
-    def __init__(self, url, save_path):
+    def __init__(self, url, save_path, expected_size=None, expected_sha256=None):
         super().__init__()
         self.url = url
         self.save_path = save_path
+        self.expected_size = expected_size
+        self.expected_sha256 = expected_sha256
 
     def run(self):
         try:
-            # Spoof a standard web browser to bypass 403 CDN blocks
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
-            req = urllib.request.Request(self.url, headers=headers)
-
-            # Pass the 'req' object instead of the raw string 'self.url'
-            with urllib.request.urlopen(req, context=ssl_context) as response, open(self.save_path, 'wb') as out_file:
-                total_size = int(response.getheader('Content-Length', 0))
-                downloaded = 0
-                start_time = time.time()
-
-                while True:
-                    buffer = response.read(1024 * 1024)
-                    if not buffer:
-                        break
-
-                    out_file.write(buffer)
-                    downloaded += len(buffer)
-
-                    percent = int((downloaded / total_size) * 100) if total_size > 0 else 0
-                    elapsed_time = time.time() - start_time
-                    speed = (downloaded / elapsed_time) / (1024 * 1024) if elapsed_time > 0 else 0
-
-                    status_text = (
-                        f"{downloaded/1024/1024:.2f} MB / {total_size/1024/1024:.2f} MB "
-                        f"({percent}%) at {speed:.2f} MB/s"
-                    )
-                    self.progress.emit(percent, status_text)
-
+            # Served from the local runtime store when possible, otherwise resumes
+            # from <save_path>.part if an earlier attempt was interrupted. The checksum is
+            # computed as the bytes stream in and checked before the file is renamed.
+            source = fetch_runtime(self.url, self.save_path, progress_callback=self._report_progress, context=ssl_context,
+                                   expected_size=self.expected_size, expected_sha256=self.expected_sha256)
+            if source == 'cache':
+                self.progress.emit(100, "Copied from local runtime cache")
             self.finished.emit(self.save_path)
         except Exception as e:
             self.error.emit(str(e))
 
+    def _report_progress(self, downloaded, total_size, bytes_per_second):
+        percent = int((downloaded / total_size) * 100) if total_size > 0 else 0
+        speed = bytes_per_second / (1024 * 1024)
+
+        status_text = (
+            f"{downloaded/1024/1024:.2f} MB / {total_size/1024/1024:.2f} MB "
+            f"({percent}%) at {speed:.2f} MB/s"
+        )
+        self.progress.emit(percent, status_text)
+
+
+# --- Background Worker for Indexing the Catalog ---
+class CatalogWorker(QThread):
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, roots):
+        super().__init__()
+        self.roots = roots
+
+    def run(self):
+        try:
+            # sqlite3 connections can't cross threads, so this one is opened here
+            catalog = KziCatalog()
+            try:
+                stats = catalog.update(self.roots)
+            finally:
+                catalog.close()
+            self.finished.emit(stats)
+        except Exception as e:
+            self.error.emit(str(e))
+
 
 class KziGeneratorApp(QMainWindow):
     def __init__(self):
@@ -174,24 +185,26 @@ class KziGeneratorApp(QMainWindow):
         if os.path.exists(icon_path):
             self.setWindowIcon(QIcon(icon_path))
 
-        self.runtime_urls = {
-            "Linux": "https://runtimes.kazeta.org/linux-1.0.kzr",
-            "Linux 1.1": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/linux-1.1.kzr",
-            "Windows": "https://runtimes.kazeta.org/windows-1.0.kzr",
-            "Windows 1.1": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/windows-1.1.kzr",
-            "Windows 1.2 (Experimental)": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/windows-1.2-experimental.kzr",
-            "NES": "https://runtimes.kazeta.org/nes-1.0.kzr",
-            "SNES": "https://runtimes.kazeta.org/snes-1.0.kzr",
-            "Sega Genesis/Mega Drive": "https://runtimes.kazeta.org/megadrive-1.1.kzr",
-            "Nintendo 64": "https://runtimes.kazeta.org/nintendo64-1.0.kzr",
-            "Dreamcast": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/dreamcast-1.0.kzr",
-            "GameCube/Wii": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/dolphin-1.0.kzr",
-        }
+        # Name, URL, size and SHA-256 of every downloadable runtime
+        self.runtime_manifest = load_runtime_manifest()
+
+        # Resolved once and refreshed when something is mounted, instead of
+        # stat()ing the candidate folders on every keystroke
+        self.media_path = get_default_media_path()
+        self.media_watcher = QFileSystemWatcher(self)
+        self._watch_media_paths()
+
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self._preview_requested_at = None
+        # Read by the preview benchmark (benchmarks/bench.py run preview-typing); nothing is printed
+        self.preview_latencies = deque(maxlen=PREVIEW_LATENCY_SAMPLES)
 
         self.setup_ui()
         self.setup_menus()
         self.connect_signals()
-        self._update_preview()
+        self._render_preview()
 
     def setup_ui(self):
         central_widget = QWidget()
@@ -286,11 +299,7 @@ class KziGeneratorApp(QMainWindow):
         download_group = QGroupBox("Download runtimes")
         download_layout = QVBoxLayout(download_group)
 
-        runtime_categories = {
-            "Linux": ["Linux", "Linux 1.1"],
-            "Windows": ["Windows", "Windows 1.1", "Windows 1.2 (Experimental)"],
-            "Emulators": ["NES", "SNES", "Sega Genesis/Mega Drive", "Nintendo 64", "Dreamcast", "GameCube/Wii"]
-        }
+        runtime_categories = get_runtime_categories(self.runtime_manifest)
 
         for category, runtimes in runtime_categories.items():
             row_layout = QHBoxLayout()
@@ -313,8 +322,33 @@ class KziGeneratorApp(QMainWindow):
             row_layout.addStretch()
             download_layout.addLayout(row_layout)
 
+        queue_layout = QHBoxLayout()
+        self.btn_download_queue = QPushButton("Download Several...")
+        self.btn_download_queue.clicked.connect(self.open_download_queue)
+        queue_layout.addWidget(self.btn_download_queue)
+        queue_layout.addStretch()
+        download_layout.addLayout(queue_layout)
+
         main_layout.addWidget(download_group)
 
+        # --- Catalog Search ---
+        catalog_group = QGroupBox("Cartridge Catalog")
+        catalog_layout = QVBoxLayout(catalog_group)
+        search_layout = QHBoxLayout()
+        self.catalog_search_entry = QLineEdit()
+        self.catalog_search_entry.setPlaceholderText("Search indexed cartridges by name, ID, executable or runtime...")
+        self.btn_catalog_rescan = QPushButton("Rescan Media")
+        search_layout.addWidget(self.catalog_search_entry)
+        search_layout.addWidget(self.btn_catalog_rescan)
+        catalog_layout.addLayout(search_layout)
+
+        self.catalog_results = QListWidget()
+        self.catalog_results.setMaximumHeight(120)
+        self.catalog_results.setToolTip("Double-click a cartridge to load it")
+        self.catalog_results.setVisible(False)
+        catalog_layout.addWidget(self.catalog_results)
+        main_layout.addWidget(catalog_group)
+
         # --- Preview Section ---
         preview_group = QGroupBox("KZI File Preview")
         preview_layout = QVBoxLayout(preview_group)
@@ -395,6 +429,9 @@ class KziGeneratorApp(QMainWindow):
         help_menu.addAction(about_action)
 
     def connect_signals(self):
+        self.preview_timer.timeout.connect(self._render_preview)
+        self.media_watcher.directoryChanged.connect(self._refresh_media_path)
+
         # Traces for live preview update
         self.game_name_entry.textChanged.connect(self._update_game_id)
         self.game_id_entry.textChanged.connect(self._update_preview)
@@ -407,6 +444,11 @@ class KziGeneratorApp(QMainWindow):
         self.runtime_menu.currentIndexChanged.connect(self._update_preview)
         self.default_game_checkbox.stateChanged.connect(self._update_preview)
 
+        # Catalog
+        self.catalog_search_entry.textChanged.connect(self.search_catalog)
+        self.catalog_results.itemDoubleClicked.connect(self.load_catalog_result)
+        self.btn_catalog_rescan.clicked.connect(self.rescan_catalog)
+
         # UI Toggles
         self.advanced_toggle.toggled.connect(self.toggle_advanced_options)
         self.kazeta_plus_toggle.toggled.connect(self.toggle_kazeta_options)
@@ -438,82 +480,70 @@ class KziGeneratorApp(QMainWindow):
         self.resize(self.width(), self.minimumSizeHint().height())
 
     def _update_game_id(self, text):
-        sanitized_id = re.sub(r'[^a-z0-9-]', '', text.lower().replace(' ', '-'))
+        sanitized_id = sanitize_game_id(text)
         if self.game_id_entry.text() != sanitized_id:
              self.game_id_entry.setText(sanitized_id)
         self._update_preview()
 
-    def _get_kzi_content(self, for_preview=False, kzi_save_dir=None):
-        game_name = self.game_name_entry.text().strip()
-        game_id = self.game_id_entry.text().strip()
-        exec_path = self.exec_path_entry.text().strip()
-        params = self.params_entry.text().strip()
-        icon_path = self.icon_path_entry.text().strip()
-        gamescope_options = self.gamescope_entry.text().strip()
-        controller_profile = self.controller_profile_entry.text().strip()
-
-        runtime = self.runtime_menu.currentData()
-        set_default = self.default_game_checkbox.isChecked()
-
-        media_path_base = get_default_media_path()
-        base_dir = kzi_save_dir if kzi_save_dir else media_path_base
-
-        content_lines = []
-        content_lines.append(f"Name={game_name}")
-        content_lines.append(f"Id={game_id}")
-
-        exec_command = ""
-        if exec_path:
-            if exec_path.startswith(media_path_base) or (kzi_save_dir and exec_path.startswith(kzi_save_dir)):
-                try:
-                    exec_command = os.path.relpath(exec_path, base_dir)
-                except ValueError:
-                    exec_command = exec_path
-
-                if ' ' in exec_command and not exec_command.startswith('"'):
-                    exec_command = f'"{exec_command}"'
-            else:
-                if os.path.isfile(exec_path) or os.path.isabs(exec_path):
-                     exec_command = os.path.basename(exec_path)
-                else:
-                     exec_command = exec_path
-
-            if params:
-                exec_command += f" {params}"
-
-        content_lines.append(f"Exec={exec_command}")
-
-        relative_icon_path = ""
-        if icon_path:
-             try:
-                 relative_icon_path = os.path.relpath(icon_path, base_dir)
-             except ValueError:
-                 relative_icon_path = icon_path
-             content_lines.append(f"Icon={relative_icon_path}")
-
-        if gamescope_options:
-            content_lines.append(f"GamescopeOptions={gamescope_options}")
-
-        if runtime and runtime != "none":
-            content_lines.append(f"Runtime={runtime}")
-
-        if controller_profile:
-            controller_name = os.path.basename(controller_profile)
-            content_lines.append(f"Controller={controller_name}")
-
-        if set_default:
-            content_lines.append("SetAsDefaultGame=true")
+    def _get_kzi_entry(self):
+        return KziEntry(
+            name=self.game_name_entry.text().strip(),
+            game_id=self.game_id_entry.text().strip(),
+            exec_path=self.exec_path_entry.text().strip(),
+            params=self.params_entry.text().strip(),
+            icon_path=self.icon_path_entry.text().strip(),
+            gamescope_options=self.gamescope_entry.text().strip(),
+            runtime=self.runtime_menu.currentData(),
+            controller_profile=self.controller_profile_entry.text().strip(),
+            set_as_default=self.default_game_checkbox.isChecked(),
+        )
 
-        return "\n".join(content_lines) + "\n"
+    def _get_kzi_content(self, kzi_save_dir=None):
+        # Serialization and path relativization live in kzi_core so the CLI produces identical files
+        return build_kzi_content(self._get_kzi_entry(), kzi_save_dir=kzi_save_dir, media_path_base=self.media_path)
 
     def _update_preview(self):
-        content = self._get_kzi_content(for_preview=True)
-        self.preview_text.setPlainText(content)
+        # Every field edit lands here; the actual work waits for a pause in typing
+        if self._preview_requested_at is None:
+            self._preview_requested_at = time.perf_counter()
+        self.preview_timer.start()
+
+    def _render_preview(self):
+        start = time.perf_counter()
+        content = self._get_kzi_content()
+        # Replacing the document resets the scroll position and is the slow part, so skip it when nothing changed
+        if content != self.preview_text.toPlainText():
+            self.preview_text.setPlainText(content)
+
+        end = time.perf_counter()
+        requested = self._preview_requested_at if self._preview_requested_at is not None else start
+        self.preview_latencies.append(((end - start) * 1000, (end - requested) * 1000))
+        self._preview_requested_at = None
+
+    def _watch_media_paths(self):
+        # Watch each candidate mount folder, or its parent while it doesn't exist yet
+        paths = set()
+        for path in get_media_path_candidates():
+            while path and not os.path.isdir(path):
+                path = os.path.dirname(path)
+            if path:
+                paths.add(path)
+        watched = set(self.media_watcher.directories())
+        new_paths = sorted(paths - watched)
+        if new_paths:
+            self.media_watcher.addPaths(new_paths)
+
+    def _refresh_media_path(self, _changed=None):
+        media_path = get_default_media_path()
+        self._watch_media_paths()
+        if media_path != self.media_path:
+            self.media_path = media_path
+            self._update_preview()
 
     def browse_executable(self):
-        file_filter = "All files (*);;Windows Executables (*.exe);;Linux Executables (*.x86_64 *.sh *.AppImage);;NES ROMs (*.nes);;SNES ROMs (*.sfc);;Nintendo 64 ROMs (*.n64 *.z64);;Sega Genesis/Mega Drive ROMs (*.bin);;Dreamcast ROMs (*.cue *.chd *.gdi *.cdi);;GameCube/Wii ROMs (*.iso *.gcm *.wbfs *.rvz)"
+        file_filter = get_executable_file_filter()
         filepath, _ = QFileDialog.getOpenFileName(
-            self, "Select Executable File", get_default_media_path(), file_filter
+            self, "Select Executable File", self.media_path, file_filter
         )
         if filepath:
             self.exec_path_entry.setText(filepath)
@@ -528,7 +558,7 @@ class KziGeneratorApp(QMainWindow):
     def browse_icon(self):
         file_filter = "PNG files (*.png);;All files (*.*)"
         filepath, _ = QFileDialog.getOpenFileName(
-            self, "Select Icon File", get_default_media_path(), file_filter
+            self, "Select Icon File", self.media_path, file_filter
         )
         if filepath:
             self.icon_path_entry.setText(filepath)
@@ -536,7 +566,7 @@ class KziGeneratorApp(QMainWindow):
     def browse_controller(self):
         file_filter = "YAML Profiles (*.yaml);;All files (*.*)"
         filepath, _ = QFileDialog.getOpenFileName(
-            self, "Select Controller Profile", get_default_media_path(), file_filter
+            self, "Select Controller Profile", self.media_path, file_filter
         )
         if filepath:
             self.controller_profile_entry.setText(filepath)
@@ -556,6 +586,13 @@ class KziGeneratorApp(QMainWindow):
         dialog = IsoBurnerWindow(self)
         dialog.exec()
 
+    def open_download_queue(self):
+        # Non-modal and kept alive, so downloads continue while the user works
+        if not getattr(self, 'download_queue_window', None):
+            self.download_queue_window = DownloadQueueWindow(self, self.media_path)
+        self.download_queue_window.show()
+        self.download_queue_window.raise_()
+
     def test_cartridge(self):
         exec_path = self.exec_path_entry.text().strip()
         params = self.params_entry.text().strip()
@@ -620,15 +657,15 @@ class KziGeneratorApp(QMainWindow):
         run_command_in_new_terminal(command, env=env, cwd=work_dir)
 
     def generate_kzi(self):
-        game_id = self.game_id_entry.text().strip()
-        exec_path = self.exec_path_entry.text().strip()
-        media_path_base = get_default_media_path()
+        entry = self._get_kzi_entry()
+        game_id = entry.game_id
+        media_path_base = self.media_path
 
-        if not all([self.game_name_entry.text().strip(), game_id, exec_path]):
+        if not all([entry.name, game_id, entry.exec_path]):
              QMessageBox.critical(self, "Error", "Game Name, ID, and Executable Path are required.")
              return
 
-        if not re.match(r'^[a-z0-9-]+$', game_id):
+        if not is_valid_game_id(game_id):
              QMessageBox.critical(self, "Invalid ID", "The 'Game ID' field can only contain lowercase letters, numbers, and hyphens.")
              return
 
@@ -641,11 +678,7 @@ class KziGeneratorApp(QMainWindow):
             return
 
         try:
-            kzi_dir = os.path.dirname(kzi_filepath)
-            content = self._get_kzi_content(for_preview=False, kzi_save_dir=kzi_dir)
-
-            with open(kzi_filepath, "w") as f:
-                f.write(content)
+            write_kzi(entry, kzi_filepath, media_path_base)
 
             QMessageBox.information(self, "Success", f"Successfully generated {os.path.basename(kzi_filepath)}")
         except Exception as e:
@@ -653,65 +686,52 @@ class KziGeneratorApp(QMainWindow):
 
     def load_kzi_file(self):
         kzi_filepath, _ = QFileDialog.getOpenFileName(
-            self, "Load .kzi File", get_default_media_path(), ".kzi files (*.kzi);;All files (*.*)"
+            self, "Load .kzi File", self.media_path, ".kzi files (*.kzi);;All files (*.*)"
         )
         if not kzi_filepath:
             return
+        self.load_kzi_path(kzi_filepath)
 
-        self.unload_cartridge()
-
+    def load_kzi_path(self, kzi_filepath):
         try:
-            kzi_dir = os.path.dirname(kzi_filepath)
-            parsed_data = {}
-            with open(kzi_filepath, 'r') as f:
-                for line in f:
-                    if '=' in line:
-                        key, value = line.strip().split('=', 1)
-                        parsed_data[key.lower()] = value
-
-            self.game_name_entry.setText(parsed_data.get('name', ''))
-            self.game_id_entry.setText(parsed_data.get('id', ''))
-            self.gamescope_entry.setText(parsed_data.get('gamescopeoptions', ''))
-
-            runtime_val = parsed_data.get('runtime', 'none').lower()
-
-            # Catch legacy or explicit 1.0 definitions and map them to our internal data values
-            if runtime_val == 'windows-1.0':
-                runtime_val = 'windows'
-            elif runtime_val == 'linux-1.0':
-                runtime_val = 'linux'
-
-            idx = self.runtime_menu.findData(runtime_val)
-            if idx >= 0:
-                self.runtime_menu.setCurrentIndex(idx)
-
-            if 'icon' in parsed_data and parsed_data['icon']:
-                icon_full_path = os.path.abspath(os.path.join(kzi_dir, parsed_data['icon']))
-                self.icon_path_entry.setText(icon_full_path)
+            entry = parse_kzi_file(kzi_filepath)
+        except Exception as e:
+            self.unload_cartridge()
+            QMessageBox.critical(self, "Error", f"Failed to load .kzi file: {e}")
+            return
+        self.load_kzi_entry(entry)
 
-            if 'controller' in parsed_data and parsed_data['controller']:
-                self.controller_profile_entry.setText(parsed_data['controller'])
+    def load_embedded_kzi(self, package_path, name):
+        """Loads a .kzi from inside a .kzp, reading the image without mounting or changing it."""
+        from erofs_reader import ErofsImage, ErofsError
 
-            if 'exec' in parsed_data and parsed_data['exec']:
-                value = parsed_data['exec']
-                match = re.match(r'^(?:"([^"]+)"|([^\s]+))(?:\s+(.*))?$', value)
-                if match:
-                    path_part = match.group(1) or match.group(2)
-                    params = match.group(3) or ""
+        try:
+            with ErofsImage(package_path) as image:
+                text = image.read(name).decode('utf-8', 'replace')
+        except (OSError, ErofsError) as e:
+            QMessageBox.warning(self, "Not Found", f"Could not read {name} from {package_path}: {e}\nRescan the media to update the catalog.")
+            return
+        # Relative Icon and Exec values point inside the image, so they stay under the package path
+        self.load_kzi_entry(entry_from_fields(parse_kzi_text(text), package_path))
+        self.statusBar().showMessage(f"Loaded {name} from {os.path.basename(package_path)} (read-only; saving writes a new .kzi)", 5000)
 
-                    potential_path = os.path.abspath(os.path.join(kzi_dir, path_part))
+    def load_kzi_entry(self, entry):
+        self.unload_cartridge()
 
-                    if os.path.exists(potential_path):
-                        self.exec_path_entry.setText(potential_path)
-                    elif shutil.which(path_part):
-                        self.exec_path_entry.setText(path_part)
-                    else:
-                        self.exec_path_entry.setText(path_part)
+        try:
+            self.game_name_entry.setText(entry.name)
+            self.game_id_entry.setText(entry.game_id)
+            self.gamescope_entry.setText(entry.gamescope_options)
 
-                    self.params_entry.setText(params)
+            idx = self.runtime_menu.findData(entry.runtime)
+            if idx >= 0:
+                self.runtime_menu.setCurrentIndex(idx)
 
-            if 'setasdefaultgame' in parsed_data:
-                self.default_game_checkbox.setChecked(parsed_data['setasdefaultgame'].lower() == 'true')
+            self.icon_path_entry.setText(entry.icon_path)
+            self.controller_profile_entry.setText(entry.controller_profile)
+            self.exec_path_entry.setText(entry.exec_path)
+            self.params_entry.setText(entry.params)
+            self.default_game_checkbox.setChecked(entry.set_as_default)
 
             # Expand the toggles if the user loaded a file utilizing them
             if self.params_entry.text() or self.gamescope_entry.text():
@@ -723,6 +743,57 @@ class KziGeneratorApp(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load .kzi file: {e}")
 
+    def search_catalog(self, text=None):
+        if not getattr(self, 'catalog', None):
+            self.catalog = KziCatalog()
+        text = self.catalog_search_entry.text().strip() if text is None else text.strip()
+
+        self.catalog_results.clear()
+        if not text:
+            self.catalog_results.setVisible(False)
+            return
+
+        for result in self.catalog.search(text, limit=100):
+            label = f"{result['name'] or result['game_id']}  [{result['runtime']}]  {result['path']}"
+            item = QListWidgetItem(label)
+            item.setData(Qt.ItemDataRole.UserRole, result['path'])
+            self.catalog_results.addItem(item)
+        self.catalog_results.setVisible(True)
+
+    def load_catalog_result(self, item):
+        path = item.data(Qt.ItemDataRole.UserRole)
+        # Cartridges inside a package are cataloged as <package>.kzp/<name>.kzi
+        package_path = os.path.dirname(path)
+        if package_path.lower().endswith('.kzp') and os.path.isfile(package_path):
+            self.load_embedded_kzi(package_path, os.path.basename(path))
+            return
+        if not os.path.isfile(path):
+            QMessageBox.warning(self, "Not Found", f"{path} is no longer there. Rescan the media to update the catalog.")
+            return
+        self.load_kzi_path(path)
+
+    def rescan_catalog(self):
+        self.btn_catalog_rescan.setEnabled(False)
+        self.btn_catalog_rescan.setText("Scanning...")
+        self.catalog_worker = CatalogWorker([self.media_path])
+        self.catalog_worker.finished.connect(self.on_catalog_updated)
+        self.catalog_worker.error.connect(self.on_catalog_error)
+        self.catalog_worker.start()
+
+    def on_catalog_updated(self, stats):
+        self.btn_catalog_rescan.setEnabled(True)
+        self.btn_catalog_rescan.setText("Rescan Media")
+        self.statusBar().showMessage(
+            f"Catalog: {stats['added']} added, {stats['updated']} updated, {stats['removed']} removed "
+            f"({stats['elapsed']:.1f}s)", 5000
+        )
+        self.search_catalog()
+
+    def on_catalog_error(self, error_msg):
+        self.btn_catalog_rescan.setEnabled(True)
+        self.btn_catalog_rescan.setText("Rescan Media")
+        QMessageBox.critical(self, "Catalog Error", f"Failed to index the media folder:\n{error_msg}")
+
     def unload_cartridge(self):
         self.game_id_entry.blockSignals(True)
 
@@ -744,11 +815,12 @@ class KziGeneratorApp(QMainWindow):
         self._update_preview()
 
     def download_runtime(self, name):
-        url = self.runtime_urls[name]
+        entry = get_runtime_entry(name, self.runtime_manifest)
+        url = entry['url']
         filename = os.path.basename(url)
 
         # Combine the default media path with the downloaded filename
-        initial_path = os.path.join(get_default_media_path(), filename)
+        initial_path = os.path.join(self.media_path, filename)
 
         save_path, _ = QFileDialog.getSaveFileName(self, f"Save {name} Runtime", initial_path)
 
@@ -767,7 +839,7 @@ class KziGeneratorApp(QMainWindow):
         self.progress_bar.setRange(0, 100)
         layout.addWidget(self.progress_bar)
 
-        self.worker = DownloadWorker(url, save_path)
+        self.worker = DownloadWorker(url, save_path, entry['size'], entry['sha256'])
         self.worker.progress.connect(self.update_download_progress)
         self.worker.finished.connect(self.download_finished)
         self.worker.error.connect(self.download_error)
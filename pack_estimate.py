@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# Size and Time Estimates for KZI Generator
+# Predicts .kzp/.kzr/.iso size, pack time and which media it fits on, before packing
+
+import os
+import math
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from erofs_analyze import get_codec, SEGMENT_SIZE, BLOCK_SIZE
+
+SCAN_THREADS = 16 # directory listings run in parallel; stat() drops the GIL
+SAMPLE_BYTES = 24 * 1024 * 1024 # compressed in total, spread over the strata by size
+SAMPLE_CHUNK = 256 * 1024 # contiguous bytes read per sample position
+MAX_SAMPLES_PER_STRATUM = 48 # bounds the number of files opened for trees of tiny files
+TOP_EXTENSIONS = 16 # extensions with their own strata; the rest share one
+SIZE_BUCKETS = [(4 * 1024, 'tiny'), (64 * 1024, 'small'), (4 * 1024 * 1024, 'medium'),
+                (256 * 1024 * 1024, 'large'), (None, 'huge')]
+
+# Metadata beyond file data: EROFS extended inode + dirent, ISO 9660 + Joliet + Rock Ridge records
+EROFS_ENTRY_BYTES = 64 + 12
+ISO_SECTOR = 2048
+ISO_ENTRY_BYTES = 300
+ISO_FIXED_BYTES = 400 * 1024
+
+# mkfs.erofs/genisoimage work per file on top of the data rate, seconds
+FILE_SECONDS = 0.00005
+
+# (label, usable bytes). Cards are sold in decimal GB and lose a little to the filesystem.
+MEDIA = [
+    ("CD-R (700 MB)", 737_280_000),
+    ("DVD-R (4.7 GB)", 4_707_319_808),
+    ("DVD-R DL (8.5 GB)", 8_543_666_176),
+    ("BD-R (25 GB)", 25_025_314_816),
+    ("32 GB card", 31_000_000_000),
+    ("64 GB card", 62_000_000_000),
+]
+
+
+# --- Scanning ---
+def _scan_dir(folder):
+    subdirs, files, name_bytes = [], [], 0
+    try:
+        with os.scandir(folder) as it:
+            for dirent in it:
+                name_bytes += len(dirent.name)
+                try:
+                    if dirent.is_dir(follow_symlinks=False):
+                        subdirs.append(dirent.path)
+                    elif dirent.is_file(follow_symlinks=False):
+                        files.append((dirent.path, dirent.stat(follow_symlinks=False).st_size))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return subdirs, files, name_bytes
+
+def scan_tree(source, jobs=SCAN_THREADS):
+    """
+    One parallel scandir pass: every folder is listed on a thread pool as
+    soon as its parent has been read. Returns {'files': [(path, size)],
+    'total_bytes', 'file_count', 'dir_count', 'name_bytes', 'elapsed'}.
+    """
+    start_time = time.time()
+    files = []
+    dir_count = name_bytes = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = {pool.submit(_scan_dir, source)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, found, names = future.result()
+                dir_count += 1
+                name_bytes += names
+                files.extend(found)
+                pending.update(pool.submit(_scan_dir, folder) for folder in subdirs)
+    return {
+        'files': files,
+        'total_bytes': sum(size for _, size in files),
+        'file_count': len(files),
+        'dir_count': dir_count,
+        'name_bytes': name_bytes,
+        'elapsed': time.time() - start_time,
+    }
+
+
+# --- Sampling ---
+def _size_bucket(size):
+    for limit, name in SIZE_BUCKETS:
+        if limit is None or size < limit:
+            return name
+
+def stratify(files):
+    """
+    Groups files by (extension, size bucket). Only the TOP_EXTENSIONS largest
+    extensions by bytes get their own strata, so a tree with thousands of
+    odd extensions still has a bounded number of groups.
+    """
+    bytes_by_ext = {}
+    for path, size in files:
+        ext = os.path.splitext(path)[1].lower()
+        bytes_by_ext[ext] = bytes_by_ext.get(ext, 0) + size
+    top = set(sorted(bytes_by_ext, key=bytes_by_ext.get, reverse=True)[:TOP_EXTENSIONS])
+
+    strata = {}
+    for path, size in files:
+        ext = os.path.splitext(path)[1].lower()
+        key = (ext if ext in top else '*', _size_bucket(size))
+        stratum = strata.setdefault(key, {'files': [], 'bytes': 0})
+        stratum['files'].append((path, size))
+        stratum['bytes'] += size
+    return strata
+
+def choose_stratified_samples(strata, sample_bytes=SAMPLE_BYTES, seed=0):
+    """
+    (stratum key, path, offset, length) samples. Each stratum gets a share of
+    the budget in proportion to its bytes, but at least one sample, so a small
+    group of very different files still gets measured. Within a stratum files
+    are picked with probability proportional to size.
+    """
+    rng = random.Random(seed)
+    total = sum(stratum['bytes'] for stratum in strata.values()) or 1
+    samples = []
+    for key, stratum in sorted(strata.items()):
+        if not stratum['bytes']:
+            continue
+        count = max(1, min(MAX_SAMPLES_PER_STRATUM,
+                           round(sample_bytes * stratum['bytes'] / total / SAMPLE_CHUNK)))
+        # Systematic sampling over the stratum's bytes with a random start
+        step = stratum['bytes'] / count
+        position = rng.uniform(0, step)
+        base = 0
+        for path, size in stratum['files']:
+            while position < base + size and count:
+                offset = int(position - base)
+                # Align to segments so each sample compresses like a real cluster of the file
+                offset -= offset % SEGMENT_SIZE
+                samples.append((key, path, offset, min(SAMPLE_CHUNK, size - offset)))
+                position += step
+                count -= 1
+            base += size
+    return samples
+
+def _measure_sample(task):
+    """Reads one sample and compresses it segment by segment the way mkfs.erofs stores clusters."""
+    key, path, offset, length, compress = task
+    t0 = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+    except OSError:
+        return key, 0, 0, 0.0, 0.0
+    t1 = time.perf_counter()
+    bytes_out = 0
+    for start in range(0, len(data), SEGMENT_SIZE):
+        segment = data[start:start + SEGMENT_SIZE]
+        if compress is None:
+            bytes_out += len(segment)
+            continue
+        packed = compress(segment)
+        if len(packed) + BLOCK_SIZE > len(segment):
+            bytes_out += len(segment) # kept raw; EROFS needs a block saved
+        else:
+            bytes_out += math.ceil(len(packed) / BLOCK_SIZE) * BLOCK_SIZE
+    return key, len(data), bytes_out, t1 - t0, time.perf_counter() - t1
+
+def _sample_codec(algo):
+    """(compress callable or None, exact). Without the lz4/zstd modules deflate level 1 stands in."""
+    name, _, level = algo.partition(',')
+    if name in ('uncompressed', 'iso'):
+        return None, True
+    codec = get_codec(name, int(level) if level else None)
+    if codec is None:
+        return get_codec('deflate', 1)[0], False
+    return codec[0], True
+
+
+# --- Estimate ---
+def estimate_pack(source, algo="lz4", fmt="erofs", workers=None, scan=None, sample_bytes=SAMPLE_BYTES,
+                  jobs=None, progress_callback=None):
+    """
+    Predicts the image size and pack time for `source`. `fmt` is 'erofs'
+    (.kzp/.kzr with `algo`) or 'iso' (genisoimage, no compression). Pass an
+    earlier scan_tree() result as `scan` to re-estimate another algorithm
+    without walking the tree again. Returns {'size', 'size_low', 'size_high',
+    'seconds', 'ratio', 'media', 'exact_codec', ...}; size_low/high are a
+    two-sigma band from the spread of the samples within each stratum.
+    """
+    start_time = time.time()
+    jobs = jobs or os.cpu_count() or 1
+    workers = workers or os.cpu_count() or 1
+    if scan is None:
+        if progress_callback:
+            progress_callback("Scanning source folder...")
+        scan = scan_tree(source)
+
+    compress, exact = _sample_codec('iso' if fmt == 'iso' else algo)
+    strata = stratify(scan['files'])
+    samples = choose_stratified_samples(strata, sample_bytes)
+    if progress_callback:
+        progress_callback(f"Test-compressing {len(samples)} samples...")
+
+    per_stratum = {}
+    read_bytes = read_seconds = compress_seconds = 0.0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        tasks = [(key, path, offset, length, compress) for key, path, offset, length in samples]
+        for key, bytes_in, bytes_out, read_time, compress_time in pool.map(_measure_sample, tasks):
+            if bytes_in:
+                per_stratum.setdefault(key, []).append((bytes_in, bytes_out))
+                read_bytes += bytes_in
+                read_seconds += read_time
+                compress_seconds += compress_time
+
+    # Each stratum's data scales by its measured ratio; unmeasured ones (unreadable) stay raw
+    data_bytes = 0.0
+    variance = 0.0
+    for key, stratum in strata.items():
+        measured = per_stratum.get(key)
+        if not measured:
+            data_bytes += stratum['bytes']
+            continue
+        ratios = [bytes_out / bytes_in for bytes_in, bytes_out in measured]
+        ratio = sum(bytes_out for _, bytes_out in measured) / sum(bytes_in for bytes_in, _ in measured)
+        data_bytes += stratum['bytes'] * ratio
+        if len(ratios) > 1:
+            mean = sum(ratios) / len(ratios)
+            spread = math.sqrt(sum((r - mean) ** 2 for r in ratios) / (len(ratios) - 1) / len(ratios))
+        else:
+            spread = 0.1 if compress else 0.0 # one sample says little about how the rest compresses
+        variance += (stratum['bytes'] * spread) ** 2
+
+    entries = scan['file_count'] + scan['dir_count']
+    if fmt == 'iso':
+        size = (sum(math.ceil(size / ISO_SECTOR) * ISO_SECTOR for _, size in scan['files'])
+                + entries * ISO_ENTRY_BYTES + 2 * scan['name_bytes'] + ISO_FIXED_BYTES)
+    else:
+        size = (data_bytes + entries * EROFS_ENTRY_BYTES + scan['name_bytes']
+                + scan['dir_count'] * BLOCK_SIZE + BLOCK_SIZE)
+    margin = 2 * math.sqrt(variance)
+
+    # Time: the slower of compressing on every worker and reading the source, plus per-file work
+    total = scan['total_bytes']
+    read_rate = read_bytes / read_seconds if read_seconds else None
+    compress_rate = read_bytes / compress_seconds * workers if compress and compress_seconds else None
+    rates = [rate for rate in (read_rate, compress_rate) if rate]
+    seconds = (total / min(rates) if rates and total else 0.0) + scan['file_count'] * FILE_SECONDS
+
+    size = int(size)
+    size_high = int(size + margin)
+    return {
+        'source': os.path.abspath(source),
+        'format': fmt,
+        'algo': algo if fmt != 'iso' else None,
+        'total_bytes': total,
+        'file_count': scan['file_count'],
+        'dir_count': scan['dir_count'],
+        'strata': len(strata),
+        'sample_bytes': int(read_bytes),
+        'ratio': size / total if total else 1.0,
+        'size': size,
+        'size_low': max(0, int(size - margin)),
+        'size_high': size_high,
+        'seconds': seconds,
+        'read_rate': read_rate,
+        'compress_rate': compress_rate,
+        'exact_codec': exact,
+        'media': media_fit(size, size_high),
+        'scan_seconds': scan['elapsed'],
+        'elapsed': time.time() - start_time,
+    }
+
+def media_fit(size, size_high=None):
+    """[{'media', 'capacity', 'fit'}] with fit 'yes', 'tight' (only if the estimate is not too low) or 'no'."""
+    size_high = size if size_high is None else size_high
+    fits = []
+    for label, capacity in MEDIA:
+        fit = 'yes' if size_high <= capacity else 'tight' if size <= capacity else 'no'
+        fits.append({'media': label, 'capacity': capacity, 'fit': fit})
+    return fits
+
+def _format_bytes(size):
+    if size >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.2f} GB"
+    return f"{size / 1024 ** 2:.0f} MB"
+
+def format_duration_estimate(seconds):
+    if seconds < 60:
+        return f"{max(1, round(seconds))}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+def format_estimate(estimate, short=False):
+    what = "ISO" if estimate['format'] == 'iso' else f"image ({estimate['algo']})"
+    size = f"~{_format_bytes(estimate['size'])}"
+    if estimate['size_high'] - estimate['size_low'] > estimate['size'] * 0.02:
+        size += f" ({_format_bytes(estimate['size_low'])}-{_format_bytes(estimate['size_high'])})"
+    # MEDIA is sorted by capacity, so the first that fits is the smallest
+    fitting = [m['media'] for m in estimate['media'] if m['fit'] == 'yes']
+    tight = [m['media'] for m in estimate['media'] if m['fit'] == 'tight']
+    fits = f"fits {fitting[0]} and up" if fitting else "too big for the usual media"
+    if tight:
+        fits += f" (tight on {', '.join(tight)})"
+    line = (f"{what}: {size} from {estimate['file_count']} files / {_format_bytes(estimate['total_bytes'])}, "
+            f"about {format_duration_estimate(estimate['seconds'])} to pack; {fits}")
+    if short:
+        return line
+    lines = [line, ""]
+    for m in estimate['media']:
+        lines.append(f"  {m['media']:<20} {m['fit']}")
+    note = "" if estimate['exact_codec'] else ", ratio approximated with deflate (codec module not installed)"
+    lines.append("")
+    lines.append(f"Sampled {_format_bytes(estimate['sample_bytes'])} from {estimate['strata']} groups in "
+                 f"{estimate['elapsed']:.1f}s{note}")
+    return "\n".join(lines)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Pack Profiles for KZI Generator
+# Named CPU/IO settings (workers, CPU set, nice, ionice) applied to mkfs.erofs runs
+
+import os
+import re
+import json
+import shutil
+
+from app_config import get_config_dir, write_json_atomic
+
+IONICE_CLASSES = {'': None, 'realtime': '1', 'best-effort': '2', 'idle': '3'}
+CPU_LIST_PATTERN = re.compile(r'^\d+(-\d+)?(,\d+(-\d+)?)*$')
+
+# workers=0 leaves the thread count to mkfs.erofs
+DEFAULT_PROFILES = {
+    "Full Speed": {'workers': 0, 'cpus': "", 'nice': 0, 'ionice_class': "", 'ionice_level': 4},
+    "Background": {'workers': 2, 'cpus': "", 'nice': 19, 'ionice_class': "idle", 'ionice_level': 7},
+    "Single Thread": {'workers': 1, 'cpus': "0", 'nice': 0, 'ionice_class': "", 'ionice_level': 4},
+}
+DEFAULT_PROFILE = "Full Speed"
+
+
+class ProfileError(Exception):
+    pass
+
+
+def get_profiles_path():
+    return os.path.join(get_config_dir(), "pack_profiles.json")
+
+def load_profiles():
+    """Built-in profiles overlaid with the user's saved ones."""
+    profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+    try:
+        with open(get_profiles_path(), 'r') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {}
+    for name, profile in saved.items():
+        merged = dict(DEFAULT_PROFILES[DEFAULT_PROFILE])
+        merged.update(profile)
+        profiles[name] = merged
+    return profiles
+
+def save_profile(name, profile):
+    validate_profile(profile)
+    try:
+        with open(get_profiles_path(), 'r') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {}
+    saved[name] = profile
+    write_json_atomic(get_profiles_path(), saved)
+
+def delete_profile(name):
+    """Removes a saved profile. Built-in ones come back with their defaults."""
+    try:
+        with open(get_profiles_path(), 'r') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if name not in saved:
+        return False
+    del saved[name]
+    write_json_atomic(get_profiles_path(), saved)
+    return True
+
+def get_profile(name=None):
+    profiles = load_profiles()
+    name = name or DEFAULT_PROFILE
+    if name not in profiles:
+        raise ProfileError(f"Unknown pack profile '{name}' (known: {', '.join(profiles)}).")
+    return profiles[name]
+
+def validate_profile(profile):
+    if int(profile.get('workers', 0)) < 0:
+        raise ProfileError("Workers must be 0 (automatic) or more.")
+    cpus = profile.get('cpus', "")
+    if cpus and not CPU_LIST_PATTERN.match(cpus):
+        raise ProfileError(f"CPU set '{cpus}' must look like 0-3 or 0,2,4.")
+    if not -20 <= int(profile.get('nice', 0)) <= 19:
+        raise ProfileError("Nice must be between -20 and 19.")
+    if profile.get('ionice_class', "") not in IONICE_CLASSES:
+        raise ProfileError(f"I/O class must be one of: {', '.join(c for c in IONICE_CLASSES if c)}.")
+    if not 0 <= int(profile.get('ionice_level', 4)) <= 7:
+        raise ProfileError("I/O priority level must be between 0 and 7.")
+
+def parse_cpu_list(cpus):
+    """'0-2,5' -> [0, 1, 2, 5]"""
+    result = []
+    for part in cpus.split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            result.extend(range(int(start), int(end) + 1))
+        elif part:
+            result.append(int(part))
+    return result
+
+
+# --- Command Wrapping ---
+def wrap_command(cmd, profile):
+    """
+    Prefixes `cmd` with nice/ionice/taskset as the profile asks, so the exact
+    command line can be shown and re-run by hand.
+    """
+    prefix = []
+    nice = int(profile.get('nice', 0))
+    if nice:
+        nice_bin = shutil.which("nice")
+        if not nice_bin:
+            raise ProfileError("nice command not found.")
+        prefix += [nice_bin, "-n", str(nice)]
+
+    io_class = IONICE_CLASSES.get(profile.get('ionice_class', ""))
+    if io_class:
+        ionice = shutil.which("ionice")
+        if not ionice:
+            raise ProfileError("ionice command not found (util-linux).")
+        prefix += [ionice, "-c", io_class]
+        if io_class != '3':
+            prefix += ["-n", str(int(profile.get('ionice_level', 4)))]
+
+    cpus = profile.get('cpus', "")
+    if cpus:
+        taskset = shutil.which("taskset")
+        if not taskset:
+            raise ProfileError("taskset command not found (required for a CPU set).")
+        prefix += [taskset, "-c", cpus]
+
+    return prefix + cmd
+
+def effective_workers(profile):
+    """
+    Worker threads mkfs.erofs should use: the profile's count, capped by the
+    CPU set, or the size of the CPU set when left automatic.
+    """
+    workers = int(profile.get('workers', 0))
+    cpus = profile.get('cpus', "")
+    if cpus:
+        cpu_count = len(parse_cpu_list(cpus))
+        return min(workers, cpu_count) if workers else cpu_count
+    return workers
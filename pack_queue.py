@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# Batch Packaging for KZI Generator
+# Builds many .kzp/.kzr images under a shared CPU and disk-I/O budget
+
+import os
+import time
+import threading
+from collections import deque
+
+from app_config import write_json_atomic
+from build_manifest import count_changes
+from erofs_core import create_package, default_package_name, format_duration, PackError, PackCancelled
+from pack_profiles import parse_cpu_list
+
+DEFAULT_IO_SLOTS = 2 # mkfs.erofs processes reading and writing at the same time
+DEFAULT_RETRIES = 1
+
+
+def get_available_cpus():
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def read_pack_manifest(path):
+    """
+    Reads a CSV/JSON/TOML manifest (see kzi_batch) into job arguments:
+    [{'source', 'output', 'algo', 'pkg_type'}]. Columns: folder (required),
+    output, algo and type; relative paths are taken from the manifest's folder.
+    """
+    from kzi_batch import load_manifest, ManifestError
+
+    manifest_dir = os.path.dirname(os.path.abspath(path))
+    rows = []
+    for i, row in enumerate(load_manifest(path), 1):
+        folder = str(row.get('folder') or "").strip()
+        if not folder:
+            raise ManifestError(f"Row {i}: 'folder' is required.")
+        output = str(row.get('output') or "").strip()
+        rows.append({
+            'source': os.path.join(manifest_dir, folder),
+            'output': os.path.join(manifest_dir, output) if output else None,
+            'algo': str(row.get('algo') or "").strip() or None,
+            'pkg_type': str(row.get('type') or "").strip().lower() or "kzp",
+        })
+    return rows
+
+
+class PackQueue:
+    """
+    Builds many images with at most `io_slots` mkfs.erofs processes at once
+    (the disk budget) sharing a fixed set of CPUs (the CPU budget). Each job
+    is pinned to its share of the CPUs and gets one worker thread per CPU, so
+    processes x workers never oversubscribes the machine. A job takes an even
+    share of the CPUs that are free when it starts; once fewer jobs are left
+    than slots, the last ones get the spare CPUs. With `incremental`, existing
+    images are only rebuilt when their source changed since the last build.
+    With `checksum`, each image gets a .sha256tree sidecar (see erofs_checksum).
+    Jobs are plain dicts so the GUI and the command line can both display them.
+    """
+
+    CALLBACK_INTERVAL = 0.2
+
+    def __init__(self, io_slots=DEFAULT_IO_SLOTS, cpus=None, profile=None, algo="lz4",
+                 auto_hints=True, retries=DEFAULT_RETRIES, overwrite=False, incremental=False, dedupe="never",
+                 checksum=False):
+        self.profile = dict(profile or {})
+        if cpus is None:
+            cpus = parse_cpu_list(self.profile['cpus']) if self.profile.get('cpus') else get_available_cpus()
+        self.cpus = sorted(set(cpus))
+        if not self.cpus:
+            raise PackError("The CPU budget is empty.")
+        unavailable = set(self.cpus) - set(get_available_cpus())
+        if unavailable:
+            raise PackError(f"CPUs not available to this process: {', '.join(map(str, sorted(unavailable)))}")
+        # A job needs at least one CPU, so more slots than CPUs would just wait
+        self.io_slots = max(1, min(int(io_slots), len(self.cpus)))
+        self.algo = algo
+        self.auto_hints = auto_hints
+        self.retries = max(0, int(retries))
+        self.overwrite = overwrite
+        self.incremental = incremental
+        self.dedupe = dedupe
+        self.checksum = checksum
+        self.jobs = []
+        self.elapsed = 0.0
+        self._cancelled = threading.Event()
+
+    def add(self, source, output=None, algo=None, pkg_type="kzp", dest=None):
+        """
+        Queues `source`. Without an output the image is named like a single
+        pack (the .kzi basename) and saved in `dest`, or beside the folder.
+        """
+        source = os.path.abspath(source)
+        if not output:
+            folder = dest or os.path.dirname(source)
+            output = os.path.join(folder, default_package_name(source, pkg_type))
+            # Two folders with the same .kzi name must not overwrite each other
+            stem, ext = os.path.splitext(output)
+            taken = {job['output'] for job in self.jobs}
+            n = 2
+            while output in taken:
+                output = f"{stem}-{n}{ext}"
+                n += 1
+        job = {
+            'source': source,
+            'output': os.path.abspath(output),
+            'algo': algo or self.algo,
+            'pkg_type': pkg_type,
+            'status': 'queued',
+            'attempts': 0,
+            'cpus': "",
+            'percent': None,
+            'elapsed': 0.0,
+            'size': None,
+            'command': None,
+            'changes': None,
+            'error': None,
+        }
+        self.jobs.append(job)
+        return job
+
+    def add_manifest(self, path, dest=None):
+        """Queues every row of a manifest (see read_pack_manifest)."""
+        return [self.add(row['source'], row['output'], row['algo'], row['pkg_type'], dest)
+                for row in read_pack_manifest(path)]
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def retry_failed(self):
+        """Puts failed and cancelled jobs back in the queue. Returns how many."""
+        count = 0
+        for job in self.jobs:
+            if job['status'] in ('failed', 'cancelled'):
+                job.update(status='queued', attempts=0, percent=None, error=None)
+                count += 1
+        return count
+
+    def _run_job(self, job, cpus, callback):
+        if self._cancelled.is_set():
+            job['status'] = 'cancelled'
+            return job
+        job.update(status='running', cpus=",".join(str(cpu) for cpu in cpus), percent=None, error=None)
+        job['attempts'] += 1
+        if callback:
+            callback(job)
+        last_report = [0.0]
+
+        def check_cancelled():
+            if self._cancelled.is_set():
+                raise PackCancelled("Cancelled")
+
+        def on_progress(progress):
+            job['percent'] = progress['percent']
+            now = time.monotonic()
+            if callback and now - last_report[0] >= self.CALLBACK_INTERVAL:
+                last_report[0] = now
+                callback(job)
+
+        def on_changes(changes):
+            job['changes'] = count_changes(changes)
+
+        profile = dict(self.profile, cpus=job['cpus'], workers=len(cpus))
+        # Build beside the target so a failed retry never destroys the previous image
+        part_path = job['output'] + ".part"
+        start = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(job['output']), exist_ok=True)
+            cmd = create_package(job['source'], job['output'], job['algo'], pkg_type=job['pkg_type'],
+                                 progress_callback=on_progress, auto_hints=self.auto_hints, profile=profile,
+                                 incremental=self.incremental, dedupe=self.dedupe, checksum=self.checksum,
+                                 work_path=part_path, changes_callback=on_changes, cancel_check=check_cancelled)
+            if cmd is None:
+                job.update(status='skipped', error="Up to date")
+            else:
+                job.update(status='done', percent=100.0, size=os.path.getsize(job['output']), command=cmd)
+        except PackCancelled:
+            job['status'] = 'cancelled'
+        except (PackError, OSError) as e:
+            job.update(status='failed', error=str(e))
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        job['elapsed'] += time.monotonic() - start
+        return job
+
+    def run(self, callback=None):
+        """
+        Runs every queued job and returns the list of job dicts. Failed jobs go
+        to the back of the queue until they have been tried `retries` more times.
+        """
+        self._cancelled.clear()
+        pending = deque()
+        for job in self.jobs:
+            if job['status'] != 'queued':
+                continue
+            if not self.overwrite and not self.incremental and os.path.exists(job['output']):
+                job.update(status='skipped', error="Output exists")
+                if callback:
+                    callback(job)
+                continue
+            pending.append(job)
+
+        free = list(self.cpus)
+        finished = []
+        running = [0]
+        threads = []
+        condition = threading.Condition()
+        start = time.monotonic()
+
+        def worker(job, cpus):
+            try:
+                self._run_job(job, cpus, callback)
+            except Exception as e:
+                job.update(status='failed', error=str(e))
+            with condition:
+                finished.append((job, cpus))
+                condition.notify()
+
+        try:
+            with condition:
+                while pending or running[0]:
+                    if self._cancelled.is_set():
+                        while pending:
+                            job = pending.popleft()
+                            job['status'] = 'cancelled'
+                            if callback:
+                                callback(job)
+
+                    while pending and free and running[0] < self.io_slots:
+                        job = pending.popleft()
+                        startable = min(self.io_slots - running[0], len(pending) + 1)
+                        share = max(1, len(free) // startable)
+                        cpus, free[:] = free[:share], free[share:]
+                        running[0] += 1
+                        thread = threading.Thread(target=worker, args=(job, cpus), daemon=True)
+                        threads.append(thread)
+                        thread.start()
+
+                    condition.wait(0.5)
+
+                    for job, cpus in finished:
+                        running[0] -= 1
+                        free.extend(cpus)
+                        free.sort()
+                        if (job['status'] == 'failed' and job['attempts'] <= self.retries
+                                and not self._cancelled.is_set()):
+                            job['status'] = 'queued'
+                            pending.append(job)
+                        if callback:
+                            callback(job)
+                    finished.clear()
+        except BaseException:
+            # Ctrl-C: the workers are daemon threads, so without this their mkfs.erofs
+            # children would outlive us and leave .part images behind
+            self.cancel()
+            for thread in threads:
+                thread.join()
+            for job in self.jobs:
+                if job['status'] in ('queued', 'running'):
+                    job['status'] = 'cancelled'
+                part_path = job['output'] + ".part"
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+            raise
+        finally:
+            self.elapsed = time.monotonic() - start
+        return self.jobs
+
+    def summary(self):
+        """Counts per status, total output size, wall time and the failures."""
+        counts = {}
+        for job in self.jobs:
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {
+            'total': len(self.jobs),
+            'counts': counts,
+            'bytes_out': sum(job['size'] or 0 for job in self.jobs if job['status'] == 'done'),
+            'elapsed': self.elapsed,
+            'io_slots': self.io_slots,
+            'cpus': len(self.cpus),
+            'failed': [{'source': job['source'], 'error': job['error']}
+                       for job in self.jobs if job['status'] == 'failed'],
+        }
+
+    def write_report(self, path):
+        write_json_atomic(path, {'summary': self.summary(), 'jobs': [
+            dict(job, command=list(job['command']) if job['command'] else None) for job in self.jobs]})
+
+
+def format_summary(summary):
+    mb = 1024 * 1024
+    counts = ", ".join(f"{count} {status}" for status, count in sorted(summary['counts'].items()))
+    lines = [f"{summary['total']} jobs ({counts}) in {format_duration(summary['elapsed'])}, "
+             f"{summary['bytes_out'] / mb:.1f} MB written "
+             f"({summary['io_slots']} at a time on {summary['cpus']} CPUs)"]
+    for failure in summary['failed']:
+        lines.append(f"  failed: {failure['source']}: {failure['error']}")
+    return "\n".join(lines)
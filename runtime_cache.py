@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# Local Runtime Store for KZI Generator
+# Content-addressed copies of downloaded .kzr files with LRU eviction
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+from app_config import get_cache_dir, load_config, write_json_atomic
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024 * 1024 # 50 GB
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+FICLONE = 0x40049409 # linux/fs.h, copy-on-write clone on btrfs/xfs
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            buffer = f.read(HASH_CHUNK_SIZE)
+            if not buffer:
+                break
+            digest.update(buffer)
+    return digest.hexdigest()
+
+def get_cache_limit():
+    """Size cap in bytes, configurable through 'runtime_cache_max_gb' in config.json."""
+    max_gb = load_config().get('runtime_cache_max_gb')
+    if max_gb is None:
+        return DEFAULT_MAX_BYTES
+    return int(float(max_gb) * 1024 * 1024 * 1024)
+
+def clone_file(src_path, dest_path):
+    """
+    Places a copy of `src_path` at `dest_path` as cheaply as the filesystem allows:
+    reflink, then hardlink, then a plain copy. Returns the method that worked.
+    """
+    tmp_path = dest_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    try:
+        import fcntl
+        with open(src_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        os.replace(tmp_path, dest_path)
+        return "reflink"
+    except (ImportError, OSError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    try:
+        os.link(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        return "hardlink"
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+    return "copy"
+
+
+class RuntimeCache:
+    """
+    Runtime files are stored once under objects/<sha256>.kzr and indexed by URL.
+    Each index entry remembers the ETag/Last-Modified the server sent, so a
+    cached copy is only reused while it still matches the remote file.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or get_cache_dir("runtimes")
+        self.objects_dir = os.path.join(self.cache_dir, "objects")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.checks_path = os.path.join(self.cache_dir, "freshness.json")
+        self.max_bytes = get_cache_limit() if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+
+    # --- Index ---
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        write_json_atomic(self.index_path, index)
+
+    def _object_path(self, sha256):
+        return os.path.join(self.objects_dir, f"{sha256}.kzr")
+
+    def lookup(self, url, etag=None, sha256=None):
+        """
+        Returns the index entry for `url` if its object is still on disk. When an
+        ETag or checksum is given, the entry must match it as well.
+        """
+        with self._lock:
+            entry = self._load_index().get(url)
+        if not entry or not os.path.exists(self._object_path(entry['sha256'])):
+            return None
+        if etag and entry.get('etag') != etag:
+            return None
+        if sha256 and entry['sha256'] != sha256:
+            return None
+        return entry
+
+    def find_by_hash(self, sha256):
+        path = self._object_path(sha256)
+        return path if os.path.exists(path) else None
+
+    def total_size(self):
+        with self._lock:
+            index = self._load_index()
+        sizes = {entry['sha256']: entry['size'] for entry in index.values()}
+        return sum(sizes.values())
+
+    # --- Store / Restore ---
+    def add(self, url, path, etag=None, last_modified=None, sha256=None):
+        """Adds a downloaded file to the store. Returns the new index entry."""
+        if sha256 is None:
+            sha256 = sha256_file(path)
+        size = os.path.getsize(path)
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        object_path = self._object_path(sha256)
+        if not os.path.exists(object_path):
+            clone_file(path, object_path)
+
+        entry = {
+            'sha256': sha256,
+            'size': size,
+            'etag': etag,
+            'last_modified': last_modified,
+            'last_used': time.time(),
+        }
+        with self._lock:
+            index = self._load_index()
+            index[url] = entry
+            self._save_index(index)
+        self.evict()
+        return entry
+
+    def restore(self, entry, dest_path):
+        """Materializes a cached runtime at `dest_path` and marks it as recently used."""
+        object_path = self._object_path(entry['sha256'])
+        if os.path.abspath(object_path) != os.path.abspath(dest_path):
+            clone_file(object_path, dest_path)
+        self.touch(entry['sha256'])
+        return dest_path
+
+    def touch(self, sha256):
+        with self._lock:
+            index = self._load_index()
+            for entry in index.values():
+                if entry['sha256'] == sha256:
+                    entry['last_used'] = time.time()
+            self._save_index(index)
+
+    def remove(self, url):
+        with self._lock:
+            index = self._load_index()
+            entry = index.pop(url, None)
+            self._save_index(index)
+            if entry:
+                self._drop_unreferenced(index, entry['sha256'])
+
+    # --- Freshness Records ---
+    def get_checks(self):
+        """Results of the last update check, keyed by URL."""
+        try:
+            with open(self.checks_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record_checks(self, results):
+        """Stores {url: result} from an update check alongside earlier results."""
+        with self._lock:
+            checks = self.get_checks()
+            checks.update(results)
+            write_json_atomic(self.checks_path, checks)
+
+    # --- Eviction ---
+    def _drop_unreferenced(self, index, sha256):
+        if any(e['sha256'] == sha256 for e in index.values()):
+            return
+        try:
+            os.remove(self._object_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, max_bytes=None):
+        """Removes least recently used objects until the store fits under the cap."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            index = self._load_index()
+
+            # Several URLs can share one object; an object is as fresh as its newest user
+            objects = {}
+            for url, entry in index.items():
+                obj = objects.setdefault(entry['sha256'], {'size': entry['size'], 'last_used': 0, 'urls': []})
+                obj['last_used'] = max(obj['last_used'], entry.get('last_used', 0))
+                obj['urls'].append(url)
+
+            total = sum(obj['size'] for obj in objects.values())
+            evicted = []
+            for sha256, obj in sorted(objects.items(), key=lambda item: item[1]['last_used']):
+                if total <= limit:
+                    break
+                for url in obj['urls']:
+                    del index[url]
+                try:
+                    os.remove(self._object_path(sha256))
+                except FileNotFoundError:
+                    pass
+                total -= obj['size']
+                evicted.append(sha256)
+
+            if evicted:
+                self._save_index(index)
+        return evicted
@@ -0,0 +1,854 @@
+#!/usr/bin/env python3
+# Runtime Downloader for KZI Generator
+# Qt-free download logic shared by the GUI workers and headless tools
+
+import os
+import json
+import time
+import ssl
+import argparse
+import hashlib
+import threading
+import http.client
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+from runtime_cache import RuntimeCache, sha256_file, HASH_CHUNK_SIZE
+
+# Spoof a standard web browser to bypass 403 CDN blocks
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+CHUNK_SIZE = 1024 * 1024
+MAX_RETRIES = 5
+STATE_SAVE_INTERVAL = 1.0 # Seconds between sidecar updates while streaming
+
+# Segmented mode: parallel Range requests into a preallocated .part file
+DEFAULT_SEGMENTS = 4
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+
+# A successful update check this recent lets fetch_runtime skip its own probe
+FRESHNESS_TTL = 10 * 60
+
+# Errors worth retrying (dropped connections, timeouts, truncated bodies)
+RETRYABLE_ERRORS = (urllib.error.URLError, http.client.HTTPException, ConnectionError, TimeoutError)
+
+
+class DownloadError(Exception):
+    pass
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+# --- SSL ---
+def create_robust_ssl_context():
+    """
+    Creates an SSL context that works reliably on different systems, especially Linux.
+    It prioritizes the certifi package, then standard system paths.
+    """
+    cert_path = None
+    try:
+        import certifi
+        candidate_path = certifi.where()
+        if os.path.exists(candidate_path):
+            cert_path = candidate_path
+    except (ImportError, Exception):
+        pass
+
+    if not cert_path:
+        system_cert_paths = [
+            "/etc/ssl/certs/ca-certificates.crt",      # Debian/Ubuntu/Gentoo etc.
+            "/etc/pki/tls/certs/ca-bundle.crt",       # Fedora/RHEL
+        ]
+        for path in system_cert_paths:
+            if os.path.exists(path):
+                cert_path = path
+                break
+    try:
+        if cert_path:
+            return ssl.create_default_context(cafile=cert_path)
+        else:
+            return ssl.create_default_context()
+    except Exception:
+        return ssl.create_default_context()
+
+
+# --- Bandwidth Limiting ---
+class TokenBucket:
+    """
+    Global bytes/sec cap shared by every stream of a download queue. Readers
+    take tokens after each read and sleep off any debt, so one large read can
+    briefly overdraw the bucket but the long-run rate holds.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(rate, CHUNK_SIZE))
+        self.tokens = self.capacity
+        self.timestamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+            self.timestamp = now
+            self.tokens -= amount
+            debt = -self.tokens
+        if debt > 0:
+            time.sleep(debt / self.rate)
+
+def parse_rate(text):
+    """Parses '500K', '4M', '1.5G', '5MB/s' (bytes per second) into an int; '0' or '' means unlimited."""
+    text = (text or '').strip().upper()
+    if text.endswith('/S'):
+        text = text[:-2]
+    text = text.rstrip('B')
+    if not text:
+        return 0
+    multiplier = 1
+    if text[-1] in 'KMG':
+        multiplier = 1024 ** ('KMG'.index(text[-1]) + 1)
+        text = text[:-1]
+    return int(float(text) * multiplier)
+
+def _rate_argument(text):
+    """argparse type for --limit: a bad rate is a usage error, not a traceback."""
+    try:
+        return parse_rate(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid rate '{text}' (use e.g. 800K, 5M or 5MB/s)")
+
+
+# --- Partial Download State ---
+def get_part_path(save_path):
+    return save_path + ".part"
+
+def get_state_path(save_path):
+    return save_path + ".part.json"
+
+def load_resume_state(save_path, url):
+    """
+    Returns the sidecar state for an interrupted download of `url`, or None
+    if there is nothing usable to resume from.
+    """
+    part_path = get_part_path(save_path)
+    state_path = get_state_path(save_path)
+    if not os.path.exists(part_path) or not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if state.get('url') != url:
+        return None
+
+    if 'segments' in state:
+        # Preallocated file, so its size says nothing; trust the per-segment counters
+        state['downloaded'] = sum(seg[2] for seg in state['segments'])
+    else:
+        # The part file is the source of truth; the sidecar may lag behind it
+        state['downloaded'] = os.path.getsize(part_path)
+    return state
+
+def save_resume_state(save_path, state):
+    state_path = get_state_path(save_path)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+def clear_resume_state(save_path):
+    for path in (get_part_path(save_path), get_state_path(save_path)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# --- HTTP Helpers ---
+def build_request(url, headers=None, method=None):
+    all_headers = {'User-Agent': USER_AGENT}
+    if headers:
+        all_headers.update(headers)
+    return urllib.request.Request(url, headers=all_headers, method=method)
+
+def parse_content_range_total(header_value):
+    """Extracts the full length from a 'bytes start-end/total' header."""
+    if not header_value or '/' not in header_value:
+        return 0
+    total = header_value.rsplit('/', 1)[1].strip()
+    return int(total) if total.isdigit() else 0
+
+def probe_url(url, context=None, timeout=60):
+    """
+    Asks the server for size and range support without fetching the body.
+    Falls back to a one-byte ranged GET for servers that reject HEAD.
+    """
+    try:
+        with urllib.request.urlopen(build_request(url, method='HEAD'), context=context, timeout=timeout) as response:
+            return {
+                'total_size': int(response.getheader('Content-Length', 0) or 0),
+                'accept_ranges': response.getheader('Accept-Ranges', '').lower() == 'bytes',
+                'etag': response.getheader('ETag'),
+                'last_modified': response.getheader('Last-Modified'),
+            }
+    except urllib.error.HTTPError as e:
+        if e.code not in (403, 405, 501):
+            raise
+
+    with urllib.request.urlopen(build_request(url, {'Range': 'bytes=0-0'}), context=context, timeout=timeout) as response:
+        ranged = response.status == 206
+        return {
+            'total_size': parse_content_range_total(response.getheader('Content-Range')) if ranged
+                          else int(response.getheader('Content-Length', 0) or 0),
+            'accept_ranges': ranged,
+            'etag': response.getheader('ETag'),
+            'last_modified': response.getheader('Last-Modified'),
+        }
+
+def split_ranges(total_size, segments):
+    """Returns [start, end, done] triples covering 0..total_size-1."""
+    segment_size = -(-total_size // segments)
+    return [[start, min(start + segment_size, total_size) - 1, 0]
+            for start in range(0, total_size, segment_size)]
+
+
+# --- Streaming Checksums ---
+def _hash_file_range(digest, path, length):
+    with open(path, 'rb') as f:
+        remaining = length
+        while remaining > 0:
+            buffer = f.read(min(HASH_CHUNK_SIZE, remaining))
+            if not buffer:
+                break
+            digest.update(buffer)
+            remaining -= len(buffer)
+
+
+class _PrefixHasher:
+    """
+    Hashes a file that is being filled out of order. Segments land in parallel,
+    but SHA-256 needs bytes in sequence, so this follows the contiguous
+    completed prefix and reads it back while it is still in the page cache.
+    """
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.digest = hashlib.sha256()
+        self.offset = 0
+
+    def advance(self, prefix_end):
+        while self.offset < prefix_end:
+            buffer = os.pread(self.fd, min(HASH_CHUNK_SIZE, prefix_end - self.offset), self.offset)
+            if not buffer:
+                break
+            self.digest.update(buffer)
+            self.offset += len(buffer)
+
+def _contiguous_prefix(segments):
+    prefix = 0
+    for start, end, done in sorted(segments):
+        if start != prefix:
+            break
+        prefix = start + done
+        if prefix <= end:
+            break
+    return prefix
+
+
+# --- Resumable Download ---
+def _download_attempt(url, save_path, state, progress_callback, context, timeout, throttle=None):
+    part_path = get_part_path(save_path)
+    resume_from = state.get('downloaded', 0) if state else 0
+
+    headers = {}
+    if resume_from > 0:
+        headers['Range'] = f"bytes={resume_from}-"
+        # If-Range makes the server send the whole file if it changed since we started
+        validator = state.get('etag') or state.get('last_modified')
+        if validator:
+            headers['If-Range'] = validator
+
+    req = build_request(url, headers)
+    try:
+        response = urllib.request.urlopen(req, context=context, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and state and state.get('total_size') and resume_from >= state['total_size']:
+            # We already have every byte, the previous run just died before the rename
+            return state
+        if e.code == 416:
+            clear_resume_state(save_path)
+        raise
+
+    with response:
+        digest = hashlib.sha256()
+        if response.status == 206:
+            total_size = parse_content_range_total(response.getheader('Content-Range'))
+            mode = 'ab'
+            # hashlib state can't be persisted, so a resumed download re-reads only its prefix
+            _hash_file_range(digest, part_path, resume_from)
+        else:
+            # Full body: the server ignored Range or the file was republished
+            total_size = int(response.getheader('Content-Length', 0) or 0)
+            resume_from = 0
+            mode = 'wb'
+
+        state = {
+            'url': url,
+            'etag': response.getheader('ETag'),
+            'last_modified': response.getheader('Last-Modified'),
+            'total_size': total_size,
+            'downloaded': resume_from,
+        }
+        save_resume_state(save_path, state)
+
+        downloaded = resume_from
+        start_time = time.time()
+        last_save = start_time
+
+        with open(part_path, mode) as out_file:
+            while True:
+                buffer = response.read(CHUNK_SIZE)
+                if not buffer:
+                    break
+
+                out_file.write(buffer)
+                digest.update(buffer)
+                downloaded += len(buffer)
+                if throttle:
+                    throttle.consume(len(buffer))
+
+                now = time.time()
+                if now - last_save >= STATE_SAVE_INTERVAL:
+                    out_file.flush()
+                    state['downloaded'] = downloaded
+                    save_resume_state(save_path, state)
+                    last_save = now
+
+                if progress_callback:
+                    elapsed_time = now - start_time
+                    speed = (downloaded - resume_from) / elapsed_time if elapsed_time > 0 else 0
+                    progress_callback(downloaded, total_size, speed)
+
+        state['downloaded'] = downloaded
+        save_resume_state(save_path, state)
+
+    if total_size and downloaded < total_size:
+        raise http.client.IncompleteRead(b'', total_size - downloaded)
+
+    state['sha256'] = digest.hexdigest()
+    return state
+
+
+# --- Segmented Download ---
+class _RestartDownload(Exception):
+    """The remote file changed between segments; the plan has to be thrown away."""
+
+
+def _fetch_segment(url, fd, segment, validator, lock, context, timeout, retries, cancelled, throttle):
+    attempt = 0
+    while True:
+        start, end, done = segment
+        if start + done > end:
+            return
+        headers = {'Range': f"bytes={start + done}-{end}"}
+        if validator:
+            headers['If-Range'] = validator
+        try:
+            with urllib.request.urlopen(build_request(url, headers), context=context, timeout=timeout) as response:
+                if response.status != 206:
+                    raise _RestartDownload()
+                offset = start + done
+                while not cancelled.is_set():
+                    buffer = response.read(min(CHUNK_SIZE, end - offset + 1))
+                    if not buffer:
+                        break
+                    os.pwrite(fd, buffer, offset)
+                    offset += len(buffer)
+                    with lock:
+                        segment[2] += len(buffer)
+                    if throttle:
+                        throttle.consume(len(buffer))
+                    if offset > end:
+                        return
+                if cancelled.is_set():
+                    return
+            raise http.client.IncompleteRead(b'', end - offset + 1)
+        except RETRYABLE_ERRORS:
+            attempt += 1
+            if attempt > retries or cancelled.is_set():
+                raise
+            time.sleep(min(2 ** attempt, 30))
+
+def _segmented_download(url, save_path, probe, segments, progress_callback, context, timeout, retries, throttle=None):
+    part_path = get_part_path(save_path)
+    total_size = probe['total_size']
+
+    state = load_resume_state(save_path, url)
+    if not (state and state.get('segments') and state.get('total_size') == total_size
+            and state.get('etag') == probe['etag'] and state.get('last_modified') == probe['last_modified']):
+        clear_resume_state(save_path)
+        state = {
+            'url': url,
+            'etag': probe['etag'],
+            'last_modified': probe['last_modified'],
+            'total_size': total_size,
+            'segments': split_ranges(total_size, segments),
+        }
+    resume_from = sum(seg[2] for seg in state['segments'])
+    validator = state['etag'] or state['last_modified']
+
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        # Sparse preallocation; every range writes into its own slice
+        os.ftruncate(fd, total_size)
+        save_resume_state(save_path, state)
+
+        lock = threading.Lock()
+        cancelled = threading.Event()
+        hasher = _PrefixHasher(fd)
+        start_time = time.time()
+        last_save = start_time
+
+        with ThreadPoolExecutor(max_workers=len(state['segments'])) as pool:
+            futures = [
+                pool.submit(_fetch_segment, url, fd, seg, validator, lock, context, timeout, retries, cancelled, throttle)
+                for seg in state['segments']
+            ]
+            pending = futures
+            try:
+                while pending:
+                    done_set, pending = wait(pending, timeout=0.25, return_when=FIRST_EXCEPTION)
+                    for future in done_set:
+                        future.result() # Re-raise the first segment failure
+
+                    with lock:
+                        downloaded = sum(seg[2] for seg in state['segments'])
+                        snapshot = dict(state, segments=[list(seg) for seg in state['segments']])
+                    hasher.advance(_contiguous_prefix(snapshot['segments']))
+
+                    now = time.time()
+                    if now - last_save >= STATE_SAVE_INTERVAL:
+                        save_resume_state(save_path, snapshot)
+                        last_save = now
+
+                    if progress_callback:
+                        elapsed_time = now - start_time
+                        speed = (downloaded - resume_from) / elapsed_time if elapsed_time > 0 else 0
+                        progress_callback(downloaded, total_size, speed)
+            except BaseException:
+                cancelled.set()
+                raise
+            finally:
+                with lock:
+                    save_resume_state(save_path, dict(state, segments=[list(seg) for seg in state['segments']]))
+
+        hasher.advance(total_size)
+        state['sha256'] = hasher.digest.hexdigest()
+    finally:
+        os.close(fd)
+
+    return state
+
+
+# --- Public Entry Point ---
+def download_file(url, save_path, progress_callback=None, context=None, retries=MAX_RETRIES, timeout=60,
+                  segments=1, expected_size=None, expected_sha256=None, throttle=None):
+    """
+    Downloads `url` to `save_path`, resuming from a previous `.part` file when
+    possible. Bytes are written to `<save_path>.part` with a JSON sidecar and the
+    finished file is moved into place atomically.
+
+    With segments > 1 the file is fetched as that many parallel Range requests,
+    falling back to a single stream when the server does not support ranges.
+
+    The SHA-256 is computed while the bytes arrive and returned in the state
+    dict. A file that does not match `expected_size`/`expected_sha256` is
+    discarded before it ever reaches `save_path`.
+
+    `throttle` is an optional TokenBucket shared with other downloads.
+
+    progress_callback(downloaded_bytes, total_bytes, bytes_per_second) is called
+    as data arrives; raising DownloadCancelled from it stops the download and
+    keeps the .part file for a later resume.
+    """
+    if context is None:
+        context = create_robust_ssl_context()
+
+    probe = None
+    if segments > 1 and hasattr(os, 'pwrite'):
+        try:
+            probe = probe_url(url, context, timeout)
+        except RETRYABLE_ERRORS:
+            probe = None
+        if probe and (not probe['accept_ranges'] or probe['total_size'] < 2 * MIN_SEGMENT_SIZE):
+            probe = None
+
+    attempt = 0
+    while True:
+        state = load_resume_state(save_path, url)
+        if state is None or (probe is None and 'segments' in state):
+            # Stale or foreign leftovers, start clean
+            clear_resume_state(save_path)
+            state = None
+        try:
+            if probe:
+                segment_count = min(segments, probe['total_size'] // MIN_SEGMENT_SIZE)
+                state = _segmented_download(url, save_path, probe, segment_count, progress_callback,
+                                            context, timeout, retries, throttle)
+            else:
+                state = _download_attempt(url, save_path, state, progress_callback, context, timeout, throttle)
+            break
+        except _RestartDownload:
+            clear_resume_state(save_path)
+            probe = probe_url(url, context, timeout)
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError("The remote file kept changing during the download.")
+            continue
+        except urllib.error.HTTPError as e:
+            # Server errors may be transient, client errors will not fix themselves
+            if e.code < 500 and e.code != 416:
+                raise DownloadError(f"HTTP {e.code}: {e.reason}")
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"HTTP {e.code}: {e.reason}")
+        except RETRYABLE_ERRORS as e:
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"Download interrupted after {retries} retries: {e}")
+        time.sleep(min(2 ** attempt, 30))
+
+    part_path = get_part_path(save_path)
+    if 'sha256' not in state:
+        # Finished by an earlier run that died before the rename
+        state['sha256'] = sha256_file(part_path)
+
+    actual_size = os.path.getsize(part_path)
+    if expected_size is not None and actual_size != expected_size:
+        clear_resume_state(save_path)
+        raise DownloadError(f"Size mismatch: expected {expected_size} bytes, got {actual_size}.")
+    if expected_sha256 and state['sha256'] != expected_sha256.lower():
+        clear_resume_state(save_path)
+        raise DownloadError(f"Checksum mismatch: expected {expected_sha256}, got {state['sha256']}.")
+
+    os.replace(part_path, save_path)
+    clear_resume_state(save_path)
+    return state
+
+
+# --- Cached Fetch ---
+def _cache_entry_is_current(entry, probe):
+    if entry.get('etag') and probe.get('etag'):
+        return entry['etag'] == probe['etag']
+    if entry.get('last_modified') and probe.get('last_modified'):
+        return entry['last_modified'] == probe['last_modified'] and entry['size'] == probe['total_size']
+    return False
+
+def _recently_confirmed(cache, url, entry):
+    check = cache.get_checks().get(url)
+    return bool(check and check['status'] == 'current' and check.get('sha256') == entry['sha256']
+                and time.time() - check['checked_at'] < FRESHNESS_TTL)
+
+def fetch_runtime(url, save_path, progress_callback=None, context=None, segments=DEFAULT_SEGMENTS, cache=None,
+                  expected_size=None, expected_sha256=None, throttle=None):
+    """
+    Saves the runtime at `url` to `save_path`, serving it from the local runtime
+    store when the cached copy still matches the server. Returns 'cache' or
+    'network' depending on where the bytes came from.
+    """
+    if context is None:
+        context = create_robust_ssl_context()
+    if cache is None:
+        cache = RuntimeCache()
+
+    if expected_sha256:
+        # A pinned checksum identifies the content; no need to ask the server
+        entry = cache.lookup(url, sha256=expected_sha256.lower())
+        if entry:
+            cache.restore(entry, save_path)
+            if progress_callback:
+                progress_callback(entry['size'], entry['size'], 0)
+            return 'cache'
+
+    entry = cache.lookup(url)
+    if entry and expected_sha256 and entry['sha256'] != expected_sha256.lower():
+        entry = None
+    if entry and _recently_confirmed(cache, url, entry):
+        cache.restore(entry, save_path)
+        if progress_callback:
+            progress_callback(entry['size'], entry['size'], 0)
+        return 'cache'
+    if entry:
+        try:
+            probe = probe_url(url, context)
+        except RETRYABLE_ERRORS:
+            probe = None # Offline or the URL is gone; what we have is the best we can do
+        if probe is None or _cache_entry_is_current(entry, probe):
+            cache.restore(entry, save_path)
+            if progress_callback:
+                progress_callback(entry['size'], entry['size'], 0)
+            return 'cache'
+
+    state = download_file(url, save_path, progress_callback, context, segments=segments,
+                          expected_size=expected_size, expected_sha256=expected_sha256, throttle=throttle)
+    cache.add(url, save_path, state.get('etag'), state.get('last_modified'), sha256=state['sha256'])
+    return 'network'
+
+
+# --- Update Checks ---
+def check_freshness(url, entry=None, context=None, timeout=30):
+    """
+    Asks the server whether `url` changed since it was cached, using a
+    conditional HEAD (If-None-Match / If-Modified-Since) so no body is sent.
+
+    Returns a dict whose 'status' is 'current' (304 or matching validators),
+    'changed', 'not cached' or 'error'.
+    """
+    result = {'url': url, 'checked_at': time.time(), 'size': entry['size'] if entry else None,
+              'sha256': entry['sha256'] if entry else None, 'error': None}
+
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        req = build_request(url, headers, method='HEAD')
+        with urllib.request.urlopen(req, context=context, timeout=timeout) as response:
+            remote = {
+                'total_size': int(response.getheader('Content-Length', 0) or 0),
+                'etag': response.getheader('ETag'),
+                'last_modified': response.getheader('Last-Modified'),
+            }
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            result['status'] = 'current'
+            return result
+        if e.code in (403, 405, 501):
+            # HEAD refused: fall back to a full probe and compare validators ourselves
+            try:
+                remote = probe_url(url, context, timeout)
+            except RETRYABLE_ERRORS as probe_error:
+                result.update(status='error', error=str(probe_error))
+                return result
+        else:
+            result.update(status='error', error=f"HTTP {e.code}: {e.reason}")
+            return result
+    except RETRYABLE_ERRORS as e:
+        result.update(status='error', error=str(e))
+        return result
+
+    if entry is None:
+        result.update(status='not cached', size=remote['total_size'])
+    elif _cache_entry_is_current(entry, remote):
+        # Some servers ignore conditionals on HEAD and answer 200 anyway
+        result['status'] = 'current'
+    else:
+        result.update(status='changed', size=remote['total_size'])
+    return result
+
+def check_for_updates(urls, cache=None, context=None, max_workers=8):
+    """
+    Checks every URL in parallel against the runtime cache and records the
+    results. Returns {url: result} as produced by check_freshness.
+    """
+    if cache is None:
+        cache = RuntimeCache()
+    if context is None:
+        context = create_robust_ssl_context()
+
+    urls = list(urls)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as pool:
+        results = list(pool.map(lambda url: check_freshness(url, cache.lookup(url), context), urls))
+
+    by_url = {result['url']: result for result in results}
+    cache.record_checks(by_url)
+    return by_url
+
+
+# --- Download Queue ---
+class DownloadQueue:
+    """
+    Fetches many runtimes with at most `max_concurrency` running at once and an
+    optional global bandwidth cap (bytes/sec, 0 = unlimited). Items are plain
+    dicts so the GUI and the command line can both display them.
+    """
+
+    CALLBACK_INTERVAL = 0.2
+
+    def __init__(self, max_concurrency=2, rate_limit=0, context=None, cache=None, segments=DEFAULT_SEGMENTS):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.throttle = TokenBucket(rate_limit) if rate_limit else None
+        self.context = context or create_robust_ssl_context()
+        self.cache = cache or RuntimeCache()
+        self.segments = segments
+        self.items = []
+        self._cancelled = threading.Event()
+
+    def add(self, entry, save_path):
+        """Queues a runtime manifest entry to be saved at `save_path`."""
+        item = {
+            'name': entry['name'],
+            'url': entry['url'],
+            'save_path': save_path,
+            'expected_size': entry.get('size'),
+            'expected_sha256': entry.get('sha256'),
+            'status': 'queued',
+            'downloaded': 0,
+            'total': entry.get('size') or 0,
+            'speed': 0,
+            'source': None,
+            'error': None,
+        }
+        self.items.append(item)
+        return item
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def totals(self):
+        downloaded = sum(item['downloaded'] for item in self.items)
+        total = sum(item['total'] for item in self.items)
+        return downloaded, total
+
+    def _run_item(self, item, callback):
+        if self._cancelled.is_set():
+            item['status'] = 'cancelled'
+            if callback:
+                callback(item)
+            return item
+
+        item['status'] = 'downloading'
+        if callback:
+            callback(item)
+        last_report = [0.0]
+
+        def on_progress(downloaded, total, speed):
+            if self._cancelled.is_set():
+                raise DownloadCancelled()
+            item['downloaded'] = downloaded
+            item['total'] = total or item['total']
+            item['speed'] = speed
+            now = time.monotonic()
+            if callback and now - last_report[0] >= self.CALLBACK_INTERVAL:
+                last_report[0] = now
+                callback(item)
+
+        try:
+            item['source'] = fetch_runtime(
+                item['url'], item['save_path'], progress_callback=on_progress, context=self.context,
+                segments=self.segments, cache=self.cache, expected_size=item['expected_size'],
+                expected_sha256=item['expected_sha256'], throttle=self.throttle
+            )
+            item['downloaded'] = item['total'] = os.path.getsize(item['save_path'])
+            item['status'] = 'done'
+        except DownloadCancelled:
+            item['status'] = 'cancelled'
+        except Exception as e:
+            item['status'] = 'failed'
+            item['error'] = str(e)
+
+        item['speed'] = 0
+        if callback:
+            callback(item)
+        return item
+
+    def run(self, callback=None):
+        """Runs every queued item and returns the list of item dicts."""
+        pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            list(pool.map(lambda item: self._run_item(item, callback), self.items))
+        except BaseException:
+            # Ctrl-C: running downloads stop at their next progress report, queued ones never start
+            self.cancel()
+            pool.shutdown(wait=True, cancel_futures=True)
+            for item in self.items:
+                if item['status'] == 'queued':
+                    item['status'] = 'cancelled'
+            raise
+        pool.shutdown()
+        return self.items
+
+
+# --- Command Line ---
+def main(argv=None):
+    from runtime_manifest import load_runtime_manifest
+
+    parser = argparse.ArgumentParser(description="Download Kazeta runtimes without the GUI.")
+    parser.add_argument('names', nargs='*', help="Runtime names as listed by --list")
+    parser.add_argument('--all', action='store_true', help="Download every runtime in the manifest")
+    parser.add_argument('--list', action='store_true', help="List the available runtimes and exit")
+    parser.add_argument('--dest', default='.', help="Destination folder (default: current directory)")
+    parser.add_argument('--jobs', type=int, default=2, help="Maximum concurrent downloads (default: 2)")
+    parser.add_argument('--limit', type=_rate_argument, default='0', help="Global bandwidth cap, e.g. 800K or 5M per second (default: unlimited)")
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS, help="Parallel connections per file")
+    parser.add_argument('--check', action='store_true',
+                        help="Check cached runtimes for updates; with --update, download only the changed ones")
+    parser.add_argument('--update', action='store_true', help="Used with --check: fetch runtimes that changed")
+    args = parser.parse_args(argv)
+
+    manifest = load_runtime_manifest()
+    if args.list:
+        for entry in manifest:
+            print(f"{entry['name']:<28} {entry['url']}")
+        return 0
+
+    if args.check:
+        results = check_for_updates(entry['url'] for entry in manifest)
+        print(f"{'Runtime':<28} {'Status':<11} {'Size':>10}  Last checked")
+        for entry in manifest:
+            result = results[entry['url']]
+            size = f"{result['size']/1024/1024:.1f} MB" if result['size'] else "-"
+            checked = time.strftime('%Y-%m-%d %H:%M', time.localtime(result['checked_at']))
+            print(f"{entry['name']:<28} {result['status']:<11} {size:>10}  {checked}")
+        if not args.update:
+            return 0
+        selected = [entry for entry in manifest if results[entry['url']]['status'] == 'changed']
+        if not selected:
+            print("Everything is up to date.")
+            return 0
+        args.all = False
+        args.names = [entry['name'] for entry in selected]
+
+    by_name = {entry['name']: entry for entry in manifest}
+    selected = list(manifest) if args.all else []
+    for name in args.names:
+        if name not in by_name:
+            parser.error(f"unknown runtime '{name}' (see --list)")
+        selected.append(by_name[name])
+    if not selected:
+        parser.error("nothing to download; name some runtimes or pass --all")
+
+    os.makedirs(args.dest, exist_ok=True)
+    queue = DownloadQueue(args.jobs, args.limit, segments=args.segments)
+    for entry in selected:
+        queue.add(entry, os.path.join(args.dest, os.path.basename(entry['url'])))
+
+    def report(item):
+        if item['status'] in ('done', 'failed', 'cancelled'):
+            detail = item['error'] or item['source'] or ''
+            print(f"{item['status']:>9}  {item['name']}  {detail}", flush=True)
+
+    try:
+        queue.run(report)
+    except KeyboardInterrupt:
+        queue.cancel()
+        print("Cancelled; partial downloads are kept and will resume next time.")
+        return 130
+
+    downloaded, total = queue.totals()
+    failed = [item for item in queue.items if item['status'] != 'done']
+    print(f"{len(queue.items) - len(failed)}/{len(queue.items)} runtimes ready, {downloaded/1024/1024:.2f} MB")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
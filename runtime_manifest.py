@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Runtime Manifest for KZI Generator
+# Every downloadable runtime with its expected size and SHA-256
+
+import os
+import json
+
+from app_config import get_config_dir
+
+# name:     label shown in the "Download runtimes" group
+# category: row the runtime is listed under
+# runtime:  value written to the Runtime= key of a .kzi
+# size / sha256: expected length and checksum; None means "not pinned yet",
+#                in which case the download is accepted as served
+RUNTIME_MANIFEST = [
+    {"name": "Linux", "category": "Linux", "runtime": "linux",
+     "url": "https://runtimes.kazeta.org/linux-1.0.kzr", "size": None, "sha256": None},
+    {"name": "Linux 1.1", "category": "Linux", "runtime": "linux-1.1",
+     "url": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/linux-1.1.kzr", "size": None, "sha256": None},
+    {"name": "Windows", "category": "Windows", "runtime": "windows",
+     "url": "https://runtimes.kazeta.org/windows-1.0.kzr", "size": None, "sha256": None},
+    {"name": "Windows 1.1", "category": "Windows", "runtime": "windows-1.1",
+     "url": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/windows-1.1.kzr", "size": None, "sha256": None},
+    {"name": "Windows 1.2 (Experimental)", "category": "Windows", "runtime": "windows-1.2",
+     "url": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/windows-1.2-experimental.kzr", "size": None, "sha256": None},
+    {"name": "NES", "category": "Emulators", "runtime": "nes",
+     "url": "https://runtimes.kazeta.org/nes-1.0.kzr", "size": None, "sha256": None},
+    {"name": "SNES", "category": "Emulators", "runtime": "snes",
+     "url": "https://runtimes.kazeta.org/snes-1.0.kzr", "size": None, "sha256": None},
+    {"name": "Sega Genesis/Mega Drive", "category": "Emulators", "runtime": "megadrive",
+     "url": "https://runtimes.kazeta.org/megadrive-1.1.kzr", "size": None, "sha256": None},
+    {"name": "Nintendo 64", "category": "Emulators", "runtime": "nintendo64",
+     "url": "https://runtimes.kazeta.org/nintendo64-1.0.kzr", "size": None, "sha256": None},
+    {"name": "Dreamcast", "category": "Emulators", "runtime": "dreamcast",
+     "url": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/dreamcast-1.0.kzr", "size": None, "sha256": None},
+    {"name": "GameCube/Wii", "category": "Emulators", "runtime": "dolphin",
+     "url": "https://github.com/the-outcaster/kazeta-plus/releases/download/runtimes/dolphin-1.0.kzr", "size": None, "sha256": None},
+]
+
+
+def get_override_path():
+    return os.path.join(get_config_dir(), "runtimes.json")
+
+def load_runtime_manifest():
+    """
+    Returns the bundled manifest, with sizes/checksums from
+    ~/.config/kzi-cartridge-generator/runtimes.json layered on top. The override
+    file is a list of {"name": ..., "size": ..., "sha256": ...} objects; it can
+    pin checksums but never add or redirect URLs.
+    """
+    manifest = [dict(entry) for entry in RUNTIME_MANIFEST]
+    try:
+        with open(get_override_path(), 'r') as f:
+            overrides = json.load(f)
+    except (OSError, ValueError):
+        return manifest
+
+    by_name = {entry['name']: entry for entry in manifest}
+    for override in overrides:
+        entry = by_name.get(override.get('name'))
+        if entry is None:
+            continue
+        if override.get('size') is not None:
+            entry['size'] = int(override['size'])
+        if override.get('sha256'):
+            entry['sha256'] = override['sha256'].lower()
+    return manifest
+
+def get_runtime_entry(name, manifest=None):
+    for entry in manifest or load_runtime_manifest():
+        if entry['name'] == name:
+            return entry
+    raise KeyError(f"Unknown runtime: {name}")
+
+def get_runtime_categories(manifest=None):
+    """Runtime names grouped by category, in manifest order."""
+    categories = {}
+    for entry in manifest or load_runtime_manifest():
+        categories.setdefault(entry['category'], []).append(entry['name'])
+    return categories
@@ -6,12 +6,14 @@ import json
 import urllib.request
 import urllib.parse
 from io import BytesIO
-import ssl
 import traceback
 
 from PyQt6.QtWidgets import QMessageBox, QInputDialog, QFileDialog, QLineEdit
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from app_config import load_config, save_config
+from runtime_downloader import USER_AGENT, create_robust_ssl_context
+
 # --- Pillow (PIL) Dependency Check ---
 try:
     from PIL import Image
@@ -19,56 +21,13 @@ try:
 except ImportError:
     PIL_AVAILABLE = False
 
-# Standard browser spoof to bypass Cloudflare/API 403 blocks
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-
 # --- Robust SSL Context Fix ---
-def create_robust_ssl_context():
-    """
-    Creates an SSL context that works reliably on different systems, especially Linux.
-    It prioritizes the certifi package, then standard system paths.
-    """
-    cert_path = None
-    try:
-        import certifi
-        candidate_path = certifi.where()
-        if os.path.exists(candidate_path):
-            cert_path = candidate_path
-    except (ImportError, Exception):
-        pass
-
-    if not cert_path:
-        system_cert_paths = [
-            "/etc/ssl/certs/ca-certificates.crt",      # Debian/Ubuntu/Gentoo etc.
-            "/etc/pki/tls/certs/ca-bundle.crt",       # Fedora/RHEL
-        ]
-        for path in system_cert_paths:
-            if os.path.exists(path):
-                cert_path = path
-                break
-    try:
-        if cert_path:
-            return ssl.create_default_context(cafile=cert_path)
-        else:
-            return ssl.create_default_context()
-    except Exception:
-        return ssl.create_default_context()
-
 ssl_context = create_robust_ssl_context()
 
 
 # --- API Key Management ---
 def get_steamgriddb_api_key(parent_window):
-    config_dir = os.path.join(os.path.expanduser("~"), ".config", "kzi-cartridge-generator")
-    config_file = os.path.join(config_dir, "config.json")
-
-    config = {}
-    if os.path.exists(config_file):
-        with open(config_file, 'r') as f:
-            try:
-                config = json.load(f)
-            except json.JSONDecodeError:
-                pass
+    config = load_config()
 
     if 'steamgriddb_api_key' in config and config['steamgriddb_api_key']:
         return config['steamgriddb_api_key']
@@ -83,9 +42,7 @@ def get_steamgriddb_api_key(parent_window):
             clean_key = key.strip()
             if clean_key:
                 config['steamgriddb_api_key'] = clean_key
-                os.makedirs(config_dir, exist_ok=True)
-                with open(config_file, 'w') as f:
-                    json.dump(config, f, indent=4)
+                save_config(config)
                 return clean_key
     return None
 
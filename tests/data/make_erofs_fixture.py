@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# EROFS Test Fixture for KZI Generator
+# Writes tests/data/fixture.erofs, a small hand-laid image covering the layouts erofs_reader handles
+
+# Run from the repository root; needs the lz4 package. The image is checked in,
+# so this only has to be run again when the fixture changes.
+
+import os
+import stat
+import struct
+
+BLOCK_SIZE = 4096
+BUILD_TIME = 1700000000
+META_BLKADDR = 1
+IMAGE_BLOCKS = 13
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixture.erofs")
+
+S_IFDIR, S_IFREG, S_IFLNK = 0o040000, 0o100000, 0o120000
+FT_REG_FILE, FT_DIR, FT_SYMLINK = 1, 2, 7
+FLAT_PLAIN, COMPRESSED_FULL, FLAT_INLINE, CHUNK_BASED = 0, 1, 2, 4
+NULL_ADDR = 0xFFFFFFFF
+
+KZI_TEXT = b"[KZI]\nName=Fixture Game\nId=fixture-game\nExec=game/run.sh\nIcon=icon.png\n"
+
+
+def contents():
+    """The file data in the image; test_erofs_reader compares against it."""
+    big = bytes((i * 7 + 3) % 251 for i in range(BLOCK_SIZE + 100))
+    plain = bytes((i * 13 + 5) % 253 for i in range(2 * BLOCK_SIZE + 10))
+    comp_a = (b"The quick brown fox jumps over the lazy dog. " * 200)[:5000]
+    comp_b = bytes((i * 31 + 17) % 256 for i in range(4096))
+    comp_c = (b"0123456789abcdef" * 500)[:16384 - 9096]
+    chunk0 = b"A" * BLOCK_SIZE
+    chunk2 = b"C" * 1000
+    return {
+        'big.bin': big,
+        'plain.bin': plain,
+        'comp.bin': (comp_a, comp_b, comp_c),
+        'chunked.bin': (chunk0, chunk2),
+    }
+
+
+def dirent_blocks(entries):
+    """Packs sorted [(name, nid, file_type)] into dirent blocks."""
+    blocks, current = [], []
+    for entry in entries:
+        trial = current + [entry]
+        if len(trial) * 12 + sum(len(name) for name, _, _ in trial) > BLOCK_SIZE:
+            blocks.append(current)
+            trial = [entry]
+        current = trial
+    blocks.append(current)
+
+    data = b""
+    for i, block in enumerate(blocks):
+        name_off = len(block) * 12
+        heads, names = b"", b""
+        for name, nid, file_type in block:
+            heads += struct.pack('<QHBB', nid, name_off + len(names), file_type, 0)
+            names += name.encode()
+        raw = heads + names
+        # Every block but the last is padded to a full block
+        data += raw if i + 1 == len(blocks) else raw.ljust(BLOCK_SIZE, b'\0')
+    return data
+
+
+def main():
+    import lz4.block
+
+    data = contents()
+    comp_a, comp_b, comp_c = data['comp.bin']
+    chunk0, chunk2 = data['chunked.bin']
+    many = [f"file-{i:03d}" for i in range(250)]
+
+    # Inodes in metadata order; inline data sizes do not depend on nids, so lay out first
+    inodes = [
+        ('/', S_IFDIR | 0o755, FLAT_INLINE),
+        ('/sub', S_IFDIR | 0o755, FLAT_INLINE),
+        ('/sub/nested.txt', S_IFREG | 0o644, FLAT_INLINE),
+        ('/sub/up', S_IFLNK | 0o777, FLAT_INLINE),
+        ('/sub/abs', S_IFLNK | 0o777, FLAT_INLINE),
+        ('/fixture.kzi', S_IFREG | 0o644, FLAT_INLINE),
+        ('/big.bin', S_IFREG | 0o644, FLAT_INLINE),
+        ('/plain.bin', S_IFREG | 0o755, FLAT_PLAIN),
+        ('/chunked.bin', S_IFREG | 0o644, CHUNK_BASED),
+        ('/comp.bin', S_IFREG | 0o644, COMPRESSED_FULL),
+        ('/link', S_IFLNK | 0o777, FLAT_INLINE),
+        ('/many', S_IFDIR | 0o755, FLAT_PLAIN),
+        ('/many/empty', S_IFREG | 0o644, FLAT_PLAIN),
+    ]
+    children = {
+        '/': ['big.bin', 'chunked.bin', 'comp.bin', 'fixture.kzi', 'link', 'many', 'plain.bin', 'sub'],
+        '/sub': ['abs', 'nested.txt', 'up'],
+    }
+    symlinks = {'/sub/up': b"../fixture.kzi", '/sub/abs': b"/etc/passwd", '/link': b"sub/nested.txt"}
+
+    def dir_data(path, nids):
+        parent = path.rsplit('/', 1)[0] or '/'
+        entries = [('.', nids[path], FT_DIR), ('..', nids[parent], FT_DIR)]
+        if path == '/many':
+            entries += [(name, nids['/many/empty'], FT_REG_FILE) for name in many]
+        else:
+            for name in children[path]:
+                child = path.rstrip('/') + '/' + name
+                mode = next(m for p, m, _ in inodes if p == child)
+                file_type = FT_DIR if stat.S_ISDIR(mode) else FT_SYMLINK if stat.S_ISLNK(mode) else FT_REG_FILE
+                entries.append((name, nids[child], file_type))
+        return dirent_blocks(sorted(entries))
+
+    def inline_data(path, nids):
+        if path in symlinks:
+            return symlinks[path]
+        if path == '/sub/nested.txt':
+            return b"nested\n"
+        if path == '/fixture.kzi':
+            return KZI_TEXT
+        if path == '/big.bin':
+            return data['big.bin'][BLOCK_SIZE:]
+        if path in ('/', '/sub'):
+            return dir_data(path, nids)
+        return b""
+
+    # Blocks after the metadata block
+    big_blk, plain_blk, chunk_blk, many_blk, comp_blk = 2, 3, 6, 8, 10
+
+    def tail_size(path):
+        """Bytes after the 32-byte inode: inline data, or the index area."""
+        if path == '/chunked.bin':
+            return 3 * 4
+        if path == '/comp.bin':
+            return 8 + 4 * 8
+        return len(inline_data(path, {p: 0 for p, _, _ in inodes}))
+
+    nids, pos = {}, 0
+    for path, _, _ in inodes:
+        nids[path] = pos // 32
+        pos += -(-(32 + tail_size(path)) // 32) * 32
+    assert pos <= BLOCK_SIZE
+    many_data = dir_data('/many', nids)
+    assert BLOCK_SIZE < len(many_data) <= 2 * BLOCK_SIZE # the folder spans two blocks
+    dir_links = {'/': 4, '/sub': 2, '/many': 2}
+
+    meta = bytearray(BLOCK_SIZE)
+    for path, mode, layout in inodes:
+        nlink, blkaddr, extra = 1, 0, b""
+        if path == '/big.bin':
+            size, blkaddr = len(data['big.bin']), big_blk
+            extra = inline_data(path, nids)
+        elif path == '/plain.bin':
+            size, blkaddr = len(data['plain.bin']), plain_blk
+        elif path == '/chunked.bin':
+            size, blkaddr = 2 * BLOCK_SIZE + len(chunk2), 0 # chunk format 0: 4 KB chunks, 4-byte block map
+            extra = struct.pack('<III', chunk_blk, NULL_ADDR, chunk_blk + 1)
+        elif path == '/comp.bin':
+            size, blkaddr = 16384, 3 # compressed block count
+            # Map header: no inline tail, lz4 for HEAD1, 4 KB lclusters
+            extra = struct.pack('<IHBB', 0, 0, 0, 0)
+            # lcn 0: lz4 extent A at 0; lcn 1: plain extent B at 5000; lcn 2: lz4 extent C at 9096; lcn 3: part of C
+            extra += struct.pack('<HHI', 1, 0, comp_blk)
+            extra += struct.pack('<HHI', 0, 5000 - BLOCK_SIZE, comp_blk + 1)
+            extra += struct.pack('<HHI', 1, 9096 - 2 * BLOCK_SIZE, comp_blk + 2)
+            extra += struct.pack('<HHHH', 2, 0, 1, 1)
+        elif path == '/many':
+            size, blkaddr, nlink = len(many_data), many_blk, dir_links[path]
+        elif path == '/many/empty':
+            size, nlink = 0, len(many)
+        else:
+            extra = inline_data(path, nids)
+            size = len(extra)
+            nlink = dir_links.get(path, 1)
+        i_format = layout << 1
+        inode = struct.pack('<HHHHIIIIHHI', i_format, 0, mode, nlink, size, nids[path], blkaddr, nids[path], 1000, 1000, 0)
+        start = nids[path] * 32
+        meta[start:start + 32 + len(extra)] = inode + extra
+
+    sb = struct.pack('<IIIBBHQQIIII', 0xE0F5E1E2, 0, 0, 12, 0, nids['/'], len(inodes), BUILD_TIME, 0, IMAGE_BLOCKS, META_BLKADDR, 0)
+    sb += bytes(range(16)) + b"kzi-fixture".ljust(16, b'\0')
+    sb += struct.pack('<I', 0x01 | 0x04) # zero padding, chunked files
+    sb = sb.ljust(128, b'\0')
+
+    def pcluster(payload):
+        """An lz4 pcluster: the compressed bytes right-aligned in one block (zero padding)."""
+        compressed = lz4.block.compress(payload, store_size=False)
+        assert len(compressed) < BLOCK_SIZE
+        return compressed.rjust(BLOCK_SIZE, b'\0')
+
+    image = bytearray(IMAGE_BLOCKS * BLOCK_SIZE)
+    image[1024:1024 + 128] = sb
+    image[BLOCK_SIZE:2 * BLOCK_SIZE] = meta
+
+    def put(blk, payload):
+        image[blk * BLOCK_SIZE:blk * BLOCK_SIZE + len(payload)] = payload
+
+    put(big_blk, data['big.bin'][:BLOCK_SIZE])
+    put(plain_blk, data['plain.bin'])
+    put(chunk_blk, chunk0)
+    put(chunk_blk + 1, chunk2)
+    put(many_blk, many_data)
+    put(comp_blk, pcluster(comp_a))
+    put(comp_blk + 1, comp_b)
+    put(comp_blk + 2, pcluster(comp_c))
+
+    with open(OUTPUT, 'wb') as f:
+        f.write(image)
+    print(f"Wrote {OUTPUT} ({len(image)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
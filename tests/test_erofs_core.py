@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# Tests for the KZI Generator EROFS core
+# Progress and cancellation of package builds
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import erofs_core
+from erofs_checksum import hash_chunks
+from erofs_core import MkfsProgress, PackCancelled, create_package
+
+MB = 1024 * 1024
+
+
+class MkfsProgressTests(unittest.TestCase):
+
+    def sample(self, rchar, reported=None):
+        progress = MkfsProgress("/nonexistent/out.kzp", 100 * MB)
+        progress.reported_percent = reported
+        with mock.patch.object(erofs_core, '_read_bytes_of', return_value=rchar):
+            return progress.sample(1)
+
+    def test_bytes_read_drive_the_percentage(self):
+        # What mkfs.erofs prints is ignored while /proc/<pid>/io can be read
+        result = self.sample(25 * MB, reported=100.0)
+
+        self.assertEqual(result['bytes_in'], 25 * MB)
+        self.assertEqual(result['percent'], 25.0)
+
+    def test_reported_percentage_without_proc_io(self):
+        result = self.sample(None, reported=40.0)
+
+        self.assertEqual(result['percent'], 40.0)
+        self.assertEqual(result['bytes_in'], 40 * MB)
+
+    def test_nothing_known(self):
+        result = self.sample(None)
+
+        self.assertIsNone(result['percent'])
+        self.assertIsNone(result['eta'])
+
+    def test_bytes_read_are_capped_at_the_source_size(self):
+        # rchar also counts libraries and other files mkfs reads
+        result = self.sample(150 * MB)
+
+        self.assertEqual(result['percent'], 100.0)
+
+
+class CancelCheckTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def cancel_after(self, calls):
+        """A cancel_check that raises from its `calls`th call on, counting every call."""
+        self.calls = 0
+
+        def check():
+            self.calls += 1
+            if self.calls >= calls:
+                raise PackCancelled("Cancelled")
+        return check
+
+    def test_create_package_stops_before_mkfs(self):
+        source = os.path.join(self.tmp.name, "game")
+        os.makedirs(source)
+        with open(os.path.join(source, "game.kzi"), 'w') as f:
+            f.write("[KZI]\n")
+
+        with mock.patch.object(erofs_core, 'run_mkfs') as run_mkfs, \
+                mock.patch.dict(os.environ, {'XDG_CACHE_HOME': self.tmp.name}):
+            with self.assertRaises(PackCancelled):
+                create_package(source, os.path.join(self.tmp.name, "game.kzp"), pkg_type="kzp", incremental=True,
+                               auto_hints=True, cancel_check=self.cancel_after(1))
+        run_mkfs.assert_not_called()
+
+    def test_hashing_threads_stop(self):
+        path = os.path.join(self.tmp.name, "image.kzp")
+        with open(path, 'wb') as f:
+            f.truncate(64 * 4096)
+
+        with self.assertRaises(PackCancelled):
+            hash_chunks(path, chunk_size=4096, jobs=4, cancel_check=self.cancel_after(3))
+        # Every chunk after the first cancellation is skipped
+        self.assertLess(self.calls, 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
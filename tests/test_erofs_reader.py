@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# Tests for the KZI Generator EROFS reader
+# Decodes checked-in lz4 blocks and reads tests/data/fixture.erofs (see tests/data/make_erofs_fixture.py)
+
+import os
+import sys
+import shutil
+import struct
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(TESTS_DIR, "data")
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, DATA_DIR)
+
+from erofs_reader import ErofsError, ErofsImage, _lz4_decompress_py, read_embedded_kzi
+from make_erofs_fixture import BLOCK_SIZE, BUILD_TIME, KZI_TEXT, contents
+
+FIXTURE = os.path.join(DATA_DIR, "fixture.erofs")
+
+# (lz4.block.compress(data, store_size=False), data), as produced by lz4 4.4.5
+LZ4_VECTORS = {
+    'literals only': (b'\xf0\x01hello, cartridge', b"hello, cartridge"),
+    'run of one byte': (b'\x1fa\x01\x00KPaaaaa', b"a" * 100),
+    'overlapping match': (b'?abc\x03\x00]Pbcabc', b"abc" * 40),
+    # 259 literals and a 597-byte match, both with 255-valued length bytes
+    'long lengths': (b'\xff\xf4' + bytes(range(256)) + b'xyz\x03\x00\xff\xff\x44\xf0\xf1' + bytes(range(255, -1, -1)),
+                     bytes(range(256)) + b"xyz" * 200 + bytes(range(255, -1, -1))),
+    'high compression': (b'\xf0\x05[KZI]\nName=Game\nId=g\x08\x00AExec\n\x00\x8f/run.sh\n)\x00\xff\x08Pn.sh\n',
+                         b"[KZI]\nName=Game\nId=game\nExec=game/run.sh\n" * 8),
+}
+
+
+class Lz4Tests(unittest.TestCase):
+
+    def test_vectors_decode(self):
+        for name, (compressed, data) in LZ4_VECTORS.items():
+            with self.subTest(name):
+                self.assertEqual(_lz4_decompress_py(compressed, len(data)), data)
+
+    def test_stops_after_the_requested_size(self):
+        # Deduplicated extents only use the front of a pcluster
+        for name, (compressed, data) in LZ4_VECTORS.items():
+            for size in (1, 3, len(data) // 2, len(data) - 1):
+                with self.subTest(name, size=size):
+                    self.assertEqual(_lz4_decompress_py(compressed, size), data[:size])
+
+    def test_match_before_the_start_is_rejected(self):
+        with self.assertRaisesRegex(ErofsError, "bad match offset"):
+            _lz4_decompress_py(b'\x14abcd\x09\x00', 100)
+
+    def test_zero_offset_is_rejected(self):
+        with self.assertRaisesRegex(ErofsError, "bad match offset"):
+            _lz4_decompress_py(b'\x14abcd\x00\x00', 100)
+
+    def test_truncated_input_is_rejected(self):
+        compressed, data = LZ4_VECTORS['long lengths']
+        with self.assertRaisesRegex(ErofsError, "truncated"):
+            _lz4_decompress_py(compressed[:264], len(data))
+
+
+class FixtureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.image = ErofsImage(FIXTURE)
+        self.addCleanup(self.image.close)
+        self.data = contents()
+
+    def broken_copy(self, size=None, patch=None):
+        """A copy of the fixture cut to `size` bytes and/or with {offset: bytes} written over it."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "broken.kzp")
+        with open(FIXTURE, 'rb') as f:
+            image = bytearray(f.read())
+        for offset, value in (patch or {}).items():
+            image[offset:offset + len(value)] = value
+        with open(path, 'wb') as f:
+            f.write(image[:size])
+        return path
+
+
+class ParsingTests(FixtureTestCase):
+
+    def test_superblock(self):
+        image = self.image
+        self.assertEqual(image.block_size, BLOCK_SIZE)
+        self.assertEqual(image.meta_blkaddr, 1)
+        self.assertEqual(image.blocks, os.path.getsize(FIXTURE) // BLOCK_SIZE)
+        self.assertEqual(image.build_time, BUILD_TIME)
+        self.assertEqual(image.volume_name, "kzi-fixture")
+        self.assertEqual(image.uuid, bytes(range(16)).hex())
+
+    def test_not_an_image(self):
+        path = self.broken_copy(patch={1024: b'\0\0\0\0'})
+        with self.assertRaisesRegex(ErofsError, "not an EROFS image"):
+            ErofsImage(path)
+
+    def test_empty_file(self):
+        with self.assertRaisesRegex(ErofsError, "empty"):
+            ErofsImage(self.broken_copy(size=0))
+
+    def test_unknown_feature(self):
+        path = self.broken_copy(patch={1024 + 80: struct.pack('<I', 0x101)})
+        with self.assertRaisesRegex(ErofsError, "features: 0x100"):
+            ErofsImage(path)
+
+    def test_inodes(self):
+        image = self.image
+        root = image.root
+        self.assertTrue(root.is_dir)
+        self.assertEqual(root.nlink, 4)
+
+        plain = image.lookup('plain.bin')
+        self.assertTrue(plain.is_file)
+        self.assertEqual(plain.mode & 0o777, 0o755)
+        self.assertEqual(plain.size, len(self.data['plain.bin']))
+        self.assertEqual((plain.uid, plain.gid), (1000, 1000))
+        # Compact inodes store mtime as an offset from the build time; the fixture uses the nid
+        self.assertEqual(plain.mtime, BUILD_TIME + plain.nid)
+
+        self.assertTrue(image.lookup('link', follow=False).is_symlink)
+        self.assertEqual(image.lookup('many/file-100').nlink, 250)
+        self.assertTrue(image.lookup('comp.bin').compressed)
+
+    def test_root_listing(self):
+        self.assertEqual(self.image.listdir(), ['big.bin', 'chunked.bin', 'comp.bin', 'fixture.kzi',
+                                                'link', 'many', 'plain.bin', 'sub'])
+        self.assertEqual(self.image.listdir('/sub/'), ['abs', 'nested.txt', 'up'])
+
+    def test_folder_spanning_two_blocks(self):
+        image = self.image
+        self.assertGreater(image.lookup('many').size, BLOCK_SIZE)
+        names = image.listdir('many')
+        self.assertEqual(names, [f"file-{i:03d}" for i in range(250)])
+        # Every entry is a hard link to the same empty file
+        self.assertEqual({inode.nid for _, inode in image.scandir('many')}, {image.lookup('many/file-000').nid})
+
+    def test_walk(self):
+        paths = [path for path, _ in self.image.walk()]
+        self.assertEqual(paths[:5], ['big.bin', 'chunked.bin', 'comp.bin', 'fixture.kzi', 'link'])
+        self.assertEqual(paths[-3:], ['sub/abs', 'sub/nested.txt', 'sub/up'])
+        self.assertEqual(len(paths), 8 + 250 + 3)
+
+    def test_symlinks(self):
+        image = self.image
+        self.assertEqual(image.readlink('link'), "sub/nested.txt")
+        self.assertEqual(image.read('link'), b"nested\n")
+        self.assertEqual(image.read('sub/up'), KZI_TEXT)
+        # Absolute links point outside the image
+        self.assertFalse(image.exists('sub/abs'))
+        self.assertTrue(image.exists('sub/../sub/nested.txt'))
+        with self.assertRaises(FileNotFoundError):
+            image.read('sub/abs')
+
+    def test_missing_paths(self):
+        self.assertFalse(self.image.exists('nope'))
+        with self.assertRaises(FileNotFoundError):
+            self.image.lookup('fixture.kzi/inside')
+        with self.assertRaises(NotADirectoryError):
+            self.image.listdir('plain.bin')
+        with self.assertRaises(IsADirectoryError):
+            self.image.read('sub')
+
+    def test_embedded_kzi(self):
+        self.assertEqual(self.image.find_kzi_files(), ['fixture.kzi'])
+        self.assertEqual(read_embedded_kzi(FIXTURE), [('fixture.kzi', KZI_TEXT.decode())])
+
+
+class FlatReadTests(FixtureTestCase):
+    """big.bin is one full block plus a 100-byte tail stored inline after its inode."""
+
+    def read(self, offset, size):
+        return self.image.read('big.bin', offset, size)
+
+    def test_whole_file(self):
+        self.assertEqual(self.image.read('big.bin'), self.data['big.bin'])
+
+    def test_block_only(self):
+        self.assertEqual(self.read(0, BLOCK_SIZE), self.data['big.bin'][:BLOCK_SIZE])
+
+    def test_tail_only(self):
+        self.assertEqual(self.read(BLOCK_SIZE, 100), self.data['big.bin'][BLOCK_SIZE:])
+
+    def test_across_the_tail_boundary(self):
+        for offset, size in ((BLOCK_SIZE - 1, 2), (BLOCK_SIZE - 10, 20), (1, BLOCK_SIZE + 98)):
+            with self.subTest(offset=offset, size=size):
+                self.assertEqual(self.read(offset, size), self.data['big.bin'][offset:offset + size])
+
+    def test_last_byte_and_past_the_end(self):
+        size = len(self.data['big.bin'])
+        self.assertEqual(self.read(size - 1, 1), self.data['big.bin'][-1:])
+        self.assertEqual(self.read(size - 10, 1000), self.data['big.bin'][-10:])
+        self.assertEqual(self.read(size, 10), b"")
+        self.assertEqual(self.read(0, 0), b"")
+
+    def test_read_flat_at_the_boundary(self):
+        inode = self.image.lookup('big.bin')
+        self.assertEqual(self.image._read_flat(inode, BLOCK_SIZE, 1), self.data['big.bin'][BLOCK_SIZE:BLOCK_SIZE + 1])
+        self.assertEqual(self.image._read_flat(inode, BLOCK_SIZE - 1, 1), self.data['big.bin'][BLOCK_SIZE - 1:BLOCK_SIZE])
+
+    def test_plain_file_with_a_partial_last_block(self):
+        self.assertEqual(self.image.read('plain.bin'), self.data['plain.bin'])
+        self.assertEqual(self.image.read('plain.bin', 2 * BLOCK_SIZE, 100), self.data['plain.bin'][2 * BLOCK_SIZE:])
+
+    def test_data_outside_the_image(self):
+        # plain.bin starts at block 3
+        with ErofsImage(self.broken_copy(size=3 * BLOCK_SIZE + 100)) as image:
+            with self.assertRaisesRegex(ErofsError, "outside the image"):
+                image.read('plain.bin')
+
+
+class JoinedReadTests(FixtureTestCase):
+    """Reads that stitch several pieces together: chunks with a hole, and compressed extents."""
+
+    def test_chunks_and_hole(self):
+        chunk0, chunk2 = self.data['chunked.bin']
+        expected = chunk0 + bytes(BLOCK_SIZE) + chunk2
+        self.assertEqual(self.image.read('chunked.bin'), expected)
+        for offset, size in ((BLOCK_SIZE - 5, 10), (2 * BLOCK_SIZE - 5, 10), (100, 2 * BLOCK_SIZE)):
+            with self.subTest(offset=offset, size=size):
+                self.assertEqual(self.image.read('chunked.bin', offset, size), expected[offset:offset + size])
+
+    def test_compressed_file(self):
+        # lz4 extent at 0, plain extent at 5000, lz4 extent at 9096 that spans two lclusters
+        self.assertEqual(self.image.read('comp.bin'), b"".join(self.data['comp.bin']))
+
+    def test_compressed_ranges(self):
+        expected = b"".join(self.data['comp.bin'])
+        for offset, size in ((4090, 20), (4999, 2), (5000, 4096), (9095, 2), (12000, 100), (16380, 100)):
+            with self.subTest(offset=offset, size=size):
+                with ErofsImage(FIXTURE) as image:
+                    self.assertEqual(image.read('comp.bin', offset, size), expected[offset:offset + size])
+
+    def test_compressed_extent_read_from_its_second_lcluster_first(self):
+        # The cached extent must be the whole extent whichever lcluster it was first read through
+        expected = b"".join(self.data['comp.bin'])
+        self.assertEqual(self.image.read('comp.bin', 13000, 10), expected[13000:13010])
+        self.assertEqual(self.image.read('comp.bin', 9096, 7288), expected[9096:])
+        self.assertEqual(self.image.read('comp.bin', 0, 10), expected[:10])
+        self.assertEqual(self.image.read('comp.bin', 4096, 904), expected[4096:5000])
+
+    def test_chunked_reading(self):
+        for path in ('comp.bin', 'big.bin', 'chunked.bin'):
+            with self.subTest(path):
+                self.assertEqual(b"".join(self.image.iter_read(path, chunk_size=1000)), self.image.read(path))
+
+    def test_extract(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        dest = os.path.join(tmp, "out")
+        count = self.image.extract('', dest)
+
+        self.assertEqual(count, 6 + 250 + 3) # folders are not counted
+        with open(os.path.join(dest, 'comp.bin'), 'rb') as f:
+            self.assertEqual(f.read(), b"".join(self.data['comp.bin']))
+        self.assertEqual(os.readlink(os.path.join(dest, 'sub', 'abs')), "/etc/passwd")
+        self.assertEqual(os.stat(os.path.join(dest, 'plain.bin')).st_mode & 0o777, 0o755)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# Tests for the KZI Generator linter
+# Duplicate-Id detection between loose .kzi files and the packages built from them
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kzi_lint
+from build_manifest import record_build
+from kzi_lint import lint_paths
+
+KZI_TEXT = "[KZI]\nName=Game\nId=game\nExec=run.sh\n"
+
+
+def fake_lint_package(image_path):
+    """Stands in for reading a real image: every package holds a valid game.kzi with Id 'game'."""
+    return [{'path': os.path.join(image_path, 'game.kzi'), 'package': image_path, 'id': 'game',
+             'errors': [], 'warnings': []}]
+
+
+class DuplicateIdTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.library = os.path.join(self.tmp.name, "library")
+        self.folder = self.make_game("game")
+
+        # Build manifests live in the cache; keep them inside the test folder
+        for patcher in (mock.patch.dict(os.environ, {'XDG_CACHE_HOME': os.path.join(self.tmp.name, "cache")}),
+                        mock.patch.object(kzi_lint, 'lint_package', fake_lint_package)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_game(self, name):
+        folder = os.path.join(self.library, name)
+        os.makedirs(folder)
+        with open(os.path.join(folder, "game.kzi"), 'w') as f:
+            f.write(KZI_TEXT)
+        open(os.path.join(folder, "run.sh"), 'w').close()
+        return folder
+
+    def make_package(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+        return path
+
+    def errors(self, *paths):
+        return {result['path']: result['errors'] for result in lint_paths(paths)['results']}
+
+    def test_package_beside_its_folder_is_the_same_cartridge(self):
+        # Where pack-batch saves it: next to the folder, named after the .kzi
+        self.make_package(os.path.join(self.library, "game.kzp"))
+
+        errors = self.errors(self.library)
+
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(list(errors.values()), [[], []])
+
+    def test_package_built_from_the_folder_elsewhere_is_the_same_cartridge(self):
+        package = self.make_package(os.path.join(self.tmp.name, "sd", "game.kzp"))
+        record_build(self.folder, package, {}, {})
+
+        errors = self.errors(self.library, package)
+
+        self.assertEqual(list(errors.values()), [[], []])
+
+    def test_unrelated_package_with_the_same_name_is_a_duplicate(self):
+        package = self.make_package(os.path.join(self.tmp.name, "sd", "game.kzp"))
+
+        errors = self.errors(self.library, package)
+
+        self.assertEqual(errors[os.path.join(package, "game.kzi")],
+                         [f"Duplicate Id 'game' (also in {os.path.join(self.folder, 'game.kzi')})"])
+        self.assertEqual(errors[os.path.join(self.folder, "game.kzi")],
+                         [f"Duplicate Id 'game' (also in {os.path.join(package, 'game.kzi')})"])
+
+    def test_package_built_from_another_folder_is_a_duplicate(self):
+        other = self.make_game("other")
+        package = self.make_package(os.path.join(self.tmp.name, "sd", "game.kzp"))
+        record_build(other, package, {}, {})
+
+        errors = self.errors(self.folder, package)
+
+        self.assertEqual(len(errors[os.path.join(package, "game.kzi")]), 1)
+        self.assertEqual(len(errors[os.path.join(self.folder, "game.kzi")]), 1)
+
+    def test_two_loose_copies_stay_duplicates_beside_a_package(self):
+        other = self.make_game("copy")
+        self.make_package(os.path.join(self.library, "game.kzp"))
+
+        errors = self.errors(self.library)
+
+        # The package matches both folders, but the folders still clash with each other
+        self.assertEqual(errors[os.path.join(self.library, "game.kzp", "game.kzi")], [])
+        self.assertEqual(errors[os.path.join(self.folder, "game.kzi")],
+                         [f"Duplicate Id 'game' (also in {os.path.join(other, 'game.kzi')})"])
+        self.assertEqual(errors[os.path.join(other, "game.kzi")],
+                         [f"Duplicate Id 'game' (also in {os.path.join(self.folder, 'game.kzi')})"])
+
+
+if __name__ == "__main__":
+    unittest.main()
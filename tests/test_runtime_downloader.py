@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# Tests for the KZI Generator runtime downloader
+# Runs download_file against a local threaded HTTP server with Range support
+
+import os
+import sys
+import hashlib
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runtime_downloader
+from runtime_downloader import DownloadError, download_file, get_part_path, get_state_path, save_resume_state
+
+SEGMENT_SIZE = 64 * 1024 # stands in for MIN_SEGMENT_SIZE so segmented downloads stay small
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """
+    Serves `server.body` at any path. Honours single Range requests and
+    If-Range when `server.ranges` is set, and cuts the first `server.truncate`
+    GET responses short after `server.truncate_at` bytes. Every request is
+    recorded in `server.requests` as (method, Range, If-Range).
+    """
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body):
+        server = self.server
+        ranged = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        with server.lock:
+            server.requests.append((self.command, ranged, if_range))
+            truncate = send_body and server.truncate > 0
+            if truncate:
+                server.truncate -= 1
+
+        body = server.body
+        start, end = 0, len(body) - 1
+        partial = server.ranges and ranged and (if_range is None or if_range == server.etag)
+        if partial:
+            first, _, last = ranged[len('bytes='):].partition('-')
+            start = int(first)
+            end = min(int(last), end) if last else end
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('ETag', server.etag)
+        if server.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+        if send_body:
+            data = body[start:end + 1]
+            if truncate:
+                data = data[:server.truncate_at]
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DownloadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.save_path = os.path.join(self.tmp.name, "runtime.kzr")
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.ranges = True
+        self.server.truncate = 0
+        self.server.truncate_at = 0
+        self.serve(os.urandom(5 * SEGMENT_SIZE + 123), '"v1"')
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/runtime.kzr"
+
+        # Small segments, and no real back-off between retries
+        for patcher in (mock.patch.object(runtime_downloader, 'MIN_SEGMENT_SIZE', SEGMENT_SIZE),
+                        mock.patch.object(runtime_downloader.time, 'sleep')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def serve(self, body, etag):
+        self.server.body = body
+        self.server.etag = etag
+
+    def gets(self):
+        return [request for request in self.server.requests if request[0] == 'GET']
+
+    def assertDownloaded(self, state):
+        with open(self.save_path, 'rb') as f:
+            self.assertEqual(f.read(), self.server.body)
+        self.assertEqual(state['sha256'], hashlib.sha256(self.server.body).hexdigest())
+        self.assertFalse(os.path.exists(get_part_path(self.save_path)))
+        self.assertFalse(os.path.exists(get_state_path(self.save_path)))
+
+
+class SegmentedDownloadTests(DownloadTestCase):
+
+    def test_segments_fetch_disjoint_ranges(self):
+        state = download_file(self.url, self.save_path, segments=4)
+
+        self.assertDownloaded(state)
+        ranges = sorted(tuple(int(n) for n in request[1][len('bytes='):].split('-')) for request in self.gets())
+        self.assertEqual(len(ranges), 4)
+        # Back to back, covering the whole file once
+        self.assertEqual([start for start, _ in ranges], [0] + [end + 1 for _, end in ranges[:-1]])
+        self.assertEqual(ranges[-1][1], len(self.server.body) - 1)
+
+    def test_falls_back_to_single_stream_without_range_support(self):
+        self.server.ranges = False
+
+        state = download_file(self.url, self.save_path, segments=4)
+
+        self.assertDownloaded(state)
+        self.assertEqual(self.gets(), [('GET', None, None)])
+
+    def test_falls_back_to_single_stream_for_small_files(self):
+        self.serve(os.urandom(SEGMENT_SIZE), '"small"')
+
+        state = download_file(self.url, self.save_path, segments=4)
+
+        self.assertDownloaded(state)
+        self.assertEqual(self.gets(), [('GET', None, None)])
+
+    def test_truncated_segment_resumes_its_own_range(self):
+        self.server.truncate = 1
+        self.server.truncate_at = 1000
+
+        state = download_file(self.url, self.save_path, segments=2)
+
+        self.assertDownloaded(state)
+        gets = self.gets()
+        self.assertEqual(len(gets), 3)
+        # The first GET was cut off; its retry asks for the rest of the same range only
+        start, end = (int(n) for n in gets[0][1][len('bytes='):].split('-'))
+        self.assertIn(('GET', f"bytes={start + 1000}-{end}", '"v1"'), gets[1:])
+        self.assertTrue(all(request[2] == '"v1"' for request in gets))
+
+
+class ResumeTests(DownloadTestCase):
+
+    def test_truncated_stream_resumes_with_range_and_if_range(self):
+        self.server.truncate = 1
+        self.server.truncate_at = 10000
+
+        state = download_file(self.url, self.save_path)
+
+        self.assertDownloaded(state)
+        self.assertEqual(self.gets(), [('GET', None, None), ('GET', 'bytes=10000-', '"v1"')])
+
+    def test_if_range_mismatch_restarts_from_scratch(self):
+        # A .part left over from an older version of the file
+        old_body = os.urandom(len(self.server.body))
+        with open(get_part_path(self.save_path), 'wb') as f:
+            f.write(old_body[:20000])
+        save_resume_state(self.save_path, {'url': self.url, 'etag': '"v0"', 'last_modified': None,
+                                           'total_size': len(old_body), 'downloaded': 20000})
+
+        state = download_file(self.url, self.save_path)
+
+        self.assertDownloaded(state)
+        self.assertEqual(self.gets(), [('GET', 'bytes=20000-', '"v0"')])
+
+    def test_checksum_mismatch_discards_the_download(self):
+        with self.assertRaises(DownloadError):
+            download_file(self.url, self.save_path, expected_sha256="0" * 64)
+
+        self.assertFalse(os.path.exists(self.save_path))
+        self.assertFalse(os.path.exists(get_part_path(self.save_path)))
+        self.assertFalse(os.path.exists(get_state_path(self.save_path)))
+
+    def test_size_mismatch_discards_a_segmented_download(self):
+        with self.assertRaises(DownloadError):
+            download_file(self.url, self.save_path, segments=4, expected_size=len(self.server.body) + 1)
+
+        self.assertFalse(os.path.exists(self.save_path))
+        self.assertFalse(os.path.exists(get_part_path(self.save_path)))
+        self.assertFalse(os.path.exists(get_state_path(self.save_path)))
+
+
+if __name__ == "__main__":
+    unittest.main()